@@ -1,12 +1,17 @@
-import dspy
 import json
 from typing import List, Dict, Optional
 import logging
 
-from plugins.mcp.app.dspy_env import apply_litellm_ssl_verify
+from plugins.mcp.app.capabilities.rag_embedders import create_embedder, is_local_model
+from plugins.mcp.app.capabilities.rag_store import get_embedding_store, top_k
+from plugins.mcp.app.capabilities.rag_hybrid import HybridIndex, reciprocal_rank_fusion
+from plugins.mcp.app.capabilities.rag_chunker import CHUNK_TYPES, StixChunk, chunk_bundle, merge_chunks
 
 class RAGService:
     """RAG service for CTI (Cyber Threat Intelligence) data retrieval using STIX bundles."""
+
+    # STIX object types that become retrieval chunks
+    CHUNK_TYPES = CHUNK_TYPES
     
     def __init__(
         self,
@@ -20,7 +25,12 @@ class RAGService:
         self.topk_objects_to_retrieve = 5
         self.corpus = []
         self.adv_step = {}
-        self.search = None
+        self.embedder = None
+        self.store = None
+        # Unit-normalized corpus vectors gathered from the embedding store
+        self.matrix = None
+        # Exact-key + BM25 index over the same corpus
+        self.hybrid = None
         # Embedding-side credentials. Default to the chat LLM key/base when
         # the orchestrator does not supply a separate embedding provider.
         self.api_key = api_key
@@ -47,72 +57,115 @@ class RAGService:
     
     def initialize_from_bundles(self, stix_bundles: List[dict], embed_model: str = 'openai/text-embedding-3-small'):
         """Initialize the RAG service with multiple STIX bundles and create retriever."""
-        all_corpus = []
-        all_adv_step = {}
-        for bundle in stix_bundles:
-            corpus, adv_step = self.extract_text_chunks(bundle)
-            all_corpus.extend(corpus)
-            all_adv_step.update(adv_step)
-
-        self.corpus = all_corpus
-        self.adv_step = all_adv_step
-        
+        chunks = merge_chunks(self.extract_chunks(bundle) for bundle in stix_bundles)
+        self.initialize_from_stix_chunks(chunks, embed_model=embed_model)
+
+    def initialize_from_stix_chunks(self, chunks: List[StixChunk], embed_model: str = 'openai/text-embedding-3-small'):
+        """Initialize the retriever from structured chunks (see rag_chunker.py)."""
+        self.initialize_from_chunks(
+            [c.text for c in chunks],
+            {c.name: c.description for c in chunks},
+            embed_model=embed_model,
+            chunk_keys={c.text: set(c.keys) for c in chunks if c.keys},
+        )
+
+    def initialize_from_chunks(
+        self,
+        corpus: List[str],
+        adv_step: Dict[str, str],
+        embed_model: str = 'openai/text-embedding-3-small',
+        chunk_keys: Optional[Dict[str, set]] = None,
+    ):
+        """Initialize the retriever from chunks already extracted from bundles."""
+        self.corpus = list(corpus)
+        self.adv_step = dict(adv_step)
+        self.hybrid = HybridIndex(self.corpus, chunk_keys)
+
         self.log.info("Initializing embeddings and retriever for STIX corpus")
-        embedder_kwargs = {"api_key": self.api_key}
-        if self.api_base:
-            embedder_kwargs["api_base"] = self.api_base
-            embedder_kwargs["custom_llm_provider"] = "custom_openai"
-        apply_litellm_ssl_verify(self.ssl_verify)
-        embedder = dspy.Embedder(embed_model, **embedder_kwargs)
-        self.search = dspy.retrievers.Embeddings(
-            corpus=self.corpus,
-            embedder=embedder, 
-            k=self.topk_objects_to_retrieve,
+        # local/... models embed in-process; anything else goes through dspy
+        self.embedder = create_embedder(
+            embed_model,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            ssl_verify=self.ssl_verify,
         )
-        self.log.info(f"[RAG] Initialized search retriever: {self.search} with model {embed_model} and k={self.topk_objects_to_retrieve}")
-    
-    def extract_text_chunks(self, stix_bundle: dict) -> tuple[List[str], Dict[str, str]]:
+
+        # Only chunks never seen before under this model (and endpoint)
+        # are embedded; local models ignore api_base.
+        self.store = get_embedding_store(
+            embed_model, api_base=None if is_local_model(embed_model) else self.api_base,
+        )
+        rows = self.store.ensure(self.corpus, self.embedder)
+        self.matrix = self.store.vectors(rows)
+        self.log.info(
+            f"[RAG] Initialized search over {len(self.corpus)} chunks "
+            f"with model {embed_model} and k={self.topk_objects_to_retrieve}"
+        )
+
+    def search(self, query: str, k: Optional[int] = None) -> List[str]:
+        """Top-k chunks: exact-key hits first, then BM25 + vector RRF.
+
+        The query is only embedded when exact keys do not already fill k.
+        """
+        if self.hybrid is None or not self.corpus:
+            return []
+        k = k or self.topk_objects_to_retrieve
+
+        exact = self.hybrid.exact_hits(query)
+        if len(exact) >= k:
+            return [self.corpus[i] for i in exact[:k]]
+
+        pool = max(4 * k, 20)
+        rankings = [self.hybrid.lexical(query, pool)]
+        if self.matrix is not None and self.embedder is not None:
+            rankings.append([i for i, _ in top_k(self.matrix, self.embedder([query]), pool)])
+
+        ordered = list(exact)
+        seen = set(exact)
+        for i in reciprocal_rank_fusion(rankings):
+            if i not in seen:
+                seen.add(i)
+                ordered.append(i)
+        return [self.corpus[i] for i in ordered[:k]]
+
+    @property
+    def ready(self) -> bool:
+        return self.hybrid is not None
+
+    @staticmethod
+    def extract_chunks(stix_bundle: dict) -> List[StixChunk]:
+        """Structure-aware chunks (object + 1-hop neighbors) for a bundle."""
+        return chunk_bundle(stix_bundle)
+
+    @staticmethod
+    def extract_text_chunks(stix_bundle: dict) -> tuple[List[str], Dict[str, str]]:
         """Extract text chunks from STIX bundle objects."""
-        text_chunks = []
-        adv_step = {}
-        
-        for obj in stix_bundle.get("objects", []):
-            if obj.get("type") in [
-                "attack-pattern", "malware", "tool", "threat-actor", 
-                "intrusion-set", "identity", "indicator", "report"
-            ]:
-                name = obj.get("name", "")
-                description = obj.get("description", "")
-                
-                if name or description:
-                    adv_step[name] = description
-                    text_chunks.append(f"{name} | {description}")
-        
-        return text_chunks, adv_step
+        chunks = chunk_bundle(stix_bundle)
+        return [c.text for c in chunks], {c.name: c.description for c in chunks}
+
+    @staticmethod
+    def extract_chunk_keys(stix_bundle: dict) -> Dict[str, set]:
+        """Map each chunk to the exact keys (external IDs, aliases) of its object."""
+        return {c.text: set(c.keys) for c in chunk_bundle(stix_bundle) if c.keys}
     
-    def search_cti_title(self, query: str) -> List[str]:
+    def search_cti_title(self, query: str, k: Optional[int] = None) -> List[str]:
         """Returns top-5 results and then the names of the top-5 to top-30 results."""
         self.log.info(f"Searching CTI title with query: {query}")
         
-        if not self.search:
+        if not self.ready:
             self.log.warning("Search attempted but RAG service not initialized with STIX data")
             return ["RAG service not initialized with STIX data"]
-            
-        self.log.debug(f"Using search retriever: {self.search}")
-        
-        topK = self.search(query)
+
+        topK = self.search(query, k)
         self.log.debug(f" Retrieved top {len(topK)} results")
         self.log.info(f"topK: {topK}")
-        names = []
         if len(topK) > 5:
-            names = [f"{x.split(' | ')[0]}" for x in topK.passages[5:30]]
+            names = [f"{x.split(' | ')[0]}" for x in topK[5:30]]
             topK = topK[:5]
-            self.log.info(f"names: {names}")
         else:
-            names = [f"{x.split(' | ')[0]}" for x in topK.passages]
-            topK = topK
-            self.log.info(f"names: {names}")
-        return topK.passages
+            names = [f"{x.split(' | ')[0]}" for x in topK]
+        self.log.info(f"names: {names}")
+        return topK
     
     def search_cti_data_by_title(self, name: str) -> str:
         """Returns the full CTI data for a given name."""
@@ -122,11 +175,16 @@ class RAGService:
             self.log.debug("Found title in adv_step cache")
             return self.adv_step[name]
         
-        if not self.search:
+        if not self.ready:
             self.log.warning("Search attempted but RAG service not initialized with STIX data")
             return "RAG service not initialized with STIX data"
         
-        results = [x for x in self.search(name, 10) if x.startswith(name + " | ")]
+        # Exact keys and BM25 only: a title lookup never needs an embedding
+        candidates = self.hybrid.exact_hits(name) + self.hybrid.lexical(name, 10)
+        results = [
+            self.corpus[i] for i in candidates
+            if self.corpus[i].startswith(name + " | ")
+        ]
         if not results:
             self.log.warning(f"No CTI data found for name: {name}")
             return f"No CTI data found for name: {name}"
@@ -134,18 +192,19 @@ class RAGService:
         self.log.debug(f"Found {len(results)} matching results")
         return results[0]
     
-    def get_context_for_task(self, task: str) -> Dict[str, any]:
+    def get_context_for_task(self, task: str, k: Optional[int] = None) -> Dict[str, any]:
         thoughts = []
 
         thoughts.append(f"Getting context for task: {task}")
-        cti_results = self.search_cti_title(task)
+        cti_results = self.search_cti_title(task, k)
         thoughts.append(f"Retrieved {len(cti_results)} CTI results")
 
         detailed_context = []
         for result in cti_results[:3]:
             if " | " in result:
-                name = result.split(" | ")[0]
-                detail = self.search_cti_data_by_title(name)
+                # The hit already carries its description; no second search
+                name, _, description = result.partition(" | ")
+                detail = self.adv_step.get(name, description)
                 detailed_context.append({
                     "name": name,
                     "description": detail
@@ -189,6 +248,7 @@ import asyncio
 from pathlib import Path
 
 from plugins.mcp.app.capabilities.base import Capability
+from plugins.mcp.app.capabilities.rag_corpus import get_rag_corpus
 
 
 def _resolve_rag_file(base_dir: Path, name: str) -> Path:
@@ -232,7 +292,7 @@ def _format_rag_context(rag_context: dict) -> str:
 
 def _build_rag_context_sync(
     prompt: str,
-    bundles: list[dict],
+    paths: list[Path],
     *,
     api_key: str,
     api_base: str | None,
@@ -240,20 +300,26 @@ def _build_rag_context_sync(
     embed_model: str,
     topk: int,
 ) -> str:
-    rag = RAGService(api_key=api_key, api_base=api_base, ssl_verify=ssl_verify)
-    rag.topk_objects_to_retrieve = topk
-    rag.initialize_from_bundles(bundles, embed_model=embed_model)
-    raw_context = rag.get_context_for_task(prompt)
+    rag = get_rag_corpus().service_for(
+        paths,
+        api_key=api_key,
+        api_base=api_base,
+        ssl_verify=ssl_verify,
+        embed_model=embed_model,
+    )
+    raw_context = rag.get_context_for_task(prompt, k=topk)
     return _format_rag_context(raw_context)
 
 
 async def _enrich(prompt: str, settings: dict) -> dict:
-    """Build a RAGService from selected files and return cti_context string.
+    """Retrieve from the shared RAG corpus and return cti_context string.
 
     settings keys (all optional):
       rag_files       list of filenames under plugins/mcp/data/
       topk            int, defaults to 5
-      embed_model     str, defaults to openai/text-embedding-3-small
+      embed_model     str, defaults to openai/text-embedding-3-small;
+                      local/spacy or local/onnx:<path> embed offline
+                      (see rag_embedders.py)
       api_key         str, embedding key fallback (mcp_svc fills this with
                       the resolved chat-LLM key when the caller does not
                       override it via embed_api_key)
@@ -275,18 +341,17 @@ async def _enrich(prompt: str, settings: dict) -> dict:
     topk = int(settings.get("topk") or 5)
 
     base_dir = Path(__file__).resolve().parent.parent.parent / "data"
-    bundles = []
+    paths = []
     for name in rag_files:
         path = _resolve_rag_file(base_dir, name)
         if not path.exists():
             raise FileNotFoundError(f"RAG file not found: {path}")
-        with open(path, "r", encoding="utf-8") as f:
-            bundles.append(json.load(f))
+        paths.append(path)
 
     cti_context = await asyncio.to_thread(
         _build_rag_context_sync,
         prompt,
-        bundles,
+        paths,
         api_key=embed_api_key,
         api_base=embed_api_base,
         ssl_verify=ssl_verify,
@@ -0,0 +1,260 @@
+"""Structure-aware STIX chunking for the RAG capability.
+
+A bare ``name | description`` chunk throws away everything STIX says about
+how an object fits into the intrusion, so retrieval returns isolated
+objects and the LLM spends tool calls putting the picture back together.
+Each chunk built here is still one SDO, with its context written inline:
+
+    Mimikatz | Credential dumper used to obtain plaintext passwords ...
+    type: tool; ids: S0002; platforms: Windows; phases: credential-access
+    uses: LSASS Memory (attack-pattern); used-by: ALPHV (threat-actor)
+
+  * line 1  name and description, in the format every RAGService caller
+            already splits on (``chunk.split(" | ")[0]`` is the name)
+  * line 2  type, external IDs, aliases, platforms, kill-chain phases and
+            indicator patterns
+  * line 3  1-hop neighbors over relationship and sighting SROs,
+            uses/targets/indicates first
+
+Chunks are held to a token budget (estimated at ~4 characters per token):
+neighbors are capped first, then the description is truncated, so no
+object can crowd the others out of the prompt. The full description is
+still returned separately for ``adv_step``.
+
+Every chunk has a stable ID (the STIX object id, or a hash of type and
+name for id-less objects) and neighbors are sorted deterministically, so
+the same bundle always yields the same text and the embedding store can
+cache it. ``merge_chunks`` deduplicates the same object across bundles.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+# STIX object types that become retrieval chunks
+CHUNK_TYPES = (
+    "attack-pattern", "malware", "tool", "threat-actor",
+    "intrusion-set", "identity", "indicator", "report",
+    "campaign", "vulnerability", "course-of-action", "infrastructure",
+)
+
+# Relationship types that carry the most operational context, in order
+PRIORITY_RELATIONS = ("uses", "targets", "indicates", "exploits", "attributed-to", "mitigates")
+
+_INVERSE = {
+    "uses": "used-by",
+    "targets": "targeted-by",
+    "indicates": "indicated-by",
+    "exploits": "exploited-by",
+    "attributed-to": "attribution-of",
+    "mitigates": "mitigated-by",
+    "delivers": "delivered-by",
+    "drops": "dropped-by",
+    "downloads": "downloaded-by",
+    "variant-of": "has-variant",
+    "located-at": "location-of",
+    "hosts": "hosted-by",
+    "owns": "owned-by",
+    "authored-by": "authored",
+    "compromises": "compromised-by",
+    "sighting-of": "sighted-by",
+}
+
+MAX_CHUNK_TOKENS = 320
+# Share of the budget the neighbor line may take before it is capped
+NEIGHBOR_SHARE = 0.35
+MAX_PATTERN_CHARS = 160
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 1:
+        return ""
+    cut = text.rfind(" ", 0, max_chars - 1)
+    return text[: cut if cut > max_chars // 2 else max_chars - 1].rstrip() + "…"
+
+
+def display_name(obj: dict) -> str:
+    for key in ("name", "display_name", "user_id", "value", "x_cti_ip"):
+        if obj.get(key):
+            return str(obj[key])
+    return str(obj.get("id") or obj.get("type") or "")
+
+
+def chunk_id(obj: dict) -> str:
+    if obj.get("id"):
+        return str(obj["id"])
+    digest = hashlib.sha256(f"{obj.get('type')}|{obj.get('name', '')}".encode("utf-8")).hexdigest()
+    return f"chunk--{digest[:32]}"
+
+
+@dataclass(frozen=True)
+class StixChunk:
+    """One retrieval chunk built around a single STIX object."""
+
+    id: str
+    type: str
+    name: str
+    description: str
+    text: str
+    keys: frozenset = field(default_factory=frozenset)
+    neighbors: int = 0
+
+
+def _object_keys(obj: dict) -> set:
+    """External IDs and aliases that identify an object exactly."""
+    found = set()
+    for ref in obj.get("external_references") or []:
+        if isinstance(ref, dict) and ref.get("external_id"):
+            found.add(str(ref["external_id"]))
+    for key in ("aliases", "x_mitre_aliases"):
+        found.update(str(a) for a in obj.get(key) or [] if a)
+    return found
+
+
+def _meta_line(obj: dict) -> str:
+    parts = [f"type: {obj.get('type')}"]
+    ids = sorted({
+        str(ref["external_id"])
+        for ref in obj.get("external_references") or []
+        if isinstance(ref, dict) and ref.get("external_id")
+    })
+    if ids:
+        parts.append("ids: " + ", ".join(ids))
+    name = obj.get("name")
+    aliases = sorted({
+        str(a) for key in ("aliases", "x_mitre_aliases")
+        for a in obj.get(key) or [] if a and a != name
+    })
+    if aliases:
+        parts.append("aliases: " + ", ".join(aliases))
+    platforms = obj.get("x_mitre_platforms") or obj.get("platforms") or []
+    if platforms:
+        parts.append("platforms: " + ", ".join(sorted(map(str, platforms))))
+    phases = sorted({
+        p.get("phase_name") for p in obj.get("kill_chain_phases") or []
+        if isinstance(p, dict) and p.get("phase_name")
+    })
+    if phases:
+        parts.append("phases: " + ", ".join(phases))
+    if obj.get("pattern"):
+        parts.append("pattern: " + _truncate(" ".join(str(obj["pattern"]).split()), MAX_PATTERN_CHARS))
+    return "; ".join(parts)
+
+
+def _edges(objects: list[dict]) -> dict[str, list[tuple[str, str]]]:
+    """object id -> [(label, neighbor id)] over relationship and sighting SROs."""
+    edges: dict[str, list[tuple[str, str]]] = {}
+    for obj in objects:
+        if obj.get("type") == "relationship":
+            rel = obj.get("relationship_type") or "related-to"
+            src, tgt = obj.get("source_ref"), obj.get("target_ref")
+            if not (src and tgt):
+                continue
+            edges.setdefault(src, []).append((rel, tgt))
+            edges.setdefault(tgt, []).append((_INVERSE.get(rel, rel), src))
+        elif obj.get("type") == "sighting" and obj.get("sighting_of_ref"):
+            sighted = obj["sighting_of_ref"]
+            for ref in obj.get("where_sighted_refs") or []:
+                edges.setdefault(sighted, []).append(("sighted-by", ref))
+                edges.setdefault(ref, []).append(("sighting-of", sighted))
+    return edges
+
+
+def _label_rank(label: str) -> tuple:
+    for i, rel in enumerate(PRIORITY_RELATIONS):
+        if label in (rel, _INVERSE.get(rel)):
+            return (i, label)
+    return (len(PRIORITY_RELATIONS), label)
+
+
+def _neighbor_line(obj_edges: list[tuple[str, str]], by_id: dict, max_chars: int) -> tuple[str, int]:
+    grouped: dict[str, set] = {}
+    for label, ref in obj_edges:
+        other = by_id.get(ref)
+        shown = f"{display_name(other)} ({other.get('type')})" if other else ref
+        grouped.setdefault(label, set()).add(shown)
+
+    total = sum(len(v) for v in grouped.values())
+    groups = []
+    used = kept = 0
+    for label in sorted(grouped, key=_label_rank):
+        names = []
+        for shown in sorted(grouped[label]):
+            piece = len(shown) + len(label) + 4
+            if used + piece > max_chars:
+                break
+            names.append(shown)
+            used += piece
+        if names:
+            groups.append(f"{label}: " + ", ".join(names))
+            kept += len(names)
+    line = "; ".join(groups)
+    if kept < total:
+        line = (line + "; " if line else "") + f"(+{total - kept} more)"
+    return line, total
+
+
+def chunk_bundle(stix_bundle: dict, max_tokens: int = MAX_CHUNK_TOKENS) -> list[StixChunk]:
+    """Build one token-budgeted chunk per retrievable SDO in a bundle."""
+    objects = [o for o in stix_bundle.get("objects", []) if isinstance(o, dict)]
+    by_id = {o["id"]: o for o in objects if o.get("id")}
+    edges = _edges(objects)
+    budget = max_tokens * CHARS_PER_TOKEN
+
+    chunks = []
+    for obj in objects:
+        if obj.get("type") not in CHUNK_TYPES:
+            continue
+        name = obj.get("name", "")
+        description = obj.get("description", "")
+        if not (name or description):
+            continue
+
+        meta = _meta_line(obj)
+        related, n_neighbors = _neighbor_line(
+            sorted(set(edges.get(obj.get("id"), ()))), by_id, int(budget * NEIGHBOR_SHARE)
+        )
+        tail = "\n" + meta + ("\n" + related if related else "")
+        room = budget - len(name) - len(" | ") - len(tail)
+        text = f"{name} | {_truncate(' '.join(description.split()), max(room, 0))}{tail}"
+
+        chunks.append(StixChunk(
+            id=chunk_id(obj),
+            type=obj.get("type", ""),
+            name=name,
+            description=description,
+            text=text,
+            keys=frozenset(_object_keys(obj)),
+            neighbors=n_neighbors,
+        ))
+    return chunks
+
+
+def merge_chunks(chunk_lists: Iterable[Iterable[StixChunk]]) -> list[StixChunk]:
+    """Deduplicate chunks across bundles by stable ID, keeping first order.
+
+    When the same object appears in several bundles, the copy with the
+    most neighbors (then the longest text) wins, and exact keys are unioned.
+    """
+    merged: dict[str, StixChunk] = {}
+    keys: dict[str, set] = {}
+    seen_text: dict[str, str] = {}
+    for chunks in chunk_lists:
+        for chunk in chunks:
+            cid = seen_text.get(chunk.text, chunk.id)
+            keys.setdefault(cid, set()).update(chunk.keys)
+            current: Optional[StixChunk] = merged.get(cid)
+            if current is None or (chunk.neighbors, len(chunk.text)) > (current.neighbors, len(current.text)):
+                merged[cid] = chunk
+            seen_text[chunk.text] = cid
+    return [
+        StixChunk(c.id, c.type, c.name, c.description, c.text, frozenset(keys[cid]), c.neighbors)
+        for cid, c in merged.items()
+    ]
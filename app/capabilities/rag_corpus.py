@@ -0,0 +1,200 @@
+"""Shared, hot-reloadable RAG corpus for every run and chat session.
+
+MCPService owns one RAGCorpusManager (``MCPService.rag_service``) and the
+RAG capability retrieves through the same process-wide instance, so the
+STIX files under plugins/mcp/data/ and data/outputs_stix/ are parsed and
+vectorized once, not once per workflow run:
+
+  * file cache    path -> structured chunks (rag_chunker.py), validated
+                  against the file's (mtime, size) on every lookup, so a
+                  bundle rewritten by the CTI pipeline is picked up
+                  without a restart
+  * corpus cache  (file set, embed model, endpoint) -> ready RAGService,
+                  LRU-bounded so memory stays flat however many distinct
+                  selections operators make
+
+Chunk vectors themselves live in the persistent embedding store
+(rag_store.py), so rebuilding a corpus after a change only embeds the
+chunks that actually changed. The upload/delete API handlers call
+``invalidate`` to drop stale entries eagerly.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from plugins.mcp.app.capabilities.rag_chunker import merge_chunks
+from plugins.mcp.app.capabilities.rag_embedders import is_local_model
+
+DEFAULT_MAX_CORPORA = 8
+DEFAULT_MAX_FILES = 128
+
+
+@dataclass
+class _FileEntry:
+    signature: tuple
+    # StixChunk list from rag_chunker.chunk_bundle
+    chunks: list = field(default_factory=list)
+
+
+def _signature(path: Path) -> tuple:
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _secret_fingerprint(secret: Optional[str]) -> str:
+    # Cache keys must distinguish credentials without holding them verbatim
+    return hashlib.sha256((secret or "").encode("utf-8")).hexdigest()[:16]
+
+
+class RAGCorpusManager:
+    """Thread-safe cache of loaded bundles and ready-to-query RAGServices."""
+
+    def __init__(
+        self,
+        max_corpora: int = DEFAULT_MAX_CORPORA,
+        max_files: int = DEFAULT_MAX_FILES,
+        log: Optional[logging.Logger] = None,
+    ):
+        self.max_corpora = max_corpora
+        self.max_files = max_files
+        self.log = log or logging.getLogger("plugins.mcp")
+        self._lock = threading.RLock()
+        self._files: "collections.OrderedDict[str, _FileEntry]" = collections.OrderedDict()
+        self._corpora: "collections.OrderedDict[tuple, object]" = collections.OrderedDict()
+        # One build lock per corpus key so concurrent runs selecting the
+        # same bundles wait for a single build instead of racing.
+        self._build_locks: dict[tuple, threading.Lock] = {}
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _load_file(self, path: Path) -> _FileEntry:
+        from plugins.mcp.app.capabilities.rag import RAGService
+
+        key = str(path)
+        sig = _signature(path)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is not None and entry.signature == sig:
+                self._files.move_to_end(key)
+                return entry
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                bundle = json.load(f)
+        except json.JSONDecodeError:
+            raise ValueError(f"Invalid JSON in STIX bundle: {path}")
+        entry = _FileEntry(signature=sig, chunks=RAGService.extract_chunks(bundle))
+
+        with self._lock:
+            if key in self._files:
+                self.log.info(f"[RAG] Reloaded changed bundle {path.name}")
+                self._drop_corpora_with(key)
+            self._files[key] = entry
+            self._files.move_to_end(key)
+            while len(self._files) > self.max_files:
+                old_key, _ = self._files.popitem(last=False)
+                self._drop_corpora_with(old_key)
+        return entry
+
+    def _drop_corpora_with(self, file_key: str):
+        for ckey in [k for k in self._corpora if file_key in k[0]]:
+            self._corpora.pop(ckey, None)
+
+    def invalidate(self, paths: Iterable = ()):
+        """Forget cached state for ``paths`` (all state when empty)."""
+        keys = [str(Path(p).resolve()) for p in paths]
+        with self._lock:
+            if not keys:
+                self._files.clear()
+                self._corpora.clear()
+                return
+            for key in keys:
+                self._files.pop(key, None)
+                self._drop_corpora_with(key)
+        self.log.info(f"[RAG] Invalidated corpus entries for {len(keys)} file(s)")
+
+    # ------------------------------------------------------------------
+    # Corpora
+    # ------------------------------------------------------------------
+
+    def service_for(
+        self,
+        paths: Iterable,
+        *,
+        api_key: str = "",
+        api_base: Optional[str] = None,
+        ssl_verify: Optional[bool] = None,
+        embed_model: str = "openai/text-embedding-3-small",
+    ):
+        """Return a ready RAGService over ``paths``, building it at most once."""
+        from plugins.mcp.app.capabilities.rag import RAGService
+
+        resolved = sorted({str(Path(p).resolve()) for p in paths})
+        # Loading validates every file's signature and drops stale corpora
+        entries = [self._load_file(Path(p)) for p in resolved]
+
+        if is_local_model(embed_model):
+            # Endpoint settings do not affect in-process embeddings, so
+            # every profile using the same local model shares one corpus.
+            key = (tuple(resolved), embed_model, "", "", None)
+        else:
+            key = (
+                tuple(resolved),
+                embed_model,
+                api_base or "",
+                _secret_fingerprint(api_key),
+                ssl_verify,
+            )
+        with self._lock:
+            rag = self._corpora.get(key)
+            if rag is not None:
+                self._corpora.move_to_end(key)
+                return rag
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                rag = self._corpora.get(key)
+                if rag is not None:
+                    return rag
+
+            # The same object in several bundles becomes one chunk
+            chunks = merge_chunks(entry.chunks for entry in entries)
+            rag = RAGService(api_key=api_key, api_base=api_base, ssl_verify=ssl_verify, log=self.log)
+            rag.initialize_from_stix_chunks(chunks, embed_model=embed_model)
+
+            with self._lock:
+                self._corpora[key] = rag
+                while len(self._corpora) > self.max_corpora:
+                    self._corpora.popitem(last=False)
+                self._build_locks.pop(key, None)
+            return rag
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "corpora": len(self._corpora),
+                "chunks": sum(len(e.chunks) for e in self._files.values()),
+            }
+
+
+_SHARED: Optional[RAGCorpusManager] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_rag_corpus() -> RAGCorpusManager:
+    """The process-wide corpus manager shared by MCPService and the capability."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = RAGCorpusManager()
+        return _SHARED
@@ -0,0 +1,261 @@
+"""Embedding backends for the RAG capability.
+
+By default RAGService embeds through ``dspy.Embedder`` (LiteLLM), i.e. a
+remote call per batch. In air-gapped ranges that either fails outright or
+costs hundreds of milliseconds per batch, so an ``embed_model`` starting
+with ``local/`` selects an in-process backend instead:
+
+    local/spacy                    static word vectors of en_core_web_lg
+                                   (shared with cti_taxonomy_loader)
+    local/spacy:<package>          ... of another installed spaCy package
+    local/onnx:<path>              a sentence encoder exported to ONNX, run
+                                   on CPU with onnxruntime; <path> is a
+                                   .onnx file or a directory holding
+                                   model.onnx + tokenizer.json (relative
+                                   paths resolve under data/embed_models/)
+
+Because the choice rides on ``embed_model``, it is selectable per RAG
+profile with no new setting, and the embedding store (rag_store.py)
+keeps local and remote vectors in separate indexes automatically.
+
+Every backend is a callable ``embed(texts) -> (n, dim) float32`` like
+``dspy.Embedder``. Local backends split the input into fixed-size batches
+and run them on a small thread pool (onnxruntime releases the GIL during
+inference). Loaded models are cached per process, so the first corpus
+build pays the load and later ones do not.
+"""
+
+import abc
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+LOCAL_PREFIX = "local/"
+DEFAULT_SPACY_MODEL = "en_core_web_lg"
+DEFAULT_MODELS_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "embed_models"
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# Sentence encoders are trained on short passages; longer input is truncated
+DEFAULT_MAX_TOKENS = 256
+
+_LOCAL_EMBEDDERS: dict[str, object] = {}
+_LOCAL_LOCK = threading.Lock()
+
+
+def is_local_model(embed_model: Optional[str]) -> bool:
+    return bool(embed_model) and embed_model.startswith(LOCAL_PREFIX)
+
+
+def _batches(texts: Sequence[str], size: int) -> list[list[str]]:
+    return [list(texts[i:i + size]) for i in range(0, len(texts), size)]
+
+
+def _shared_spacy_pipeline(model: str):
+    """The en_core_web_lg pipeline cti_taxonomy_loader already keeps loaded.
+
+    Its ~600 MB of vectors are shared rather than loaded a second time;
+    None for other packages or when the loader cannot be imported.
+    """
+    if model != DEFAULT_SPACY_MODEL:
+        return None
+    try:
+        from plugins.mcp.app.utilities import cti_taxonomy_loader
+    except (ImportError, OSError) as e:
+        logging.getLogger("plugins.mcp").debug(f"[RAG] Shared spaCy pipeline unavailable: {e}")
+        return None
+    return getattr(cti_taxonomy_loader, "nlp", None)
+
+
+class _BatchedEmbedder(abc.ABC):
+    """Shared batching / thread-pool plumbing for local backends."""
+
+    dim: int = 0
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, workers: int = DEFAULT_WORKERS):
+        self.batch_size = max(1, int(batch_size))
+        self.workers = max(1, int(workers))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed one batch into a (len(texts), dim) float32 array."""
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="rag-embed"
+                )
+            return self._pool
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        texts = [t or "" for t in texts]
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batches = _batches(texts, self.batch_size)
+        if len(batches) == 1 or self.workers == 1:
+            parts = [self._embed_batch(b) for b in batches]
+        else:
+            parts = list(self._executor().map(self._embed_batch, batches))
+        return np.vstack(parts).astype(np.float32, copy=False)
+
+
+class SpacyVectorEmbedder(_BatchedEmbedder):
+    """Mean of spaCy static word vectors (``doc.vector``) per text.
+
+    Only the tokenizer runs: tagger/parser/NER add nothing to static
+    vectors. The default en_core_web_lg is taken from cti_taxonomy_loader,
+    which the process loads anyway; other packages load with those
+    components excluded. Pass ``nlp`` to supply a pipeline directly.
+    """
+
+    def __init__(self, model: str = DEFAULT_SPACY_MODEL, nlp=None, **kwargs):
+        super().__init__(**kwargs)
+        if nlp is None:
+            nlp = _shared_spacy_pipeline(model)
+        if nlp is None:
+            import spacy
+
+            nlp = spacy.load(
+                model,
+                exclude=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"],
+            )
+        if not nlp.vocab.vectors.shape[0]:
+            raise ValueError(
+                f"spaCy model {model} has no static word vectors; use a *_md or *_lg package"
+            )
+        self.model = model
+        self.nlp = nlp
+        self.dim = int(nlp.vocab.vectors.shape[1])
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, doc in enumerate(self.nlp.tokenizer.pipe(texts, batch_size=len(texts))):
+            if doc.has_vector:
+                out[i] = doc.vector
+        return out
+
+
+class OnnxSentenceEmbedder(_BatchedEmbedder):
+    """Mean-pooled transformer sentence encoder exported to ONNX.
+
+    Expects a directory with ``model.onnx`` and a Hugging Face
+    ``tokenizer.json`` (e.g. an all-MiniLM-L6-v2 export). onnxruntime and
+    tokenizers are optional dependencies, imported only when selected.
+    """
+
+    def __init__(
+        self,
+        path: "str | Path",
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        intra_op_threads: int = 1,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "local/onnx embeddings need onnxruntime and tokenizers "
+                "(pip install onnxruntime tokenizers)"
+            ) from e
+
+        path = Path(path)
+        model_file = path if path.suffix == ".onnx" else path / "model.onnx"
+        tokenizer_file = model_file.parent / "tokenizer.json"
+        if not model_file.exists():
+            raise FileNotFoundError(f"ONNX embedding model not found at: {model_file}")
+        if not tokenizer_file.exists():
+            raise FileNotFoundError(f"Tokenizer not found next to ONNX model: {tokenizer_file}")
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.enable_padding()
+
+        opts = ort.SessionOptions()
+        # Parallelism comes from the batch thread pool; one intra-op thread
+        # per batch keeps workers from oversubscribing the CPU.
+        opts.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(model_file), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model = str(model_file)
+        self.dim = int(self.session.get_outputs()[0].shape[-1] or 0)
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        self.dim = int(pooled.shape[1])
+        return pooled.astype(np.float32)
+
+
+def _resolve_model_path(spec: str) -> Path:
+    path = Path(spec).expanduser()
+    if not path.is_absolute():
+        path = DEFAULT_MODELS_DIR / path
+    return path
+
+
+def load_local_embedder(embed_model: str, **kwargs):
+    """Build the local backend named by a ``local/...`` embed_model."""
+    spec = embed_model[len(LOCAL_PREFIX):]
+    backend, _, arg = spec.partition(":")
+    if backend == "spacy":
+        return SpacyVectorEmbedder(arg or DEFAULT_SPACY_MODEL, **kwargs)
+    if backend == "onnx":
+        if not arg:
+            raise ValueError("local/onnx requires a model path, e.g. local/onnx:all-MiniLM-L6-v2")
+        return OnnxSentenceEmbedder(_resolve_model_path(arg), **kwargs)
+    raise ValueError(
+        f"Unknown local embedding backend {backend!r} in {embed_model!r} "
+        f"(expected local/spacy or local/onnx:<path>)"
+    )
+
+
+def get_local_embedder(embed_model: str):
+    """Process-wide local embedder per embed_model (models load once)."""
+    with _LOCAL_LOCK:
+        embedder = _LOCAL_EMBEDDERS.get(embed_model)
+        if embedder is None:
+            logging.getLogger("plugins.mcp").info(f"[RAG] Loading local embedder {embed_model}")
+            embedder = _LOCAL_EMBEDDERS[embed_model] = load_local_embedder(embed_model)
+        return embedder
+
+
+def create_embedder(
+    embed_model: str,
+    *,
+    api_key: Optional[str] = None,
+    api_base: Optional[str] = None,
+    ssl_verify: Optional[bool] = None,
+):
+    """Local backend for ``local/...`` models, else a remote dspy.Embedder."""
+    if is_local_model(embed_model):
+        return get_local_embedder(embed_model)
+
+    import dspy
+    from plugins.mcp.app.dspy_env import apply_litellm_ssl_verify
+
+    embedder_kwargs = {"api_key": api_key}
+    if api_base:
+        embedder_kwargs["api_base"] = api_base
+        embedder_kwargs["custom_llm_provider"] = "custom_openai"
+    apply_litellm_ssl_verify(ssl_verify)
+    return dspy.Embedder(embed_model, **embedder_kwargs)
@@ -0,0 +1,132 @@
+"""Lexical and exact-match retrieval for the RAG capability.
+
+Dense embeddings are good at paraphrase but poor at identifiers: a query
+for "T1059.001" or "CVE-2021-44228" rarely lands on the right STIX object
+by cosine alone, and each query costs a remote embedding call. RAGService
+therefore combines three rankers:
+
+  * exact keys    ATT&CK technique IDs, CVE IDs, object names and aliases
+                  found verbatim in the query (no scoring, pinned first)
+  * BM25          Okapi BM25 over the chunk text
+  * vectors       the embedding search from rag_store.py
+
+and merges BM25 and vector rankings with reciprocal-rank fusion. When
+exact keys alone fill the requested k, no embedding call is made.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable, Optional, Sequence
+
+TECHNIQUE_ID_RE = re.compile(r"\bT\d{4}(?:\.\d{3})?\b", re.I)
+CVE_ID_RE = re.compile(r"\bCVE-\d{4}-\d{4,}\b", re.I)
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9._-]*[a-z0-9]|[a-z0-9]")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9.]+")
+
+# Longest object name (in words) matched verbatim inside a query
+MAX_NAME_WORDS = 5
+# Shorter keys ("at", "net") match too much English to be trusted exactly
+MIN_KEY_CHARS = 4
+# Standard RRF damping constant (Cormack et al.)
+RRF_K = 60
+
+
+def normalize_key(text: str) -> str:
+    return _NON_ALNUM_RE.sub(" ", (text or "").lower()).strip(" .")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def identifier_keys(text: str) -> set[str]:
+    """Technique and CVE IDs mentioned in ``text``, normalized."""
+    keys = {m.group(0).upper() for m in TECHNIQUE_ID_RE.finditer(text or "")}
+    keys |= {m.group(0).upper() for m in CVE_ID_RE.finditer(text or "")}
+    return {normalize_key(k) for k in keys}
+
+
+def query_keys(query: str) -> list[str]:
+    """Candidate exact keys in a query: identifiers then word n-grams."""
+    keys = list(identifier_keys(query))
+    words = [w.strip(".") for w in normalize_key(query).split()]
+    words = [w for w in words if w]
+    for n in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+        for i in range(len(words) - n + 1):
+            keys.append(" ".join(words[i:i + n]))
+    return keys
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, docs: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_len: list[int] = []
+        for i, doc in enumerate(docs):
+            counts = Counter(tokenize(doc))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+        self.n_docs = len(self.doc_len)
+        self.avg_len = (sum(self.doc_len) / self.n_docs) if self.n_docs else 0.0
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> dict[int, float]:
+        out: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self._idf(term)
+            for doc, tf in plist:
+                norm = 1 - self.b + self.b * self.doc_len[doc] / (self.avg_len or 1.0)
+                out[doc] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return out
+
+    def search(self, query: str, n: int) -> list[int]:
+        scored = self.scores(query)
+        return sorted(scored, key=lambda d: (-scored[d], d))[:n]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int = RRF_K) -> list[int]:
+    fused: dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[doc] += 1.0 / (k + rank + 1)
+    return sorted(fused, key=lambda d: (-fused[d], d))
+
+
+class HybridIndex:
+    """Exact-key map plus BM25 over a RAGService corpus."""
+
+    def __init__(self, corpus: Sequence[str], chunk_keys: Optional[dict] = None):
+        self.bm25 = BM25Index(corpus)
+        self.exact: dict[str, list[int]] = defaultdict(list)
+        for i, chunk in enumerate(corpus):
+            # Only the object's own name/IDs/aliases are exact keys; IDs
+            # mentioned in a description are left to BM25.
+            keys = {normalize_key(chunk.split(" | ")[0])}
+            keys |= {normalize_key(k) for k in (chunk_keys or {}).get(chunk, ())}
+            for key in keys:
+                if len(key) >= MIN_KEY_CHARS:
+                    self.exact[key].append(i)
+
+    def exact_hits(self, query: str) -> list[int]:
+        hits: list[int] = []
+        seen: set[int] = set()
+        for key in query_keys(query):
+            for doc in self.exact.get(key, ()):
+                if doc not in seen:
+                    seen.add(doc)
+                    hits.append(doc)
+        return hits
+
+    def lexical(self, query: str, n: int) -> list[int]:
+        return self.bm25.search(query, n)
@@ -0,0 +1,255 @@
+"""Persistent embedding store for the RAG capability.
+
+Chunk embeddings are cached on disk keyed by (embed_model, sha256 of the
+chunk text), so a STIX object is embedded once per model no matter how
+many runs, sessions or bundles it shows up in. Each model (and each
+non-default ``api_base`` serving it) gets its own directory under
+plugins/mcp/data/rag_index/:
+
+    keys.json    {"model": ..., "api_base": ..., "dim": N, "keys": [sha256, ...]}
+    vectors.f32  row-major float32 matrix, one unit-normalized row per key
+
+Rows are append-only. Searches read the matrix through np.memmap, so
+only the pages a query touches are resident, and because rows are
+normalized at write time a cosine search is a single matmul.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "rag_index"
+
+_KEYS_FILE = "keys.json"
+_VECTORS_FILE = "vectors.f32"
+_DTYPE = np.float32
+
+_STORES: dict[tuple[str, str], "EmbeddingStore"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _model_slug(embed_model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", embed_model).strip("_") or "default"
+
+
+def _store_slug(embed_model: str, api_base: Optional[str] = None) -> str:
+    """Directory name for a model; endpoints other than the default get their own."""
+    slug = _model_slug(embed_model)
+    base = (api_base or "").strip().rstrip("/").lower()
+    if not base:
+        return slug
+    return f"{slug}@{hashlib.sha1(base.encode('utf-8')).hexdigest()[:10]}"
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)."""
+    arr = np.asarray(vectors, dtype=_DTYPE)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped embedding cache for one embed model.
+
+    ``api_base`` separates stores for the same model name served from
+    different endpoints, which may be different models or dimensions.
+    """
+
+    def __init__(self, embed_model: str, root: Optional[Path] = None, log: Optional[logging.Logger] = None,
+                 api_base: Optional[str] = None):
+        self.embed_model = embed_model
+        self.api_base = api_base or None
+        self.dir = Path(root or DEFAULT_INDEX_DIR) / _store_slug(embed_model, api_base)
+        self.log = log or logging.getLogger("plugins.mcp")
+        self._lock = threading.RLock()
+        self._keys: list[str] = []
+        self._row_of: dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Disk state
+    # ------------------------------------------------------------------
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.dir / _KEYS_FILE
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.dir / _VECTORS_FILE
+
+    def _discard_vectors(self):
+        """Drop rows that keys.json cannot account for.
+
+        add() appends to vectors.f32 and numbers rows from len(self._keys),
+        so any bytes left behind here would shift every later row.
+        """
+        self._keys, self._row_of, self._dim = [], {}, None
+        try:
+            self._vectors_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _load(self):
+        try:
+            meta = json.loads(self._keys_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # e.g. a crash before the first _save_keys()
+            if self._vectors_path.exists():
+                self.log.warning(f"[RAG] Embedding store {self.dir} has no readable keys; rebuilding")
+                self._discard_vectors()
+            return
+        keys = meta.get("keys") or []
+        dim = meta.get("dim")
+        if not dim:
+            self._discard_vectors()
+            return
+        if not self._vectors_path.exists():
+            return
+
+        # keys.json is written after the rows are appended; trim rows that
+        # were appended by an interrupted write and never committed.
+        expected = len(keys) * int(dim) * np.dtype(_DTYPE).itemsize
+        size = self._vectors_path.stat().st_size
+        if size < expected:
+            self.log.warning(f"[RAG] Embedding store {self.dir} is truncated; rebuilding")
+            self._discard_vectors()
+            return
+        if size > expected:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(expected)
+
+        self._dim = int(dim)
+        self._keys = list(keys)
+        self._row_of = {k: i for i, k in enumerate(self._keys)}
+
+    def _save_keys(self):
+        tmp = self._keys_path.with_name(_KEYS_FILE + ".tmp")
+        tmp.write_text(
+            json.dumps({"model": self.embed_model, "api_base": self.api_base,
+                        "dim": self._dim, "keys": self._keys}),
+            encoding="utf-8",
+        )
+        tmp.replace(self._keys_path)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    # ------------------------------------------------------------------
+    # Read / write
+    # ------------------------------------------------------------------
+
+    def lookup(self, hashes: Sequence[str]) -> list[Optional[int]]:
+        return [self._row_of.get(h) for h in hashes]
+
+    def add(self, hashes: Sequence[str], vectors) -> list[int]:
+        """Append vectors for hashes not already stored; return their rows."""
+        rows = normalize_rows(vectors)
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(rows.shape[1])
+            elif rows.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dim {rows.shape[1]} does not match store dim {self._dim} "
+                    f"for model {self.embed_model}"
+                )
+
+            new_keys, new_rows, pending = [], [], set()
+            for h, row in zip(hashes, rows):
+                if h in self._row_of or h in pending:
+                    continue
+                pending.add(h)
+                new_keys.append(h)
+                new_rows.append(row)
+
+            if new_keys:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                with open(self._vectors_path, "ab") as f:
+                    f.write(np.ascontiguousarray(new_rows, dtype=_DTYPE).tobytes())
+                for h in new_keys:
+                    self._row_of[h] = len(self._keys)
+                    self._keys.append(h)
+                self._save_keys()
+                self._mmap = None
+
+            return [self._row_of[h] for h in hashes]
+
+    def ensure(self, texts: Sequence[str], embed: Callable[[list[str]], "np.ndarray"]) -> list[int]:
+        """Return store rows for ``texts``, embedding only unseen ones."""
+        hashes = [text_hash(t) for t in texts]
+        with self._lock:
+            missing = {}
+            for h, t, row in zip(hashes, texts, self.lookup(hashes)):
+                if row is None and h not in missing:
+                    missing[h] = t
+
+            if missing:
+                self.log.info(
+                    f"[RAG] Embedding {len(missing)} new chunks with {self.embed_model} "
+                    f"({len(hashes) - len(missing)} cached)"
+                )
+                self.add(list(missing), embed(list(missing.values())))
+
+            return [self._row_of[h] for h in hashes]
+
+    def matrix(self) -> np.ndarray:
+        """Memory-mapped (rows, dim) view over every stored vector."""
+        with self._lock:
+            if not self._keys:
+                return np.zeros((0, self._dim or 0), dtype=_DTYPE)
+            if self._mmap is None or self._mmap.shape[0] != len(self._keys):
+                self._mmap = np.memmap(
+                    self._vectors_path,
+                    dtype=_DTYPE,
+                    mode="r",
+                    shape=(len(self._keys), self._dim),
+                )
+            return self._mmap
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """Gather ``rows`` into a dense matrix (for a corpus subset)."""
+        if not len(rows):
+            return np.zeros((0, self._dim or 0), dtype=_DTYPE)
+        return np.asarray(self.matrix()[np.asarray(rows, dtype=np.int64)])
+
+
+def get_embedding_store(embed_model: str, root: Optional[Path] = None,
+                        api_base: Optional[str] = None) -> EmbeddingStore:
+    """Process-wide EmbeddingStore per (root, embed_model, api_base)."""
+    key = (str(root or DEFAULT_INDEX_DIR), _store_slug(embed_model, api_base))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = EmbeddingStore(embed_model, root=root, api_base=api_base)
+        return store
+
+
+def top_k(matrix: np.ndarray, query_vector, k: int) -> list[tuple[int, float]]:
+    """Indices and cosine scores of the k best rows for a query."""
+    if matrix.shape[0] == 0 or k <= 0:
+        return []
+    q = normalize_rows(query_vector)[0]
+    scores = matrix @ q
+    k = min(k, scores.shape[0])
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return [(int(i), float(scores[i])) for i in idx]
@@ -22,6 +22,7 @@ Debug / Observability:
 """
 
 import argparse
+import functools
 import json
 from pathlib import Path
 import uuid
@@ -58,9 +59,14 @@ from plugins.mcp.app.utilities.cti_taxonomy_loader import (
 
 from plugins.mcp.app.utilities.cti_stix_validation import validate_bundle
 from plugins.mcp.app.utilities.cti_stix_report_writer import render_stix_report
-from plugins.mcp.app.utilities.cti_defend_enricher import enrich_stix_bundle_with_defend
+from plugins.mcp.app.utilities.cti_defend_enricher import (
+    enrich_stix_bundle_with_defend,
+    load_d3fend_index,
+    write_d3fend_catalog,
+)
 from plugins.mcp.app.utilities.cti_mitre_extract import hashes_to_stix_observed_data
 from plugins.mcp.app.utilities.llm_client import get_llm_provenance
+from plugins.mcp.app.utilities.cti_stage_pool import map_bundles, resolve_workers
 
 
 # -----------------------------------------------------------
@@ -597,149 +603,196 @@ def convert_ir_to_stix(ir: dict, debug: dict, taxonomy: dict) -> dict:
 # Phase 2 Runner
 # -----------------------------------------------------------
 
-def run_phase2(base_dir: Path):
-    outputs_ir   = base_dir / OUTPUTS_IR_DIR
-    outputs_stix = base_dir / OUTPUTS_STIX_DIR
-    outputs_cad  = base_dir / OUTPUTS_CAD_DIR
-    debug_dir    = outputs_stix / DEBUG_DIR
+def _phase2_setup() -> dict:
+    """Shared read-only inputs for every IR file (built once per process)."""
+    return {"taxonomy": load_mitre_taxonomy(), "defense_root": get_d3fend_root()}
 
-    outputs_stix.mkdir(parents=True, exist_ok=True)
-    outputs_cad.mkdir(parents=True, exist_ok=True)
 
-    # Load MITRE taxonomy once
-    taxonomy = load_mitre_taxonomy()
+def _phase2_one(ir_path: Path, state: dict, outputs_stix: Path, outputs_cad: Path,
+                debug_dir: Path, cad_scope: str):
+    """IR → STIX (+ CAD graph preview) for one IR file."""
+    log(f"    [*] Processing {ir_path.name}")
 
-    log("[+] Running Phase 2: IR → STIX")
+    ir = load_ir(ir_path)
+    if not ir:
+        log("        [!] Invalid IR, skipping.")
+        return None
 
-    # Prefer full Stage-1 outputs (parse-to-ir → complete_*.json)
-    ir_files = sorted(outputs_ir.glob("*.json"))
+    stem = ir_path.stem
+    debug = {}
 
-    # # Fallback: allow IR-only outputs for testing step 1
-    # if not ir_files:
-    #     ir_files = sorted(outputs_ir.glob("*.ir-only.json"))
+    # Copy IR into debug
+    write_debug_file(debug_dir / f"{stem}.ir.json", ir)
 
-    if not ir_files:
-        log("[!] No IR files found. Run Phase 1 first.")
-        return
+    # Pretty IR summary
+    write_debug_file(debug_dir / f"{stem}.ir.pretty.txt",
+                     json.dumps(ir, indent=2))
 
+    # Convert IR → STIX
+    bundle = convert_ir_to_stix(ir, debug, state["taxonomy"])
 
-    for ir_path in ir_files:
-        log(f"    [*] Processing {ir_path.name}")
+    # Validate bundle
+    errors = validate_bundle(bundle)
+    write_debug_file(debug_dir / f"{stem}.validation.txt",
+                     "\n".join(errors) if errors else "No validation issues.")
 
-        ir = load_ir(ir_path)
-        if not ir:
-            log("        [!] Invalid IR, skipping.")
-            continue
+    # Track metrics
+    metrics = compute_metrics(ir, bundle)
+    write_debug_file(debug_dir / f"{stem}.metrics.json", metrics)
 
-        stem = ir_path.stem
-        debug = {}
+    # Write relationship debug
+    write_debug_file(debug_dir / f"{stem}.relationships.json",
+                     debug.get("relationship_debug", []))
 
-        # Copy IR into debug
-        write_debug_file(debug_dir / f"{stem}.ir.json", ir)
+    # Write conversion log
+    write_debug_file(debug_dir / f"{stem}.conversion.log",
+                     "\n".join(debug.get("conversion_steps", [])))
 
-        # Pretty IR summary
-        write_debug_file(debug_dir / f"{stem}.ir.pretty.txt",
-                         json.dumps(ir, indent=2))
+    # Write audit log
+    audit = {
+        "ir_file": ir_path.name,
+        "bundle_id": bundle["id"],
+        "metrics": metrics,
+        "validation_errors": errors,
+        "conversion_log": debug.get("conversion_steps", []),
+        "relationship_debug": debug.get("relationship_debug", []),
+    }
+    audit["unresolved_entities"] = [
+        r for r in debug.get("relationship_debug", [])
+        if "unresolved" in r.get("status", "")
+    ]
 
-        # Convert IR → STIX
-        bundle = convert_ir_to_stix(ir, debug, taxonomy)
+    audit["object_count_before_bundle"] = len(bundle.get("objects", []))
+    audit["object_count_after_bundle"] = len(bundle.get("objects", []))
 
-        # Validate bundle
-        errors = validate_bundle(bundle)
-        write_debug_file(debug_dir / f"{stem}.validation.txt",
-                         "\n".join(errors) if errors else "No validation issues.")
 
-        # Track metrics
-        metrics = compute_metrics(ir, bundle)
-        write_debug_file(debug_dir / f"{stem}.metrics.json", metrics)
+    write_debug_file(debug_dir / f"{stem}.audit.json", audit)
 
-        # Write relationship debug
-        write_debug_file(debug_dir / f"{stem}.relationships.json",
-                         debug.get("relationship_debug", []))
+    # Save final STIX JSON
+    stix_out = outputs_stix / f"{stem}.stix.json"
+    with stix_out.open("w", encoding="utf-8") as f:
+        json.dump(bundle, f, indent=2)
+    log(f"        → wrote {stix_out.name}")
 
-        # Write conversion log
-        write_debug_file(debug_dir / f"{stem}.conversion.log",
-                         "\n".join(debug.get("conversion_steps", [])))
+    # Save .txt report
+    report_text = render_stix_report(bundle, ir_path.name)
+    (outputs_stix / f"{stem}.stix.txt").write_text(report_text, encoding="utf-8")
+    log(f"        → wrote {stem}.stix.txt")
 
-        # Write audit log
-        audit = {
-            "ir_file": ir_path.name,
-            "bundle_id": bundle["id"],
-            "metrics": metrics,
-            "validation_errors": errors,
-            "conversion_log": debug.get("conversion_steps", []),
-            "relationship_debug": debug.get("relationship_debug", []),
-        }
-        audit["unresolved_entities"] = [
-            r for r in debug.get("relationship_debug", [])
-            if "unresolved" in r.get("status", "")
-        ]
 
-        audit["object_count_before_bundle"] = len(bundle.get("objects", []))
-        audit["object_count_after_bundle"] = len(bundle.get("objects", []))
+    # -------------------------------------------------------
+    # Write CAD Graph Preview for Visualizer Testing
+    # -------------------------------------------------------
+    defense_root = state["defense_root"]
+    try:
+        enriched_bundle, ontology_info = enrich_stix_bundle_with_defend(
+            bundle, defense_root, scope=cad_scope
+        )
+    except FileNotFoundError as e:
+        log(f"[D3FEND] Skipping enrichment (missing assets): {e}")
+        ontology_info = {}
+    log("        → performed D3FEND enrichment")
+    log("ontology_info keys:")
+    log(", ".join(ontology_info.keys()))
+    if "cad_graph" in ontology_info:
+        cad_out = outputs_cad / f"{stem}.cad.json"
+        with cad_out.open("w", encoding="utf-8") as f:
+            json.dump(ontology_info["cad_graph"], f, indent=2)
+
+        log(f"        → wrote {cad_out.name} (CAD Graph Preview)")
+    else:
+        log("        [!] No CAD graph returned from enrichment.")
 
+    # -------------------------------------------------------
+    # STDOUT log: ontology modules + mappings + schema used
+    # -------------------------------------------------------
+    log("\n===== D3FEND ENRICHMENT DEBUG =====")
 
-        write_debug_file(debug_dir / f"{stem}.audit.json", audit)
+    if ontology_info:
+        modules = ontology_info.get("ontology_modules", [])
+        log(f"[Ontology] Loaded {len(modules)} ontology_modules:")
+        for m in modules:
+            log(f"   - {m}")
 
-        # Save final STIX JSON
-        stix_out = outputs_stix / f"{stem}.stix.json"
-        with stix_out.open("w", encoding="utf-8") as f:
-            json.dump(bundle, f, indent=2)
-        log(f"        → wrote {stix_out.name}")
+        log(f"\n[CAD Schema] {ontology_info.get('cad_schema')}")
 
-        # Save .txt report
-        report_text = render_stix_report(bundle, ir_path.name)
-        (outputs_stix / f"{stem}.stix.txt").write_text(report_text, encoding="utf-8")
-        log(f"        → wrote {stem}.stix.txt")
+        log("\n[Dynamic D3FEND Class Mappings]:")
+        for k, v in ontology_info.get("mappings_used", {}).items():
+            log(f"   {k:20s} → {v}")
+    else:
+        log("[D3FEND] Enrichment skipped — ontology assets not available")
 
+    log("===== END D3FEND ENRICHMENT DEBUG =====\n")
 
-        # -------------------------------------------------------
-        # Write CAD Graph Preview for Visualizer Testing
-        # -------------------------------------------------------
-        defense_root = get_d3fend_root()
-        try:
-            enriched_bundle, ontology_info = enrich_stix_bundle_with_defend(bundle, defense_root)
-        except FileNotFoundError as e:
-            log(f"[D3FEND] Skipping enrichment (missing assets): {e}")
-            ontology_info = {}
-        log("        → performed D3FEND enrichment")
-        log("ontology_info keys:")
-        log(", ".join(ontology_info.keys()))
-        if "cad_graph" in ontology_info:
-            cad_out = outputs_cad / f"{stem}.cad.json"
-            with cad_out.open("w", encoding="utf-8") as f:
-                json.dump(ontology_info["cad_graph"], f, indent=2)
+    return stix_out
 
-            log(f"        → wrote {cad_out.name} (CAD Graph Preview)")
-        else:
-            log("        [!] No CAD graph returned from enrichment.")
 
-        # -------------------------------------------------------
-        # STDOUT log: ontology modules + mappings + schema used
-        # -------------------------------------------------------
-        log("\n===== D3FEND ENRICHMENT DEBUG =====")
+def run_phase2(base_dir: Path, cad_scope: str = "bundle", workers: int | None = None):
+    """
+    Stage 2: IR → STIX (+ CAD graph preview) for every complete IR file.
 
-        if ontology_info:
-            modules = ontology_info.get("ontology_modules", [])
-            log(f"[Ontology] Loaded {len(modules)} ontology_modules:")
-            for m in modules:
-                log(f"   - {m}")
+    ``cad_scope`` selects which D3FEND countermeasures each CAD graph
+    carries (see cti_defend_enricher.CAD_SCOPES). With "catalog" the full
+    catalog is written once to outputs_cad/ and graphs reference it by ID.
 
-            log(f"\n[CAD Schema] {ontology_info.get('cad_schema')}")
+    ``workers`` > 1 spreads IR files over processes (default from
+    CTI_STAGE_WORKERS, see cti_stage_pool). A failing IR file is logged
+    and skipped; the stage only fails when every file does.
+    """
+    outputs_ir   = base_dir / OUTPUTS_IR_DIR
+    outputs_stix = base_dir / OUTPUTS_STIX_DIR
+    outputs_cad  = base_dir / OUTPUTS_CAD_DIR
+    debug_dir    = outputs_stix / DEBUG_DIR
 
-            log("\n[Dynamic D3FEND Class Mappings]:")
-            for k, v in ontology_info.get("mappings_used", {}).items():
-                log(f"   {k:20s} → {v}")
-        else:
-            log("[D3FEND] Enrichment skipped — ontology assets not available")
+    outputs_stix.mkdir(parents=True, exist_ok=True)
+    outputs_cad.mkdir(parents=True, exist_ok=True)
 
-        log("===== END D3FEND ENRICHMENT DEBUG =====\n")
+    log("[+] Running Phase 2: IR → STIX")
+
+    # Prefer full Stage-1 outputs (parse-to-ir → complete_*.json)
+    ir_files = sorted(outputs_ir.glob("*.json"))
+
+    # # Fallback: allow IR-only outputs for testing step 1
+    # if not ir_files:
+    #     ir_files = sorted(outputs_ir.glob("*.ir-only.json"))
+
+    if not ir_files:
+        log("[!] No IR files found. Run Phase 1 first.")
+        return
+
+    if cad_scope == "catalog":
+        try:
+            write_d3fend_catalog(get_d3fend_root(), outputs_cad)
+        except FileNotFoundError as e:
+            log(f"[D3FEND] Skipping shared catalog (missing assets): {e}")
+
+    workers = resolve_workers(workers)
+    if workers > 1:
+        # Build the D3FEND index snapshot once so spawned workers read it
+        # from disk instead of each re-parsing the ontology.
+        try:
+            load_d3fend_index(get_d3fend_root())
+        except FileNotFoundError:
+            pass
+
+    results = map_bundles(
+        functools.partial(_phase2_one, outputs_stix=outputs_stix, outputs_cad=outputs_cad,
+                          debug_dir=debug_dir, cad_scope=cad_scope),
+        ir_files,
+        workers=workers,
+        setup=_phase2_setup,
+    )
+    failed = [r for r in results if r.error]
+    for r in failed:
+        log(f"    [!] {r.path.name} failed: {r.error.splitlines()[0]}")
+    if failed and len(failed) == len(results):
+        raise RuntimeError(f"Phase 2 failed for every IR file ({len(failed)})")
 
 
 # -----------------------------------------------------------
 # STIX → CAD Enrichment Only Runner
 # -----------------------------------------------------------
-def run_stix_to_cad_only(base_dir: Path):
+def run_stix_to_cad_only(base_dir: Path, cad_scope: str = "bundle"):
     outputs_stix = base_dir / OUTPUTS_STIX_DIR
     outputs_cad  = base_dir / OUTPUTS_CAD_DIR
 
@@ -755,13 +808,17 @@ def run_stix_to_cad_only(base_dir: Path):
         return
 
     defense_root = get_d3fend_root()
+    if cad_scope == "catalog":
+        write_d3fend_catalog(defense_root, outputs_cad)
 
     for stix_file in stix_files:
         log(f"    [*] Enriching {stix_file.name}")
 
         with stix_file.open("r", encoding="utf-8") as f:
             bundle = json.load(f)
-        enriched_bundle, ontology_info = enrich_stix_bundle_with_defend(bundle, defense_root)
+        enriched_bundle, ontology_info = enrich_stix_bundle_with_defend(
+            bundle, defense_root, scope=cad_scope
+        )
 
         stem = stix_file.name.replace(".stix.json", "")
         # Write CAD graph
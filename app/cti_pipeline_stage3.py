@@ -24,7 +24,10 @@ from typing import Dict, List
 
 from plugins.mcp.app.utilities.cti_stix_builders import new_stix_id, now
 from plugins.mcp.app.utilities.llm_client import llm_generate
-from plugins.mcp.app.utilities.cti_infra_aggregation import aggregate_infrastructure_hypotheses
+from plugins.mcp.app.utilities.cti_infra_aggregation import (
+    InfraAggregator,
+    update_infrastructure_aggregate,
+)
 
 
 # ============================================================
@@ -61,6 +64,9 @@ def run_phase3_infrastructure(
       - infer infrastructure hypotheses (LLM reasoning)
       - write outputs_stix/infra/<stem>.infra.stix.json
 
+    The cross-report aggregate (_aggregated.infrastructure.json) is
+    maintained in memory during the loop and written once at the end.
+
     This stage NEVER mutates the original STIX bundle.
     """
 
@@ -76,51 +82,84 @@ def run_phase3_infrastructure(
         print("[STAGE3][INFRA] No STIX files found")
         return
 
+    # Seed once from infra bundles already on disk; each report then
+    # replaces only its own contribution and the aggregate is written once.
+    aggregator = InfraAggregator.from_dir(out_dir)
+    processed = 0
     for stix_path in stix_files:
-        stem = stix_path.stem.replace(".stix", "")
-        clean_path = clean_dir / f"{stem}.txt"
-
-        if not clean_path.exists():
-            print(f"[STAGE3][INFRA] SKIP (no clean text): {stem}")
+        written = _write_infra_bundle(stix_path, clean_dir, out_dir, use_llm=use_llm)
+        if written is None:
             continue
+        out_path, out_bundle = written
+        aggregator.add_bundle(out_path.name, out_bundle)
+        processed += 1
 
-        bundle = json.loads(stix_path.read_text(encoding="utf-8"))
-        clean_text = clean_path.read_text(encoding="utf-8", errors="ignore")
-
-        infra_obj = infer_infrastructure_reasoning(
-            bundle=bundle,
-            clean_text=clean_text,
-            source_stix_file=stix_path.name,
-            use_llm=use_llm,
+    if processed:
+        agg_path = aggregator.write(out_dir)
+        print(
+            f"[STAGE3][INFRA] Aggregated components={len(aggregator.aggregate())} "
+            f"→ {agg_path.name}"
         )
 
-        out_bundle = {
-            "type": "bundle",
-            "id": new_stix_id("bundle"),
-            "objects": [infra_obj],
-        }
 
-        out_path = out_dir / f"{stem}.infra.stix.json"
-        out_path.write_text(
-            json.dumps(out_bundle, indent=2, ensure_ascii=False),
-            encoding="utf-8",
-        )
+def run_phase3_single_bundle(
+    base_dir: Path,
+    stix_path: Path,
+    *,
+    use_llm: bool = True,
+):
+    """
+    Phase 3 for one new outputs_stix bundle: write its infra bundle and
+    fold it into the existing aggregate without rescanning outputs_stix/infra.
+    """
+    out_dir = base_dir / "outputs_stix" / "infra"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = _write_infra_bundle(Path(stix_path), base_dir / "clean", out_dir, use_llm=use_llm)
+    if written is None:
+        return None
+    out_path, out_bundle = written
+    agg = update_infrastructure_aggregate(out_dir, out_path, out_bundle)
+    print(f"[STAGE3][INFRA] Aggregated components={len(agg)} (incremental: {out_path.name})")
+    return agg
+
+
+def _write_infra_bundle(stix_path: Path, clean_dir: Path, out_dir: Path,
+                        *, use_llm: bool):
+    """Infer and write <stem>.infra.stix.json; (path, bundle) or None if skipped."""
+    stem = stix_path.stem.replace(".stix", "")
+    clean_path = clean_dir / f"{stem}.txt"
+
+    if not clean_path.exists():
+        print(f"[STAGE3][INFRA] SKIP (no clean text): {stem}")
+        return None
+
+    bundle = json.loads(stix_path.read_text(encoding="utf-8"))
+    clean_text = clean_path.read_text(encoding="utf-8", errors="ignore")
+
+    infra_obj = infer_infrastructure_reasoning(
+        bundle=bundle,
+        clean_text=clean_text,
+        source_stix_file=stix_path.name,
+        use_llm=use_llm,
+    )
 
-        print(
-            f"[STAGE3][INFRA] {stem}: "
-            f"hypotheses={len(infra_obj.get('x_infrastructure_hypotheses', []))}"
-        )
-        agg = aggregate_infrastructure_hypotheses(out_dir)
+    out_bundle = {
+        "type": "bundle",
+        "id": new_stix_id("bundle"),
+        "objects": [infra_obj],
+    }
 
-        agg_path = out_dir / "_aggregated.infrastructure.json"
-        agg_path.write_text(
-            json.dumps(agg, indent=2, ensure_ascii=False)
-        )
+    out_path = out_dir / f"{stem}.infra.stix.json"
+    out_path.write_text(
+        json.dumps(out_bundle, indent=2, ensure_ascii=False),
+        encoding="utf-8",
+    )
 
-        print(
-            f"[STAGE3][INFRA] Aggregated components={len(agg)} "
-            f"→ {agg_path.name}"
-        )
+    print(
+        f"[STAGE3][INFRA] {stem}: "
+        f"hypotheses={len(infra_obj.get('x_infrastructure_hypotheses', []))}"
+    )
+    return out_path, out_bundle
 
 
 # ============================================================
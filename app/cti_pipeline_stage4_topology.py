@@ -29,23 +29,29 @@ taxonomy, the AE-plan IR, the STIX vocab, or the YAML data files.
 
 from __future__ import annotations
 
+import functools
 import json
+import multiprocessing
 import re
 from pathlib import Path
 from typing import Optional
 
 from plugins.mcp.app.utilities.cti_topology_inference import (
     build_range_topology,
+    use_presynced_nvd_index,
 )
-from plugins.mcp.app.utilities.cti_ae_library_loader import (
-    discover_ae_plans,
-    find_plan_by_adversary,
-    parse_ae_plan,
+from plugins.mcp.app.utilities.cti_nvd_index import open_nvd_index
+from plugins.mcp.app.utilities.cti_ae_library_loader import AEPlanMatcher
+from plugins.mcp.app.utilities.cti_ae_plan_index import (
+    cached_ae_plans,
+    cached_parse_ae_plan,
+    flush_ae_plan_indexes,
 )
 from plugins.mcp.app.utilities.cti_taxonomy_loader import (
     load_mitre_taxonomy,
     load_mitre_bundle,
 )
+from plugins.mcp.app.utilities.cti_stage_pool import map_bundles, resolve_workers
 from plugins.mcp.app.utilities.paths import get_mcp_root
 
 
@@ -349,8 +355,7 @@ def _enrich_topology_with_ae_plan(
     plan_dir_str = str(plan_dir) if plan_dir is not None else ""
 
     try:
-        from plugins.mcp.app.utilities.cti_ae_library_loader import parse_ae_plan
-        emulation_ir = parse_ae_plan(ae_plan_meta, taxonomy=None)
+        emulation_ir = cached_parse_ae_plan(ae_plan_meta, taxonomy=None)
     except Exception:
         emulation_ir = ae_ir
 
@@ -662,7 +667,8 @@ def _process_bundle(stix_path: Path,
                     topology_dir: Path,
                     taxonomy: dict,
                     plans: list,
-                    images_catalog: list) -> Optional[Path]:
+                    images_catalog: list,
+                    matcher: Optional[AEPlanMatcher] = None) -> Optional[Path]:
     """
     Build + persist the topology SDO for a single bundle. Returns the
     path the topology file was written to (or None on skip / error).
@@ -685,18 +691,14 @@ def _process_bundle(stix_path: Path,
     if stem_hint.endswith(".stix"):
         stem_hint = stem_hint[: -len(".stix")]
     candidates = _adversary_candidates_from_bundle(bundle, stem_hint=stem_hint)
-    plan_match = None
-    matched_candidate = None
-    for cand in candidates:
-        m = find_plan_by_adversary(plans, cand)
-        if m:
-            plan_match = m
-            matched_candidate = cand
-            break
+    if matcher is None:
+        matcher = AEPlanMatcher(plans, taxonomy)
+    plan_match, match_why = matcher.match_first(candidates)
 
     if plan_match:
         _log(
-            f"AE-plan match for {stix_path.name}: candidate={matched_candidate!r} "
+            f"AE-plan match for {stix_path.name}: candidate={match_why['candidate']!r} "
+            f"({match_why['method']} on {match_why['key_kind']} {match_why['key']!r}) "
             f"-> {plan_match.get('library')}/{plan_match.get('adversary')}"
         )
     else:
@@ -713,11 +715,12 @@ def _process_bundle(stix_path: Path,
     # Cross-reference with AE library IR when a plan matched.
     if plan_match is not None:
         try:
-            ae_ir = parse_ae_plan(plan_match, taxonomy=taxonomy)
+            ae_ir = cached_parse_ae_plan(plan_match, taxonomy=taxonomy)
             bundle_tids = _technique_ids_in_bundle(bundle)
             topology = _enrich_topology_with_ae_plan(
                 topology, plan_match, ae_ir, bundle_tids, images_catalog,
             )
+            topology["x_ae_library_match"]["match"] = match_why
         except Exception as e:
             _log(f"AE-plan IR enrichment failed for {stix_path.name}: {e}")
 
@@ -760,10 +763,68 @@ def _process_bundle(stix_path: Path,
 # Public entry point
 # -----------------------------------------------------------
 
-def run_phase4_topology(base_dir: Path) -> list:
+def _phase4_setup(nvd_presynced: bool = False) -> dict:
+    """One-time loads shared (read-only) by every bundle."""
+    if nvd_presynced:
+        use_presynced_nvd_index()
+    _log("loading MITRE ATT&CK taxonomy ...")
+    taxonomy = load_mitre_taxonomy()
+    # Attach raw objects so cti_topology_inference can walk the
+    # data-component / detection-strategy graph without re-loading.
+    try:
+        raw_bundle = load_mitre_bundle()
+        taxonomy["_raw_objects"] = raw_bundle.get("objects", []) or []
+    except Exception as e:
+        _log(f"could not attach _raw_objects to taxonomy: {e}")
+
+    _log("discovering AE-library plans ...")
+    plans = cached_ae_plans()
+    _log(f"  discovered {len(plans)} AE plans")
+
+    _log("loading on-prem images catalog ...")
+    images_catalog = _load_images_catalog()
+    _log(f"  images_catalog entries: {len(images_catalog)}")
+
+    return {
+        "taxonomy": taxonomy,
+        "plans": plans,
+        "plan_matcher": AEPlanMatcher(plans, taxonomy),
+        "images_catalog": images_catalog,
+    }
+
+
+def _sync_nvd_index() -> None:
+    try:
+        index = open_nvd_index()
+    except Exception as e:
+        _log(f"NVD index sync failed: {e}")
+        return
+    if index is not None:
+        _log("NVD index synced with local feeds")
+        index.close()
+
+
+def _process_bundle_in_pool(stix_path: Path, state: dict, topology_dir: Path) -> Optional[Path]:
+    try:
+        return _process_bundle(
+            stix_path, topology_dir, state["taxonomy"], state["plans"], state["images_catalog"],
+            matcher=state["plan_matcher"],
+        )
+    finally:
+        # Pool workers exit without running atexit hooks; merge any new
+        # plan parses into the shared index before handing the bundle back.
+        if multiprocessing.parent_process() is not None:
+            flush_ae_plan_indexes()
+
+
+def run_phase4_topology(base_dir: Path, workers: Optional[int] = None) -> list:
     """
     Run stage 4 over every STIX bundle in ``<base_dir>/outputs_stix``.
 
+    ``workers`` > 1 spreads bundles over processes (default from
+    CTI_STAGE_WORKERS, see cti_stage_pool); a bundle that raises or
+    crashes its worker is logged and skipped.
+
     Returns the list of topology paths produced (for caller logging /
     smoke tests).
     """
@@ -780,32 +841,33 @@ def run_phase4_topology(base_dir: Path) -> list:
         _log(f"no *.stix.json files in {stix_dir}; nothing to do")
         return []
 
-    # One-time loads.
-    _log("loading MITRE ATT&CK taxonomy ...")
-    taxonomy = load_mitre_taxonomy()
-    # Attach raw objects so cti_topology_inference can walk the
-    # data-component / detection-strategy graph without re-loading.
-    try:
-        raw_bundle = load_mitre_bundle()
-        taxonomy["_raw_objects"] = raw_bundle.get("objects", []) or []
-    except Exception as e:
-        _log(f"could not attach _raw_objects to taxonomy: {e}")
-
-    _log("discovering AE-library plans ...")
-    plans = discover_ae_plans()
-    _log(f"  discovered {len(plans)} AE plans")
-
-    _log("loading on-prem images catalog ...")
-    images_catalog = _load_images_catalog()
-    _log(f"  images_catalog entries: {len(images_catalog)}")
+    workers = resolve_workers(workers)
+    setup = _phase4_setup
+    if workers > 1:
+        # Sync the NVD index once here so workers open it read-as-is
+        # instead of racing to ingest the same feeds into one SQLite file.
+        _sync_nvd_index()
+        setup = functools.partial(_phase4_setup, nvd_presynced=True)
 
-    produced: list = []
-    for stix_path in stix_files:
-        out = _process_bundle(
-            stix_path, topology_dir, taxonomy, plans, images_catalog,
+    try:
+        results = map_bundles(
+            functools.partial(_process_bundle_in_pool, topology_dir=topology_dir),
+            stix_files,
+            workers=workers,
+            setup=setup,
         )
-        if out is not None:
-            produced.append(out)
+    finally:
+        flush_ae_plan_indexes()
+        if workers > 1:
+            # Under fork (or a single bundle) setup ran here in the parent;
+            # later Stage 4 runs in this process must sync again.
+            use_presynced_nvd_index(False)
+    produced: list = []
+    for r in results:
+        if r.error:
+            _log(f"{r.path.name}: failed: {r.error.splitlines()[0]}")
+        elif r.result is not None:
+            produced.append(r.result)
 
     _log(f"stage 4 complete: {len(produced)} topology file(s) produced")
     return produced
@@ -820,8 +882,10 @@ def _main() -> int:
     ap = argparse.ArgumentParser(description="Run CTI pipeline stage 4 (topology).")
     ap.add_argument("--base-dir", type=Path, required=True,
                     help="MCP data directory (the one containing outputs_stix/).")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Worker processes (default: $CTI_STAGE_WORKERS or 1; 0 = cores - 1).")
     args = ap.parse_args()
-    run_phase4_topology(args.base_dir)
+    run_phase4_topology(args.base_dir, workers=args.workers)
     return 0
 
 
@@ -12,6 +12,7 @@ from datetime import datetime
 
 from plugins.mcp.app.config import llm_defaults
 from plugins.mcp.app.utilities.llm_client import load_config
+from plugins.mcp.app.utilities.catalog_cache import TTLCache
 from plugins.mcp.app.utilities.paths import get_mcp_data_dir, get_mcp_root
 from plugins.mcp.app.cti_ingest_svc import CTIIngestService
 
@@ -37,6 +38,17 @@ class McpAPI:
         # self.base_dir / self.root_dir without recomputing.
         self.base_dir = get_mcp_data_dir()
         self.root_dir = get_mcp_root()
+        self._range_catalog_cache = TTLCache(ttl_s=30, stale_s=300)
+
+    def _invalidate_rag_corpus(self, *paths):
+        """Tell the shared RAG corpus that these bundle files changed."""
+        corpus = getattr(self.mcp_svc, "rag_service", None)
+        if corpus is None or not hasattr(corpus, "invalidate"):
+            return
+        try:
+            corpus.invalidate(paths)
+        except Exception as e:
+            self.log.warning(f"[MCP] RAG corpus invalidation failed: {e}")
 
     def _mcp_server_catalog(self):
         registry = getattr(self.mcp_svc, "server_registry", None) or {}
@@ -183,6 +195,39 @@ class McpAPI:
                 "feature_count": 0,
             }
 
+        # Feature playbooks and image inventories are read from disk (and
+        # credentials decrypted) on every UI request otherwise. The key
+        # tracks the inventories, feature/role directories and onprem
+        # profiles, so an import or deploy is visible on the next request.
+        payload, age = self._range_catalog_cache.get_sync(
+            self._range_catalog_signature(range_svc),
+            lambda: self._load_range_feature_catalog(range_svc),
+        )
+        return dict(payload, catalog_age_s=round(age, 3))
+
+    @staticmethod
+    def _range_catalog_signature(range_svc) -> tuple:
+        paths = (
+            Path(getattr(range_svc, "images_inventory", "plugins/range/conf/onprem_images.yml")),
+            Path("plugins/range/conf/onprem_microvm_images.yml"),
+            Path("plugins/range/automation/playbooks/feature"),
+            Path("plugins/range/automation/roles"),
+        )
+        sig = [id(range_svc)]
+        for path in paths:
+            try:
+                st = path.stat()
+                sig.append((str(path), st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append((str(path), None, None))
+        sig.append(tuple(
+            (p.get("profile"), p.get("provider"))
+            for p in getattr(range_svc, "profiles", []) or []
+            if isinstance(p, dict) and p.get("range") == "onprem"
+        ))
+        return tuple(sig)
+
+    def _load_range_feature_catalog(self, range_svc):
         features = {"default": [], "custom": []}
         feature_error = None
         try:
@@ -460,6 +505,7 @@ class McpAPI:
 
             with open(target_path, "wb") as f:
                 f.write(file_bytes)
+            self._invalidate_rag_corpus(target_path)
 
             stat = target_path.stat()
             self.log.info(f"[MCP] Uploaded RAG file to {target_path} ({stat.st_size} bytes)")
@@ -670,6 +716,7 @@ class McpAPI:
             json.loads(data.decode("utf-8"))  # validate JSON
 
             target_path.write_bytes(data)
+            self._invalidate_rag_corpus(target_path)
 
             self.log.info(f"[MCP] CTI STIX uploaded: {target_path}")
 
@@ -726,10 +773,13 @@ class McpAPI:
         files = data.get("files", [])
         stix_dir = self.base_dir /"outputs_stix"
 
+        deleted = []
         for fname in files:
             p = stix_dir / fname
             if p.exists() and p.is_file():
                 p.unlink()
+                deleted.append(p)
+        self._invalidate_rag_corpus(*deleted)
 
         return web.json_response({"deleted": files})
 
@@ -1,10 +1,8 @@
+import asyncio
 import os
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel
-import requests
-from datetime import datetime
 import time
-import collections
 import uuid
 import sys
 from pathlib import Path
@@ -16,6 +14,7 @@ if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
 from plugins.mcp.app.config import caldera_connection, _normalise_api_url
+from plugins.mcp.app.utilities.caldera_http import CalderaHTTP, Policy, RequestStats
 
 MCP_METADATA = {
     "display_name": "CALDERA Core",
@@ -26,7 +25,7 @@ MCP_METADATA = {
 mcp = FastMCP("Caldera Core MCP Server")
 
 class CalderaRequest:
-    def __init__(self, url, api_key):
+    def __init__(self, url, api_key, timeout_s=30.0):
         # Route the incoming URL through the same _normalise_api_url
         # config.py uses, so an underspecified value (e.g. operator typed
         # "http://localhost:8788" without the "/api/v2/" suffix in a
@@ -37,52 +36,62 @@ class CalderaRequest:
         self.caldera_url = _normalise_api_url(url) if url else url
         self.api_key = api_key
         self.headers = {"KEY": f"{self.api_key}", "Content-Type": "application/json"}
-        self.total_get_requests = collections.defaultdict(list)
-        self.total_post_requests = collections.defaultdict(list)
+        # One keep-alive pool for every tool call; GETs retry once on a
+        # transport error or 5xx, POSTs (creates) never do.
+        self._http = CalderaHTTP(roots=lambda: [self.caldera_url or ""],
+                                 headers=lambda: self.headers)
+        self.get_policy = Policy(timeout_s=timeout_s, retries=1)
+        self.post_policy = Policy(timeout_s=timeout_s)
+        self.stats = RequestStats()
 
     def _join(self, endpoint):
         return f"{self.caldera_url}{endpoint.lstrip('/')}"
 
-    def make_get_request(self, endpoint):
-        response = requests.get(self._join(endpoint), headers=self.headers)
-        self.total_get_requests[endpoint].append(
-            {
-                "time_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "response_code": response.status_code,
-            }
-        )
-        if response.status_code != 200:
-            return {"error": f"Request did not return 200. Error: {response.text}"}
-        return response.json()
-
-    def make_post_request(self, endpoint, body):
-        response = requests.post(
-            self._join(endpoint), headers=self.headers, json=body
-        )
-        self.total_post_requests[endpoint].append(
-            {
-                "time_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "response_code": response.status_code,
-            }
-        )
-        if response.status_code != 200:
-            return {"error": f"Request did not return 200. Error: {response.text}"}
-        return response.json()
+    async def _request(self, method, endpoint, policy, **kwargs):
+        start = time.monotonic()
+        try:
+            result = await self._http.request(method, self._join(endpoint),
+                                              policy=policy, **kwargs)
+        except Exception as e:
+            self.stats.record(method, endpoint, None, time.monotonic() - start)
+            return {"error": f"Request failed: {e!r}"}
+        self.stats.record(method, endpoint, result.status, time.monotonic() - start)
+        if result.status != 200:
+            payload = result.payload
+            if isinstance(payload, dict) and set(payload) == {"raw"}:
+                payload = payload["raw"]
+            return {"error": f"Request did not return 200. Error: {payload}"}
+        return result.payload
+
+    async def make_get_request(self, endpoint):
+        return await self._request("GET", endpoint, self.get_policy)
+
+    async def make_post_request(self, endpoint, body):
+        return await self._request("POST", endpoint, self.post_policy, json=body)
+
+
+def _is_error(result):
+    """True for the {"error": ...} dict CalderaRequest returns on failure."""
+    return isinstance(result, dict) and "error" in result
 
 
 _caldera = caldera_connection()
 caldera_request = CalderaRequest(
     url=os.environ.get("CALDERA_URL") or _caldera["url"],
     api_key=os.environ.get("CORE_CALDERA_API_KEY") or _caldera["api_key"],
+    timeout_s=float(os.environ.get("CORE_CALDERA_TIMEOUT_S", "30")),
 )
 
 
 @mcp.tool(name="core_health_check")
-def health_check():
+async def health_check():
     """
     Returns the health of the Caldera API.
     """
-    if isinstance(caldera_request.make_get_request("health"), dict):
+    result = await caldera_request.make_get_request("health")
+    if _is_error(result):
+        return result
+    if isinstance(result, dict):
         return "Caldera API is UP!"
 
 
@@ -116,7 +125,7 @@ def filter_abilities(req, tactic: str, atomic: bool):
 
 
 @mcp.tool(name="core_get_abilities_by_tactic")
-def get_abilities_by_tactic(tactic: str):
+async def get_abilities_by_tactic(tactic: str):
     """
     Returns the stockpile abilities of Caldera specified by the tactic.
     Possible Tactic Values:
@@ -130,7 +139,9 @@ def get_abilities_by_tactic(tactic: str):
     - discovery
     - defense-evasion
     """
-    req = caldera_request.make_get_request("abilities")
+    req = await caldera_request.make_get_request("abilities")
+    if _is_error(req):
+        return req
     stockpile_abilities = filter_abilities(req, tactic, atomic=False)
     if stockpile_abilities:
         return stockpile_abilities
@@ -141,19 +152,21 @@ def get_abilities_by_tactic(tactic: str):
 
 
 @mcp.tool(name="core_get_ability_by_id")
-def get_ability_by_id(id: str):
+async def get_ability_by_id(id: str):
     """
     Returns the ability of the Caldera API specified by the id.
     """
-    return caldera_request.make_get_request(f"abilities/{id}")
+    return await caldera_request.make_get_request(f"abilities/{id}")
 
 
 @mcp.tool(name="core_get_adversaries")
-def get_adversaries():
+async def get_adversaries():
     """
     Returns all Caldera adversaries.
     """
-    req = caldera_request.make_get_request("adversaries")
+    req = await caldera_request.make_get_request("adversaries")
+    if _is_error(req):
+        return req
     adversary_list = []
     for adversary in req:
         adversary_stripped = {}
@@ -165,14 +178,19 @@ def get_adversaries():
 
 
 @mcp.tool(name="core_get_adversary_by_ability_id")
-def get_adversary_by_ability_id(ability_id: str, ability_name: str = None):
+async def get_adversary_by_ability_id(ability_id: str, ability_name: str = None):
     """
     Filters all Caldera adversaries by the specifies ability id or ability name.
     """
-    req = caldera_request.make_get_request("adversaries")
+    req, abilities = await asyncio.gather(
+        caldera_request.make_get_request("adversaries"),
+        caldera_request.make_get_request("abilities"),
+    )
+    for result in (req, abilities):
+        if _is_error(result):
+            return result
     adversary_list = []
 
-    abilities = caldera_request.make_get_request("abilities")
     if ability_name:
         named_abilities = [
             item for item in abilities
@@ -206,11 +224,13 @@ def get_adversary_by_ability_id(ability_id: str, ability_name: str = None):
 
 
 @mcp.tool(name="core_get_adversary_by_name")
-def get_adversary_by_name(name: str):
+async def get_adversary_by_name(name: str):
     """
     Returns the Caldera adversary specified by the name.
     """
-    req = caldera_request.make_get_request("adversaries")
+    req = await caldera_request.make_get_request("adversaries")
+    if _is_error(req):
+        return req
     found_adversaries = []
     for adversary in req:
         if adversary["name"] == name:
@@ -219,11 +239,13 @@ def get_adversary_by_name(name: str):
 
 
 @mcp.tool(name="core_get_adversary_by_id")
-def get_adversary_by_id(id: str):
+async def get_adversary_by_id(id: str):
     """
     Returns the Caldera adversary specified by the id.
     """
-    req = caldera_request.make_get_request(f"adversaries/{id}")
+    req = await caldera_request.make_get_request(f"adversaries/{id}")
+    if _is_error(req):
+        return req
     adversary_stripped = {}
     adversary_stripped["adversary_id"] = req["adversary_id"]
     adversary_stripped["name"] = req["name"]
@@ -232,87 +254,87 @@ def get_adversary_by_id(id: str):
 
 
 @mcp.tool(name="core_get_all_agents")
-def get_all_agents():
+async def get_all_agents():
     """
     Returns all active and dead agents.
     """
 
-    return caldera_request.make_get_request("agents")
+    return await caldera_request.make_get_request("agents")
 
 
 @mcp.tool(name="core_get_agent_by_paw")
-def get_agent_by_paw(paw: str):
+async def get_agent_by_paw(paw: str):
     """
     Returns the agent of the Caldera API specified by the paw.
     """
 
-    return caldera_request.make_get_request(f"agents/{paw}")
+    return await caldera_request.make_get_request(f"agents/{paw}")
 
 
 @mcp.tool(name="core_get_all_operations")
-def get_all_operations():
+async def get_all_operations():
     """
     Returns all active and dead operations.
     """
 
-    return caldera_request.make_get_request("operations")
+    return await caldera_request.make_get_request("operations")
 
 
 @mcp.tool(name="core_get_operation_by_id")
-def get_operation_by_id(id: str):
+async def get_operation_by_id(id: str):
     """
     Return operation by specified id.
     """
 
-    return caldera_request.make_get_request(f"operations/{id}")
+    return await caldera_request.make_get_request(f"operations/{id}")
 
 
 @mcp.tool(name="core_get_operation_links")
-def get_operation_links(operation_id: str):
+async def get_operation_links(operation_id: str):
     """
     Specify an operation id to get the links of the operation.
     """
 
-    return caldera_request.make_get_request(f"operations/{operation_id}/links")
+    return await caldera_request.make_get_request(f"operations/{operation_id}/links")
 
 
 @mcp.tool(name="core_get_operation_link")
-def get_operation_link(operation_id: str, link_id: str):
+async def get_operation_link(operation_id: str, link_id: str):
     """
     Specify an operation id and link id to get the specific link of the specific operation.
     """
 
-    return caldera_request.make_get_request(
+    return await caldera_request.make_get_request(
         f"operations/{operation_id}/links/{link_id}"
     )
 
 
 @mcp.tool(name="core_get_operation_link_result")
-def get_operation_link_result(operation_id: str, link_id: str):
+async def get_operation_link_result(operation_id: str, link_id: str):
     """
     Specify an operation id and link id to get the result of the specific link of the specific operation.
     """
 
-    return caldera_request.make_get_request(
+    return await caldera_request.make_get_request(
         f"operations/{operation_id}/links/{link_id}/result"
     )
 
 
 @mcp.tool(name="core_add_link_to_operation")
-def add_link_to_operation(
+async def add_link_to_operation(
     operation_id: str, ability_id: str, ability_executor: str, paw: str
 ):
     """
     Add an ability to an existing operation by specifying the operation id, ability id, ability executor, and paw.
     """
-    return caldera_request.make_post_request(
+    return await caldera_request.make_post_request(
         f"operations/{operation_id}/links",
         {"ability_id": ability_id, "ability_executor": ability_executor, "paw": paw},
     )
 
 
 @mcp.tool(name="core_create_adversary")
-def create_adversary(name: str, description: str, atomic_ordering: list):
+async def create_adversary(name: str, description: str, atomic_ordering: list):
     """
     Create a new adversary, specify a name, description, and atomic ordering.
     Atomic ordering is a list of ability ids that are used to order the abilities of the adversary.
@@ -324,7 +346,7 @@ def create_adversary(name: str, description: str, atomic_ordering: list):
     """
     adversary_id = str(uuid.uuid4())
 
-    return caldera_request.make_post_request(
+    return await caldera_request.make_post_request(
         f"adversaries",
         {
             "adversary_id": adversary_id,
@@ -336,7 +358,7 @@ def create_adversary(name: str, description: str, atomic_ordering: list):
 
 
 @mcp.tool(name="core_create_operation")
-def create_operation(operation_name: str, adversary_name: str):
+async def create_operation(operation_name: str, adversary_name: str):
     """
     Create a new operation with the specified name and adversary.
 
@@ -347,7 +369,9 @@ def create_operation(operation_name: str, adversary_name: str):
     Returns:
         The response from the Caldera API or None if adversary details cannot be fetched
     """
-    req = caldera_request.make_get_request("adversaries")
+    req = await caldera_request.make_get_request("adversaries")
+    if _is_error(req):
+        return req
     found_adversaries = []
     for adversary in req:
         if adversary["name"] == adversary_name:
@@ -384,7 +408,7 @@ def create_operation(operation_name: str, adversary_name: str):
         "group": "",
     }
 
-    return caldera_request.make_post_request("operations", operation_body)
+    return await caldera_request.make_post_request("operations", operation_body)
 
 
 def create_command(description: str, platform: str):
@@ -397,7 +421,7 @@ def create_command(description: str, platform: str):
 
 
 @mcp.tool(name="core_create_windows_ability")
-def create_windows_ability(
+async def create_windows_ability(
     name: str,
     description: str,
     command_description: str,
@@ -422,7 +446,7 @@ def create_windows_ability(
         The response from the Caldera API
     """
     ability_id = str(uuid.uuid4())
-    created_command = create_command(command_description, "windows")
+    created_command = await asyncio.to_thread(create_command, command_description, "windows")
     # Create the executor object with default values for optional fields
     executor = {
         "name": "windows",
@@ -459,11 +483,11 @@ def create_windows_ability(
         "delete_payload": True,
     }
 
-    return caldera_request.make_post_request("abilities", ability_body)
+    return await caldera_request.make_post_request("abilities", ability_body)
 
 
 @mcp.tool(name="core_create_linux_ability")
-def create_linux_ability(
+async def create_linux_ability(
     name: str,
     description: str,
     command_description: str,
@@ -488,7 +512,7 @@ def create_linux_ability(
         The response from the Caldera API
     """
     ability_id = str(uuid.uuid4())
-    created_command = create_command(command_description, "linux")
+    created_command = await asyncio.to_thread(create_command, command_description, "linux")
 
     # Create the executor object with default values for optional fields
     executor = {
@@ -526,15 +550,15 @@ def create_linux_ability(
         "delete_payload": True,
     }
 
-    return caldera_request.make_post_request("abilities", ability_body)
+    return await caldera_request.make_post_request("abilities", ability_body)
 
 
 @mcp.tool(name="core_get_payloads")
-def get_payloads():
+async def get_payloads():
     """
     Returns all payloads.
     """
-    return caldera_request.make_get_request("payloads")
+    return await caldera_request.make_get_request("payloads")
 
 
 if __name__ == "__main__":
@@ -10,6 +10,7 @@ import mlflow
 import asyncio
 
 from plugins.mcp.app.config import resolve_llm_config
+from plugins.mcp.app.capabilities.rag_corpus import get_rag_corpus
 
 
 # Where chat session history lives on disk. Co-located with RAG uploads
@@ -99,7 +100,10 @@ class MCPService(BaseService):
         self.auth_svc = services.get("auth_svc")
         self.log = logging.getLogger("plugins.mcp")
 
-        self.rag_service = None
+        # Long-lived RAG corpus shared by every run and session. The rag
+        # capability retrieves through the same instance, so bundles are
+        # parsed and vectorized once and reloaded only when they change.
+        self.rag_service = get_rag_corpus()
         self.server_registry = server_registry or {}
         self.workflow_registry = workflow_registry or {}
         self.capability_registry = capability_registry or {}
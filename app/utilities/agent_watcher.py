@@ -0,0 +1,153 @@
+"""
+Shared watcher for Caldera agent check-ins.
+
+``wait_for_agents`` used to fetch the full agent list every 30 s per
+tool call. An ``AgentWatcher`` polls one (platform-filtered) agent set
+on behalf of every concurrent waiter: the first poll is immediate, the
+interval then backs off from ``initial_interval_s`` to the cap and is
+reset whenever the paw set changes, and each waiter returns as soon as
+its own ``min_count`` is met. Check-ins delivered by an event source can
+be fed in through ``push`` and wake waiters without waiting for a poll.
+
+    watcher = watcher_for(frozenset({"linux"}), fetch_agents)
+    snap = await watcher.wait(min_count=2, timeout_s=600, max_interval_s=30)
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+from plugins.mcp.app.utilities.range_readiness import AdaptiveInterval
+
+log = logging.getLogger("plugins.mcp")
+
+# Only the fields the watcher reports; Caldera's ``include`` query
+# parameter trims the rest (links, executors, ...) from each agent.
+AGENT_FIELDS = ("paw", "host", "platform")
+
+
+class AgentWatcher:
+
+    def __init__(self, fetch: Callable[[], Awaitable[Optional[list]]],
+                 platforms: Iterable[str] = (),
+                 initial_interval_s: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self._fetch = fetch
+        self.platforms = frozenset(p.lower() for p in platforms)
+        self._initial_s = initial_interval_s
+        self._clock = clock
+        self._sleep = sleep
+        self.agents: dict[str, dict] = {}
+        self.polls = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop = None
+        self._task: Optional[asyncio.Task] = None
+        self._caps: list[float] = []
+
+    # -- state ---------------------------------------------------------------
+
+    def _accepts(self, agent: dict) -> bool:
+        if not agent.get("paw"):
+            return False
+        return not self.platforms or (agent.get("platform") or "").lower() in self.platforms
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._loop is not loop:
+            self._changed = asyncio.Condition()
+            self._loop = loop
+        return self._changed
+
+    async def _notify(self) -> None:
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+
+    def snapshot(self) -> dict:
+        agents = list(self.agents.values())
+        return {
+            "agent_count": len(agents),
+            "paws": [a["paw"] for a in agents],
+            "hostnames": [a["host"] for a in agents if a.get("host")],
+            "platforms": sorted({(a.get("platform") or "").lower()
+                                 for a in agents if a.get("platform")}),
+        }
+
+    async def push(self, agents: Iterable[dict]) -> bool:
+        """Merge check-ins from an event source; True when a paw was new."""
+        added = False
+        for agent in agents:
+            if isinstance(agent, dict) and self._accepts(agent) and agent["paw"] not in self.agents:
+                self.agents[agent["paw"]] = agent
+                added = True
+        if added:
+            await self._notify()
+        return added
+
+    def _replace(self, agents: list) -> bool:
+        current = {a["paw"]: a for a in agents if isinstance(a, dict) and self._accepts(a)}
+        changed = current.keys() != self.agents.keys()
+        self.agents = current
+        return changed
+
+    # -- polling -------------------------------------------------------------
+
+    async def _poll_loop(self) -> None:
+        interval = AdaptiveInterval(self._initial_s, max(self._caps))
+        try:
+            while self._caps:
+                self.polls += 1
+                try:
+                    agents = await self._fetch()
+                except Exception as e:
+                    log.warning(f"[AGENTS] poll error: {e!r}")
+                    agents = None
+                if agents is not None and self._replace(agents):
+                    interval.reset()
+                    await self._notify()
+                interval.max_s = min(self._caps) if self._caps else interval.max_s
+                await self._sleep(interval.next())
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    async def wait(self, min_count: int, timeout_s: float,
+                   max_interval_s: float = 30.0) -> dict:
+        """Wait until ``min_count`` agents are present or ``timeout_s`` passes."""
+        start = self._clock()
+        self._caps.append(max_interval_s)
+        if self._task is None:
+            # Nobody was polling: drop the old set so the first poll decides.
+            self.agents = {}
+            self._task = asyncio.ensure_future(self._poll_loop())
+        cond = self._condition()
+        met = False
+        try:
+            async with asyncio.timeout(timeout_s):
+                async with cond:
+                    met = await cond.wait_for(lambda: len(self.agents) >= min_count)
+        except TimeoutError:
+            pass
+        finally:
+            self._caps.remove(max_interval_s)
+            if not self._caps and self._task is not None:
+                self._task.cancel()
+                self._task = None
+        out = self.snapshot()
+        out["elapsed_s"] = round(self._clock() - start, 3) if met else timeout_s
+        out["timed_out"] = not met
+        return out
+
+
+_WATCHERS: dict[Hashable, AgentWatcher] = {}
+
+
+def watcher_for(key: Hashable, fetch: Callable[[], Awaitable[Optional[list]]],
+                platforms: Iterable[str] = ()) -> AgentWatcher:
+    """The process-wide watcher for ``key`` (created on first use)."""
+    watcher = _WATCHERS.get(key)
+    if watcher is None:
+        watcher = _WATCHERS[key] = AgentWatcher(fetch, platforms)
+    return watcher
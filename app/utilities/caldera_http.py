@@ -0,0 +1,270 @@
+"""
+Shared aiohttp client for Caldera / Range / Detections REST calls.
+
+The cti_pipeline MCP server used to open a fresh ``ClientSession`` per
+helper call (per poll iteration for some tools) and to walk every
+Caldera root candidate in order on each call, so an agent run paid TCP
+setup and, for a dead first root, a full timeout on every request.
+``CalderaHTTP`` keeps one keep-alive connection pool for the life of
+the event loop and remembers the root that last answered:
+
+    http = CalderaHTTP(roots=_caldera_root_candidates, headers=_caldera_headers)
+    res = await http.request_root("POST", "/plugin/range/onprem/deploy-status",
+                                  json={...}, policy=POLICIES["range-status"])
+    res.status, res.payload, res.url
+
+Per-endpoint ``Policy`` objects set the timeout and how many times a
+transport error or 5xx is retried (only ever for idempotent requests).
+``stream_events`` reads a server-sent-events endpoint on the same pool,
+and ``RequestStats`` keeps bounded per-endpoint counters and latency
+histograms for long-lived servers.
+"""
+
+import asyncio
+import bisect
+import collections
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, NamedTuple, Optional
+
+log = logging.getLogger("plugins.mcp")
+
+
+class Policy(NamedTuple):
+    timeout_s: float = 10.0
+    retries: int = 0
+    backoff_s: float = 0.5
+
+
+class HTTPResult(NamedTuple):
+    status: int
+    payload: Any
+    url: str
+    # False for an empty or non-JSON body (payload is then {} / {"raw": text})
+    is_json: bool = True
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+
+# Non-idempotent calls (deploys, imports, operation creation) never retry.
+POLICIES = {
+    "default": Policy(),
+    "range-get": Policy(timeout_s=10, retries=1),
+    "range-images": Policy(timeout_s=5, retries=1),
+    "range-status": Policy(timeout_s=15, retries=1),
+    "range-post": Policy(timeout_s=10),
+    "range-deploy": Policy(timeout_s=60),
+    "range-profile": Policy(timeout_s=30),
+    "range-import": Policy(timeout_s=120),
+    "range-features": Policy(timeout_s=900),
+    "caldera-agents": Policy(timeout_s=15, retries=1),
+    "caldera-operation": Policy(timeout_s=30),
+    "detections-validate": Policy(timeout_s=120),
+}
+
+_RETRY_STATUSES = {502, 503, 504}
+
+
+class StreamUnsupported(Exception):
+    """The endpoint does not serve ``text/event-stream``."""
+
+
+class StreamIdle(StreamUnsupported):
+    """The stream went quiet for ``idle_timeout_s``; it may work next time."""
+
+
+def _decode_body(text: str) -> tuple[Any, bool]:
+    """``(payload, is_json)`` for a response body."""
+    if not text:
+        return {}, False
+    try:
+        return json.loads(text), True
+    except json.JSONDecodeError:
+        return {"raw": text}, False
+
+
+def _decode(text: str) -> Any:
+    return _decode_body(text)[0]
+
+
+# Upper bounds (seconds) of the latency histogram buckets; the last
+# bucket counts everything slower.
+LATENCY_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestStats:
+    """
+    Request counters keyed by (method, resource, status) and a latency
+    histogram per (method, resource). ``resource`` is the first path
+    segment ("abilities", "operations", ...), so ids never become keys
+    and the tables stay bounded however long the server runs.
+    """
+
+    def __init__(self):
+        self.counts: collections.Counter = collections.Counter()
+        self.latency: dict[tuple[str, str], list[int]] = {}
+
+    @staticmethod
+    def resource(endpoint: str) -> str:
+        return endpoint.strip("/").split("/", 1)[0].split("?", 1)[0] or "/"
+
+    def record(self, method: str, endpoint: str, status: Optional[int],
+               elapsed_s: float) -> None:
+        key = (method, self.resource(endpoint))
+        self.counts[key + (status or "error",)] += 1
+        hist = self.latency.setdefault(key, [0] * (len(LATENCY_BUCKETS_S) + 1))
+        hist[bisect.bisect_left(LATENCY_BUCKETS_S, elapsed_s)] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": [{"method": m, "resource": r, "status": s, "count": n}
+                         for (m, r, s), n in sorted(self.counts.items(), key=str)],
+            "latency_buckets_s": list(LATENCY_BUCKETS_S) + ["inf"],
+            "latency": {f"{m} {r}": list(h) for (m, r), h in sorted(self.latency.items())},
+        }
+
+
+class CalderaHTTP:
+
+    def __init__(self, roots: Callable[[], list[str]],
+                 headers: Callable[[], dict],
+                 limit_per_host: int = 8):
+        self._roots = roots
+        self._headers = headers
+        self._limit_per_host = limit_per_host
+        self._candidates: Optional[list[str]] = None
+        self._session = None
+        self._loop = None
+        self.good_root: Optional[str] = None
+
+    async def session(self):
+        """The pooled session for the running loop (created on first use)."""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self._limit_per_host,
+                                               keepalive_timeout=60),
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def request(self, method: str, url: str, *,
+                      policy: Policy = POLICIES["default"],
+                      headers: Optional[dict] = None,
+                      **kwargs) -> HTTPResult:
+        """One request with ``policy``'s timeout and retries.
+
+        Raises the last transport error when every attempt failed.
+        """
+        import aiohttp
+
+        session = await self.session()
+        hdrs = self._headers() if headers is None else headers
+        attempt = 0
+        while True:
+            try:
+                async with session.request(
+                    method, url, headers=hdrs,
+                    timeout=aiohttp.ClientTimeout(total=policy.timeout_s),
+                    **kwargs,
+                ) as resp:
+                    payload, is_json = _decode_body(await resp.text())
+                    result = HTTPResult(resp.status, payload, url, is_json)
+                if result.status not in _RETRY_STATUSES or attempt >= policy.retries:
+                    return result
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= policy.retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(policy.backoff_s * attempt)
+
+    def _ordered_roots(self) -> list[str]:
+        if self._candidates is None:
+            self._candidates = [r.rstrip("/") for r in self._roots()]
+        roots = list(self._candidates)
+        if self.good_root in roots:
+            roots.remove(self.good_root)
+            roots.insert(0, self.good_root)
+        return roots
+
+    async def request_root(self, method: str, path: str, *,
+                           policy: Policy = POLICIES["default"],
+                           require_ok: bool = False,
+                           require_json: bool = False,
+                           headers: Optional[dict] = None,
+                           **kwargs) -> Optional[HTTPResult]:
+        """
+        Send ``path`` to the remembered root, falling back to the other
+        candidates on transport errors (and, with ``require_ok``, on HTTP
+        errors; with ``require_json``, on bodies that are not JSON, e.g. a
+        proxy's HTML page). Returns None when no root answered acceptably.
+        """
+        for root in self._ordered_roots():
+            url = f"{root}{path}"
+            try:
+                result = await self.request(method, url, policy=policy, headers=headers, **kwargs)
+            except Exception as e:
+                log.debug(f"[HTTP] {method} {url} failed: {e}")
+                if root == self.good_root:
+                    self.good_root = None
+                continue
+            if require_ok and not result.ok:
+                continue
+            if require_json and not result.is_json:
+                log.debug(f"[HTTP] {method} {url} answered {result.status} without JSON")
+                continue
+            self.good_root = root
+            return result
+        return None
+
+    async def stream_events(self, method: str, path: str, *,
+                            connect_timeout_s: float = 10.0,
+                            idle_timeout_s: float = 30.0,
+                            **kwargs) -> AsyncIterator[Any]:
+        """
+        Yield the decoded ``data:`` payload of each server-sent event from
+        ``path`` on the current root. Raises ``StreamUnsupported`` when the
+        server answers with an error or a non-SSE content type, and its
+        subclass ``StreamIdle`` when it sends nothing for
+        ``idle_timeout_s`` (e.g. a buffering proxy, or a quiet deploy).
+        """
+        import aiohttp
+
+        session = await self.session()
+        url = f"{self.root()}{path}"
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout_s,
+                                        sock_read=idle_timeout_s)
+        async with session.request(method, url, headers=self._headers(),
+                                   timeout=timeout, **kwargs) as resp:
+            ctype = resp.headers.get("Content-Type", "")
+            if resp.status >= 400 or not ctype.startswith("text/event-stream"):
+                raise StreamUnsupported(f"{url}: HTTP {resp.status} {ctype or '-'}")
+            data: list[str] = []
+            lines = resp.content.__aiter__()
+            while True:
+                try:
+                    raw = await lines.__anext__()
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError as e:
+                    raise StreamIdle(
+                        f"{url}: no data within {idle_timeout_s:g}s") from e
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                if line.startswith("data:"):
+                    data.append(line[5:].lstrip())
+                elif not line and data:
+                    yield _decode("\n".join(data))
+                    data = []
+
+    def root(self) -> str:
+        """The remembered root, else the first candidate."""
+        return self.good_root or self._ordered_roots()[0]
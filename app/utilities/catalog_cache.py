@@ -0,0 +1,152 @@
+"""
+TTL cache with stale-while-revalidate for slow-changing catalogs.
+
+The Range image / feature catalogs are read over HTTP (with per-root
+timeouts) and from YAML on disk, yet change only when an image or
+feature is imported or a range deployed. ``TTLCache`` keeps each keyed
+value for ``ttl_s``; for a further ``stale_s`` it is still served
+immediately while one refresh runs in the background, after which the
+next caller loads it again. Concurrent misses share one load.
+
+    cache = TTLCache(ttl_s=60, stale_s=600)
+    value, age_s = await cache.get("images:microvm", load_images)
+    cache.invalidate()          # after import / deploy
+
+``get`` is for coroutine loaders on an event loop; ``get_sync`` is for
+blocking loaders and refreshes on a daemon thread. A loader that cannot
+reach its source raises (``CatalogUnavailable``) rather than returning an
+empty catalog: nothing is stored, a stale entry keeps being served and
+the next miss tries again.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+log = logging.getLogger("plugins.mcp")
+
+
+class CatalogUnavailable(RuntimeError):
+    """A catalog source could not be read; the failed load is not cached."""
+
+
+class TTLCache:
+
+    def __init__(self, ttl_s: float = 60.0, stale_s: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self._clock = clock
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        # Bumped by invalidate() so a load started before it is not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._loading: dict[Hashable, Any] = {}
+
+    def age(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return None if entry is None else self._clock() - entry[0]
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop entries; loads already in flight are neither stored nor joined."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._loading.clear()
+            else:
+                self._entries.pop(key, None)
+                self._loading.pop(key, None)
+
+    def _finish_loading(self, key: Hashable, token: Any) -> None:
+        with self._lock:
+            if self._loading.get(key) is token:
+                del self._loading[key]
+
+    def _lookup(self, key: Hashable) -> tuple[Optional[tuple[float, Any]], str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, "miss"
+        age = self._clock() - entry[0]
+        if age < self.ttl_s:
+            return entry, "fresh"
+        if age < self.ttl_s + self.stale_s:
+            return entry, "stale"
+        return None, "miss"
+
+    def _store(self, key: Hashable, generation: int, value: Any) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (self._clock(), value)
+
+    # -- async ---------------------------------------------------------------
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                    generation: int) -> Any:
+        try:
+            value = await loader()
+        finally:
+            self._finish_loading(key, asyncio.current_task())
+        self._store(key, generation, value)
+        return value
+
+    def _start(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> "asyncio.Task":
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, self._generation))
+            task.add_done_callback(_log_refresh_error)
+            self._loading[key] = task
+        return task
+
+    async def get(self, key: Hashable,
+                  loader: Callable[[], Awaitable[Any]]) -> tuple[Any, float]:
+        """``(value, age_s)``; ``loader`` is awaited only on a miss."""
+        entry, state = self._lookup(key)
+        if state == "fresh":
+            return entry[1], self._clock() - entry[0]
+        if state == "stale":
+            self._start(key, loader)
+            return entry[1], self._clock() - entry[0]
+        value = await asyncio.shield(self._start(key, loader))
+        return value, 0.0
+
+    # -- sync ----------------------------------------------------------------
+
+    def get_sync(self, key: Hashable, loader: Callable[[], Any]) -> tuple[Any, float]:
+        """Blocking counterpart of ``get``."""
+        entry, state = self._lookup(key)
+        if state == "fresh":
+            return entry[1], self._clock() - entry[0]
+        if state == "stale":
+            token = object()
+            with self._lock:
+                refreshing = key in self._loading
+                if not refreshing:
+                    self._loading[key] = token
+                generation = self._generation
+            if not refreshing:
+                threading.Thread(
+                    target=self._refresh_sync, args=(key, loader, generation, token),
+                    daemon=True,
+                ).start()
+            return entry[1], self._clock() - entry[0]
+        generation = self._generation
+        value = loader()
+        self._store(key, generation, value)
+        return value, 0.0
+
+    def _refresh_sync(self, key: Hashable, loader: Callable[[], Any],
+                      generation: int, token: Any) -> None:
+        try:
+            self._store(key, generation, loader())
+        except Exception as e:
+            log.warning(f"[CACHE] background refresh of {key!r} failed: {e}")
+        finally:
+            self._finish_loading(key, token)
+
+
+def _log_refresh_error(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.warning(f"[CACHE] catalog load failed: {task.exception()}")
@@ -28,6 +28,7 @@ Public API
 ``discover_ae_plans(libraries_root: Path = None) -> list[dict]``
 ``parse_ae_plan(plan_meta: dict) -> dict``
 ``ae_plan_to_stix(ir: dict, taxonomy: dict) -> dict``
+``AEPlanMatcher(plans, taxonomy).match_first(candidates) -> (plan, explanation)``
 
 CLI
 ---
@@ -1271,6 +1272,147 @@ def find_plan_by_adversary(plans: list[dict], adversary: str) -> Optional[dict]:
     return None
 
 
+def _norm_slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", (value or "").lower())
+
+
+def _trigrams(value: str) -> set:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _numbers(value: str) -> list[str]:
+    return re.findall(r"[0-9]+", value)
+
+
+class AEPlanMatcher:
+    """Prebuilt adversary-name -> plan index.
+
+    Every plan is reachable by its normalised slug, its library folder
+    name, the threat-actor name it lowers to and, when an ATT&CK taxonomy
+    is given, the name and aliases of the intrusion-set carrying any of
+    those names. ``match`` tries, in order:
+
+      1. exact hit on any of those keys;
+      2. ``find_plan_by_adversary``'s substring rule (needle in slug or
+         slug in needle) on slug / folder keys, first plan in discovery
+         order, with candidates narrowed through a trigram posting list;
+      3. trigram Jaccard similarity above ``fuzzy_threshold`` on any key
+         whose numbers agree with the candidate's (APT28 is not APT29,
+         FIN6 is not FIN7, however close the letters are).
+
+    and returns the plan plus an explanation of which key matched how.
+    """
+
+    def __init__(self, plans: list[dict], taxonomy: Optional[dict] = None,
+                 fuzzy_threshold: float = 0.6):
+        self.plans = plans
+        self.fuzzy_threshold = fuzzy_threshold
+        self._exact: dict[str, int] = {}
+        # key id -> (normalised key, plan index, method, source value)
+        self._keys: list[tuple[str, int, str, str]] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._short: list[int] = []
+
+        groups_by_name: dict[str, dict] = {}
+        for group in ((taxonomy or {}).get("groups") or {}).values():
+            for name in [group.get("name")] + list(group.get("aliases") or []):
+                groups_by_name.setdefault(_norm_slug(name or ""), group)
+        groups_by_name.pop("", None)
+
+        for idx, plan in enumerate(plans):
+            slug = plan.get("adversary") or ""
+            plan_dir = plan.get("plan_dir")
+            base = [(slug, "slug"),
+                    (Path(plan_dir).name if plan_dir else "", "folder"),
+                    (_LIBRARY_ADVERSARY_TO_THREAT_ACTOR.get(slug.lower(), ""), "threat-actor")]
+            names = list(base)
+            for value, _ in base:
+                group = groups_by_name.get(_norm_slug(value))
+                if group:
+                    names.append((group.get("name") or "", "attack-group"))
+                    names.extend((a, "attack-alias") for a in group.get("aliases") or [])
+            for value, method in names:
+                self._add_key(value, idx, method)
+
+    def _add_key(self, value: str, idx: int, method: str) -> None:
+        key = _norm_slug(value)
+        if not key:
+            return
+        kid = len(self._keys)
+        self._keys.append((key, idx, method, value))
+        self._exact.setdefault(key, kid)
+        grams = _trigrams(key)
+        if not grams:
+            self._short.append(kid)
+        for g in grams:
+            self._postings[g].append(kid)
+
+    def _explain(self, candidate: str, kid: int, method: str, score: float = 1.0) -> dict:
+        key, idx, key_method, value = self._keys[kid]
+        plan = self.plans[idx]
+        return {
+            "candidate": candidate,
+            "method": method,
+            "key_kind": key_method,
+            "key": value,
+            "score": round(score, 3),
+            "plan": f"{plan.get('library')}/{plan.get('adversary')}",
+        }
+
+    def match(self, candidate: str) -> tuple[Optional[dict], Optional[dict]]:
+        """``(plan, explanation)`` for one candidate name, or ``(None, None)``."""
+        needle = _norm_slug(candidate)
+        if not needle:
+            return None, None
+
+        kid = self._exact.get(needle)
+        if kid is not None:
+            return self.plans[self._keys[kid][1]], self._explain(candidate, kid, "exact")
+
+        grams = _trigrams(needle)
+        hits: dict[int, int] = defaultdict(int)
+        for g in grams:
+            for k in self._postings.get(g, ()):
+                hits[k] += 1
+        if grams:
+            maybe = list(hits) + self._short
+        else:
+            maybe = range(len(self._keys))
+
+        best_sub = None
+        for k in maybe:
+            key, idx, method, _ = self._keys[k]
+            if method not in ("slug", "folder"):
+                continue
+            if (needle in key or key in needle) and (best_sub is None or idx < self._keys[best_sub][1]):
+                best_sub = k
+        if best_sub is not None:
+            return self.plans[self._keys[best_sub][1]], self._explain(candidate, best_sub, "substring")
+
+        best, best_score = None, 0.0
+        numbers = _numbers(needle)
+        for k, n in hits.items():
+            key, idx, _, _ = self._keys[k]
+            key_numbers = _numbers(key)
+            if numbers and key_numbers and numbers != key_numbers:
+                continue
+            score = n / (len(grams) + len(_trigrams(key)) - n)
+            if score > best_score or (score == best_score and best is not None
+                                      and idx < self._keys[best][1]):
+                best, best_score = k, score
+        if best is not None and best_score > self.fuzzy_threshold:
+            return self.plans[self._keys[best][1]], self._explain(candidate, best, "trigram", best_score)
+        return None, None
+
+    def match_first(self, candidates: Iterable[str]) -> tuple[Optional[dict], Optional[dict]]:
+        """First candidate (in the caller's priority order) that matches."""
+        for cand in candidates:
+            plan, why = self.match(cand)
+            if plan is not None:
+                return plan, why
+        return None, None
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
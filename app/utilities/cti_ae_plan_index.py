@@ -0,0 +1,324 @@
+"""
+Persisted index of the vendored AE-library plans.
+
+``discover_ae_plans()`` walks both adversary-emulation libraries and
+``parse_ae_plan()`` regex-parses a plan's markdown; Stage 4 and the
+topology tools used to repeat both for every bundle / tool call. This
+module keeps the discovered plan records and the parsed AE IR in
+``<libraries_root>/.ae_plan_index.json`` and in memory for the life of
+the process:
+
+  * the plan list is reused while the mtime of every directory the
+    discoverer looked at is unchanged (adding, removing or renaming a
+    plan or one of its markdown files bumps one of them);
+  * each parsed IR is reused while its markdown sources keep their
+    (mtime, size) -- or, when only the mtime moved (checkout, touch),
+    their SHA-1 -- and the ATT&CK tool/malware names it was parsed
+    against are the same.
+
+Callers get fresh copies and may mutate them.
+
+Writes are batched: parses mark the index dirty and it is saved every
+``SAVE_BATCH`` new entries, ``SAVE_INTERVAL_S`` seconds, on ``flush()``
+and at interpreter exit. A save merges with whatever other processes
+(Stage 4 workers) wrote to the file since, so none of their entries are
+lost to a last-writer-wins replace.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:  # optional: serialize merge-and-replace across processes
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from plugins.mcp.app.utilities.cti_ae_library_loader import (
+    _AEVALS_LIB_DIR,
+    _CTID_LIB_DIR,
+    _DEFAULT_LIBRARIES_ROOT,
+    discover_ae_plans,
+    parse_ae_plan,
+)
+
+INDEX_FILE = ".ae_plan_index.json"
+INDEX_VERSION = 1
+SAVE_BATCH = 16
+SAVE_INTERVAL_S = 30.0
+
+_PATH_KEYS = ("plan_dir", "scenario_md_path", "overview_md_path",
+              "infrastructure_md_path", "resources_dir")
+_PLAN_SUBDIRS = ("Emulation_Plan", "CTI_Emulation_Resources", "Intelligence_Summary")
+
+_INDEXES: dict[str, "AEPlanIndex"] = {}
+_INDEXES_LOCK = threading.Lock()
+_NAMES_FP: dict[int, tuple[int, str]] = {}
+
+
+# ---------------------------------------------------------------------------
+# Signatures
+# ---------------------------------------------------------------------------
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _subdirs(path: Path) -> list[Path]:
+    try:
+        return sorted(p for p in path.iterdir() if p.is_dir())
+    except OSError:
+        return []
+
+
+def _discovery_dirs(root: Path, plans: list[dict]) -> list[Path]:
+    """Every directory whose listing ``discover_ae_plans`` depends on.
+
+    ``root`` itself is left out: the index file lives there, and the two
+    library directories are tracked directly (a missing one stats None).
+    """
+    dirs = {root / _CTID_LIB_DIR, root / _AEVALS_LIB_DIR}
+    dirs.update(_subdirs(root / _CTID_LIB_DIR))
+    dirs.update(_subdirs(root / _AEVALS_LIB_DIR))
+    dirs.add(root / _CTID_LIB_DIR / "micro_emulation_plans" / "src")
+    for plan in plans:
+        plan_dir = plan["plan_dir"]
+        dirs.add(plan_dir)
+        for name in _PLAN_SUBDIRS:
+            dirs.add(plan_dir / name)
+        dirs.update(_subdirs(plan_dir / "Emulation_Plan"))
+    return sorted(dirs)
+
+
+def _dirs_signature(dirs: list[Path]) -> list:
+    return [[str(d), _mtime(d)] for d in dirs]
+
+
+def _sha1(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _source_paths(plan_meta: dict) -> list[Path]:
+    return [p for p in (plan_meta.get(k) for k in
+                        ("scenario_md_path", "overview_md_path", "infrastructure_md_path"))
+            if isinstance(p, Path)]
+
+
+def _sources_signature(paths: list[Path]) -> list:
+    sig = []
+    for p in paths:
+        try:
+            st = p.stat()
+            sig.append([str(p), st.st_mtime_ns, st.st_size, _sha1(p)])
+        except OSError:
+            sig.append([str(p), None, None, None])
+    return sig
+
+
+def _taxonomy_fingerprint(taxonomy: Optional[dict]) -> str:
+    """Hash of the ATT&CK tool/malware names parse_ae_plan consults."""
+    if not taxonomy:
+        return "none"
+    names = taxonomy.get("name_index") or {}
+    memo = _NAMES_FP.get(id(names))
+    if memo is not None and memo[0] == len(names):
+        return memo[1]
+    keys = sorted(k for k in names if k.startswith(("tool:", "malware:")))
+    fp = hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()[:16]
+    _NAMES_FP[id(names)] = (len(names), fp)
+    return fp
+
+
+def _plan_key(plan_meta: dict) -> str:
+    return f"{plan_meta.get('library')}/{plan_meta.get('adversary')}"
+
+
+def _plan_to_json(plan: dict) -> dict:
+    return {k: (str(v) if isinstance(v, Path) else v) for k, v in plan.items()}
+
+
+def _plan_from_json(plan: dict) -> dict:
+    return {k: (Path(v) if k in _PATH_KEYS and v is not None else v)
+            for k, v in plan.items()}
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class AEPlanIndex:
+    """Discovered plans + parsed IR for one libraries root."""
+
+    def __init__(self, libraries_root: Optional[Path] = None):
+        self.root = Path(libraries_root or _DEFAULT_LIBRARIES_ROOT).resolve()
+        self.path = self.root / INDEX_FILE
+        self._lock = threading.RLock()
+        self._plans: Optional[list[dict]] = None
+        self._plans_sig: Optional[list] = None
+        self._parsed: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._plans_dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+
+    def _read(self) -> Optional[dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return data if data.get("version") == INDEX_VERSION else None
+
+    def _load(self) -> None:
+        data = self._read()
+        if data is None:
+            return
+        self._plans = [_plan_from_json(p) for p in data.get("plans") or []]
+        self._plans_sig = data.get("plans_signature")
+        self._parsed = data.get("parsed") or {}
+
+    def save(self) -> None:
+        """Merge this process's changes into the index file."""
+        with self._lock:
+            if not self.root.is_dir():
+                return
+            try:
+                with open(self.path.with_name(INDEX_FILE + ".lock"), "a") as lock:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_EX)
+                    self._merge_and_write()
+            except OSError as e:
+                print(f"[AE-INDEX] Could not persist plan index: {e}")
+                return
+            self._dirty.clear()
+            self._plans_dirty = False
+            self._saved_at = time.monotonic()
+
+    def _merge_and_write(self) -> None:
+        disk = self._read() or {}
+        parsed = dict(disk.get("parsed") or {})
+        for key, entry in self._parsed.items():
+            if key in self._dirty or key not in parsed:
+                parsed[key] = entry
+        # Adopt what other processes parsed; freshness is checked on use.
+        self._parsed = parsed
+        if self._plans_dirty or not disk.get("plans_signature"):
+            plans = [_plan_to_json(p) for p in self._plans or []]
+            plans_sig = self._plans_sig
+        else:
+            plans, plans_sig = disk.get("plans") or [], disk.get("plans_signature")
+        data = {
+            "version": INDEX_VERSION,
+            "plans": plans,
+            "plans_signature": plans_sig,
+            "parsed": parsed,
+        }
+        tmp = self.path.with_name(f"{INDEX_FILE}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def flush(self) -> None:
+        """Save now if anything changed since the last save."""
+        with self._lock:
+            if self._dirty or self._plans_dirty:
+                self.save()
+
+    def _mark_dirty(self, key: str) -> None:
+        self._dirty.add(key)
+        if (len(self._dirty) >= SAVE_BATCH
+                or time.monotonic() - self._saved_at >= SAVE_INTERVAL_S):
+            self.save()
+
+    def _plans_fresh(self) -> bool:
+        if self._plans is None or not self._plans_sig:
+            return False
+        return _dirs_signature([Path(d) for d, _ in self._plans_sig]) == self._plans_sig
+
+    def plans(self) -> list[dict]:
+        """``discover_ae_plans()`` for this root, rediscovered only on change."""
+        with self._lock:
+            if not self._plans_fresh():
+                self._plans = discover_ae_plans(self.root)
+                self._plans_sig = _dirs_signature(_discovery_dirs(self.root, self._plans))
+                # Rare, and every later parse depends on it: save at once.
+                self._plans_dirty = True
+                self.save()
+            return [dict(p) for p in self._plans]
+
+    def parse(self, plan_meta: dict, *, taxonomy: Optional[dict] = None) -> dict:
+        """``parse_ae_plan()``, reparsed only when its sources change."""
+        key = f"{_plan_key(plan_meta)}|{_taxonomy_fingerprint(taxonomy)}"
+        sources = _source_paths(plan_meta)
+        with self._lock:
+            entry = self._parsed.get(key)
+            if entry is not None and self._entry_fresh(key, entry, sources):
+                return copy.deepcopy(entry["ir"])
+            ir = parse_ae_plan(plan_meta, taxonomy=taxonomy)
+            self._parsed[key] = {"sources": _sources_signature(sources), "ir": ir}
+            self._mark_dirty(key)
+            return copy.deepcopy(ir)
+
+    def _entry_fresh(self, key: str, entry: dict, sources: list[Path]) -> bool:
+        recorded = entry.get("sources") or []
+        if [s[0] for s in recorded] != [str(p) for p in sources]:
+            return False
+        changed = False
+        for rec, path in zip(recorded, sources):
+            try:
+                st = path.stat()
+            except OSError:
+                if rec[1] is not None:
+                    return False
+                continue
+            if rec[1] == st.st_mtime_ns and rec[2] == st.st_size:
+                continue
+            if rec[2] != st.st_size or rec[3] != _sha1(path):
+                return False
+            rec[1] = st.st_mtime_ns
+            changed = True
+        if changed:
+            self._mark_dirty(key)
+        return True
+
+
+def load_ae_plan_index(libraries_root: Optional[Path] = None) -> AEPlanIndex:
+    """Process-wide ``AEPlanIndex`` for ``libraries_root``."""
+    key = str(Path(libraries_root or _DEFAULT_LIBRARIES_ROOT).resolve())
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = AEPlanIndex(key)
+        return index
+
+
+def flush_ae_plan_indexes() -> None:
+    """Save every process-wide index with unsaved parses."""
+    with _INDEXES_LOCK:
+        indexes = list(_INDEXES.values())
+    for index in indexes:
+        index.flush()
+
+
+atexit.register(flush_ae_plan_indexes)
+
+
+def cached_ae_plans(libraries_root: Optional[Path] = None) -> list[dict]:
+    return load_ae_plan_index(libraries_root).plans()
+
+
+def cached_parse_ae_plan(plan_meta: dict, *, taxonomy: Optional[dict] = None,
+                         libraries_root: Optional[Path] = None) -> dict:
+    return load_ae_plan_index(libraries_root).parse(plan_meta, taxonomy=taxonomy)
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 from __future__ import annotations
+import hashlib
 import json
+import threading
 from pathlib import Path
 from typing import Dict, Any
 
@@ -67,17 +69,242 @@ def build_dynamic_mapping(classes):
     return mapping
 
 
+# ===========================================================
+# Compiled ontology index (parsed once, cached on disk + memory)
+# ===========================================================
+# Parsing the D3FEND TTL modules with rdflib dominates enrichment time and
+# the result never changes between bundles. The classes, mitigations and
+# derived-from triples are compiled into a small JSON index next to the
+# ontology, keyed by every module's (mtime, size), and held in memory for
+# the life of the process. Editing or replacing a TTL file rebuilds it.
+
+ONTOLOGY_SUFFIXES = (".ttl", ".rdf", ".owl")
+INDEX_FILE = ".d3fend_index.json"
+INDEX_VERSION = 2
+
+_INDEX_CACHE: Dict[str, Dict[str, Any]] = {}
+_SCHEMA_CACHE: Dict[str, tuple] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _ontology_modules(ontology_dir: Path) -> list:
+    return sorted(f for f in ontology_dir.rglob("*") if f.suffix in ONTOLOGY_SUFFIXES)
+
+
+def _modules_signature(modules) -> list:
+    sig = []
+    for f in modules:
+        st = f.stat()
+        sig.append([str(f), st.st_mtime_ns, st.st_size])
+    return sig
+
+
+def build_d3fend_index(ttl_files) -> Dict[str, Any]:
+    """Parse TTL modules once and extract everything enrichment needs."""
+    d3f_graph = load_d3fend_graph(ttl_files)
+
+    namespaces = {prefix: str(ns) for prefix, ns in d3f_graph.namespaces()}
+    D3F = Namespace(namespaces.get("d3f"))
+
+    mitigations = sorted({
+        (str(dtech), str(attack))
+        for dtech, _, attack in d3f_graph.triples((None, D3F.mitigates, None))
+    })
+    derived_from = sorted({
+        (str(child), str(parent))
+        for child, _, parent in d3f_graph.triples((None, D3F["derived-from"], None))
+    })
+
+    mitigates_by_attack: Dict[str, list] = {}
+    for dtech, attack in mitigations:
+        mitigates_by_attack.setdefault(attack.split("/")[-1], []).append(dtech)
+
+    index = {
+        "classes": sorted(extract_d3fend_classes(d3f_graph)),
+        "mitigations": [list(p) for p in mitigations],
+        "mitigates_by_attack": mitigates_by_attack,
+        "derived_from": [list(p) for p in derived_from],
+    }
+    # Content-addressed, so every bundle built from the same ontology
+    # references the same shared catalog.
+    digest = hashlib.sha256(json.dumps(index, sort_keys=True).encode("utf-8")).hexdigest()
+    index["catalog_id"] = f"d3fend-catalog--{digest[:16]}"
+    return index
+
+
+def load_d3fend_index(defense_root: Path, force: bool = False) -> Dict[str, Any]:
+    """
+    Return the compiled D3FEND index for ``defense_root``.
+
+    Looked up in memory first, then in ``<defense_root>/.d3fend_index.json``;
+    either is reused only while every ontology module's (mtime, size)
+    matches. Otherwise the TTL modules are parsed and the index rewritten.
+    """
+    ontology_dir = defense_root / "ontology"
+    modules = _ontology_modules(ontology_dir)
+    signature = _modules_signature(modules)
+    key = str(defense_root.resolve())
+
+    with _CACHE_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if not force and cached is not None and cached["signature"] == signature:
+            return cached
+
+        index_path = defense_root / INDEX_FILE
+        index = None
+        if not force and index_path.exists():
+            try:
+                on_disk = json.loads(index_path.read_text(encoding="utf-8"))
+                if on_disk.get("version") == INDEX_VERSION and on_disk.get("signature") == signature:
+                    index = on_disk
+                    print(f"[D3FEND] Loaded cached ontology index: {index_path.name}")
+            except (OSError, ValueError):
+                index = None
+
+        if index is None:
+            index = build_d3fend_index([f for f in modules if f.suffix == ".ttl"])
+            index.update({
+                "version": INDEX_VERSION,
+                "signature": signature,
+                "ontology_modules": [str(f) for f in modules],
+            })
+            try:
+                tmp = index_path.with_name(INDEX_FILE + ".tmp")
+                tmp.write_text(json.dumps(index), encoding="utf-8")
+                tmp.replace(index_path)
+                print(f"[D3FEND] Wrote ontology index: {index_path}")
+            except OSError as e:
+                print(f"[D3FEND] Could not persist ontology index: {e}")
+
+        _INDEX_CACHE[key] = index
+        return index
+
+
+def load_cad_schema(cad_schema_file: Path) -> Dict[str, Any]:
+    """CAD graph schema, re-read only when the file changes."""
+    st = cad_schema_file.stat()
+    sig = (st.st_mtime_ns, st.st_size)
+    key = str(cad_schema_file)
+    with _CACHE_LOCK:
+        cached = _SCHEMA_CACHE.get(key)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+    with cad_schema_file.open("r", encoding="utf-8") as f:
+        schema = json.load(f)
+    with _CACHE_LOCK:
+        _SCHEMA_CACHE[key] = (sig, schema)
+    return schema
+
+
+# ===========================================================
+# CAD countermeasure scope
+# ===========================================================
+# "bundle"   only countermeasures that mitigate the bundle's ATT&CK
+#            techniques, plus their derived-from ancestors (default)
+# "catalog"  no countermeasure/analytic nodes inline; the graph references
+#            the shared catalog (write_d3fend_catalog) by ID instead
+# "full"     the whole D3FEND catalog inline in every graph (legacy)
+CAD_SCOPES = ("bundle", "catalog", "full")
+CATALOG_FILE = "d3fend-catalog.cad.json"
+
+
+def countermeasure_closure(index: Dict[str, Any], attack_tids) -> set:
+    """D3FEND techniques mitigating ``attack_tids`` plus their ancestors."""
+    parents: Dict[str, list] = {}
+    for child, parent in index["derived_from"]:
+        parents.setdefault(child, []).append(parent)
+
+    closure = set()
+    stack = [d for tid in attack_tids for d in index["mitigates_by_attack"].get(tid, ())]
+    while stack:
+        iri = stack.pop()
+        if iri in closure:
+            continue
+        closure.add(iri)
+        stack.extend(parents.get(iri, ()))
+    return closure
+
+
+def _countermeasure_node(iri: str) -> dict:
+    return {
+        "id": iri,               # Use full IRI for uniqueness
+        "nodeType": "Countermeasure",
+        "label": iri.split("#")[-1],
+        "properties": {"iri": iri}
+    }
+
+
+def _analytic_node(dtech: str, attack: str) -> dict:
+    tname = dtech.split("#")[-1]
+    return {
+        "id": f"analytic::{tname}",
+        "nodeType": "Analytic",
+        "label": f"{tname} Analytic",
+        "properties": {
+            "analyticImplements": tname,
+            "analyticPurpose": f"Mitigates {attack}"
+        }
+    }
+
+
+def _derived_from_edge(child: str, parent: str) -> dict:
+    return {
+        "id": f"der-{child}-{parent}",
+        "source": child,
+        "target": parent,
+        "relationship": "derived-from"
+    }
+
+
+def build_d3fend_catalog(defense_root: Path) -> Dict[str, Any]:
+    """The full D3FEND countermeasure catalog as a standalone CAD graph."""
+    index = load_d3fend_index(defense_root)
+    return {
+        "id": index["catalog_id"],
+        "nodes": [_countermeasure_node(iri) for iri in index["classes"]]
+                 + [_analytic_node(d, a) for d, a in index["mitigations"]],
+        "edges": [_derived_from_edge(c, p) for c, p in index["derived_from"]],
+        "metadata": {
+            "source": "d3fend_ontology",
+            "ontology_modules": list(index["ontology_modules"]),
+        },
+    }
+
+
+def write_d3fend_catalog(defense_root: Path, out_dir: Path) -> Path:
+    """
+    Write the shared catalog to ``out_dir/d3fend-catalog.cad.json`` unless
+    a catalog with the same ID is already there. Returns the path.
+    """
+    index = load_d3fend_index(defense_root)
+    out = out_dir / CATALOG_FILE
+    try:
+        if json.loads(out.read_text(encoding="utf-8")).get("id") == index["catalog_id"]:
+            return out
+    except (OSError, ValueError):
+        pass
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(CATALOG_FILE + ".tmp")
+    tmp.write_text(json.dumps(build_d3fend_catalog(defense_root)), encoding="utf-8")
+    tmp.replace(out)
+    print(f"[D3FEND] Wrote shared catalog {out.name} ({index['catalog_id']})")
+    return out
+
+
 # ===========================================================
 # MAIN ENRICHER (Creates CAD graph)
 # ===========================================================
-def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path):
+def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path, scope: str = "bundle"):
     """
     Input:
-        STIX bundle (dict), defense ontology root directory
+        STIX bundle (dict), defense ontology root directory,
+        countermeasure scope (see CAD_SCOPES)
 
     Output:
         (unchanged_but_annotated_bundle, metadata_info)
     """
+    if scope not in CAD_SCOPES:
+        raise ValueError(f"Unknown CAD scope {scope!r}; expected one of {CAD_SCOPES}")
 
     print("[D3FEND] Enriching STIX bundle...")
 
@@ -94,42 +321,22 @@ def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path):
         scenario_text = ""
 
     # -------------------------------------------------------
-    # Load ontology + schema
+    # Load ontology index + schema (compiled once, cached)
     # -------------------------------------------------------
-    ontology_dir = defense_root / "ontology"
     cad_schema_file = defense_root / "D3fend_CAD_Graph_Schema.json"
+    cad_schema = load_cad_schema(cad_schema_file)
 
-    ontology_modules = []
-    for f in ontology_dir.rglob("*"):
-        if f.suffix in [".ttl", ".rdf", ".owl"]:
-            ontology_modules.append(str(f))
-
-    with cad_schema_file.open("r", encoding="utf-8") as f:
-        cad_schema = json.load(f)
-
-    ttl_files = [Path(p) for p in ontology_modules if p.endswith(".ttl")]
-    d3f_graph = load_d3fend_graph(ttl_files)
-
-    # Extract namespaces from ontology
-    namespaces = {prefix: str(ns) for prefix, ns in d3f_graph.namespaces()}
-    D3F = Namespace(namespaces.get("d3f"))
-    ATTCK = Namespace(namespaces.get("attack"))
-    CAD = Namespace(namespaces.get("cad"))
+    index = load_d3fend_index(defense_root)
+    ontology_modules = list(index["ontology_modules"])
 
     # Defensive technique IRIs
-    d3f_classes = extract_d3fend_classes(d3f_graph)
+    d3f_classes = index["classes"]
 
     # Mitigation mappings (d3f technique → ATT&CK IRI)
-    mitigations = [
-        (str(dtech), str(attack))
-        for dtech, _, attack in d3f_graph.triples((None, D3F.mitigates, None))
-    ]
+    mitigations = [tuple(pair) for pair in index["mitigations"]]
 
     # Derived-from hierarchy
-    derived_from = [
-        (str(child), str(parent))
-        for child, _, parent in d3f_graph.triples((None, D3F["derived-from"], None))
-    ]
+    derived_from = [tuple(pair) for pair in index["derived_from"]]
 
     # -------------------------------------------------------
     # Enrich STIX objects with metadata used by CAD
@@ -157,6 +364,24 @@ def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path):
 
     bundle["objects"] = enriched_objects
 
+    # ATT&CK ID -> attack-pattern ids in this bundle (one entry per matching
+    # reference, so edge multiplicity matches a full scan)
+    attack_objs_by_tid: dict[str, list[str]] = {}
+    for obj in enriched_objects:
+        if obj.get("type") == "attack-pattern":
+            for ref in obj.get("external_references", []):
+                if ref.get("external_id"):
+                    attack_objs_by_tid.setdefault(ref["external_id"], []).append(obj["id"])
+
+    # Countermeasures relevant to this bundle
+    if scope == "full":
+        countermeasures = list(d3f_classes)
+    else:
+        closure = countermeasure_closure(index, attack_objs_by_tid)
+        mitigations = [(d, a) for d, a in mitigations if a.split("/")[-1] in attack_objs_by_tid]
+        derived_from = [(c, p) for c, p in derived_from if c in closure]
+        countermeasures = sorted(closure)
+
     # -------------------------------------------------------
     # CAD GRAPH GENERATION
     # -------------------------------------------------------
@@ -226,29 +451,18 @@ def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path):
     # ----------------------------------------------
     # 4. Countermeasures (D3F techniques)
     # ----------------------------------------------
-    for iri in d3f_classes:
-        tname = iri.split("#")[-1]
-        cad_nodes.append({
-            "id": iri,               # Use full IRI for uniqueness
-            "nodeType": "Countermeasure",
-            "label": tname,
-            "properties": {"iri": iri}
-        })
+    # In catalog scope countermeasures and analytics live in the shared
+    # catalog and are referenced by IRI instead of inlined.
+    if scope != "catalog":
+        for iri in countermeasures:
+            cad_nodes.append(_countermeasure_node(iri))
 
     # ----------------------------------------------
     # 5. Analytics
     # ----------------------------------------------
-    for dtech, attack in mitigations:
-        tname = dtech.split("#")[-1]
-        cad_nodes.append({
-            "id": f"analytic::{tname}",
-            "nodeType": "Analytic",
-            "label": f"{tname} Analytic",
-            "properties": {
-                "analyticImplements": tname,
-                "analyticPurpose": f"Mitigates {attack}"
-            }
-        })
+    if scope != "catalog":
+        for dtech, attack in mitigations:
+            cad_nodes.append(_analytic_node(dtech, attack))
 
     # ======================================================
     # CAD EDGE CREATION
@@ -261,27 +475,20 @@ def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path):
         tech_id = dtech  # IRI
         attack_tid = attack_iri.split("/")[-1]
 
-        for obj in enriched_objects:
-            if obj.get("type") == "attack-pattern":
-                for ref in obj.get("external_references", []):
-                    if ref.get("external_id") == attack_tid:
-                        cad_edges.append({
-                            "id": f"mit-{tech_id}-{obj['id']}",
-                            "source": tech_id,
-                            "target": obj["id"],
-                            "relationship": "mitigates"
-                        })
+        for obj_id in attack_objs_by_tid.get(attack_tid, ()):
+            cad_edges.append({
+                "id": f"mit-{tech_id}-{obj_id}",
+                "source": tech_id,
+                "target": obj_id,
+                "relationship": "mitigates"
+            })
 
     # ----------------------------------------------
     # Derived-from edges
     # ----------------------------------------------
-    for child, parent in derived_from:
-        cad_edges.append({
-            "id": f"der-{child}-{parent}",
-            "source": child,
-            "target": parent,
-            "relationship": "derived-from"
-        })
+    if scope != "catalog":
+        for child, parent in derived_from:
+            cad_edges.append(_derived_from_edge(child, parent))
 
     # ----------------------------------------------
     # Agent uses Attack edges
@@ -366,9 +573,16 @@ def enrich_stix_bundle_with_defend(bundle: dict, defense_root: Path):
         "metadata": {
             "source": "blackcat_cti_pipeline",
             "stix_bundle_id": bundle.get("id"),
-            "ontology_modules": ontology_modules
+            "ontology_modules": ontology_modules,
+            "cad_scope": scope,
         }
     }
+    if scope == "catalog":
+        cad_graph["metadata"]["d3fend_catalog"] = {
+            "id": index["catalog_id"],
+            "file": CATALOG_FILE,
+            "countermeasures": countermeasures,
+        }
 
     info = {
         "ontology_modules": ontology_modules,
@@ -86,6 +86,8 @@ from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Optional
 
+from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_window_docs
+
 __all__ = [
     "extract_hosts",
     "hosts_to_infrastructure_entries",
@@ -663,22 +665,24 @@ def _extract_from_freeform(text: str, nlp,
     common_noun_tokens: set[str] = set()
     if nlp is not None:
         try:
-            doc = nlp(text)
-            for tok in doc:
-                # Hostnames are proper nouns. Common nouns (NOUN) are
-                # English words like "host", "server", "controller"
-                # that we want to *reject* as hostnames near IPs --
-                # this replaces the static "domain-noise" denylist
-                # entries (`host`, `hostname`, `role`, `address`,
-                # `subsidiary`, `incorporated`, ...) with a POS-tagger
-                # derived set.
-                txt = tok.text.strip()
-                if not txt:
-                    continue
-                if tok.pos_ == "PROPN":
-                    propn_tokens.add(txt)
-                elif tok.pos_ == "NOUN":
-                    common_noun_tokens.add(txt.lower())
+            # Sentence-bounded windows keep very large reports under
+            # nlp.max_length; only token tags are kept across windows.
+            for _window, doc in iter_window_docs(nlp, text):
+                for tok in doc:
+                    # Hostnames are proper nouns. Common nouns (NOUN) are
+                    # English words like "host", "server", "controller"
+                    # that we want to *reject* as hostnames near IPs --
+                    # this replaces the static "domain-noise" denylist
+                    # entries (`host`, `hostname`, `role`, `address`,
+                    # `subsidiary`, `incorporated`, ...) with a POS-tagger
+                    # derived set.
+                    txt = tok.text.strip()
+                    if not txt:
+                        continue
+                    if tok.pos_ == "PROPN":
+                        propn_tokens.add(txt)
+                    elif tok.pos_ == "NOUN":
+                        common_noun_tokens.add(txt.lower())
         except Exception:
             propn_tokens = set()
             common_noun_tokens = set()
@@ -1,11 +1,47 @@
-"""Deterministic multi-source STIX bundle fusion for the CTI pipeline."""
+"""Deterministic multi-source STIX bundle fusion for the CTI pipeline.
+
+Fusion is incremental: ``FusionEngine`` reads one bundle at a time (with
+ijson when installed, so a bundle file is never fully materialized), keeps
+only the canonical-key index plus one merged object per key, and dedups
+list members by a cheap structural fingerprint cached per field, so
+merging an attack-pattern seen in 200 reports stays linear.
+
+With ``spill`` set, merged objects beyond ``max_resident`` are evicted
+to a scratch SQLite file and reloaded on demand, so fusing hundreds of
+bundles runs in a fixed memory budget. ``fuse_bundles`` keeps the
+original list-in, bundle-out API on top of the engine, and
+``fuse_bundle_files`` picks in-memory or spilling fusion by input size.
+"""
 
 from __future__ import annotations
 
+import collections
 import datetime
+import itertools
 import json
 import re
+import sqlite3
+import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+try:  # optional: incremental parsing of large bundle files
+    import ijson
+except ImportError:  # pragma: no cover - exercised only without ijson
+    ijson = None
+
+try:  # optional: faster whole-file parsing for load_bundles
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# File reads release the GIL, so a small pool overlaps I/O with parsing
+LOAD_WORKERS = 8
+# Above this much input, fuse_bundle_files streams each file through the
+# engine and spills merged objects to disk instead of parsing in parallel.
+SPILL_INPUT_BYTES = 256 * 1024 * 1024
 
 
 def _now() -> str:
@@ -72,16 +108,38 @@ def canonical_object_key(obj: dict) -> str:
     return f"{otype}:{obj.get('id') or json.dumps(obj, sort_keys=True, default=str)}"
 
 
+_EMPTY = (None, "", [], {})
+
+
+def _fingerprint(value: Any):
+    """
+    Hashable structural fingerprint of a JSON value.
+
+    Equal exactly when ``json.dumps(..., sort_keys=True)`` would be, but
+    without building strings. Scalars are tagged with their type so that
+    1, 1.0, True and "1" stay distinct as they are in JSON.
+    """
+    if isinstance(value, dict):
+        return ("d", tuple(sorted((str(k), _fingerprint(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ("l", tuple(_fingerprint(v) for v in value))
+    if value is None or isinstance(value, (bool, str)):
+        return value if not isinstance(value, bool) else ("b", value)
+    if isinstance(value, (int, float)):
+        return (type(value).__name__, value)
+    return ("s", str(value))
+
+
 def _merge_values(old, new):
-    if old in (None, "", [], {}):
+    if old in _EMPTY:
         return new
-    if new in (None, "", [], {}):
+    if new in _EMPTY:
         return old
     if isinstance(old, list) and isinstance(new, list):
         out = list(old)
-        seen = {json.dumps(v, sort_keys=True, default=str) for v in out}
+        seen = {_fingerprint(v) for v in out}
         for item in new:
-            key = json.dumps(item, sort_keys=True, default=str)
+            key = _fingerprint(item)
             if key not in seen:
                 seen.add(key)
                 out.append(item)
@@ -95,68 +153,396 @@ def _merge_values(old, new):
 
 
 def _merge_objects(existing: dict, incoming: dict) -> dict:
-    out = dict(existing)
-    for k, v in incoming.items():
-        if k == "id":
-            continue
-        out[k] = _merge_values(out.get(k), v)
-    fused = list(out.get("x_cti_fused_from") or [])
-    for oid in (existing.get("id"), incoming.get("id")):
-        if oid and oid not in fused:
-            fused.append(oid)
-    if fused:
-        out["x_cti_fused_from"] = fused
-    return out
+    acc = _Merged(existing)
+    acc.merge(incoming)
+    return acc.obj
 
 
-def fuse_bundles(bundles: list[dict]) -> dict:
+class _Merged:
     """
-    Merge STIX bundles by stable canonical keys, remapping relationships to
-    the surviving object IDs.
+    One canonical object being fused.
+
+    Same semantics as ``_merge_values`` applied field by field, but the
+    fingerprint set of every merged list is kept per field path, so each
+    merge only fingerprints the incoming items. Lists are copied the first
+    time they are merged into and appended in place afterwards; input
+    objects are never mutated.
     """
-    objects_by_key: dict[str, dict] = {}
-    id_to_key: dict[str, str] = {}
-    relationship_inputs: list[dict] = []
 
-    for bundle in bundles or []:
-        for obj in bundle.get("objects") or []:
-            if not isinstance(obj, dict):
+    __slots__ = ("obj", "seq", "_seen")
+
+    def __init__(self, obj: dict, seq: int = 0):
+        self.obj = dict(obj)
+        self.seq = seq
+        self._seen: dict[tuple, set] = {}
+
+    def _merge(self, path: tuple, old, new):
+        if old in _EMPTY:
+            return new
+        if new in _EMPTY:
+            return old
+        if isinstance(old, list) and isinstance(new, list):
+            seen = self._seen.get(path)
+            if seen is None:
+                old = list(old)
+                seen = self._seen[path] = {_fingerprint(v) for v in old}
+            for item in new:
+                key = _fingerprint(item)
+                if key not in seen:
+                    seen.add(key)
+                    old.append(item)
+            return old
+        if isinstance(old, dict) and isinstance(new, dict):
+            out = dict(old)
+            for k, v in new.items():
+                out[k] = self._merge(path + (k,), out.get(k), v)
+            return out
+        return old
+
+    def merge(self, incoming: dict) -> None:
+        existing_id = self.obj.get("id")
+        for k, v in incoming.items():
+            if k == "id":
                 continue
-            if obj.get("type") == "relationship":
-                relationship_inputs.append(dict(obj))
+            self.obj[k] = self._merge((k,), self.obj.get(k), v)
+        fused = self.obj.get("x_cti_fused_from")
+        fused = list(fused) if fused else []
+        for oid in (existing_id, incoming.get("id")):
+            if oid and oid not in fused:
+                fused.append(oid)
+        if fused:
+            self.obj["x_cti_fused_from"] = fused
+            self._seen.pop(("x_cti_fused_from",), None)
+
+
+class _Store:
+    """
+    Insertion-ordered key -> _Merged map, optionally bounded in memory.
+
+    Without a spill path everything stays resident. With one, the least
+    recently used entries beyond ``max_resident`` are serialized to SQLite
+    and reloaded when touched again.
+    """
+
+    def __init__(self, spill_path: Optional[Path] = None, max_resident: int = 50_000):
+        self.max_resident = max(1, int(max_resident))
+        self._resident: "collections.OrderedDict[str, _Merged]" = collections.OrderedDict()
+        self._seq = 0
+        self._spilled = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if spill_path is not None:
+            self._db = sqlite3.connect(str(spill_path))
+            self._db.execute("PRAGMA journal_mode=OFF")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute("DROP TABLE IF EXISTS merged")
+            self._db.execute(
+                "CREATE TABLE merged (key TEXT PRIMARY KEY, seq INTEGER, json TEXT)"
+            )
+
+    def __len__(self) -> int:
+        return self._seq
+
+    def get(self, key: str) -> Optional[_Merged]:
+        acc = self._resident.get(key)
+        if acc is not None:
+            self._resident.move_to_end(key)
+            return acc
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT seq, json FROM merged WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        acc = _Merged(json.loads(row[1]), row[0])
+        self._admit(key, acc)
+        return acc
+
+    def add(self, key: str, obj: dict) -> _Merged:
+        acc = _Merged(obj, self._seq)
+        self._seq += 1
+        self._admit(key, acc)
+        return acc
+
+    def _admit(self, key: str, acc: _Merged) -> None:
+        self._resident[key] = acc
+        if self._db is None:
+            return
+        while len(self._resident) > self.max_resident:
+            old_key, old = self._resident.popitem(last=False)
+            self._write(old_key, old)
+
+    def _write(self, key: str, acc: _Merged) -> None:
+        self._db.execute(
+            "INSERT INTO merged(key, seq, json) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET json = excluded.json",
+            (key, acc.seq, json.dumps(acc.obj, default=str)),
+        )
+        self._spilled += 1
+
+    def values(self) -> Iterator[dict]:
+        """Merged objects in first-seen order."""
+        if self._db is None:
+            yield from (acc.obj for acc in sorted(self._resident.values(), key=lambda a: a.seq))
+            return
+        for key, acc in self._resident.items():
+            self._write(key, acc)
+        self._resident.clear()
+        self._db.commit()
+        for (blob,) in self._db.execute("SELECT json FROM merged ORDER BY seq"):
+            yield json.loads(blob)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def iter_bundle_objects(source) -> Iterator[dict]:
+    """
+    Yield the objects of one STIX bundle.
+
+    ``source`` may be a bundle dict, a path, or a binary/text file object.
+    Files are parsed incrementally with ijson when it is installed.
+    """
+    if isinstance(source, dict):
+        yield from (o for o in source.get("objects") or [] if isinstance(o, dict))
+        return
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            yield from iter_bundle_objects(f)
+        return
+    if ijson is not None:
+        try:
+            items = ijson.items(source, "objects.item", use_float=True)
+        except TypeError:  # ijson < 3.1 has no use_float
+            items = ijson.items(source, "objects.item")
+        yield from (o for o in items if isinstance(o, dict))
+        return
+    data = json.load(source)
+    yield from (o for o in (data.get("objects") or []) if isinstance(o, dict))
+
+
+def load_bundle_file(path: "str | Path") -> dict:
+    """Parse one STIX bundle file, with orjson when installed."""
+    raw = Path(path).read_bytes()
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def iter_loaded_bundles(paths: Iterable["str | Path"],
+                        workers: int = LOAD_WORKERS) -> Iterator[dict]:
+    """
+    Parse bundle files concurrently, yielding each in input order as soon
+    as it and its predecessors are parsed. At most ``workers`` parsed or
+    in-flight bundles are held at once.
+
+    Raises ValueError naming the first path (in input order) that fails.
+    """
+    paths = list(paths)
+
+    def _load(path):
+        try:
+            return load_bundle_file(path), None
+        except Exception as e:
+            return None, e
+
+    def _unwrap(path, loaded):
+        bundle, err = loaded
+        if err is not None:
+            raise ValueError(f"failed to parse STIX bundle {path}: {err}") from err
+        return bundle
+
+    if len(paths) <= 1 or workers <= 1:
+        for path in paths:
+            yield _unwrap(path, _load(path))
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths)),
+                            thread_name_prefix="cti-fusion-load") as pool:
+        queued = iter(paths)
+        pending = collections.deque(
+            (p, pool.submit(_load, p)) for p in itertools.islice(queued, workers)
+        )
+        while pending:
+            path, future = pending.popleft()
+            bundle = _unwrap(path, future.result())
+            nxt = next(queued, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(_load, nxt)))
+            yield bundle
+
+
+def load_bundles(paths: Iterable["str | Path"], workers: int = LOAD_WORKERS) -> list[dict]:
+    """
+    Parse bundle files concurrently, returning them in input order.
+
+    Raises ValueError naming the first path (in input order) that fails.
+    """
+    return list(iter_loaded_bundles(paths, workers))
+
+
+class FusionEngine:
+    """
+    Incremental STIX fusion by canonical key.
+
+        engine = FusionEngine(spill=True)
+        for path in paths:
+            engine.add_bundle(path)
+        bundle = engine.result()
+
+    Relationships are collected as they stream past and resolved at the
+    end, because their endpoints may only appear in a later bundle.
+    """
+
+    def __init__(self, spill: "bool | str | Path" = False, max_resident: int = 50_000):
+        self._tmpdir = None
+        spill_path = None
+        if spill:
+            if spill is True:
+                self._tmpdir = tempfile.TemporaryDirectory(prefix="cti-fusion-")
+                spill_path = Path(self._tmpdir.name) / "fusion.sqlite"
+            else:
+                spill_path = Path(spill)
+        self._objects = _Store(spill_path, max_resident)
+        self._relationships = _Store(
+            spill_path.with_name(spill_path.stem + ".rels.sqlite") if spill_path else None,
+            max_resident,
+        )
+        self._rel_inputs = _Store(
+            spill_path.with_name(spill_path.stem + ".rel-inputs.sqlite") if spill_path else None,
+            max_resident,
+        )
+        self.id_to_key: dict[str, str] = {}
+        self.key_to_id: dict[str, Optional[str]] = {}
+        self.source_bundle_count = 0
+
+    def add_object(self, obj: dict) -> None:
+        if obj.get("type") == "relationship":
+            self._rel_inputs.add(str(len(self._rel_inputs)), obj)
+            return
+        key = canonical_object_key(obj)
+        acc = self._objects.get(key)
+        if acc is None:
+            self._objects.add(key, obj)
+            self.key_to_id[key] = obj.get("id")
+        else:
+            acc.merge(obj)
+        if obj.get("id"):
+            self.id_to_key[obj["id"]] = key
+
+    def add_bundle(self, source) -> None:
+        for obj in iter_bundle_objects(source):
+            self.add_object(obj)
+        self.source_bundle_count += 1
+
+    def _resolve_relationships(self) -> None:
+        for rel in self._rel_inputs.values():
+            src_key = self.id_to_key.get(rel.get("source_ref"))
+            tgt_key = self.id_to_key.get(rel.get("target_ref"))
+            if not (src_key and tgt_key):
                 continue
-            key = canonical_object_key(obj)
-            if key in objects_by_key:
-                objects_by_key[key] = _merge_objects(objects_by_key[key], obj)
+            rel = dict(rel)
+            src_id = self.key_to_id.get(src_key)
+            tgt_id = self.key_to_id.get(tgt_key)
+            rel["source_ref"] = src_id
+            rel["target_ref"] = tgt_id
+            rkey = json.dumps([src_id, rel.get("relationship_type") or "related-to", tgt_id])
+            acc = self._relationships.get(rkey)
+            if acc is None:
+                self._relationships.add(rkey, rel)
             else:
-                objects_by_key[key] = dict(obj)
-            if obj.get("id"):
-                id_to_key[obj["id"]] = key
-
-    relationships_by_key: dict[tuple[str, str, str], dict] = {}
-    for rel in relationship_inputs:
-        src_key = id_to_key.get(rel.get("source_ref"))
-        tgt_key = id_to_key.get(rel.get("target_ref"))
-        if not (src_key and tgt_key):
-            continue
-        src_id = objects_by_key[src_key].get("id")
-        tgt_id = objects_by_key[tgt_key].get("id")
-        rel["source_ref"] = src_id
-        rel["target_ref"] = tgt_id
-        rkey = (src_id, rel.get("relationship_type") or "related-to", tgt_id)
-        if rkey in relationships_by_key:
-            relationships_by_key[rkey] = _merge_objects(relationships_by_key[rkey], rel)
+                acc.merge(rel)
+
+    def iter_objects(self) -> Iterator[dict]:
+        """Fused objects, then fused relationships, in first-seen order."""
+        self._resolve_relationships()
+        yield from self._objects.values()
+        yield from self._relationships.values()
+
+    def result(self) -> dict:
+        try:
+            fused_objects = list(self.iter_objects())
+        finally:
+            self.close()
+        return {
+            "type": "bundle",
+            "id": f"bundle--{uuid.uuid4()}",
+            "objects": fused_objects,
+            "x_cti_fusion": {
+                "source_bundle_count": self.source_bundle_count,
+                "object_count": len(fused_objects),
+                "created": _now(),
+            },
+        }
+
+    def write(self, out_path: "str | Path") -> dict:
+        """Stream the fused bundle to ``out_path`` without building it in memory."""
+        out_path = Path(out_path)
+        count = 0
+        bundle_id = f"bundle--{uuid.uuid4()}"
+        try:
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write('{"type": "bundle", "id": %s, "objects": [' % json.dumps(bundle_id))
+                for obj in self.iter_objects():
+                    f.write(("," if count else "") + "\n" + json.dumps(obj, default=str))
+                    count += 1
+                meta = {
+                    "source_bundle_count": self.source_bundle_count,
+                    "object_count": count,
+                    "created": _now(),
+                }
+                f.write('\n], "x_cti_fusion": %s}\n' % json.dumps(meta))
+        finally:
+            self.close()
+        return {"id": bundle_id, "path": str(out_path), "object_count": count}
+
+    def close(self) -> None:
+        for store in (self._objects, self._relationships, self._rel_inputs):
+            store.close()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+
+def fuse_bundles(bundles: Iterable, spill: "bool | str | Path" = False,
+                 max_resident: int = 50_000) -> dict:
+    """
+    Merge STIX bundles by stable canonical keys, remapping relationships to
+    the surviving object IDs.
+
+    ``bundles`` may mix bundle dicts and bundle file paths; see
+    ``FusionEngine`` for ``spill`` / ``max_resident``.
+    """
+    engine = FusionEngine(spill=spill, max_resident=max_resident)
+    for bundle in bundles or []:
+        engine.add_bundle(bundle)
+    return engine.result()
+
+
+def fuse_bundle_files(paths: Iterable["str | Path"], spill: "bool | str | Path | None" = None,
+                      max_resident: int = 50_000, workers: int = LOAD_WORKERS) -> dict:
+    """
+    Fuse bundle files without holding every parsed input at once.
+
+    Small inputs are parsed concurrently and fed to the engine in input
+    order. When ``spill`` is None it is enabled once the files total more
+    than ``SPILL_INPUT_BYTES``; spilling fusions stream each file (ijson)
+    instead. Raises ValueError naming the file that failed to parse.
+    """
+    paths = [Path(p) for p in paths]
+    if spill is None:
+        spill = sum(p.stat().st_size for p in paths) > SPILL_INPUT_BYTES
+    engine = FusionEngine(spill=spill, max_resident=max_resident)
+    try:
+        if spill:
+            for path in paths:
+                try:
+                    engine.add_bundle(path)
+                except Exception as e:
+                    raise ValueError(f"failed to parse STIX bundle {path}: {e}") from e
         else:
-            relationships_by_key[rkey] = rel
-
-    fused_objects = list(objects_by_key.values()) + list(relationships_by_key.values())
-    return {
-        "type": "bundle",
-        "id": f"bundle--{uuid.uuid4()}",
-        "objects": fused_objects,
-        "x_cti_fusion": {
-            "source_bundle_count": len(bundles or []),
-            "object_count": len(fused_objects),
-            "created": _now(),
-        },
-    }
+            for bundle in iter_loaded_bundles(paths, workers):
+                engine.add_bundle(bundle)
+    except BaseException:
+        engine.close()
+        raise
+    return engine.result()
@@ -3,16 +3,42 @@ Cross-report aggregation for infrastructure hypotheses.
 
 This module NEVER invents infrastructure.
 It ONLY aggregates confidence across multiple hypothesis bundles.
+
+Aggregation is incremental: ``InfraAggregator`` keeps each report's
+hypotheses keyed by report, so adding or replacing one report touches
+only that report's contribution. Stage 3 feeds it one bundle at a time
+and writes the aggregate once. ``update_infrastructure_aggregate`` folds
+a single new bundle into an existing aggregate through a small state file
+kept next to it, without rereading every ``*.infra.stix.json``.
 """
 
 import json
-from collections import defaultdict
 from pathlib import Path
+from typing import Iterable, Optional
 
+INFRA_REASONING_OBJECT_TYPE = "x-cti-infrastructure-reasoning"
+INFRA_BUNDLE_GLOB = "*.infra.stix.json"
+AGGREGATE_FILE = "_aggregated.infrastructure.json"
+STATE_FILE = "_aggregated.infrastructure.state.json"
+STATE_VERSION = 1
 
-def aggregate_infrastructure_hypotheses(infra_dir: Path) -> list[dict]:
+
+def _bundle_hypotheses(bundle: dict) -> list[dict]:
+    out = []
+    for obj in bundle.get("objects", []):
+        if obj.get("type") != INFRA_REASONING_OBJECT_TYPE:
+            continue
+        out.extend(h for h in obj.get("x_infrastructure_hypotheses", []) if isinstance(h, dict))
+    return out
+
+
+def _report_name(path: Path) -> str:
+    return path.name
+
+
+class InfraAggregator:
     """
-    Aggregate infra hypotheses across reports.
+    Running (component, category) buckets over per-report hypotheses.
 
     Aggregation key:
       (component, category)
@@ -21,42 +47,131 @@ def aggregate_infrastructure_hypotheses(infra_dir: Path) -> list[dict]:
       independent corroboration increases confidence
     """
 
-    buckets = defaultdict(list)
+    def __init__(self):
+        # report -> hypotheses, in the order reports were first added
+        self._reports: dict[str, list[dict]] = {}
+        # (component, category) -> {report: [hypotheses]}
+        self._buckets: dict[tuple, dict[str, list[dict]]] = {}
 
-    for path in infra_dir.glob("*.infra.stix.json"):
-        bundle = json.loads(path.read_text())
-        for obj in bundle.get("objects", []):
-            if obj.get("type") != "x-cti-infrastructure-reasoning":
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def remove_report(self, report: str) -> None:
+        for h in self._reports.pop(report, []):
+            key = (h.get("component"), h.get("category"))
+            bucket = self._buckets.get(key)
+            if bucket is None:
                 continue
+            bucket.pop(report, None)
+            if not bucket:
+                del self._buckets[key]
+
+    def add_report(self, report: str, hypotheses: Iterable[dict]) -> None:
+        """Add (or replace) one report's hypotheses."""
+        self.remove_report(report)
+        hypotheses = list(hypotheses)
+        self._reports[report] = hypotheses
+        for h in hypotheses:
+            key = (h.get("component"), h.get("category"))
+            self._buckets.setdefault(key, {}).setdefault(report, []).append(h)
+
+    def add_bundle(self, report: str, bundle: dict) -> None:
+        self.add_report(report, _bundle_hypotheses(bundle))
+
+    def aggregate(self) -> list[dict]:
+        aggregated = []
+
+        for (component, category), by_report in self._buckets.items():
+            items = [h for hs in by_report.values() for h in hs]
+            confidences = [i.get("confidence", 0.0) for i in items]
+            avg_conf = sum(confidences) / len(confidences)
+
+            # Soft corroboration boost (bounded)
+            boosted = min(avg_conf + (0.05 * (len(items) - 1)), 0.95)
+
+            aggregated.append({
+                "component": component,
+                "category": category,
+                "reports": len(items),
+                "confidence": round(boosted, 2),
+                "rationales": list(dict.fromkeys(
+                    i.get("rationale") for i in items if i.get("rationale")
+                )),
+                "evidence": list(dict.fromkeys(
+                    e for i in items for e in i.get("evidence", [])
+                ))[:5],
+            })
+
+        return sorted(
+            aggregated,
+            key=lambda x: (x["confidence"], x["reports"]),
+            reverse=True,
+        )
 
-            for h in obj.get("x_infrastructure_hypotheses", []):
-                key = (h.get("component"), h.get("category"))
-                buckets[key].append(h)
-
-    aggregated = []
-
-    for (component, category), items in buckets.items():
-        confidences = [i.get("confidence", 0.0) for i in items]
-        avg_conf = sum(confidences) / len(confidences)
-
-        # Soft corroboration boost (bounded)
-        boosted = min(avg_conf + (0.05 * (len(items) - 1)), 0.95)
-
-        aggregated.append({
-            "component": component,
-            "category": category,
-            "reports": len(items),
-            "confidence": round(boosted, 2),
-            "rationales": list({
-                i.get("rationale") for i in items if i.get("rationale")
-            }),
-            "evidence": list({
-                e for i in items for e in i.get("evidence", [])
-            })[:5],
-        })
-
-    return sorted(
-        aggregated,
-        key=lambda x: (x["confidence"], x["reports"]),
-        reverse=True,
-    )
+    # -- persistence -------------------------------------------------------
+
+    @classmethod
+    def from_dir(cls, infra_dir: Path) -> "InfraAggregator":
+        """Seed from every infra bundle in ``infra_dir`` (one full scan)."""
+        agg = cls()
+        for path in sorted(Path(infra_dir).glob(INFRA_BUNDLE_GLOB)):
+            try:
+                bundle = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as e:
+                print(f"[STAGE3][INFRA] skip unreadable {path.name}: {e}")
+                continue
+            agg.add_bundle(_report_name(path), bundle)
+        return agg
+
+    @classmethod
+    def load(cls, infra_dir: Path) -> "InfraAggregator":
+        """Restore from the state file, falling back to a directory scan."""
+        state_path = Path(infra_dir) / STATE_FILE
+        try:
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+            if state.get("version") != STATE_VERSION:
+                raise ValueError("state version mismatch")
+        except Exception:
+            return cls.from_dir(infra_dir)
+        agg = cls()
+        for report, hypotheses in (state.get("reports") or {}).items():
+            agg.add_report(report, hypotheses)
+        return agg
+
+    def write(self, infra_dir: Path) -> Path:
+        """Write the aggregate plus the state needed for later updates."""
+        infra_dir = Path(infra_dir)
+        agg_path = infra_dir / AGGREGATE_FILE
+        agg_path.write_text(
+            json.dumps(self.aggregate(), indent=2, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        (infra_dir / STATE_FILE).write_text(
+            json.dumps({"version": STATE_VERSION, "reports": self._reports}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        return agg_path
+
+
+def aggregate_infrastructure_hypotheses(infra_dir: Path) -> list[dict]:
+    """
+    Aggregate infra hypotheses across reports.
+
+    Full rebuild from every ``*.infra.stix.json`` in ``infra_dir``.
+    """
+    return InfraAggregator.from_dir(infra_dir).aggregate()
+
+
+def update_infrastructure_aggregate(infra_dir: Path, bundle_path: Path,
+                                    bundle: Optional[dict] = None) -> list[dict]:
+    """
+    Fold one (new or rewritten) infra bundle into the aggregate in
+    ``infra_dir`` and rewrite it. Reads the state file, not the directory.
+    """
+    bundle_path = Path(bundle_path)
+    if bundle is None:
+        bundle = json.loads(bundle_path.read_text(encoding="utf-8"))
+    agg = InfraAggregator.load(infra_dir)
+    agg.add_bundle(_report_name(bundle_path), bundle)
+    agg.write(infra_dir)
+    return agg.aggregate()
@@ -9,6 +9,7 @@ from __future__ import annotations
 import datetime
 import hashlib
 import json
+import re
 import sqlite3
 from pathlib import Path
 from typing import Optional
@@ -82,171 +83,686 @@ def canonical_key(obj: dict) -> str:
     return f"{otype}:{_norm(name) or _hash_token(str(name))}"
 
 
+# SQLite tuning for a write-mostly, single-writer graph: WAL lets readers
+# (MCP tools, the UI) query while a pipeline run writes, and NORMAL sync
+# is durable across application crashes in WAL mode.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA foreign_keys=OFF",
+)
+_BUSY_TIMEOUT_S = 30.0
+# Readers skip the WAL switch and the schema DDL: the writer already did
+# both, and a query-only connection never needs them.
+_READ_PRAGMAS = (
+    f"PRAGMA busy_timeout={int(_BUSY_TIMEOUT_S * 1000)}",
+    "PRAGMA query_only=ON",
+)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS nodes (
+        canonical_key TEXT PRIMARY KEY,
+        stix_id TEXT,
+        type TEXT,
+        name TEXT,
+        first_seen TEXT,
+        last_seen TEXT,
+        json TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS edges (
+        source_key TEXT,
+        target_key TEXT,
+        relationship_type TEXT,
+        first_seen TEXT,
+        last_seen TEXT,
+        count INTEGER DEFAULT 1,
+        json TEXT,
+        PRIMARY KEY (source_key, target_key, relationship_type)
+    )
+    """,
+    # source_key lookups use the edges primary key
+    "CREATE INDEX IF NOT EXISTS idx_nodes_type_name ON nodes(type, name)",
+    "CREATE INDEX IF NOT EXISTS idx_nodes_name ON nodes(name)",
+    "CREATE INDEX IF NOT EXISTS idx_nodes_stix_id ON nodes(stix_id)",
+    "CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(target_key, relationship_type)",
+    "CREATE INDEX IF NOT EXISTS idx_edges_relationship ON edges(relationship_type)",
+)
+
+_UPSERT_NODE_SQL = """
+    INSERT INTO nodes(canonical_key, stix_id, type, name, first_seen, last_seen, json)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(canonical_key) DO UPDATE SET
+        stix_id=excluded.stix_id,
+        type=excluded.type,
+        name=excluded.name,
+        last_seen=excluded.last_seen,
+        json=excluded.json
+"""
+
+_UPSERT_EDGE_SQL = """
+    INSERT INTO edges(source_key, target_key, relationship_type, first_seen, last_seen, count, json)
+    VALUES (?, ?, ?, ?, ?, 1, ?)
+    ON CONFLICT(source_key, target_key, relationship_type) DO UPDATE SET
+        last_seen=excluded.last_seen,
+        count=count + 1,
+        json=excluded.json
+"""
+
+
 def _connect(db_path: Optional[Path] = None) -> sqlite3.Connection:
     path = Path(db_path or _DEFAULT_DB)
     path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(path)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS nodes (
-            canonical_key TEXT PRIMARY KEY,
-            stix_id TEXT,
-            type TEXT,
-            name TEXT,
-            first_seen TEXT,
-            last_seen TEXT,
-            json TEXT
-        )
-    """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS edges (
-            source_key TEXT,
-            target_key TEXT,
-            relationship_type TEXT,
-            first_seen TEXT,
-            last_seen TEXT,
-            count INTEGER DEFAULT 1,
-            json TEXT,
-            PRIMARY KEY (source_key, target_key, relationship_type)
-        )
-    """)
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT_S)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    for stmt in _SCHEMA:
+        conn.execute(stmt)
+    conn.commit()
     return conn
 
 
-def _upsert_node(conn: sqlite3.Connection, obj: dict) -> str:
-    key = canonical_key(obj)
-    now = _now()
-    conn.execute(
-        """
-        INSERT INTO nodes(canonical_key, stix_id, type, name, first_seen, last_seen, json)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(canonical_key) DO UPDATE SET
-            stix_id=excluded.stix_id,
-            type=excluded.type,
-            name=excluded.name,
-            last_seen=excluded.last_seen,
-            json=excluded.json
-        """,
-        (
-            key,
-            obj.get("id") or obj.get("stix_id"),
-            obj.get("type") or obj.get("node_type"),
-            obj.get("name"),
-            now,
-            now,
-            json.dumps(obj, sort_keys=True, default=str),
-        ),
+def _node_row(obj: dict, now: str) -> tuple:
+    return (
+        canonical_key(obj),
+        obj.get("id") or obj.get("stix_id"),
+        obj.get("type") or obj.get("node_type"),
+        obj.get("name"),
+        now,
+        now,
+        json.dumps(obj, sort_keys=True, default=str),
+    )
+
+
+def _edge_row(source_key: str, target_key: str, relationship_type: str,
+              payload: dict, now: str) -> tuple:
+    return (
+        source_key,
+        target_key,
+        relationship_type,
+        now,
+        now,
+        json.dumps(payload, sort_keys=True, default=str),
     )
-    return key
+
+
+def _upsert_node(conn: sqlite3.Connection, obj: dict) -> str:
+    row = _node_row(obj, _now())
+    conn.execute(_UPSERT_NODE_SQL, row)
+    return row[0]
 
 
 def _upsert_edge(conn: sqlite3.Connection, source_key: str, target_key: str,
                  relationship_type: str, payload: dict) -> None:
-    now = _now()
-    conn.execute(
-        """
-        INSERT INTO edges(source_key, target_key, relationship_type, first_seen, last_seen, count, json)
-        VALUES (?, ?, ?, ?, ?, 1, ?)
-        ON CONFLICT(source_key, target_key, relationship_type) DO UPDATE SET
-            last_seen=excluded.last_seen,
-            count=count + 1,
-            json=excluded.json
-        """,
-        (
-            source_key,
-            target_key,
-            relationship_type,
-            now,
-            now,
-            json.dumps(payload, sort_keys=True, default=str),
-        ),
-    )
+    conn.execute(_UPSERT_EDGE_SQL, _edge_row(source_key, target_key, relationship_type, payload, _now()))
 
 
 def persist_bundle_topology(bundle: dict, topology: dict,
                             db_path: Optional[Path] = None) -> dict:
-    """Persist STIX objects, topology hosts, and relationship edges."""
+    """Persist STIX objects, topology hosts, and relationship edges.
+
+    Rows are collected in memory first and written with ``executemany``
+    in a single transaction, so a bundle costs one fsync, not one per row.
+    """
     objects = bundle.get("objects") or []
     by_id = {
         o.get("id"): o for o in objects
         if isinstance(o, dict) and o.get("id")
     }
-    conn = _connect(db_path)
-    nodes = 0
-    edges = 0
-    try:
-        for obj in objects:
-            if not isinstance(obj, dict) or not obj.get("id"):
-                continue
-            _upsert_node(conn, obj)
-            nodes += 1
+    hosts = [h for h in topology.get("hosts") or [] if isinstance(h, dict)]
+    # stix_id -> first host carrying it (what a linear scan would find)
+    hosts_by_stix_id: dict = {}
+    for host in hosts:
+        if host.get("stix_id"):
+            hosts_by_stix_id.setdefault(host["stix_id"], host)
+
+    now = _now()
+    node_rows: list = []
+    edge_rows: list = []
+
+    for obj in objects:
+        if not isinstance(obj, dict) or not obj.get("id"):
+            continue
+        node_rows.append(_node_row(obj, now))
 
-        for host in topology.get("hosts") or []:
-            if not isinstance(host, dict):
+    for host in hosts:
+        host_obj = {
+            "type": "x-cti-range-host",
+            "id": host.get("name"),
+            "name": host.get("name"),
+            "ip": host.get("ip"),
+            "role": host.get("role"),
+            "platform": host.get("platform"),
+            "stix_id": host.get("stix_id"),
+        }
+        row = _node_row(host_obj, now)
+        node_rows.append(row)
+        stix_id = host.get("stix_id")
+        if stix_id and stix_id in by_id:
+            inf_key = canonical_key(by_id[stix_id])
+            edge_rows.append(_edge_row(inf_key, row[0], "materializes-as", host, now))
+
+    for rel in objects:
+        if not isinstance(rel, dict) or rel.get("type") != "relationship":
+            continue
+        src = by_id.get(rel.get("source_ref"))
+        tgt = by_id.get(rel.get("target_ref"))
+        if not (src and tgt):
+            continue
+        edge_rows.append(_edge_row(
+            canonical_key(src),
+            canonical_key(tgt),
+            rel.get("relationship_type") or "related-to",
+            rel,
+            now,
+        ))
+
+    for edge in topology.get("network_edges") or []:
+        svc_obj = {
+            "type": "service",
+            "name": f"{edge.get('service')}:{edge.get('protocol')}:{edge.get('port')}",
+        }
+        svc_row = _node_row(svc_obj, now)
+        for host_ref in edge.get("host_refs") or []:
+            host = hosts_by_stix_id.get(host_ref)
+            if not host:
                 continue
-            host_obj = {
+            host_key = canonical_key({
                 "type": "x-cti-range-host",
-                "id": host.get("name"),
                 "name": host.get("name"),
                 "ip": host.get("ip"),
-                "role": host.get("role"),
-                "platform": host.get("platform"),
-                "stix_id": host.get("stix_id"),
-            }
-            host_key = _upsert_node(conn, host_obj)
-            nodes += 1
-            stix_id = host.get("stix_id")
-            if stix_id and stix_id in by_id:
-                inf_key = canonical_key(by_id[stix_id])
-                _upsert_edge(conn, inf_key, host_key, "materializes-as", host)
-                edges += 1
-
-        for rel in objects:
-            if not isinstance(rel, dict) or rel.get("type") != "relationship":
-                continue
-            src = by_id.get(rel.get("source_ref"))
-            tgt = by_id.get(rel.get("target_ref"))
-            if not (src and tgt):
-                continue
-            _upsert_edge(
-                conn,
-                canonical_key(src),
-                canonical_key(tgt),
-                rel.get("relationship_type") or "related-to",
-                rel,
+            })
+            node_rows.append(svc_row)
+            edge_rows.append(_edge_row(host_key, svc_row[0], "exposes-service", edge, now))
+
+    conn = _connect(db_path)
+    try:
+        with conn:
+            conn.executemany(_UPSERT_NODE_SQL, node_rows)
+            conn.executemany(_UPSERT_EDGE_SQL, edge_rows)
+    finally:
+        conn.close()
+    return {
+        "db_path": str(Path(db_path or _DEFAULT_DB)),
+        "nodes_seen": len(node_rows),
+        "edges_seen": len(edge_rows),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Read API
+# ---------------------------------------------------------------------------
+# Answer graph questions straight from SQLite instead of reloading bundles.
+# Every function takes an optional db_path and returns plain dicts.
+
+HOST_TYPE = "x-cti-range-host"
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def _clamp(limit: int) -> int:
+    return max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+
+
+def _read(db_path: Optional[Path] = None) -> Optional[sqlite3.Connection]:
+    """Connection for queries, or None when no graph has been written yet."""
+    path = Path(db_path or _DEFAULT_DB)
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT_S)
+    for pragma in _READ_PRAGMAS:
+        conn.execute(pragma)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _node_dict(row: sqlite3.Row, include_json: bool = False) -> dict:
+    out = {
+        "key": row["canonical_key"],
+        "type": row["type"],
+        "name": row["name"],
+        "stix_id": row["stix_id"],
+        "first_seen": row["first_seen"],
+        "last_seen": row["last_seen"],
+    }
+    if include_json:
+        out["object"] = json.loads(row["json"]) if row["json"] else None
+    return out
+
+
+def technique_key(technique_id: str) -> str:
+    """Canonical node key for an ATT&CK technique ID (``attack:T1059.001``)."""
+    tid = str(technique_id).strip()
+    if tid.lower().startswith("attack:"):
+        tid = tid[len("attack:"):]
+    return f"attack:{tid.upper()}"
+
+
+def get_node(key: str, db_path: Optional[Path] = None,
+             include_json: bool = True) -> Optional[dict]:
+    conn = _read(db_path)
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT * FROM nodes WHERE canonical_key = ?", (key,)
+        ).fetchone()
+        return _node_dict(row, include_json) if row else None
+    finally:
+        conn.close()
+
+
+def nodes_by_type(node_type: str, db_path: Optional[Path] = None,
+                  limit: int = DEFAULT_LIMIT, offset: int = 0) -> list:
+    conn = _read(db_path)
+    if conn is None:
+        return []
+    try:
+        rows = conn.execute(
+            "SELECT * FROM nodes WHERE type = ? ORDER BY name, canonical_key LIMIT ? OFFSET ?",
+            (node_type, _clamp(limit), max(0, int(offset))),
+        ).fetchall()
+        return [_node_dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def neighbors(key: str, db_path: Optional[Path] = None,
+              direction: str = "both",
+              relationship_type: Optional[str] = None,
+              limit: int = DEFAULT_LIMIT, offset: int = 0) -> list:
+    """
+    Nodes one edge away from ``key``.
+
+    ``direction`` is "out" (key is the source), "in" (key is the target)
+    or "both". Each result carries the edge's relationship_type,
+    direction and observation count.
+    """
+    if direction not in ("out", "in", "both"):
+        raise ValueError("direction must be 'out', 'in' or 'both'")
+    parts, params = [], []
+    rel_clause = " AND e.relationship_type = ?" if relationship_type else ""
+    if direction in ("out", "both"):
+        parts.append(
+            "SELECT e.target_key AS nkey, e.relationship_type, 'out' AS direction, e.count "
+            "FROM edges e WHERE e.source_key = ?" + rel_clause
+        )
+        params += [key] + ([relationship_type] if relationship_type else [])
+    if direction in ("in", "both"):
+        parts.append(
+            "SELECT e.source_key AS nkey, e.relationship_type, 'in' AS direction, e.count "
+            "FROM edges e WHERE e.target_key = ?" + rel_clause
+        )
+        params += [key] + ([relationship_type] if relationship_type else [])
+
+    sql = (
+        "SELECT n.*, x.nkey, x.relationship_type AS rel, x.direction, x.count FROM ("
+        + " UNION ALL ".join(parts)
+        + ") x LEFT JOIN nodes n ON n.canonical_key = x.nkey "
+        "ORDER BY x.relationship_type, x.direction, x.nkey LIMIT ? OFFSET ?"
+    )
+    params += [_clamp(limit), max(0, int(offset))]
+
+    conn = _read(db_path)
+    if conn is None:
+        return []
+    try:
+        out = []
+        for row in conn.execute(sql, params):
+            node = _node_dict(row) if row["canonical_key"] else {"key": row["nkey"], "type": None, "name": None}
+            node.update({
+                "relationship_type": row["rel"],
+                "direction": row["direction"],
+                "count": row["count"],
+            })
+            out.append(node)
+        return out
+    finally:
+        conn.close()
+
+
+# Undirected walk from a seed key: each step follows any edge touching the
+# current node. UNION (not UNION ALL) drops repeated (key, depth) pairs so
+# cycles terminate at the depth bound.
+_WALK_SQL = """
+    WITH RECURSIVE walk(key, depth) AS (
+        SELECT ?, 0
+        UNION
+        SELECT CASE WHEN e.source_key = w.key THEN e.target_key ELSE e.source_key END,
+               w.depth + 1
+        FROM walk w
+        JOIN edges e ON (e.source_key = w.key OR e.target_key = w.key)
+        WHERE w.depth < ? {rel_filter}
+    )
+    SELECT w.key, MIN(w.depth) AS depth, n.type, n.name, n.stix_id,
+           n.first_seen, n.last_seen, n.canonical_key
+    FROM walk w LEFT JOIN nodes n ON n.canonical_key = w.key
+    {type_filter}
+    GROUP BY w.key
+    ORDER BY depth, w.key
+    LIMIT ?
+"""
+
+
+def _walk(conn: sqlite3.Connection, key: str, k: int, limit: int,
+          relationship_types: Optional[list] = None,
+          node_type: Optional[str] = None) -> list:
+    rel_filter, type_filter = "", ""
+    params: list = [key, max(0, int(k))]
+    if relationship_types:
+        rel_filter = "AND e.relationship_type IN (%s)" % ",".join("?" * len(relationship_types))
+        params += list(relationship_types)
+    if node_type:
+        type_filter = "WHERE n.type = ?"
+        params.append(node_type)
+    params.append(_clamp(limit))
+    rows = conn.execute(_WALK_SQL.format(rel_filter=rel_filter, type_filter=type_filter), params)
+    return [
+        {
+            "key": r["key"],
+            "type": r["type"],
+            "name": r["name"],
+            "stix_id": r["stix_id"],
+            "depth": r["depth"],
+        }
+        for r in rows
+    ]
+
+
+def k_hop(key: str, k: int = 2, db_path: Optional[Path] = None,
+          relationship_types: Optional[list] = None,
+          max_nodes: int = 500) -> dict:
+    """
+    Subgraph within ``k`` undirected hops of ``key``.
+
+    Returns ``{"nodes": [...], "edges": [...], "truncated": bool}``; nodes
+    carry their hop distance and edges are those between returned nodes.
+    """
+    conn = _read(db_path)
+    if conn is None:
+        return {"nodes": [], "edges": [], "truncated": False}
+    try:
+        cap = _clamp(max_nodes)
+        nodes = _walk(conn, key, k, cap + 1, relationship_types)
+        truncated = len(nodes) > cap
+        nodes = nodes[:cap]
+        keys = [n["key"] for n in nodes]
+
+        edges = []
+        # Chunk the IN list to stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 400):
+            chunk = keys[i:i + 400]
+            marks = ",".join("?" * len(chunk))
+            sql = (
+                "SELECT source_key, target_key, relationship_type, count FROM edges "
+                f"WHERE source_key IN ({marks})"
             )
-            edges += 1
-
-        for edge in topology.get("network_edges") or []:
-            for host_ref in edge.get("host_refs") or []:
-                host = next(
-                    (h for h in topology.get("hosts") or []
-                     if h.get("stix_id") == host_ref),
-                    None,
-                )
-                if not host:
-                    continue
-                host_key = canonical_key({
-                    "type": "x-cti-range-host",
-                    "name": host.get("name"),
-                    "ip": host.get("ip"),
-                })
-                svc_key = canonical_key({
-                    "type": "service",
-                    "name": f"{edge.get('service')}:{edge.get('protocol')}:{edge.get('port')}",
-                })
-                _upsert_node(conn, {
-                    "type": "service",
-                    "name": f"{edge.get('service')}:{edge.get('protocol')}:{edge.get('port')}",
+            for r in conn.execute(sql, chunk):
+                edges.append(r)
+        key_set = set(keys)
+        edge_list = [
+            {
+                "source": r["source_key"],
+                "target": r["target_key"],
+                "relationship_type": r["relationship_type"],
+                "count": r["count"],
+            }
+            for r in edges
+            if r["target_key"] in key_set
+            and (not relationship_types or r["relationship_type"] in relationship_types)
+        ]
+        return {"nodes": nodes, "edges": edge_list, "truncated": truncated}
+    finally:
+        conn.close()
+
+
+def hosts_for_technique(technique_id: str, db_path: Optional[Path] = None,
+                        max_hops: int = 3, limit: int = DEFAULT_LIMIT) -> list:
+    """
+    Range hosts connected to an ATT&CK technique within ``max_hops``.
+
+    The usual path is technique <-uses- software/actor -targets->
+    infrastructure -materializes-as-> host, i.e. three hops.
+    """
+    conn = _read(db_path)
+    if conn is None:
+        return []
+    try:
+        return _walk(conn, technique_key(technique_id), max_hops, limit, node_type=HOST_TYPE)
+    finally:
+        conn.close()
+
+
+_TECHNIQUE_ID_RE = re.compile(r"^T\d{4}(?:\.\d{3})?$", re.I)
+
+
+def resolve_key(ref: str, db_path: Optional[Path] = None) -> Optional[str]:
+    """
+    Map a user-facing reference to a canonical node key.
+
+    Accepts a canonical key, an ATT&CK technique ID, a STIX id or a node
+    name (exact, then case-insensitive). Returns None when nothing matches.
+    """
+    ref = str(ref or "").strip()
+    if not ref:
+        return None
+    conn = _read(db_path)
+    if conn is None:
+        return None
+    try:
+        candidates = [
+            ("SELECT canonical_key FROM nodes WHERE canonical_key = ?", ref),
+        ]
+        if _TECHNIQUE_ID_RE.match(ref):
+            candidates.append(("SELECT canonical_key FROM nodes WHERE canonical_key = ?", technique_key(ref)))
+        candidates += [
+            ("SELECT canonical_key FROM nodes WHERE stix_id = ? ORDER BY last_seen DESC", ref),
+            ("SELECT canonical_key FROM nodes WHERE name = ? ORDER BY last_seen DESC", ref),
+            ("SELECT canonical_key FROM nodes WHERE lower(name) = lower(?) ORDER BY last_seen DESC", ref),
+        ]
+        for sql, value in candidates:
+            row = conn.execute(sql, (value,)).fetchone()
+            if row:
+                return row[0]
+        return None
+    finally:
+        conn.close()
+
+
+def find_nodes(query: Optional[str] = None, node_type: Optional[str] = None,
+               db_path: Optional[Path] = None,
+               limit: int = DEFAULT_LIMIT, offset: int = 0) -> list:
+    """Nodes whose name contains ``query`` (case-insensitive), optionally by type."""
+    where, params = [], []
+    if node_type:
+        where.append("type = ?")
+        params.append(node_type)
+    if query:
+        where.append("name LIKE ? ESCAPE '\\'")
+        escaped = str(query).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    sql = "SELECT * FROM nodes"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY type, name, canonical_key LIMIT ? OFFSET ?"
+    params += [_clamp(limit), max(0, int(offset))]
+
+    conn = _read(db_path)
+    if conn is None:
+        return []
+    try:
+        return [_node_dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+# Breadth-first path search. SQLite evaluates a recursive CTE as a FIFO
+# queue, so the first row reaching the target is a shortest path; the
+# inner LIMIT caps total work on dense graphs. Paths are \x1f-delimited
+# and wrapped so instr() can reject revisits.
+_OTHER_END = "(CASE WHEN e.source_key = w.key THEN e.target_key ELSE e.source_key END)"
+_PATH_SQL = """
+    WITH RECURSIVE walk(key, depth, path) AS (
+        SELECT ?, 0, char(31) || ? || char(31)
+        UNION ALL
+        SELECT {other}, w.depth + 1, w.path || {other} || char(31)
+        FROM walk w
+        JOIN edges e ON (e.source_key = w.key OR e.target_key = w.key)
+        WHERE w.depth < ? {rel_filter}
+          AND instr(w.path, char(31) || {other} || char(31)) = 0
+        LIMIT ?
+    )
+    SELECT path, depth FROM walk WHERE key = ? LIMIT 1
+"""
+PATH_SEARCH_ROWS = 200_000
+
+
+def shortest_path(source: str, target: str, db_path: Optional[Path] = None,
+                  max_hops: int = 4,
+                  relationship_types: Optional[list] = None) -> Optional[dict]:
+    """
+    Shortest undirected path between two node keys within ``max_hops``.
+
+    Returns ``{"nodes": [...], "edges": [...], "hops": n}`` or None.
+    """
+    conn = _read(db_path)
+    if conn is None:
+        return None
+    try:
+        rel_filter = ""
+        params: list = [source, source, max(0, int(max_hops))]
+        if relationship_types:
+            rel_filter = "AND e.relationship_type IN (%s)" % ",".join("?" * len(relationship_types))
+            params += list(relationship_types)
+        params += [PATH_SEARCH_ROWS, target]
+        sql = _PATH_SQL.format(other=_OTHER_END, rel_filter=rel_filter)
+        row = conn.execute(sql, params).fetchone()
+        if row is None:
+            return None
+        keys = [k for k in row["path"].split("\x1f") if k]
+
+        nodes = []
+        for key in keys:
+            n = conn.execute("SELECT * FROM nodes WHERE canonical_key = ?", (key,)).fetchone()
+            nodes.append(_node_dict(n) if n else {"key": key, "type": None, "name": None})
+        edges = []
+        for a, b in zip(keys, keys[1:]):
+            e = conn.execute(
+                "SELECT source_key, target_key, relationship_type, count FROM edges "
+                "WHERE (source_key = ? AND target_key = ?) OR (source_key = ? AND target_key = ?) "
+                "ORDER BY count DESC LIMIT 1",
+                (a, b, b, a),
+            ).fetchone()
+            if e:
+                edges.append({
+                    "source": e["source_key"],
+                    "target": e["target_key"],
+                    "relationship_type": e["relationship_type"],
+                    "count": e["count"],
                 })
-                _upsert_edge(conn, host_key, svc_key, "exposes-service", edge)
-                nodes += 1
-                edges += 1
+        return {"nodes": nodes, "edges": edges, "hops": row["depth"]}
+    finally:
+        conn.close()
+
 
-        conn.commit()
+def technique_aggregates(technique_ids: Optional[list] = None,
+                         db_path: Optional[Path] = None,
+                         limit: int = DEFAULT_LIMIT, offset: int = 0,
+                         host_hops: int = 3) -> list:
+    """
+    Per-technique rollup across every persisted report.
+
+    For each attack-pattern node: total edge observations, neighbor counts
+    by node type (actors, software, ...) and the range hosts reachable
+    within ``host_hops``. Ordered by observations, most-seen first.
+    """
+    where, params = ["n.type = 'attack-pattern'"], []
+    if technique_ids:
+        keys = [technique_key(t) for t in technique_ids]
+        where.append("n.canonical_key IN (%s)" % ",".join("?" * len(keys)))
+        params += keys
+    sql = f"""
+        SELECT n.canonical_key, n.name,
+               COALESCE(SUM(e.count), 0) AS observations,
+               COUNT(e.source_key) AS degree
+        FROM nodes n
+        LEFT JOIN edges e ON (e.source_key = n.canonical_key OR e.target_key = n.canonical_key)
+        WHERE {" AND ".join(where)}
+        GROUP BY n.canonical_key
+        ORDER BY observations DESC, n.canonical_key
+        LIMIT ? OFFSET ?
+    """
+    params += [_clamp(limit), max(0, int(offset))]
+
+    conn = _read(db_path)
+    if conn is None:
+        return []
+    try:
+        out = []
+        for row in conn.execute(sql, params).fetchall():
+            key = row["canonical_key"]
+            by_type = {
+                r[0] or "unknown": r[1]
+                for r in conn.execute(
+                    """
+                    SELECT n2.type, COUNT(DISTINCT n2.canonical_key)
+                    FROM edges e JOIN nodes n2 ON n2.canonical_key =
+                        CASE WHEN e.source_key = ? THEN e.target_key ELSE e.source_key END
+                    WHERE e.source_key = ? OR e.target_key = ?
+                    GROUP BY n2.type
+                    """,
+                    (key, key, key),
+                )
+            }
+            hosts = _walk(conn, key, host_hops, MAX_LIMIT, node_type=HOST_TYPE)
+            out.append({
+                "key": key,
+                "technique_id": key.split(":", 1)[-1],
+                "name": row["name"],
+                "observations": row["observations"],
+                "degree": row["degree"],
+                "neighbors_by_type": by_type,
+                "hosts": [h["name"] for h in hosts],
+            })
+        return out
     finally:
         conn.close()
+
+
+# Upper bound on a serialized result page handed back to an LLM tool call
+MAX_RESULT_BYTES = 24_000
+
+
+def paginate(fetch, offset: int = 0, limit: int = 50,
+             max_bytes: int = MAX_RESULT_BYTES) -> dict:
+    """
+    Run ``fetch(limit, offset)`` and shape one size-capped page.
+
+    One extra row is requested to learn whether more exist. Items are
+    dropped from the end until the page serializes under ``max_bytes``;
+    ``next_offset`` always points at the first item not returned.
+    """
+    offset = max(0, int(offset or 0))
+    limit = _clamp(limit)
+    rows = fetch(limit + 1, offset)
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    items, size = [], 2
+    for row in rows:
+        row_size = len(json.dumps(row, default=str)) + 1
+        if items and size + row_size > max_bytes:
+            more = True
+            break
+        items.append(row)
+        size += row_size
     return {
-        "db_path": str(Path(db_path or _DEFAULT_DB)),
-        "nodes_seen": nodes,
-        "edges_seen": edges,
+        "items": items,
+        "offset": offset,
+        "count": len(items),
+        "next_offset": offset + len(items) if more else None,
     }
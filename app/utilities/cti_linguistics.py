@@ -24,6 +24,8 @@ import asyncio
 from rapidfuzz import fuzz
 from functools import lru_cache
 
+from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_window_docs
+
 # ============================================================
 # NLP MODEL (GLOBAL SINGLE LOAD)
 # ============================================================
@@ -232,16 +234,7 @@ def extract_candidate_phrases(text: str) -> list[str]:
 
     raw_phrases = set()
 
-    MAX_CHARS = int(nlp.max_length * 0.8)
-    doc_cache = {}
-
-    for offset in range(0, len(text), MAX_CHARS):
-        chunk = text[offset:offset + MAX_CHARS]
-
-        if chunk not in doc_cache:
-            doc_cache[chunk] = nlp(chunk)
-
-        doc = doc_cache[chunk]
+    for _window, doc in iter_window_docs(nlp, text):
 
         # --- noun chunks ---
         for ch in doc.noun_chunks:
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+cti_nvd_index.py
+
+Offline CVE -> CPE applicability index over local NVD JSON feeds.
+
+Topology inference used to ``json.load`` every NVD feed in the cache dirs
+into one dict per process. Full feeds are gigabytes, so that cost minutes
+and several GB of RAM wherever topology ran. This module streams the
+feeds once into a SQLite store instead:
+
+    cpes     (id, cpe, vendor, product)         one row per distinct CPE
+    cve_cpe  (cve, cpe_id, file_id, ord)        applicability, WITHOUT ROWID
+    files    (id, path, mtime_ns, size, cves)   ingested feed files
+
+Lookups by CVE and by vendor/product are B-tree seeks, and the process
+keeps only SQLite's page cache resident. ``sync()`` is incremental: new
+feed files are ingested, changed ones re-ingested, and removed ones
+dropped, keyed by (mtime_ns, size). CPEs come back in first-seen order
+across feeds, as the old in-memory index returned them.
+
+Feeds are NVD 1.1 (``CVE_Items``) or 2.0 (``vulnerabilities``), plain or
+gzip. With ijson installed they are parsed incrementally; otherwise each
+file is loaded whole, one at a time. No network access is attempted.
+
+CLI
+---
+``python -m plugins.mcp.app.utilities.cti_nvd_index [--index PATH] [--rebuild] [DIR ...]``
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+try:  # optional: stream multi-GB feeds instead of loading them whole
+    import ijson
+except ImportError:  # pragma: no cover - exercised only without ijson
+    ijson = None
+
+log = logging.getLogger("plugins.mcp")
+
+_THIS_DIR = Path(__file__).resolve().parent
+INDEX_FILE = "nvd-cpe-index.sqlite"
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+_BUSY_TIMEOUT_S = 30.0
+_INSERT_BATCH = 5000
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        id INTEGER PRIMARY KEY,
+        path TEXT UNIQUE,
+        mtime_ns INTEGER,
+        size INTEGER,
+        cves INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cpes (
+        id INTEGER PRIMARY KEY,
+        cpe TEXT UNIQUE,
+        vendor TEXT,
+        product TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cve_cpe (
+        cve TEXT,
+        cpe_id INTEGER,
+        file_id INTEGER,
+        ord INTEGER,
+        PRIMARY KEY (cve, cpe_id, file_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cpes_vendor_product ON cpes(vendor, product)",
+    "CREATE INDEX IF NOT EXISTS idx_cve_cpe_cpe ON cve_cpe(cpe_id)",
+    "CREATE INDEX IF NOT EXISTS idx_cve_cpe_file ON cve_cpe(file_id)",
+)
+
+
+def candidate_nvd_dirs() -> list[Path]:
+    paths = []
+    for env_key in ("CTI_NVD_CACHE", "NVD_JSON_DIR", "NVD_CACHE_DIR"):
+        val = os.environ.get(env_key)
+        if val:
+            paths.append(Path(val).expanduser())
+    paths.extend([
+        _THIS_DIR / "data" / "nvd",
+        _THIS_DIR / "data" / "nvd-cache",
+        Path.home() / ".cache" / "nvd",
+    ])
+    return paths
+
+
+def default_index_path() -> Path:
+    """CTI_NVD_INDEX, else ~/.cache/nvd/nvd-cpe-index.sqlite."""
+    val = os.environ.get("CTI_NVD_INDEX")
+    if val:
+        return Path(val).expanduser()
+    return Path.home() / ".cache" / "nvd" / INDEX_FILE
+
+
+def feed_files(dirs: Optional[Iterable[Path]] = None) -> list[Path]:
+    files = set()
+    for root in dirs if dirs is not None else candidate_nvd_dirs():
+        root = Path(root)
+        if not root.is_dir():
+            continue
+        files.update(root.glob("*.json"))
+        files.update(root.glob("*.json.gz"))
+    return sorted(files)
+
+
+# ----------------------------------------------------------------------
+# Feed parsing
+# ----------------------------------------------------------------------
+
+def _walk_cpe_matches(node) -> list[str]:
+    """Extract vulnerable CPE criteria from NVD 1.1/2.0 config nodes."""
+    cpes = []
+    if isinstance(node, dict):
+        for key in ("cpe_match", "cpeMatch"):
+            for match in node.get(key) or []:
+                if not isinstance(match, dict):
+                    continue
+                if match.get("vulnerable") is False:
+                    continue
+                criteria = match.get("criteria") or match.get("cpe23Uri")
+                if criteria:
+                    cpes.append(criteria)
+        for child_key in ("nodes", "children"):
+            for child in node.get(child_key) or []:
+                cpes.extend(_walk_cpe_matches(child))
+    elif isinstance(node, list):
+        for child in node:
+            cpes.extend(_walk_cpe_matches(child))
+    return cpes
+
+
+def _cve_id_from_nvd_item(item: dict) -> Optional[str]:
+    cve = item.get("cve") if isinstance(item, dict) else None
+    if isinstance(cve, dict):
+        meta = cve.get("CVE_data_meta")
+        if isinstance(meta, dict) and meta.get("ID"):
+            return str(meta["ID"]).upper()
+        if cve.get("id"):
+            return str(cve["id"]).upper()
+    if item.get("id"):
+        return str(item["id"]).upper()
+    return None
+
+
+def _open_feed(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _feed_items(path: Path) -> Iterator[dict]:
+    if ijson is not None:
+        # The item array key sits in the feed header; sniff it so a 1.1
+        # feed is not streamed twice looking for the 2.0 key.
+        with _open_feed(path) as fh:
+            head = fh.read(65536)
+        prefixes = ["vulnerabilities.item", "CVE_Items.item"]
+        if b'"CVE_Items"' in head and b'"vulnerabilities"' not in head:
+            prefixes.reverse()
+        for prefix in prefixes:
+            found = False
+            with _open_feed(path) as fh:
+                for item in ijson.items(fh, prefix):
+                    found = True
+                    yield item
+            if found:
+                return
+        return
+    with _open_feed(path) as fh:
+        doc = json.load(fh)
+    items = doc.get("vulnerabilities")
+    if items is None:
+        items = doc.get("CVE_Items")
+    if isinstance(items, list):
+        yield from items
+
+
+def iter_feed_applicability(path: Path) -> Iterator[tuple[str, list[str]]]:
+    """Yield (CVE-ID, [vulnerable CPE 2.3 strings]) for one feed file."""
+    for item in _feed_items(path):
+        if not isinstance(item, dict):
+            continue
+        cve_id = _cve_id_from_nvd_item(item)
+        if not cve_id:
+            continue
+        cve_payload = item.get("cve") if isinstance(item.get("cve"), dict) else {}
+        configs = (
+            item.get("configurations")
+            or cve_payload.get("configurations")
+            or {}
+        )
+        cpes = _walk_cpe_matches(configs)
+        if cpes:
+            yield cve_id, cpes
+
+
+def _vendor_product(cpe: str) -> tuple[Optional[str], Optional[str]]:
+    parts = str(cpe).split(":")
+    if len(parts) <= 4:
+        return None, None
+    vendor = parts[3].replace("\\", "").lower() or None
+    product = parts[4].replace("\\", "").lower() or None
+    return vendor, product
+
+
+# ----------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------
+
+class NvdCpeIndex:
+    """
+    SQLite-backed CVE <-> CPE index.
+
+    ``get(cve, default)`` mirrors the dict the topology code used before,
+    so it can stand in for ``{CVE-ID: [CPE]}``. One connection is shared
+    across threads behind a lock; topology inference runs in worker
+    threads when driven from the MCP server.
+    """
+
+    def __init__(self, path: "str | Path"):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path), timeout=_BUSY_TIMEOUT_S, check_same_thread=False,
+        )
+        for pragma in _PRAGMAS:
+            self._conn.execute(pragma)
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- ingest --------------------------------------------------------
+
+    def sync(self, files: Optional[Iterable[Path]] = None) -> dict:
+        """
+        Bring the index up to date with ``files`` (default: every feed in
+        the candidate NVD dirs). Returns counts of added / updated /
+        removed / unchanged files.
+        """
+        files = [Path(p).resolve() for p in (feed_files() if files is None else files)]
+        with self._lock:
+            known = {
+                row[1]: row for row in
+                self._conn.execute("SELECT id, path, mtime_ns, size FROM files")
+            }
+            stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+            wanted = set()
+            for path in files:
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                key = str(path)
+                wanted.add(key)
+                row = known.get(key)
+                if row and (row[2], row[3]) == (st.st_mtime_ns, st.st_size):
+                    stats["unchanged"] += 1
+                    continue
+                if row:
+                    self._drop_file(row[0])
+                try:
+                    self._ingest(path, st)
+                except Exception as e:
+                    self._conn.rollback()
+                    log.warning(f"[NVD] skipped unreadable feed {path}: {e}")
+                    continue
+                stats["updated" if row else "added"] += 1
+            for key, row in known.items():
+                if key not in wanted and not Path(key).exists():
+                    self._drop_file(row[0])
+                    stats["removed"] += 1
+            self._conn.commit()
+        return stats
+
+    def _drop_file(self, file_id: int) -> None:
+        self._conn.execute("DELETE FROM cve_cpe WHERE file_id = ?", (file_id,))
+        self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _cpe_ids(self, cpes: Iterable[str], cache: dict) -> list[int]:
+        out = []
+        for cpe in cpes:
+            cid = cache.get(cpe)
+            if cid is None:
+                vendor, product = _vendor_product(cpe)
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO cpes(cpe, vendor, product) VALUES (?, ?, ?)",
+                    (cpe, vendor, product),
+                )
+                cid = self._conn.execute(
+                    "SELECT id FROM cpes WHERE cpe = ?", (cpe,),
+                ).fetchone()[0]
+                cache[cpe] = cid
+            out.append(cid)
+        return out
+
+    def _ingest(self, path: Path, st: os.stat_result) -> None:
+        cur = self._conn.execute(
+            "INSERT INTO files(path, mtime_ns, size, cves) VALUES (?, ?, ?, 0)",
+            (str(path), st.st_mtime_ns, st.st_size),
+        )
+        file_id = cur.lastrowid
+        ord_ = (self._conn.execute("SELECT COALESCE(MAX(ord), 0) FROM cve_cpe").fetchone()[0])
+        cpe_cache: dict[str, int] = {}
+        rows = []
+        cves = 0
+        for cve_id, cpes in iter_feed_applicability(path):
+            cves += 1
+            for cid in self._cpe_ids(cpes, cpe_cache):
+                ord_ += 1
+                rows.append((cve_id, cid, file_id, ord_))
+            if len(rows) >= _INSERT_BATCH:
+                self._insert_rows(rows)
+                rows = []
+            if len(cpe_cache) > 200_000:
+                cpe_cache.clear()
+        self._insert_rows(rows)
+        self._conn.execute("UPDATE files SET cves = ? WHERE id = ?", (cves, file_id))
+        self._conn.commit()
+        log.info(f"[NVD] indexed {cves} CVEs from {path.name}")
+
+    def _insert_rows(self, rows: list) -> None:
+        if rows:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cve_cpe(cve, cpe_id, file_id, ord) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    # -- lookups -------------------------------------------------------
+
+    def cpes_for_cve(self, cve: str) -> list[str]:
+        """Vulnerable CPEs for a CVE, deduplicated, in first-seen order."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT c.cpe FROM cve_cpe m JOIN cpes c ON c.id = m.cpe_id
+                WHERE m.cve = ?
+                GROUP BY m.cpe_id ORDER BY MIN(m.ord)
+                """,
+                (str(cve).upper(),),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def cves_for_product(self, vendor: Optional[str], product: str,
+                         limit: int = 1000) -> list[str]:
+        """CVEs whose applicability names vendor/product (vendor optional)."""
+        sql = (
+            "SELECT DISTINCT m.cve FROM cpes c JOIN cve_cpe m ON m.cpe_id = c.id "
+            "WHERE c.product = ?"
+        )
+        params: list = [str(product).lower()]
+        if vendor:
+            sql += " AND c.vendor = ?"
+            params.append(str(vendor).lower())
+        sql += " ORDER BY m.cve LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            return [r[0] for r in self._conn.execute(sql, params)]
+
+    def get(self, cve: str, default=None):
+        cpes = self.cpes_for_cve(cve)
+        return cpes if cpes else default
+
+    def __contains__(self, cve: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM cve_cpe WHERE cve = ? LIMIT 1", (str(cve).upper(),),
+            ).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(DISTINCT cve) FROM cve_cpe"
+            ).fetchone()[0]
+
+
+def open_nvd_index(path: Optional["str | Path"] = None,
+                   sync: bool = True) -> Optional[NvdCpeIndex]:
+    """
+    Open (and by default sync) the on-disk index. Returns None when there
+    are no feed files and no index yet, so callers can skip NVD entirely.
+    """
+    path = Path(path) if path else default_index_path()
+    files = feed_files() if sync else None
+    if not path.exists() and not files:
+        return None
+    try:
+        index = NvdCpeIndex(path)
+    except (OSError, sqlite3.Error) as e:
+        log.warning(f"[NVD] cannot open index at {path} ({e}); using an in-memory index")
+        index = NvdCpeIndex(":memory:")
+    if sync:
+        index.sync(files)
+    return index
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build/refresh the offline NVD CVE->CPE index.")
+    ap.add_argument("dirs", nargs="*", type=Path,
+                    help="feed directories (default: CTI_NVD_CACHE / NVD_JSON_DIR / data/nvd / ~/.cache/nvd)")
+    ap.add_argument("--index", type=Path, default=None, help="index file (default: CTI_NVD_INDEX or ~/.cache/nvd)")
+    ap.add_argument("--rebuild", action="store_true", help="delete the index and ingest every feed again")
+    args = ap.parse_args()
+
+    path = args.index or default_index_path()
+    if args.rebuild and path.exists():
+        path.unlink()
+    index = NvdCpeIndex(path)
+    stats = index.sync(feed_files(args.dirs or None))
+    print(f"[NVD] {path}: {len(index)} CVEs; " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
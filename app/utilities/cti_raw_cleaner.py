@@ -4,13 +4,19 @@ cti_raw_cleaner.py
 Async-capable raw → clean extractor used across Stage1.
 
     - HTML → cleaned TXT
-    - PDF  → extracted text (async pdftotext)
+    - PDF  → extracted text (async pdftotext, streamed to disk)
     - TXT/MD → copied/normalized
     - Images copied
+
+Unchanged inputs are skipped using a content-hash manifest kept in the
+clean directory (see MANIFEST_NAME).
 """
 
 import re
+import os
+import json
 import asyncio
+import hashlib
 from pathlib import Path
 import trafilatura
 from bs4 import BeautifulSoup
@@ -18,12 +24,20 @@ import aiofiles
 import aiofiles.os
 import aiofiles.ospath
 import math
-# import spacy
 
-# _nlp = spacy.load("en_core_web_lg")
+# Concurrency for pdftotext subprocesses and HTML parse threads. Sized to
+# the host instead of a fixed 8 so small VMs are not oversubscribed and
+# large hosts are not left idle.
+MAX_CONCURRENCY = max(2, os.cpu_count() or 4)
+
+# Per-directory manifest of raw file hashes → produced outputs
+MANIFEST_NAME = ".raw_manifest.json"
 
-# Limit async concurrency
-SEMAPHORE = asyncio.Semaphore(8)
+_HASH_CHUNK = 1 << 20
+
+_IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif")
+_HTML_EXTS = (".html", ".htm")
+_TEXT_EXTS = (".txt", ".md")
 
 # ============================================================
 # HTML CLEANING (sync helper)
@@ -68,17 +82,69 @@ async def extract_clean_text_from_html(path: Path) -> str:
 # ============================================================
 
 async def pdf_to_text(path: Path) -> str:
-    async with SEMAPHORE:
-        proc = await asyncio.create_subprocess_exec(
-            "pdftotext",
-            "-layout",
-            str(path),
-            "-",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        out, _ = await proc.communicate()
-        return out.decode(errors="ignore") if out else ""
+    proc = await asyncio.create_subprocess_exec(
+        "pdftotext",
+        "-layout",
+        str(path),
+        "-",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    out, _ = await proc.communicate()
+    return out.decode(errors="ignore") if out else ""
+
+
+async def pdf_to_text_file(path: Path, out: Path) -> bool:
+    """
+    Stream pdftotext output page by page straight into ``out``.
+
+    pdftotext separates pages with form feeds; each page is decoded and
+    written as soon as it is complete, so a large PDF is never held in
+    memory as both bytes and text. Returns False (and leaves no output)
+    when the PDF yields no text.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "pdftotext",
+        "-layout",
+        str(path),
+        "-",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+    tmp = out.with_name(out.name + ".part")
+    has_text = False
+    pending = b""
+
+    try:
+        async with aiofiles.open(tmp, "w", encoding="utf-8") as f:
+            while True:
+                chunk = await proc.stdout.read(_HASH_CHUNK)
+                if not chunk:
+                    break
+                pending += chunk
+                *pages, pending = pending.split(b"\f")
+                for page in pages:
+                    text = page.decode(errors="ignore")
+                    has_text = has_text or bool(text.strip())
+                    await f.write(text + "\f")
+            if pending:
+                text = pending.decode(errors="ignore")
+                has_text = has_text or bool(text.strip())
+                await f.write(text)
+        await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+        tmp.unlink(missing_ok=True)
+        raise
+
+    if not has_text:
+        tmp.unlink(missing_ok=True)
+        return False
+
+    tmp.replace(out)
+    return True
 
 # ============================================================
 # Process a single raw file
@@ -90,7 +156,7 @@ async def process_raw_file(path: Path, clean_dir: Path, images_dir: Path):
     # ---------------------------------------------------------
     # Images: direct copy
     # ---------------------------------------------------------
-    if ext in (".png", ".jpg", ".jpeg", ".gif"):
+    if ext in _IMAGE_EXTS:
         out = images_dir / path.name
         out.write_bytes(path.read_bytes())
         return f"[IMG] Copied {path.name}"
@@ -98,7 +164,7 @@ async def process_raw_file(path: Path, clean_dir: Path, images_dir: Path):
     # ---------------------------------------------------------
     # HTML
     # ---------------------------------------------------------
-    if ext in (".html", ".htm"):
+    if ext in _HTML_EXTS:
         cleaned = await extract_clean_text_from_html(path)
 
         if not cleaned.strip():
@@ -114,21 +180,17 @@ async def process_raw_file(path: Path, clean_dir: Path, images_dir: Path):
     # PDF
     # ---------------------------------------------------------
     if ext == ".pdf":
-        cleaned = await pdf_to_text(path)
+        out = clean_dir / (path.stem + ".txt")
 
-        if not cleaned.strip():
+        if not await pdf_to_text_file(path, out):
             return f"[SKIP] Empty PDF: {path.name}"
 
-        out = clean_dir / (path.stem + ".txt")
-        async with aiofiles.open(out, "w", encoding="utf-8") as f:
-            await f.write(cleaned)
-
         return f"[PDF] {path.name} → {out.name}"
 
     # ---------------------------------------------------------
     # TXT / Markdown
     # ---------------------------------------------------------
-    if ext in (".txt", ".md"):
+    if ext in _TEXT_EXTS:
         async with aiofiles.open(path, "r", encoding="utf-8", errors="ignore") as f:
             txt = await f.read()
 
@@ -158,25 +220,105 @@ async def process_raw_file(path: Path, clean_dir: Path, images_dir: Path):
     return f"[SKIP] Unsupported type: {path.name}"
 
 
+# ============================================================
+# Content-hash manifest
+# ============================================================
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _expected_output(path: Path, clean_dir: Path, images_dir: Path) -> Path | None:
+    ext = path.suffix.lower()
+    if ext in _IMAGE_EXTS:
+        return images_dir / path.name
+    if ext in _HTML_EXTS or ext == ".pdf":
+        return clean_dir / (path.stem + ".txt")
+    if ext in _TEXT_EXTS:
+        return clean_dir / path.name
+    return None
+
+
+def load_manifest(clean_dir: Path) -> dict:
+    path = clean_dir / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_manifest(clean_dir: Path, manifest: dict) -> None:
+    path = clean_dir / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _is_unchanged(entry: dict | None, digest: str, out: Path | None) -> bool:
+    if not entry or entry.get("sha256") != digest:
+        return False
+    # A previous run produced output that has since been removed → redo it
+    if entry.get("output") and (out is None or not out.exists()):
+        return False
+    return True
+
+
 # ============================================================
 # Full async directory processor
 # ============================================================
 
-async def clean_raw_directory_async(raw_dir: Path, clean_dir: Path, images_dir: Path):
+async def clean_raw_directory_async(
+    raw_dir: Path,
+    clean_dir: Path,
+    images_dir: Path,
+    force: bool = False,
+):
     print("[+] Async raw → clean extraction starting…")
-
-    tasks = [
-        process_raw_file(path, clean_dir, images_dir)
-        for path in raw_dir.rglob("*")
-        if path.is_file()
-    ]
     print(f"[DEBUG] raw_dir={raw_dir}")
     print(f"[DEBUG] clean_dir={clean_dir}")
     print(f"[DEBUG] images_dir={images_dir}")
-    results = await asyncio.gather(*tasks)
 
-    for line in results:
+    manifest = {} if force else load_manifest(clean_dir)
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def _run(path: Path):
+        key = path.relative_to(raw_dir).as_posix()
+        out = _expected_output(path, clean_dir, images_dir)
+
+        async with sem:
+            digest = await asyncio.to_thread(_file_sha256, path)
+            if _is_unchanged(manifest.get(key), digest, out):
+                return key, None, f"[SKIP] Unchanged: {path.name}"
+
+            line = await process_raw_file(path, clean_dir, images_dir)
+
+        produced = out is not None and out.exists() and not line.startswith("[SKIP]")
+        entry = {
+            "sha256": digest,
+            "output": out.name if produced else None,
+        }
+        return key, entry, line
+
+    paths = [p for p in raw_dir.rglob("*") if p.is_file()]
+    results = await asyncio.gather(*(_run(p) for p in paths))
+
+    seen = set()
+    for key, entry, line in results:
+        seen.add(key)
+        if entry is not None:
+            manifest[key] = entry
         print("   ", line)
+
+    # Drop manifest rows for raw files that no longer exist
+    for key in list(manifest):
+        if key not in seen:
+            manifest.pop(key, None)
+    save_manifest(clean_dir, manifest)
     clean_count = len(list(clean_dir.glob("*.txt")))
     print(f"[DEBUG] clean txt count={clean_count}")
 
@@ -187,11 +329,19 @@ async def clean_raw_directory_async(raw_dir: Path, clean_dir: Path, images_dir:
 # Sync wrapper for Stage1
 # ============================================================
 
-def clean_raw_directory(base_dir: Path, raw_dir: Path, clean_dir: Path, images_dir: Path):
+def clean_raw_directory(
+    base_dir: Path,
+    raw_dir: Path,
+    clean_dir: Path,
+    images_dir: Path,
+    force: bool = False,
+):
     """
     Stage1-compatible wrapper.
     """
-    return asyncio.run(clean_raw_directory_async(raw_dir, clean_dir, images_dir))
+    return asyncio.run(
+        clean_raw_directory_async(raw_dir, clean_dir, images_dir, force=force)
+    )
 
 def _shannon_entropy(s: str) -> float:
     if not s:
@@ -203,6 +353,41 @@ def _shannon_entropy(s: str) -> float:
     return -sum(p * math.log2(p) for p in probs)
 
 
+# Closed-class English words. Their density is a strong, cheap signal
+# for running prose; identifiers and keywords in code rarely hit them.
+_FUNCTION_WORDS = frozenset("""
+a an the and or but if then than that this these those of to in on at by
+for from with as into over after before during through against between
+is are was were be been being has have had do does did will would can
+could should may might must it its they their them he she his her we our
+which who whom whose when where while also not no
+""".split())
+
+_WORD_RE = re.compile(r"[A-Za-z]+")
+_SENTENCE_END_RE = re.compile(r"[a-z0-9\)][.!?](?=\s|$)")
+_CODE_SYMBOL_RE = re.compile(r"[{}\[\]();=<>$\\|&^~`]")
+
+
+def _prose_statistics(text: str) -> dict:
+    """
+    Token-free statistics used by the dominance gate.
+
+    Counts are regex-based so multi-megabyte inputs are classified in a
+    single linear pass without loading a spaCy model.
+    """
+    words = _WORD_RE.findall(text)
+    non_space = sum(1 for c in text if not c.isspace())
+    function_hits = sum(1 for w in words if w.lower() in _FUNCTION_WORDS)
+
+    return {
+        "words": len(words),
+        "sentences": len(_SENTENCE_END_RE.findall(text)),
+        "alpha_ratio": sum(len(w) for w in words) / max(non_space, 1),
+        "function_ratio": function_hits / max(len(words), 1),
+        "symbol_ratio": len(_CODE_SYMBOL_RE.findall(text)) / max(non_space, 1),
+    }
+
+
 def _is_linguistically_dominant(text: str) -> bool:
     """
     Returns True if prose dominates over code.
@@ -212,29 +397,22 @@ def _is_linguistically_dominant(text: str) -> bool:
     Rejects:
     - Code-only or minified blobs
     """
-    # doc = _nlp(text)
-    import spacy
-
-    # Lazy-load inside function to avoid fork corruption
-    if not hasattr(_is_linguistically_dominant, "_nlp"):
-        _is_linguistically_dominant._nlp = spacy.load("en_core_web_lg")
-
-    doc = _is_linguistically_dominant._nlp(text)
-
-    word_tokens = [t for t in doc if t.is_alpha]
-    verb_tokens = [t for t in doc if t.pos_ == "VERB"]
-    sentence_count = len(list(doc.sents))
+    stats = _prose_statistics(text)
 
     # No linguistic structure
-    if sentence_count < 2:
+    if stats["sentences"] < 2:
         return False
 
-    # Too few verbs → not explanatory prose
-    if len(verb_tokens) < 2:
+    # Explanatory prose is glued together by function words
+    if stats["function_ratio"] < 0.15:
         return False
 
     # Extremely low word ratio = code dominant
-    if len(word_tokens) / max(len(doc), 1) < 0.25:
+    if stats["alpha_ratio"] < 0.25:
+        return False
+
+    # Punctuation-heavy bodies are source, not narrative
+    if stats["symbol_ratio"] > 0.08:
         return False
 
     return True
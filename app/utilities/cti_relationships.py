@@ -18,6 +18,7 @@ from nltk.corpus import wordnet as wn
 
 from plugins.mcp.app.utilities.cti_mitre_extract import cosine_sim
 from plugins.mcp.app.utilities.cti_linguistics import normalize_behavior_text, canonicalize_relationship_endpoints
+from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_window_docs
 
 # ============================================================
 # NLP MODEL (GLOBAL, SINGLE LOAD)
@@ -532,7 +533,12 @@ def _resolve_subject_for_verb(tok, ir: dict) -> list[str]:
     return []
 
 
-def _extract_relationships_from_doc(doc, ir, source_label):
+def _extract_relationships_from_doc(doc, ir, source_label, window=None):
+    """
+    When ``window`` (a TextWindow) is given, each candidate also carries
+    ``evidence_offset``: the [start, end) character span of its evidence
+    sentence in the full text the window was cut from.
+    """
     results = []
 
     for tok in doc:
@@ -695,6 +701,10 @@ def _extract_relationships_from_doc(doc, ir, source_label):
                     "evidence": sentence,
                     "source_context": source_label,
                 }
+                if window is not None:
+                    candidate["evidence_offset"] = list(
+                        window.offset(tok.sent.start_char, tok.sent.end_char)
+                    )
 
                 if status:
                     candidate["status"] = status
@@ -717,12 +727,12 @@ def _extract_relationships_from_doc(doc, ir, source_label):
 # ============================================================
 
 async def semantic_relationships(text: str, ir: dict) -> list[dict]:
-    MAX_CHARS = int(nlp.max_length * 0.8)
     results = []
 
-    for i in range(0, len(text), MAX_CHARS):
-        doc = nlp(text[i:i + MAX_CHARS])
-        results.extend(_extract_relationships_from_doc(doc, ir, "sentence"))
+    for window, doc in iter_window_docs(nlp, text):
+        results.extend(
+            _extract_relationships_from_doc(doc, ir, "sentence", window=window)
+        )
 
     print(f"[REL] semantic={len(results)}")
     return results
@@ -0,0 +1,154 @@
+"""
+Per-bundle process-pool execution for the batch pipeline stages.
+
+Stage 2 (IR -> STIX + D3FEND) and Stage 4 (topology) handle each bundle
+independently once the shared read-only inputs (ATT&CK taxonomy, D3FEND
+index, AE plans, image catalog) are loaded, so a backfill can spread
+bundles over processes:
+
+    results = map_bundles(fn, paths, workers=8, setup=functools.partial(...))
+
+  * ``setup()`` builds the shared state dict once. When the parent is
+    single-threaded and fork is available, it runs in the parent and
+    workers inherit the state copy-on-write. Otherwise (for example inside
+    the multithreaded FastMCP server, where forking deadlocks) workers
+    are started with forkserver/spawn and each runs ``setup()`` itself,
+    reading the on-disk snapshots (D3FEND ``.d3fend_index.json``, the
+    ATT&CK bundle).
+  * ``fn(path, state)`` processes one bundle. Exceptions and crashed
+    workers are recorded for that bundle only.
+  * Bundles are scheduled largest-first so one big report does not
+    start last and leave the other cores idle at the end.
+
+``workers`` defaults to ``CTI_STAGE_WORKERS`` (unset = 1, i.e. the old
+sequential loop in the parent); 0 means one per core minus one. ``fn``
+and ``setup`` must be module-level callables (or partials of them) so
+they pickle.
+"""
+
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+WORKERS_ENV = "CTI_STAGE_WORKERS"
+
+_STATE: dict = {}
+
+
+class BundleResult(NamedTuple):
+    path: Path
+    result: Any
+    error: Optional[str]
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    if workers is None:
+        try:
+            workers = int(os.environ.get(WORKERS_ENV, "1"))
+        except ValueError:
+            workers = 1
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+    return workers
+
+
+def largest_first(paths: Iterable[Path]) -> list[Path]:
+    def size(p: Path) -> int:
+        try:
+            return p.stat().st_size
+        except OSError:
+            return 0
+    return sorted(paths, key=lambda p: (-size(p), str(p)))
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    if "forkserver" in methods:
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(setup: Callable[[], dict]) -> None:
+    _STATE.clear()
+    _STATE.update(setup())
+
+
+def _call(fn: Callable, path: Path, state: dict) -> BundleResult:
+    try:
+        return BundleResult(path, fn(path, state), None)
+    except Exception as e:
+        return BundleResult(path, None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+
+
+def _run_in_worker(fn: Callable, path: Path) -> BundleResult:
+    return _call(fn, path, _STATE)
+
+
+_CRASHED = "worker process died"
+
+
+def _run_pool(fn: Callable, paths: list[Path], workers: int, ctx,
+              initializer, initargs) -> dict:
+    results: dict[Path, BundleResult] = {}
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths)),
+        mp_context=ctx,
+        initializer=initializer,
+        initargs=initargs,
+    ) as pool:
+        futures = {}
+        for p in largest_first(paths):
+            try:
+                futures[pool.submit(_run_in_worker, fn, p)] = p
+            except BrokenProcessPool as e:
+                results[p] = BundleResult(p, None, f"{_CRASHED}: {e}")
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                results[path] = fut.result()
+            except BrokenProcessPool as e:
+                results[path] = BundleResult(path, None, f"{_CRASHED}: {e}")
+            except Exception as e:
+                results[path] = BundleResult(path, None, f"{type(e).__name__}: {e}")
+    return results
+
+
+def map_bundles(fn: Callable[[Path, dict], Any],
+                paths: Iterable[Path],
+                *,
+                workers: Optional[int] = None,
+                setup: Callable[[], dict] = dict) -> list[BundleResult]:
+    """Run ``fn`` over every path; results come back in input order."""
+    paths = list(paths)
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(paths) <= 1:
+        state = setup()
+        return [_call(fn, p, state) for p in paths]
+
+    ctx = _mp_context()
+    if ctx.get_start_method() == "fork":
+        _init_worker(setup)
+        initializer, initargs = None, ()
+    else:
+        initializer, initargs = _init_worker, (setup,)
+
+    try:
+        results = _run_pool(fn, paths, workers, ctx, initializer, initargs)
+        # A hard worker crash (OOM kill, segfault) breaks the whole pool and
+        # fails every pending bundle with it. Retry those once in parallel,
+        # then one process per bundle so only the culprit is reported.
+        crashed = [p for p in paths if (results[p].error or "").startswith(_CRASHED)]
+        if crashed:
+            results.update(_run_pool(fn, crashed, workers, ctx, initializer, initargs))
+        for p in [p for p in crashed if (results[p].error or "").startswith(_CRASHED)]:
+            results.update(_run_pool(fn, [p], 1, ctx, initializer, initargs))
+    finally:
+        _STATE.clear()
+    return [results[p] for p in paths]
@@ -19,39 +19,49 @@ Provides high-performance lookup tables for Stage 2:
 This replaces the old loader that assumed 3 separate JSON files.
 """
 
-import json, re
+import json, os, re, threading
 from pathlib import Path
 import spacy
+
+try:  # optional: ~5x faster parse of the 40 MB ATT&CK bundle
+    import orjson
+except ImportError:
+    orjson = None
 nlp = spacy.load("en_core_web_lg")
 
 # ======================================================================
 #  Load the unified MITRE ATT&CK bundle
 # ======================================================================
 
+def _mitre_bundle_path() -> Path:
+    return Path(__file__).resolve().parent / "cti_taxonomy" / "enterprise_attack.json"
+
+
 def load_mitre_bundle():
     """
     Loads the official enterprise_attack.json file generated by
     install_mitre_taxonomy.py
     """
-    base = Path(__file__).resolve().parent / "cti_taxonomy"
-    path = base / "enterprise_attack.json"
+    path = _mitre_bundle_path()
 
     if not path.exists():
         raise FileNotFoundError(
             f"MITRE dataset not found at {path}\n"
             f"Run: python3 utilities/install_mitre_taxonomy.py"
         )
-    raw = path.read_text(encoding="utf-8")
-    if not raw.strip().startswith("{"):
+    raw = path.read_bytes()
+    if not raw.lstrip().startswith(b"{"):
         raise ValueError(f"[MITRE] Unexpected file format at {path}")
-    return json.loads(path.read_text(encoding="utf-8"))
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
 
 
 # ======================================================================
 #  Parse and index MITRE objects
 # ======================================================================
 
-def load_mitre_taxonomy(taxonomy=None):
+def load_mitre_taxonomy(taxonomy=None, bundle=None):
     """
     Extracts all relevant MITRE STIX objects and builds fast lookup tables.
 
@@ -63,10 +73,13 @@ def load_mitre_taxonomy(taxonomy=None):
         relationships
         name_index
         attack_id_index
+
+    Pass ``bundle`` to index an already-parsed ATT&CK bundle.
     """
 
     try:
-        bundle = load_mitre_bundle()
+        if bundle is None:
+            bundle = load_mitre_bundle()
         if "objects" not in bundle:
             raise ValueError("Invalid MITRE bundle — missing 'objects' field")
     except FileNotFoundError as e:
@@ -192,6 +205,42 @@ def load_mitre_taxonomy(taxonomy=None):
     }
 
 
+# ======================================================================
+#  Shared snapshot
+# ======================================================================
+
+_SNAPSHOT = None
+_SNAPSHOT_SIG = None
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def load_taxonomy_snapshot():
+    """
+    Process-wide taxonomy, parsed and indexed once.
+
+    Same dict as ``load_mitre_taxonomy()`` plus ``_raw_objects`` (every
+    ATT&CK SDO, for cti_topology_inference). Rebuilt only when
+    enterprise_attack.json changes on disk. Callers share the dict and
+    must treat it as read-only, apart from the ``_topology_*`` memo keys
+    cti_topology_inference adds.
+    """
+    global _SNAPSHOT, _SNAPSHOT_SIG
+    path = _mitre_bundle_path()
+    try:
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    with _SNAPSHOT_LOCK:
+        if _SNAPSHOT is not None and sig == _SNAPSHOT_SIG:
+            return _SNAPSHOT
+        bundle = load_mitre_bundle()
+        taxonomy = load_mitre_taxonomy(bundle=bundle) or {}
+        taxonomy["_raw_objects"] = bundle.get("objects", []) or []
+        _SNAPSHOT, _SNAPSHOT_SIG = taxonomy, sig
+        return taxonomy
+
+
 # ======================================================================
 #  Convenience APIs
 # ======================================================================
@@ -64,9 +64,6 @@ from __future__ import annotations
 import re
 import uuid
 import datetime
-import gzip
-import json
-import os
 import socket
 from collections import deque
 from functools import lru_cache
@@ -227,18 +224,82 @@ def _relationship_edges(bundle_objects: list,
     return out
 
 
-def _infra_graph_context(bundle_objects: list) -> dict:
+class BundleIndex:
+    """
+    Lookup tables over one bundle, built once per ``build_range_topology``.
+
+    The per-host helpers used to rebuild ``_objects_by_id`` /
+    ``_relationship_edges`` / ``_observable_memberships`` or rescan every
+    relationship on each call, which is O(hosts x objects). Every helper
+    takes an optional ``index`` and builds one itself when called alone.
+
+      by_id        last object per STIX id (same as ``_objects_by_id``)
+      ids_by_type  {type: [ids]} in ``by_id`` order
+      edges        normalized relationship records, all types
+      touching     {ref: [edges with ref as source or target]}
+      outgoing     {(ref, relationship_type): [edges]}
+      memberships  observed-data co-membership (``_observable_memberships``)
+
+    Adjacency lists keep bundle order, so results match a linear scan.
+    """
+
+    def __init__(self, bundle_objects: list):
+        self.objects = [o for o in bundle_objects or [] if isinstance(o, dict)]
+        self.by_id = _objects_by_id(self.objects)
+        self.ids_by_type: dict[str, list[str]] = {}
+        for oid, obj in self.by_id.items():
+            self.ids_by_type.setdefault(obj.get("type"), []).append(oid)
+        self.edges = _relationship_edges(self.objects, None)
+        self.touching: dict[str, list[dict]] = {}
+        self.outgoing: dict[tuple[str, str], list[dict]] = {}
+        for e in self.edges:
+            src, tgt = e["source_ref"], e["target_ref"]
+            self.touching.setdefault(src, []).append(e)
+            if tgt != src:
+                self.touching.setdefault(tgt, []).append(e)
+            self.outgoing.setdefault((src, e["relationship_type"]), []).append(e)
+        self.memberships = _observable_memberships(self.objects)
+        self._objects_by_type: dict[str, list] = {}
+        for o in self.objects:
+            self._objects_by_type.setdefault(o.get("type"), []).append(o)
+
+    def objects_of_type(self, otype: str) -> list:
+        """Objects of one type in bundle order (duplicates included)."""
+        return self._objects_by_type.get(otype) or []
+
+    def type_of(self, ref: str) -> Optional[str]:
+        return self.by_id.get(ref, {}).get("type")
+
+    def edges_touching(self, ref: str,
+                       allowed_types: Optional[frozenset] = None) -> list:
+        edges = self.touching.get(ref) or []
+        if allowed_types is None:
+            return edges
+        return [e for e in edges if e["relationship_type"] in allowed_types]
+
+    def neighbors(self, ref: str) -> list:
+        """Relationship peers of ``ref`` in edge order (with repeats)."""
+        return [
+            e["target_ref"] if e["source_ref"] == ref else e["source_ref"]
+            for e in self.touching.get(ref) or []
+        ]
+
+
+def _infra_graph_context(bundle_objects: list,
+                         index: Optional[BundleIndex] = None) -> dict:
     """
     Build the infra-relevant STIX graph and mark infrastructure reachable
     from campaign / intrusion-set / threat-actor roots.
     """
-    by_id = _objects_by_id(bundle_objects)
+    index = index or BundleIndex(bundle_objects)
+    by_id = index.by_id
     allowed = _infra_graph_relationship_types()
-    edges = _relationship_edges(bundle_objects, allowed)
+    edges = [e for e in index.edges if e["relationship_type"] in allowed]
     adjacency: dict[str, list[dict]] = {}
     for e in edges:
         adjacency.setdefault(e["source_ref"], []).append(e)
-        adjacency.setdefault(e["target_ref"], []).append(e)
+        if e["target_ref"] != e["source_ref"]:
+            adjacency.setdefault(e["target_ref"], []).append(e)
 
     roots = sorted(
         oid for oid, obj in by_id.items()
@@ -265,12 +326,16 @@ def _infra_graph_context(bundle_objects: list) -> dict:
         "edges": edges,
         "reachable_refs": sorted(reachable),
         "reachable_infrastructure_refs": sorted(infra_ids & reachable),
+        "adjacency": adjacency,
     }
 
 
 def _edges_touching(ref_id: str, graph_ctx: dict) -> list:
     if not ref_id:
         return []
+    adjacency = graph_ctx.get("adjacency")
+    if adjacency is not None:
+        return [dict(e) for e in adjacency.get(ref_id) or []]
     out = []
     for e in graph_ctx.get("edges") or []:
         if ref_id in (e.get("source_ref"), e.get("target_ref")):
@@ -367,24 +432,19 @@ def _observable_memberships(bundle_objects: list) -> dict:
     return peers
 
 
-def _network_services_by_infrastructure(bundle_objects: list) -> tuple[dict, list]:
+def _network_services_by_infrastructure(bundle_objects: list,
+                                        index: Optional[BundleIndex] = None) -> tuple[dict, list]:
     """
     Return ({infrastructure-id: [network service records]}, network_edges).
     Direct relationship/observed-data membership wins. If a bundle has one
     infrastructure SDO and unanchored traffic, attach it to that host as the
     least-surprising one-report topology.
     """
-    by_id = _objects_by_id(bundle_objects)
-    infra_ids = {
-        oid for oid, obj in by_id.items()
-        if obj.get("type") == "infrastructure"
-    }
-    network_ids = [
-        oid for oid, obj in by_id.items()
-        if obj.get("type") == "network-traffic"
-    ]
-    memberships = _observable_memberships(bundle_objects)
-    all_relationships = _relationship_edges(bundle_objects, None)
+    index = index or BundleIndex(bundle_objects)
+    by_id = index.by_id
+    infra_ids = set(index.ids_by_type.get("infrastructure", []))
+    network_ids = index.ids_by_type.get("network-traffic", [])
+    memberships = index.memberships
 
     by_infra: dict[str, list[dict]] = {}
     network_edges = []
@@ -395,13 +455,7 @@ def _network_services_by_infrastructure(bundle_objects: list) -> tuple[dict, lis
         if not services:
             continue
 
-        anchors = set()
-        for e in all_relationships:
-            if nt_id not in (e["source_ref"], e["target_ref"]):
-                continue
-            other = e["target_ref"] if e["source_ref"] == nt_id else e["source_ref"]
-            if other in infra_ids:
-                anchors.add(other)
+        anchors = {other for other in index.neighbors(nt_id) if other in infra_ids}
         anchors.update(r for r in memberships.get(nt_id, set()) if r in infra_ids)
         if not anchors and len(infra_ids) == 1:
             anchors.update(infra_ids)
@@ -454,34 +508,28 @@ def _software_record(sw: dict) -> dict:
 
 
 def _direct_refs_by_type(ref_id: str, bundle_objects: list,
-                         target_type: str) -> set:
-    by_id = _objects_by_id(bundle_objects)
-    hits = set()
-    for e in _relationship_edges(bundle_objects, None):
-        if ref_id not in (e["source_ref"], e["target_ref"]):
-            continue
-        other = e["target_ref"] if e["source_ref"] == ref_id else e["source_ref"]
-        if by_id.get(other, {}).get("type") == target_type:
-            hits.add(other)
-    for peer in _observable_memberships(bundle_objects).get(ref_id, set()):
-        if by_id.get(peer, {}).get("type") == target_type:
+                         target_type: str,
+                         index: Optional[BundleIndex] = None) -> set:
+    index = index or BundleIndex(bundle_objects)
+    hits = {
+        other for other in index.neighbors(ref_id)
+        if index.type_of(other) == target_type
+    }
+    for peer in index.memberships.get(ref_id, set()):
+        if index.type_of(peer) == target_type:
             hits.add(peer)
     return hits
 
 
-def _software_inventory_by_infrastructure(bundle_objects: list) -> dict:
-    by_id = _objects_by_id(bundle_objects)
-    infra_ids = [
-        oid for oid, obj in by_id.items()
-        if obj.get("type") == "infrastructure"
-    ]
-    software_ids = [
-        oid for oid, obj in by_id.items()
-        if obj.get("type") == "software"
-    ]
+def _software_inventory_by_infrastructure(bundle_objects: list,
+                                          index: Optional[BundleIndex] = None) -> dict:
+    index = index or BundleIndex(bundle_objects)
+    by_id = index.by_id
+    infra_ids = index.ids_by_type.get("infrastructure", [])
+    software_ids = index.ids_by_type.get("software", [])
     out: dict[str, list[dict]] = {}
     for inf_id in infra_ids:
-        linked = _direct_refs_by_type(inf_id, bundle_objects, "software")
+        linked = _direct_refs_by_type(inf_id, bundle_objects, "software", index)
         if not linked and len(infra_ids) == 1:
             # A single-host bundle with unlinked software is a common
             # extraction artifact. Treat the software inventory as host
@@ -494,102 +542,37 @@ def _software_inventory_by_infrastructure(bundle_objects: list) -> dict:
     return out
 
 
-def _candidate_nvd_dirs() -> list[Path]:
-    paths = []
-    for env_key in ("CTI_NVD_CACHE", "NVD_JSON_DIR", "NVD_CACHE_DIR"):
-        val = os.environ.get(env_key)
-        if val:
-            paths.append(Path(val).expanduser())
-    here = Path(__file__).resolve().parent
-    paths.extend([
-        here / "data" / "nvd",
-        here / "data" / "nvd-cache",
-        Path.home() / ".cache" / "nvd",
-    ])
-    return paths
-
-
-def _walk_cpe_matches(node) -> list[str]:
-    """Extract vulnerable CPE criteria from NVD 1.1/2.0 config nodes."""
-    cpes = []
-    if isinstance(node, dict):
-        for key in ("cpe_match", "cpeMatch"):
-            for match in node.get(key) or []:
-                if not isinstance(match, dict):
-                    continue
-                if match.get("vulnerable") is False:
-                    continue
-                criteria = match.get("criteria") or match.get("cpe23Uri")
-                if criteria:
-                    cpes.append(criteria)
-        for child_key in ("nodes", "children"):
-            for child in node.get(child_key) or []:
-                cpes.extend(_walk_cpe_matches(child))
-    elif isinstance(node, list):
-        for child in node:
-            cpes.extend(_walk_cpe_matches(child))
-    return cpes
-
-
-def _cve_id_from_nvd_item(item: dict) -> Optional[str]:
-    cve = item.get("cve") if isinstance(item, dict) else None
-    if isinstance(cve, dict):
-        meta = cve.get("CVE_data_meta")
-        if isinstance(meta, dict) and meta.get("ID"):
-            return str(meta["ID"]).upper()
-        if cve.get("id"):
-            return str(cve["id"]).upper()
-    if item.get("id"):
-        return str(item["id"]).upper()
-    return None
+# Cleared by use_presynced_nvd_index() in stage worker processes, whose
+# parent has already synced the index with the feed dirs.
+_NVD_SYNC = True
+
+
+def use_presynced_nvd_index(presynced: bool = True) -> None:
+    """Open the NVD index without syncing it (a parent process already did).
+
+    ``presynced=False`` restores the default of syncing on first open.
+    """
+    global _NVD_SYNC
+    _NVD_SYNC = not presynced
+    _local_nvd_cpe_index.cache_clear()
 
 
 @lru_cache(maxsize=1)
-def _local_nvd_cpe_index() -> dict:
+def _local_nvd_cpe_index():
     """
-    Build {CVE-ID: [CPE 2.3 strings]} from local NVD JSON cache files.
-    No network access is attempted.
+    {CVE-ID: [CPE 2.3 strings]} lookup over local NVD JSON cache files.
+
+    Backed by the on-disk SQLite index in cti_nvd_index.py, synced with
+    the feed dirs once per process (unless use_presynced_nvd_index() was
+    called); returns {} when no feeds exist. No network access is
+    attempted.
     """
-    files = []
-    for root in _candidate_nvd_dirs():
-        if not root.is_dir():
-            continue
-        files.extend(root.glob("*.json"))
-        files.extend(root.glob("*.json.gz"))
-    index: dict[str, list[str]] = {}
-    for path in sorted(set(files)):
-        try:
-            if path.suffix == ".gz":
-                with gzip.open(path, "rt", encoding="utf-8") as fh:
-                    doc = json.load(fh)
-            else:
-                doc = json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            continue
-        items = doc.get("vulnerabilities")
-        if items is None:
-            items = doc.get("CVE_Items")
-        if not isinstance(items, list):
-            continue
-        for item in items:
-            if not isinstance(item, dict):
-                continue
-            cve_id = _cve_id_from_nvd_item(item)
-            if not cve_id:
-                continue
-            cve_payload = item.get("cve") if isinstance(item.get("cve"), dict) else {}
-            configs = (
-                item.get("configurations")
-                or cve_payload.get("configurations")
-                or {}
-            )
-            cpes = _walk_cpe_matches(configs)
-            if cpes:
-                index.setdefault(cve_id, [])
-                for cpe in cpes:
-                    if cpe not in index[cve_id]:
-                        index[cve_id].append(cpe)
-    return index
+    try:
+        from .cti_nvd_index import open_nvd_index
+        index = open_nvd_index(sync=_NVD_SYNC)
+    except Exception:
+        index = None
+    return index if index is not None else {}
 
 
 def _software_hint_from_cpe(cpe: str) -> dict:
@@ -609,20 +592,16 @@ def _software_hint_from_cpe(cpe: str) -> dict:
     return hint
 
 
-def _vulnerabilities_by_infrastructure(bundle_objects: list) -> dict:
-    by_id = _objects_by_id(bundle_objects)
-    infra_ids = [
-        oid for oid, obj in by_id.items()
-        if obj.get("type") == "infrastructure"
-    ]
-    vuln_ids = [
-        oid for oid, obj in by_id.items()
-        if obj.get("type") == "vulnerability"
-    ]
+def _vulnerabilities_by_infrastructure(bundle_objects: list,
+                                       index: Optional[BundleIndex] = None) -> dict:
+    index = index or BundleIndex(bundle_objects)
+    by_id = index.by_id
+    infra_ids = index.ids_by_type.get("infrastructure", [])
+    vuln_ids = index.ids_by_type.get("vulnerability", [])
     nvd = _local_nvd_cpe_index()
     out: dict[str, list[dict]] = {}
     for inf_id in infra_ids:
-        linked = _direct_refs_by_type(inf_id, bundle_objects, "vulnerability")
+        linked = _direct_refs_by_type(inf_id, bundle_objects, "vulnerability", index)
         if not linked and len(infra_ids) == 1:
             linked = set(vuln_ids)
         for vuln_id in linked:
@@ -1240,23 +1219,23 @@ def _ad_identities(bundle_objects: list) -> list:
     return out
 
 
+def _located_at_identity_ref(src_id: str, index: BundleIndex) -> Optional[str]:
+    """First identity id an object is `located-at`, in bundle order."""
+    for e in index.outgoing.get((src_id, "located-at")) or []:
+        if e["target_ref"].startswith("identity--"):
+            return e["target_ref"]
+    return None
+
+
 def _domain_from_located_at(src_id: str, bundle_objects: list,
-                            identity_index: dict) -> Optional[dict]:
+                            identity_index: dict,
+                            index: Optional[BundleIndex] = None) -> Optional[dict]:
     """
     For a STIX object id, walk `located-at` relationships and return the
     first identity SDO it resolves to (or None).
     """
-    for r in bundle_objects:
-        if r.get("type") != "relationship":
-            continue
-        if (r.get("relationship_type") or "") != "located-at":
-            continue
-        if r.get("source_ref") != src_id:
-            continue
-        tgt = r.get("target_ref") or ""
-        if tgt.startswith("identity--"):
-            return identity_index.get(tgt)
-    return None
+    tgt = _located_at_identity_ref(src_id, index or BundleIndex(bundle_objects))
+    return identity_index.get(tgt) if tgt else None
 
 
 # ----------------------------------------------------------------------
@@ -1276,7 +1255,8 @@ def _image_candidates_for_platform(platform: str, images_catalog: list) -> list:
     return out
 
 
-def _tools_for_platform(bundle_objects: list, platform: str) -> list:
+def _tools_for_platform(bundle_objects: list, platform: str,
+                        index: Optional[BundleIndex] = None) -> list:
     """
     Return [{name, id}] for every STIX tool SDO whose
     `x_mitre_platforms` includes the host platform (case-insensitive).
@@ -1288,9 +1268,11 @@ def _tools_for_platform(bundle_objects: list, platform: str) -> list:
     p = platform.strip().lower()
     out = []
     seen = set()
-    for o in bundle_objects:
-        if o.get("type") != "tool":
-            continue
+    tools = (
+        index.objects_of_type("tool") if index is not None
+        else [o for o in bundle_objects if o.get("type") == "tool"]
+    )
+    for o in tools:
         plats = [str(x).lower() for x in (o.get("x_mitre_platforms") or [])]
         # Some bundles double-prefixed the field (`x_x_cti_*` etc.); accept
         # the canonical name OR any platform list field stage 2 may add.
@@ -1306,27 +1288,25 @@ def _tools_for_platform(bundle_objects: list, platform: str) -> list:
     return out
 
 
-def _co_techniques_for_infrastructure(inf_id: str, bundle_objects: list) -> list:
+def _co_techniques_for_infrastructure(inf_id: str, bundle_objects: list,
+                                      index: Optional[BundleIndex] = None) -> list:
     """
     Return ATT&CK technique IDs that co-occur with an infrastructure SDO
     in the bundle, via relationships of any direction. The set narrows
     the data-component lookup to those techniques actually present in
     this report.
     """
-    ap_ids = set()
-    for r in bundle_objects:
-        if r.get("type") != "relationship":
-            continue
-        s, t = r.get("source_ref") or "", r.get("target_ref") or ""
-        if inf_id not in (s, t):
-            continue
-        other = t if s == inf_id else s
-        if other.startswith("attack-pattern--"):
-            ap_ids.add(other)
-    # Convert ap IDs to technique-IDs by scanning bundle objects
+    index = index or BundleIndex(bundle_objects)
+    ap_ids = {
+        other for other in index.neighbors(inf_id)
+        if other.startswith("attack-pattern--")
+    }
+    if not ap_ids:
+        return []
+    # Convert ap IDs to technique-IDs in bundle object order
     out = []
-    for o in bundle_objects:
-        if o.get("type") != "attack-pattern" or o.get("id") not in ap_ids:
+    for o in index.objects_of_type("attack-pattern"):
+        if o.get("id") not in ap_ids:
             continue
         for er in o.get("external_references", []):
             if er.get("source_name") == "mitre-attack":
@@ -1352,7 +1332,8 @@ def derive_hosts(bundle_objects: list, primary_platform: str,
                  network_services: Optional[dict] = None,
                  software_inventory: Optional[dict] = None,
                  vulnerabilities: Optional[dict] = None,
-                 attack_surface: Optional[dict] = None) -> list:
+                 attack_surface: Optional[dict] = None,
+                 index: Optional[BundleIndex] = None) -> list:
     """
     For each STIX infrastructure object emit a richly populated host spec.
 
@@ -1366,7 +1347,8 @@ def derive_hosts(bundle_objects: list, primary_platform: str,
     """
     dc_index = _datacomponent_index(taxonomy) if taxonomy else {}
 
-    graph_ctx = graph_ctx or _infra_graph_context(bundle_objects)
+    index = index or BundleIndex(bundle_objects)
+    graph_ctx = graph_ctx or _infra_graph_context(bundle_objects, index)
     network_services = network_services or {}
     software_inventory = software_inventory or {}
     vulnerabilities = vulnerabilities or {}
@@ -1416,7 +1398,7 @@ def derive_hosts(bundle_objects: list, primary_platform: str,
         # a technique is directly related to this infrastructure SDO.
         # Do not fall back to the bundle-wide technique set or every host
         # inherits generic artifacts like Process, Kernel, File, etc.
-        host_tids = _co_techniques_for_infrastructure(o["id"], bundle_objects)
+        host_tids = _co_techniques_for_infrastructure(o["id"], bundle_objects, index)
         services = set()
         for tid in host_tids:
             signals = dc_index.get(tid)
@@ -1448,7 +1430,7 @@ def derive_hosts(bundle_objects: list, primary_platform: str,
                 domain_membership = ad.get("name")
 
         # software_required: tool SDOs that target this OS.
-        software_required = _tools_for_platform(bundle_objects, platform)
+        software_required = _tools_for_platform(bundle_objects, platform, index)
         for sw in software_inventory.get(o["id"], []):
             key = (
                 (sw.get("cpe") or "").lower(),
@@ -1632,7 +1614,8 @@ def _is_elevated_privilege(privilege: str) -> bool:
 
 
 def derive_user_accounts(bundle_objects: list, identity_index: dict,
-                         targeted_identity_refs: Optional[set] = None) -> list:
+                         targeted_identity_refs: Optional[set] = None,
+                         index: Optional[BundleIndex] = None) -> list:
     """
     Surface every user-account SCO from the bundle as a topology entry.
 
@@ -1641,6 +1624,7 @@ def derive_user_accounts(bundle_objects: list, identity_index: dict,
       2. Failing that, the SCO's own `x_cti_domain` field.
     """
     targeted_identity_refs = targeted_identity_refs or set()
+    index = index or BundleIndex(bundle_objects)
     out = []
     for o in bundle_objects:
         if o.get("type") != "user-account":
@@ -1651,7 +1635,7 @@ def derive_user_accounts(bundle_objects: list, identity_index: dict,
             continue
 
         # Domain resolution.
-        domain_ident = _domain_from_located_at(o["id"], bundle_objects, identity_index)
+        domain_ident = _domain_from_located_at(o["id"], bundle_objects, identity_index, index)
         targeted_identity = False
         if domain_ident:
             domain_name = domain_ident.get("name")
@@ -1704,24 +1688,23 @@ def derive_identities(bundle_objects: list,
     return out
 
 
-def _targeted_identity_refs(bundle_objects: list, graph_ctx: dict) -> set:
+def _targeted_identity_refs(bundle_objects: list, graph_ctx: dict,
+                            index: Optional[BundleIndex] = None) -> set:
     """Identity SDOs targeted by campaign/intrusion-set/threat-actor roots."""
-    by_id = _objects_by_id(bundle_objects)
-    roots = set(graph_ctx.get("root_refs") or [])
+    index = index or BundleIndex(bundle_objects)
     out = set()
-    for e in _relationship_edges(bundle_objects, None):
-        if e.get("relationship_type") != "targets":
-            continue
-        src = e.get("source_ref")
-        tgt = e.get("target_ref")
-        if src in roots and by_id.get(tgt, {}).get("type") == "identity":
-            out.add(tgt)
-        if tgt in roots and by_id.get(src, {}).get("type") == "identity":
-            out.add(src)
+    for root in graph_ctx.get("root_refs") or []:
+        for e in index.touching.get(root) or []:
+            if e["relationship_type"] != "targets":
+                continue
+            other = e["target_ref"] if e["source_ref"] == root else e["source_ref"]
+            if index.type_of(other) == "identity":
+                out.add(other)
     return out
 
 
-def derive_networks(bundle_objects: list, hosts: list) -> list:
+def derive_networks(bundle_objects: list, hosts: list,
+                    index: Optional[BundleIndex] = None) -> list:
     """
     Group infrastructure SDOs into networks by their `located-at`
     relationship to an identity SDO. Hosts that don't share a target
@@ -1740,6 +1723,7 @@ def derive_networks(bundle_objects: list, hosts: list) -> list:
         inf_id_by_slug.setdefault(slug, o["id"])
 
     # For each host, find its located-at identity (if any).
+    index = index or BundleIndex(bundle_objects)
     groups = {}
     orphans = []
     for h in hosts:
@@ -1749,18 +1733,7 @@ def derive_networks(bundle_objects: list, hosts: list) -> list:
         if not inf_id:
             orphans.append(h["name"])
             continue
-        anchor = None
-        for r in bundle_objects:
-            if r.get("type") != "relationship":
-                continue
-            if r.get("relationship_type") != "located-at":
-                continue
-            if r.get("source_ref") != inf_id:
-                continue
-            tgt = r.get("target_ref") or ""
-            if tgt.startswith("identity--"):
-                anchor = tgt
-                break
+        anchor = _located_at_identity_ref(inf_id, index)
         if anchor:
             groups.setdefault(anchor, []).append(h["name"])
         else:
@@ -1845,16 +1818,17 @@ def build_range_topology(bundle: dict, taxonomy: dict,
         A single SDO dict ready to be appended to a STIX bundle.
     """
     objects = bundle.get("objects", []) if isinstance(bundle, dict) else []
+    index = BundleIndex(objects)
 
     plat = aggregate_target_platforms(objects, taxonomy)
     ad_idents = _ad_identities(objects)
     identity_index = {o["id"]: o for o in objects if o.get("type") == "identity"}
-    graph_ctx = _infra_graph_context(objects)
-    network_services, network_edges = _network_services_by_infrastructure(objects)
-    software_inventory = _software_inventory_by_infrastructure(objects)
-    vulnerabilities = _vulnerabilities_by_infrastructure(objects)
+    graph_ctx = _infra_graph_context(objects, index)
+    network_services, network_edges = _network_services_by_infrastructure(objects, index)
+    software_inventory = _software_inventory_by_infrastructure(objects, index)
+    vulnerabilities = _vulnerabilities_by_infrastructure(objects, index)
     attack_surface = _attack_surface_from_techniques(objects, taxonomy)
-    targeted_idents = _targeted_identity_refs(objects, graph_ctx)
+    targeted_idents = _targeted_identity_refs(objects, graph_ctx, index)
 
     hosts = derive_hosts(
         objects, plat["primary"], images_catalog or [], taxonomy, ad_idents,
@@ -1863,6 +1837,7 @@ def build_range_topology(bundle: dict, taxonomy: dict,
         software_inventory=software_inventory,
         vulnerabilities=vulnerabilities,
         attack_surface=attack_surface,
+        index=index,
     )
 
     required_infrastructure_missing: list[dict] = []
@@ -1889,9 +1864,9 @@ def build_range_topology(bundle: dict, taxonomy: dict,
             ),
         })
 
-    user_accounts = derive_user_accounts(objects, identity_index, targeted_idents)
+    user_accounts = derive_user_accounts(objects, identity_index, targeted_idents, index)
     identities = derive_identities(objects, targeted_idents)
-    networks = derive_networks(objects, hosts)
+    networks = derive_networks(objects, hosts, index)
     observable_surfaces = derive_observable_surfaces(objects)
     if observable_surfaces["networks"]:
         existing_cidrs = {
@@ -11,6 +11,8 @@ Purpose:
 import spacy
 from nltk.corpus import wordnet as wn
 
+from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_window_docs
+
 nlp = spacy.load("en_core_web_lg")
 
 
@@ -22,7 +24,13 @@ def recover_nominalized_behaviors(text: str) -> list[dict]:
     Output format matches IR["behaviors"] entries.
     """
     results = []
-    doc = nlp(text)
+    for _window, doc in iter_window_docs(nlp, text or ""):
+        results.extend(_nominalized_behaviors_in_doc(doc))
+    return results
+
+
+def _nominalized_behaviors_in_doc(doc) -> list[dict]:
+    results = []
 
     for chunk in doc.noun_chunks:
         head = chunk.root
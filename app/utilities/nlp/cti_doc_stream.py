@@ -0,0 +1,144 @@
+"""
+Streaming document reader for Stage 1 extractors.
+
+spaCy refuses inputs longer than ``nlp.max_length`` and its parser needs
+roughly 1 GB of RAM per 100k characters, so a multi-megabyte incident dump
+cannot be handed to ``nlp(text)`` in one go. This module splits text into
+sentence-bounded windows of bounded size and parses them lazily with
+``nlp.pipe``:
+
+    for window, doc in iter_window_docs(nlp, text):
+        for sent in doc.sents:
+            start, end = window.offset(sent.start_char, sent.end_char)
+            assert text[start:end] == sent.text
+
+Every window records its character offset into the ORIGINAL text, so
+evidence spans found inside a window map back exactly. Only ``batch_size``
+parsed windows are alive at any moment.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, TextIO
+
+# Well under spaCy's default max_length (1,000,000) and small enough that
+# a parsed window stays in the tens of MB.
+WINDOW_CHARS = 50_000
+
+# How much raw text is pulled from a file-like source per read()
+READ_CHARS = 1 << 16
+
+# Sentence boundary: terminal punctuation followed by whitespace, or a
+# blank line (paragraph / table / bullet breaks in CTI reports).
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n[ \t]*\n\s*")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class TextWindow:
+    """A slice ``source[start:end]`` of the original document."""
+
+    start: int
+    end: int
+    text: str
+
+    def offset(self, start_char: int, end_char: int) -> tuple[int, int]:
+        """Map window-relative character offsets back to the source."""
+        return self.start + start_char, self.start + end_char
+
+
+def _cut_point(buf: str, limit: int) -> int:
+    """
+    Index at which to end the next window: after the last sentence
+    boundary within ``limit``; else after the last whitespace; else a
+    hard cut at ``limit`` (a single "sentence" longer than the window,
+    e.g. a base64 blob).
+    """
+    head = buf[:limit]
+
+    cut = 0
+    for m in _BOUNDARY_RE.finditer(head):
+        cut = m.end()
+    if cut:
+        return cut
+
+    for m in _WHITESPACE_RE.finditer(head):
+        cut = m.end()
+    return cut or limit
+
+
+def _iter_reads(source: TextIO) -> Iterator[str]:
+    while True:
+        chunk = source.read(READ_CHARS)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_sentence_windows(
+    source: "str | TextIO | Iterable[str]",
+    max_chars: int = WINDOW_CHARS,
+) -> Iterator[TextWindow]:
+    """
+    Yield consecutive, non-overlapping sentence-bounded windows.
+
+    ``source`` may be a string, a text file object or any iterable of
+    string chunks. Windows tile the source exactly: concatenating every
+    ``window.text`` reproduces the input, and ``window.start`` is the
+    absolute character offset of the window.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+
+    if isinstance(source, str):
+        pos = 0
+        n = len(source)
+        while n - pos > max_chars:
+            cut = _cut_point(source[pos:pos + max_chars], max_chars)
+            yield TextWindow(pos, pos + cut, source[pos:pos + cut])
+            pos += cut
+        if pos < n:
+            yield TextWindow(pos, n, source[pos:])
+        return
+
+    chunks = _iter_reads(source) if hasattr(source, "read") else iter(source)
+
+    buf = ""
+    base = 0
+    for chunk in chunks:
+        buf += chunk
+        while len(buf) > max_chars:
+            cut = _cut_point(buf, max_chars)
+            yield TextWindow(base, base + cut, buf[:cut])
+            buf = buf[cut:]
+            base += cut
+    if buf:
+        yield TextWindow(base, base + len(buf), buf)
+
+
+def iter_window_docs(
+    nlp,
+    source: "str | TextIO | Iterable[str]",
+    max_chars: int = WINDOW_CHARS,
+    batch_size: int = 4,
+) -> Iterator[tuple[TextWindow, "object"]]:
+    """
+    Parse ``source`` window by window, yielding ``(window, doc)``.
+
+    Blank windows are skipped. ``nlp.pipe`` consumes the window generator
+    lazily, so memory stays proportional to ``batch_size * max_chars``
+    regardless of input size.
+    """
+    # nlp.max_length is the hard ceiling spaCy enforces per call
+    limit = min(max_chars, int(getattr(nlp, "max_length", max_chars)))
+
+    windows = (w for w in iter_sentence_windows(source, limit) if w.text.strip())
+    pending: list[TextWindow] = []
+
+    def _texts():
+        for w in windows:
+            pending.append(w)
+            yield w.text
+
+    for doc in nlp.pipe(_texts(), batch_size=batch_size):
+        yield pending.pop(0), doc
@@ -15,8 +15,11 @@ Output conforms to:
 
 import spacy
 import re
+import numpy as np
 from rapidfuzz import fuzz
 
+from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_window_docs
+
 nlp = spacy.load("en_core_web_lg")
 
 def _log(msg: str):
@@ -106,12 +109,15 @@ def clean_ir_nlp_layer1(ir: dict, original_text: str) -> dict:
         - entity canonical names
     """
     _log("Beginning NLP Layer #1")
-    doc = nlp(original_text)
 
     # ------------------------
     # Behavior Extraction
     # ------------------------
-    dep_behaviors = extract_dependency_behaviors(doc)
+    # Parse sentence-bounded windows so arbitrarily large reports stay
+    # under nlp.max_length and in bounded memory.
+    dep_behaviors = []
+    for _window, doc in iter_window_docs(nlp, original_text or ""):
+        dep_behaviors.extend(extract_dependency_behaviors(doc))
     expanded = []
     for b in dep_behaviors:
         expanded.extend(split_multi_verb(b))
@@ -238,22 +244,73 @@ def normalize_behavior_text(text: str) -> str:
             return v
     return t
 
-def _cosine(a, b) -> float:
-    na = float((a*a).sum()) ** 0.5
-    nb = float((b*b).sum()) ** 0.5
-    if na == 0.0 or nb == 0.0:
-        return 0.0
-    return float((a*b).sum() / (na * nb))
+# Candidates compared per matmul in the greedy dedupe
+DEDUPE_BLOCK = 256
+
+def _behavior_vectors(texts: list[str]) -> np.ndarray:
+    """
+    Vectorize all behaviors in one nlp.pipe batch.
+
+    Doc vectors of a model with static vectors are token-vector averages,
+    so the tagger/parser/NER are skipped; they do not affect the result.
+    """
+    disable = nlp.pipe_names if nlp.vocab.vectors.shape[0] else []
+    docs = nlp.pipe(texts, disable=disable, batch_size=256)
+    return np.asarray([d.vector for d in docs], dtype=np.float32)
+
+def _greedy_dedupe_indices(vectors: np.ndarray, threshold: float,
+                           block: int = DEDUPE_BLOCK) -> list[int]:
+    """
+    Order-stable greedy dedupe over row vectors.
+
+    Row i is kept iff its cosine to every previously KEPT row is below
+    ``threshold`` (zero vectors never match anything). Candidates are
+    scored in blocks: one matmul against the kept matrix, then a small
+    in-block Gram matrix resolves the sequential part exactly.
+    """
+    n = len(vectors)
+    if n == 0:
+        return []
+
+    norms = np.linalg.norm(vectors, axis=1)
+    unit = np.zeros_like(vectors, dtype=np.float32)
+    nz = norms > 0
+    unit[nz] = vectors[nz] / norms[nz, None]
+
+    kept_idx: list[int] = []
+    kept = np.empty((n, vectors.shape[1]), dtype=np.float32)
+
+    for lo in range(0, n, block):
+        hi = min(lo + block, n)
+        cand = unit[lo:hi]
+
+        if kept_idx:
+            against_kept = cand @ kept[:len(kept_idx)].T
+            alive = ~(against_kept >= threshold).any(axis=1)
+        else:
+            alive = np.ones(hi - lo, dtype=bool)
+        alive &= nz[lo:hi]
+
+        gram = cand @ cand.T
+        survivors: list[int] = []
+        for j in range(hi - lo):
+            if not nz[lo + j]:
+                survivors.append(j)     # zero vector: never merged
+                continue
+            if not alive[j]:
+                continue
+            if survivors and (gram[j, survivors] >= threshold).any():
+                continue
+            survivors.append(j)
+
+        for j in survivors:
+            kept[len(kept_idx)] = cand[j]
+            kept_idx.append(lo + j)
+
+    return kept_idx
 
 def dedupe_behaviors_by_vector(texts: list[str], threshold: float = 0.92) -> list[str]:
-    kept: list[tuple[str, any]] = []
-    for t in texts:
-        v = nlp(t).vector
-        merged = False
-        for i, (kt, kv) in enumerate(kept):
-            if _cosine(v, kv) >= threshold:
-                merged = True
-                break
-        if not merged:
-            kept.append((t, v))
-    return [t for t, _ in kept]
+    if not texts:
+        return []
+    vectors = _behavior_vectors(texts)
+    return [texts[i] for i in _greedy_dedupe_indices(vectors, threshold)]
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+rag_embed_benchmark.py
+======================
+
+Compare RAG embedding backends (remote LiteLLM models vs the local
+``local/spacy`` / ``local/onnx:<path>`` backends in
+``app/capabilities/rag_embedders.py``) on the measuring-stick bundles.
+
+For every backend the benchmark embeds the RAG corpus of each bundle
+(the same structured chunks RAGService builds) and reports:
+
+  * corpus latency   wall time to embed every chunk, and chunks/second
+  * query latency    median wall time to embed one query
+  * recall@k         fraction of queries whose source chunk ranks in the
+                     top k by cosine alone (no BM25 / exact keys)
+  * overlap@k        mean |top-k ∩ reference top-k| / k against the first
+                     backend listed, i.e. how closely a local backend
+                     reproduces the remote embedder's rankings
+
+Queries are the first sentence of each object's description with its name
+removed, so a hit requires matching meaning rather than the title.
+Vectors are computed fresh every run; the persistent embedding store is
+not touched.
+
+CLI
+---
+``python -m plugins.mcp.app.utilities.rag_embed_benchmark \\
+        --model openai/text-embedding-3-small --model local/spacy``
+
+Remote models read OPENAI_API_KEY (or --api-key / --api-base).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from plugins.mcp.app.capabilities.rag import RAGService
+from plugins.mcp.app.capabilities.rag_embedders import create_embedder
+from plugins.mcp.app.capabilities.rag_store import normalize_rows
+
+DEFAULT_BUNDLE_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "measuring-sticks"
+DEFAULT_MODELS = ["openai/text-embedding-3-small", "local/spacy"]
+
+_FIRST_SENTENCE_RE = re.compile(r"^(.+?[.!?])(?:\s|$)", re.S)
+
+
+def build_queries(chunks: list) -> list[tuple[str, int]]:
+    """(query, index of its source chunk) for every described chunk."""
+    queries = []
+    for i, chunk in enumerate(chunks):
+        description = (chunk.description or "").strip()
+        if not description:
+            continue
+        m = _FIRST_SENTENCE_RE.match(description)
+        query = (m.group(1) if m else description)
+        if chunk.name:
+            query = re.sub(re.escape(chunk.name), " ", query, flags=re.I)
+        query = " ".join(query.split())
+        if len(query.split()) >= 3:
+            queries.append((query, i))
+    return queries
+
+
+def rank(corpus_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = normalize_rows(query_vectors) @ normalize_rows(corpus_vectors).T
+    k = min(k, scores.shape[1])
+    return np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+
+def bench_model(embed_model: str, corpus: list[str], queries: list[tuple[str, int]], k: int, **embedder_kwargs) -> dict:
+    embedder = create_embedder(embed_model, **embedder_kwargs)
+    # Warm up so model load / connection setup is not billed to the corpus
+    embedder(["warm up"])
+
+    t0 = time.perf_counter()
+    corpus_vectors = np.asarray(embedder(corpus), dtype=np.float32)
+    corpus_s = time.perf_counter() - t0
+
+    query_times = []
+    query_vectors = []
+    for text, _ in queries:
+        t0 = time.perf_counter()
+        query_vectors.append(np.asarray(embedder([text]), dtype=np.float32)[0])
+        query_times.append(time.perf_counter() - t0)
+
+    top = rank(corpus_vectors, np.vstack(query_vectors), k) if queries else np.zeros((0, k), dtype=int)
+    hits = sum(1 for (_, target), row in zip(queries, top) if target in row)
+    return {
+        "model": embed_model,
+        "chunks": len(corpus),
+        "queries": len(queries),
+        "corpus_s": corpus_s,
+        "chunks_per_s": len(corpus) / corpus_s if corpus_s else float("inf"),
+        "query_ms_p50": 1000 * statistics.median(query_times) if query_times else 0.0,
+        "recall_at_k": hits / len(queries) if queries else 0.0,
+        "top": top,
+    }
+
+
+def overlap(top: np.ndarray, reference: np.ndarray) -> float:
+    if not len(top):
+        return 0.0
+    k = top.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(top, reference)]))
+
+
+def run(bundle_paths: list[Path], models: list[str], k: int, **embedder_kwargs) -> list[dict]:
+    results = []
+    for path in bundle_paths:
+        bundle = json.loads(path.read_text(encoding="utf-8"))
+        chunks = RAGService.extract_chunks(bundle)
+        corpus = [c.text for c in chunks]
+        queries = build_queries(chunks)
+        reference = None
+        for model in models:
+            try:
+                res = bench_model(model, corpus, queries, k, **embedder_kwargs)
+            except Exception as e:
+                print(f"[!] {path.name}: {model} failed: {e}")
+                continue
+            res["bundle"] = path.name
+            if reference is None:
+                reference = res["top"]
+                res["overlap_at_k"] = 1.0
+            else:
+                res["overlap_at_k"] = overlap(res["top"], reference)
+            results.append(res)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark RAG embedding backends on measuring-stick bundles.")
+    ap.add_argument("--bundle", action="append", type=Path,
+                    help="STIX bundle to use (repeatable; default: every *.json in data/measuring-sticks)")
+    ap.add_argument("--model", action="append",
+                    help="embed_model to compare (repeatable; first is the reference)")
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""))
+    ap.add_argument("--api-base", default=os.environ.get("OPENAI_API_BASE") or None)
+    args = ap.parse_args()
+
+    bundles = args.bundle or sorted(DEFAULT_BUNDLE_DIR.glob("*.json"))
+    models = args.model or DEFAULT_MODELS
+    results = run(bundles, models, args.k, api_key=args.api_key, api_base=args.api_base)
+
+    print(f"{'bundle':42} {'model':36} {'chunks/s':>9} {'q p50 ms':>9} "
+          f"{'recall@' + str(args.k):>9} {'overlap':>8}")
+    for r in results:
+        print(f"{r['bundle'][:42]:42} {r['model'][:36]:36} {r['chunks_per_s']:9.1f} "
+              f"{r['query_ms_p50']:9.2f} {r['recall_at_k']:9.2f} {r['overlap_at_k']:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
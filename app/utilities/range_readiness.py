@@ -0,0 +1,146 @@
+"""
+Wait for a Range deployment to reach a terminal status.
+
+``wait_for_status`` consumes a status stream when the Range plugin offers
+one (server-sent events, see ``CalderaHTTP.stream_events``) and otherwise
+polls adaptively: the first checks come quickly (a small range is often
+ready within seconds), the interval then grows geometrically up to the
+caller's cap, and every status transition ("deploying" -> "configuring")
+resets the interval to its initial value. Replies without a status
+("unknown") are not transitions, so a flapping endpoint cannot make the
+loop poll faster than ``initial_interval_s``. Compared with a fixed 15 s
+poll this finds readiness sooner and sends fewer requests over a long
+deploy.
+
+Each status change is reported through an optional
+``on_progress(elapsed_s, timeout_s, status)`` coroutine so the MCP tool
+can forward it to the client.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+log = logging.getLogger("plugins.mcp")
+
+TERMINAL_OK = {"running", "ready", "complete", "completed", "success"}
+TERMINAL_BAD = {"error", "failed", "failure"}
+
+
+class AdaptiveInterval:
+    """Geometric poll interval: initial_s, initial_s*factor, ... capped at max_s."""
+
+    def __init__(self, initial_s: float = 1.0, max_s: float = 15.0, factor: float = 2.0):
+        self.initial_s = min(initial_s, max_s)
+        self.max_s = max_s
+        self.factor = factor
+        self._next = self.initial_s
+
+    def reset(self) -> None:
+        self._next = self.initial_s
+
+    def next(self) -> float:
+        delay = self._next
+        self._next = min(self.max_s, self._next * self.factor)
+        return delay
+
+
+def _status_of(payload: Any) -> str:
+    if not isinstance(payload, dict):
+        return "unknown"
+    return str(payload.get("status") or "unknown").lower()
+
+
+async def wait_for_status(
+    poll: Callable[[], Awaitable[dict]],
+    *,
+    timeout_s: float,
+    max_interval_s: float = 15.0,
+    initial_interval_s: float = 1.0,
+    stream: Optional[Callable[[], AsyncIterator[dict]]] = None,
+    on_progress: Optional[Callable[[float, float, str], Awaitable[None]]] = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> dict:
+    """
+    Return ``{status, ready, timed_out, elapsed_s, polls, mode,
+    transitions, last_status}`` once a terminal status is seen or
+    ``timeout_s`` passes.
+    """
+    start = clock()
+    deadline = start + timeout_s
+    state = {"polls": 0, "last": {}, "status": None, "transitions": [], "mode": "poll"}
+
+    def elapsed() -> float:
+        return round(clock() - start, 3)
+
+    async def observe(payload: dict) -> Optional[bool]:
+        """Record one status; True/False when terminal, None otherwise."""
+        status = _status_of(payload)
+        state["last"] = payload if isinstance(payload, dict) else {}
+        changed = status != state["status"]
+        if changed:
+            state["transitions"].append({"status": status, "elapsed_s": elapsed()})
+            state["status"] = status
+        if on_progress is not None and changed:
+            try:
+                await on_progress(elapsed(), timeout_s, status)
+            except Exception as e:
+                log.debug(f"[RANGE] progress notification failed: {e}")
+        if status in TERMINAL_OK:
+            return True
+        if status in TERMINAL_BAD:
+            return False
+        return None
+
+    def result(ready: Optional[bool]) -> dict:
+        out = {
+            "status": state["status"] or "unknown",
+            "ready": bool(ready),
+            "timed_out": ready is None,
+            "elapsed_s": timeout_s if ready is None else elapsed(),
+            "polls": state["polls"],
+            "mode": state["mode"],
+            "transitions": state["transitions"],
+            "last_status": state["last"],
+        }
+        if ready is False:
+            out["error"] = state["last"].get("error")
+        elif ready is None:
+            out["error"] = f"range did not become ready within {int(timeout_s)}s"
+        return out
+
+    if stream is not None:
+        overall = asyncio.timeout(max(0.0, deadline - clock()))
+        try:
+            async with overall:
+                async for payload in stream():
+                    state["mode"] = "stream"
+                    outcome = await observe(payload)
+                    if outcome is not None:
+                        return result(outcome)
+        except Exception as e:
+            if isinstance(e, TimeoutError) and overall.expired():
+                return result(None)
+            # Unsupported, idle or dropped stream: poll for the remainder.
+            log.debug(f"[RANGE] status stream unavailable, polling instead: {e!r}")
+        state["mode"] = "poll"
+
+    interval = AdaptiveInterval(initial_interval_s, max_interval_s)
+    known = None if state["status"] in (None, "unknown") else state["status"]
+    while clock() <= deadline:
+        state["polls"] += 1
+        outcome = await observe(await poll())
+        if outcome is not None:
+            return result(outcome)
+        if state["status"] != "unknown":
+            if known is not None and state["status"] != known:
+                # Transition: the next phase often completes quickly.
+                interval.reset()
+            known = state["status"]
+        delay = min(interval.next(), max(0.0, deadline - clock()))
+        if delay <= 0:
+            break
+        await sleep(delay)
+    return result(None)
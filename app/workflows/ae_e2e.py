@@ -435,13 +435,14 @@ class AEEndToEndWorkflow:
             topo = json.loads(topo_path.read_text(encoding="utf-8"))
             ae_ir = None
             try:
-                from plugins.mcp.app.utilities.cti_ae_library_loader import (
-                    discover_ae_plans, find_plan_by_adversary, parse_ae_plan,
+                from plugins.mcp.app.utilities.cti_ae_library_loader import find_plan_by_adversary
+                from plugins.mcp.app.utilities.cti_ae_plan_index import (
+                    cached_ae_plans, cached_parse_ae_plan,
                 )
-                plans = discover_ae_plans()
+                plans = cached_ae_plans()
                 plan = find_plan_by_adversary(plans, ctx["adversary_slug"])
                 if plan:
-                    ae_ir = parse_ae_plan(plan, taxonomy=None)
+                    ae_ir = cached_parse_ae_plan(plan, taxonomy=None)
             except Exception as e:
                 self.log.warning(f"AE plan IR not loaded: {e}")
             images_catalog: list = []
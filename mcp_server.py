@@ -44,6 +44,15 @@ if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
 from plugins.mcp.app.config import caldera_connection
+from plugins.mcp.app.utilities.caldera_http import (
+    CalderaHTTP,
+    POLICIES as HTTP_POLICIES,
+    StreamIdle,
+    StreamUnsupported,
+)
+from plugins.mcp.app.utilities.agent_watcher import AGENT_FIELDS, watcher_for
+from plugins.mcp.app.utilities.catalog_cache import CatalogUnavailable, TTLCache
+from plugins.mcp.app.utilities.range_readiness import wait_for_status
 
 
 def _stdout_safe(fn):
@@ -100,7 +109,7 @@ def _resolve_pipeline_file(path_value: str, *, data_subdirs: tuple[str, ...] = (
     return candidates[0].resolve()
 
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
 
 # ---------------------------------------------------------------------------
@@ -214,10 +223,7 @@ def _file_images_catalog() -> list:
     seen: dict[tuple[str, str, str], dict] = {}
     try:
         import yaml  # type: ignore
-        for candidate in (
-            Path("plugins/range/conf/onprem_microvm_images.yml"),
-            Path("plugins/range/conf/onprem_images.yml"),
-        ):
+        for candidate in _FILE_IMAGE_CATALOGS:
             if not candidate.is_file():
                 continue
             doc = yaml.safe_load(candidate.read_text(encoding="utf-8")) or {}
@@ -232,29 +238,24 @@ def _file_images_catalog() -> list:
     return images
 
 
+# One keep-alive connection pool for every Caldera / Range / Detections
+# call, pinned to whichever root candidate last answered.
+_HTTP = CalderaHTTP(roots=_caldera_root_candidates, headers=_caldera_headers)
+
+
 async def _range_api_images_catalog(provider: str = "microvm") -> list:
-    body: dict = {}
-    try:
-        import aiohttp
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            for root in _caldera_root_candidates():
-                url = f"{root}/plugin/range/onprem/images"
-                try:
-                    async with session.get(
-                        url,
-                        params={"provider": provider},
-                        timeout=aiohttp.ClientTimeout(total=5),
-                    ) as resp:
-                        if resp.status != 200:
-                            continue
-                        body = await resp.json(content_type=None)
-                        break
-                except Exception as e:
-                    log.debug(f"Range image API attempt failed at {url}: {e}")
-    except Exception as e:
-        log.debug(f"Range image API catalog load failed: {e}")
-        return []
-    if not body:
+    """Range API image records; raises CatalogUnavailable if no root answers."""
+    res = await _HTTP.request_root(
+        "GET", "/plugin/range/onprem/images",
+        params={"provider": provider},
+        policy=HTTP_POLICIES["range-images"],
+        require_ok=True,
+        require_json=True,
+    )
+    if res is None or res.status != 200:
+        raise CatalogUnavailable(f"Range image catalog for {provider} unavailable")
+    body = res.payload
+    if not isinstance(body, dict) or not body:
         return []
 
     out: list = []
@@ -270,66 +271,106 @@ async def _range_api_images_catalog(provider: str = "microvm") -> list:
 
 
 async def _range_get_json(path: str, params: dict | None = None,
-                          timeout_s: int = 10) -> dict:
-    try:
-        import aiohttp
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            for root in _caldera_root_candidates():
-                url = f"{root}{path}"
-                try:
-                    async with session.get(
-                        url,
-                        params=params or {},
-                        timeout=aiohttp.ClientTimeout(total=timeout_s),
-                    ) as resp:
-                        if resp.status >= 400:
-                            continue
-                        return await resp.json(content_type=None) or {}
-                except Exception as e:
-                    log.debug(f"Range GET failed at {url}: {e}")
-    except Exception as e:
-        log.debug(f"Range GET setup failed for {path}: {e}")
-    return {}
+                          policy: str = "range-get", *, strict: bool = False) -> dict:
+    """GET a Range endpoint; ``{}`` if no root answers (``strict``: raise)."""
+    res = await _HTTP.request_root(
+        "GET", path, params=params or {},
+        policy=HTTP_POLICIES[policy], require_ok=True, require_json=True,
+    )
+    if res is None:
+        if strict:
+            raise CatalogUnavailable(f"GET {path} failed on every Caldera root")
+        return {}
+    return res.payload or {}
 
 
 async def _range_post_json(path: str, body: dict | None = None,
-                           timeout_s: int = 10) -> dict:
-    try:
-        import aiohttp
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            for root in _caldera_root_candidates():
-                url = f"{root}{path}"
-                try:
-                    async with session.post(
-                        url,
-                        json=body or {},
-                        timeout=aiohttp.ClientTimeout(total=timeout_s),
-                    ) as resp:
-                        text = await resp.text()
-                        try:
-                            payload = json.loads(text) if text else {}
-                        except json.JSONDecodeError:
-                            payload = {"raw": text}
-                        if resp.status >= 400:
-                            payload.setdefault("error", f"HTTP {resp.status}")
-                        return payload
-                except Exception as e:
-                    log.debug(f"Range POST failed at {url}: {e}")
-    except Exception as e:
-        log.debug(f"Range POST setup failed for {path}: {e}")
-    return {}
+                           policy: str = "range-post") -> dict:
+    res = await _HTTP.request_root("POST", path, json=body or {}, policy=HTTP_POLICIES[policy])
+    if res is None:
+        return {}
+    payload = res.payload
+    if not res.ok and isinstance(payload, dict):
+        payload.setdefault("error", f"HTTP {res.status}")
+    return payload
+
+
+# Range catalogs change only on image/feature import or deploy, but every
+# uncached read costs an HTTP round trip per root candidate (5 s timeout
+# each when Range is down) plus a YAML parse. Serve them from a TTL cache
+# with stale-while-revalidate; import_ansible_feature and deploy_range
+# invalidate it. The file catalog's mtimes are part of the key, so YAML
+# edits are picked up immediately.
+_CATALOG_TTL_S = float(os.environ.get("CTI_CATALOG_TTL_S", "60"))
+_CATALOG_CACHE = TTLCache(ttl_s=_CATALOG_TTL_S, stale_s=10 * _CATALOG_TTL_S)
+_FILE_IMAGE_CATALOGS = (
+    Path("plugins/range/conf/onprem_microvm_images.yml"),
+    Path("plugins/range/conf/onprem_images.yml"),
+)
+
+
+def _file_catalog_signature() -> tuple:
+    sig = []
+    for candidate in _FILE_IMAGE_CATALOGS:
+        try:
+            st = candidate.stat()
+            sig.append((str(candidate), st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((str(candidate), None, None))
+    return tuple(sig)
 
 
-async def _load_images_catalog() -> list:
+def _merge_image_catalogs(api_images: list) -> list:
     images: list = []
     seen: dict[tuple[str, str, str], dict] = {}
-    for rec in await _range_api_images_catalog("microvm"):
+    for rec in api_images:
         _merge_image_record(images, seen, rec)
     for rec in _file_images_catalog():
         _merge_image_record(images, seen, rec)
     return images
 
 
+async def _merged_images_catalog() -> list:
+    return _merge_image_catalogs(await _range_api_images_catalog("microvm"))
+
+
+async def _load_images_catalog() -> tuple[list, float]:
+    """Merged Range API + file image catalog and its age in seconds.
+
+    With Range unreachable (and nothing cached) the file catalog alone is
+    returned, uncached, so the API images appear once Range is back.
+    """
+    try:
+        images, age = await _CATALOG_CACHE.get(
+            ("images", _file_catalog_signature()), _merged_images_catalog,
+        )
+    except CatalogUnavailable as e:
+        log.debug(f"[RANGE] {e}; using the file image catalog only")
+        return _merge_image_catalogs([]), 0.0
+    return [dict(rec) for rec in images], round(age, 3)
+
+
+async def _cached_range_json(path: str) -> tuple[dict, float]:
+    try:
+        return await _CATALOG_CACHE.get(
+            ("range-get", path), lambda: _range_get_json(path, strict=True),
+        )
+    except CatalogUnavailable as e:
+        log.debug(f"[RANGE] {e}")
+        return {}, 0.0
+
+
+async def _cached_range_images(provider: str) -> tuple[list, float]:
+    try:
+        images, age = await _CATALOG_CACHE.get(
+            ("range-images", provider), lambda: _range_api_images_catalog(provider),
+        )
+    except CatalogUnavailable as e:
+        log.debug(f"[RANGE] {e}")
+        return [], 0.0
+    return [dict(rec) for rec in images], age
+
+
 # ---------------------------------------------------------------------------
 # Pipeline tools
 # ---------------------------------------------------------------------------
@@ -496,22 +537,9 @@ async def build_topology(stix_path: str) -> dict:
     except Exception as e:
         return {"error": f"failed to parse STIX bundle: {e}"}
 
-    taxonomy: dict = {}
-    try:
-        from plugins.mcp.app.utilities.cti_taxonomy_loader import (
-            load_mitre_taxonomy,
-            load_mitre_bundle,
-        )
-        taxonomy = load_mitre_taxonomy() or {}
-        try:
-            raw_bundle = load_mitre_bundle()
-            taxonomy["_raw_objects"] = raw_bundle.get("objects", []) or []
-        except Exception:
-            pass
-    except Exception as e:
-        log.warning(f"taxonomy load failed: {e}; proceeding without it")
+    taxonomy = await asyncio.to_thread(_shared_taxonomy)
 
-    images_catalog = await _load_images_catalog()
+    images_catalog, images_catalog_age_s = await _load_images_catalog()
 
     try:
         topology = build_range_topology(bundle, taxonomy, images_catalog)
@@ -525,23 +553,23 @@ async def build_topology(stix_path: str) -> dict:
             _enrich_topology_with_ae_plan,
             _technique_ids_in_bundle,
         )
-        from plugins.mcp.app.utilities.cti_ae_library_loader import (
-            discover_ae_plans,
-            find_plan_by_adversary,
-            parse_ae_plan,
+        from plugins.mcp.app.utilities.cti_ae_library_loader import AEPlanMatcher
+        from plugins.mcp.app.utilities.cti_ae_plan_index import (
+            cached_ae_plans,
+            cached_parse_ae_plan,
         )
         stem_hint = p.stem[:-len(".stix")] if p.stem.endswith(".stix") else p.stem
-        plans = discover_ae_plans()
-        for cand in _adversary_candidates_from_bundle(bundle, stem_hint=stem_hint):
-            plan = find_plan_by_adversary(plans, cand)
-            if not plan:
-                continue
-            ae_ir = parse_ae_plan(plan, taxonomy=taxonomy)
+        plans = cached_ae_plans()
+        plan, match_why = AEPlanMatcher(plans, taxonomy).match_first(
+            _adversary_candidates_from_bundle(bundle, stem_hint=stem_hint)
+        )
+        if plan:
+            ae_ir = cached_parse_ae_plan(plan, taxonomy=taxonomy)
             topology = _enrich_topology_with_ae_plan(
                 topology, plan, ae_ir, _technique_ids_in_bundle(bundle),
                 images_catalog,
             )
-            break
+            topology["x_ae_library_match"]["match"] = match_why
     except Exception as e:
         log.warning(f"AE plan topology enrichment skipped: {e}")
 
@@ -588,6 +616,7 @@ async def build_topology(stix_path: str) -> dict:
 
     return {
         "topology_id": topology.get("id"),
+        "images_catalog_age_s": images_catalog_age_s,
         "primary_platform": topology.get("primary_platform"),
         "primary_platform_confidence": topology.get("primary_platform_confidence"),
         "host_count": len(hosts),
@@ -634,13 +663,11 @@ async def fuse_cti_bundles(stix_paths: list[str],
     CPEs, and normalized STIX names. Relationships are remapped to the
     surviving object IDs.
     """
-    from plugins.mcp.app.utilities.cti_fusion import fuse_bundles
-    from plugins.mcp.app.utilities.cti_topology_inference import build_range_topology
+    from plugins.mcp.app.utilities.cti_fusion import fuse_bundle_files
 
     if not stix_paths:
         return {"error": "stix_paths is required"}
 
-    bundles = []
     resolved_paths = []
     for raw in stix_paths:
         p = _resolve_pipeline_file(
@@ -649,103 +676,113 @@ async def fuse_cti_bundles(stix_paths: list[str],
         )
         if not p.is_file():
             return {"error": f"stix_path not found: {raw}"}
-        try:
-            bundle = json.loads(p.read_text(encoding="utf-8"))
-        except Exception as e:
-            return {"error": f"failed to parse STIX bundle {raw}: {e}"}
-        bundles.append(bundle)
         resolved_paths.append(p)
 
-    fused = fuse_bundles(bundles)
+    # Parsing, fusion and topology are CPU-bound; keep them off the event
+    # loop so the stdio reader stays responsive during large fusions.
+    # Inputs are fed to the engine one at a time (and spilled to disk past
+    # SPILL_INPUT_BYTES), so memory tracks the fused result, not the sum
+    # of the inputs.
+    try:
+        fused = await asyncio.to_thread(fuse_bundle_files, resolved_paths)
+    except ValueError as e:
+        return {"error": str(e)}
     digest = hashlib.sha256(
         "|".join(str(p) for p in resolved_paths).encode("utf-8")
     ).hexdigest()[:12]
     out_dir = resolved_paths[0].parent
     out_path = out_dir / f"fused-{digest}.stix.json"
     try:
-        out_path.write_text(
-            json.dumps(fused, indent=2, default=str), encoding="utf-8",
-        )
+        await asyncio.to_thread(_write_json, out_path, fused)
     except Exception as e:
         return {"error": f"failed to persist fused bundle: {e}"}
 
     topology_path = None
     topology_summary = None
+    images_catalog_age_s = None
     if build_topology_after_fuse:
-        taxonomy: dict = {}
-        try:
-            from plugins.mcp.app.utilities.cti_taxonomy_loader import (
-                load_mitre_taxonomy,
-                load_mitre_bundle,
-            )
-            taxonomy = load_mitre_taxonomy() or {}
-            try:
-                raw_bundle = load_mitre_bundle()
-                taxonomy["_raw_objects"] = raw_bundle.get("objects", []) or []
-            except Exception:
-                pass
-        except Exception as e:
-            log.warning(f"taxonomy load failed during fusion topology: {e}")
-
-        images_catalog = await _load_images_catalog()
-
-        topology = build_range_topology(fused, taxonomy, images_catalog)
-        try:
-            from plugins.mcp.app.cti_pipeline_stage4_topology import (
-                _adversary_candidates_from_bundle,
-                _enrich_topology_with_ae_plan,
-                _technique_ids_in_bundle,
-            )
-            from plugins.mcp.app.utilities.cti_ae_library_loader import (
-                discover_ae_plans,
-                find_plan_by_adversary,
-                parse_ae_plan,
-            )
-            plans = discover_ae_plans()
-            for cand in _adversary_candidates_from_bundle(fused, stem_hint=out_path.stem):
-                plan = find_plan_by_adversary(plans, cand)
-                if not plan:
-                    continue
-                ae_ir = parse_ae_plan(plan, taxonomy=taxonomy)
-                topology = _enrich_topology_with_ae_plan(
-                    topology, plan, ae_ir, _technique_ids_in_bundle(fused),
-                    images_catalog,
-                )
-                break
-        except Exception as e:
-            log.warning(f"AE plan topology enrichment skipped for fusion: {e}")
-        topo_dir = out_dir.parent / "outputs_topology"
-        topo_dir.mkdir(parents=True, exist_ok=True)
-        topology_path = topo_dir / f"fused-{digest}.topology.json"
-        topology_path.write_text(
-            json.dumps(topology, indent=2, default=str), encoding="utf-8",
+        images_catalog, images_catalog_age_s = await _load_images_catalog()
+        topology_path, topology_summary = await asyncio.to_thread(
+            _fused_topology, fused, out_path, digest, images_catalog,
         )
-        try:
-            from plugins.mcp.app.utilities.cti_knowledge_graph import (
-                persist_bundle_topology,
-            )
-            kg = persist_bundle_topology(fused, topology)
-        except Exception as e:
-            log.warning(f"knowledge graph persistence skipped for fusion: {e}")
-            kg = None
-        topology_summary = {
-            "topology_id": topology.get("id"),
-            "host_count": len(topology.get("hosts") or []),
-            "primary_platform": topology.get("primary_platform"),
-            "services": sorted({
-                svc
-                for h in topology.get("hosts") or []
-                for svc in (h.get("services") or [])
-            }),
-            "knowledge_graph": kg,
-        }
 
     return {
-        "source_count": len(bundles),
+        "source_count": len(resolved_paths),
         "object_count": len(fused.get("objects") or []),
         "saved_to": str(out_path),
         "topology_path": str(topology_path) if topology_path else None,
         "topology": topology_summary,
+        "images_catalog_age_s": images_catalog_age_s,
+    }
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+
+
+def _shared_taxonomy() -> dict:
+    """Memoized ATT&CK taxonomy snapshot, or {} when it cannot be loaded."""
+    try:
+        from plugins.mcp.app.utilities.cti_taxonomy_loader import load_taxonomy_snapshot
+        return load_taxonomy_snapshot()
+    except Exception as e:
+        log.warning(f"taxonomy load failed: {e}; proceeding without it")
+        return {}
+
+
+def _fused_topology(fused: dict, out_path: Path, digest: str,
+                    images_catalog: list) -> tuple[Path, dict]:
+    """Topology + AE enrichment + knowledge graph for a fused bundle (sync)."""
+    from plugins.mcp.app.utilities.cti_topology_inference import build_range_topology
+
+    taxonomy = _shared_taxonomy()
+    topology = build_range_topology(fused, taxonomy, images_catalog)
+    try:
+        from plugins.mcp.app.cti_pipeline_stage4_topology import (
+            _adversary_candidates_from_bundle,
+            _enrich_topology_with_ae_plan,
+            _technique_ids_in_bundle,
+        )
+        from plugins.mcp.app.utilities.cti_ae_library_loader import AEPlanMatcher
+        from plugins.mcp.app.utilities.cti_ae_plan_index import (
+            cached_ae_plans,
+            cached_parse_ae_plan,
+        )
+        plans = cached_ae_plans()
+        plan, match_why = AEPlanMatcher(plans, taxonomy).match_first(
+            _adversary_candidates_from_bundle(fused, stem_hint=out_path.stem)
+        )
+        if plan:
+            ae_ir = cached_parse_ae_plan(plan, taxonomy=taxonomy)
+            topology = _enrich_topology_with_ae_plan(
+                topology, plan, ae_ir, _technique_ids_in_bundle(fused),
+                images_catalog,
+            )
+            topology["x_ae_library_match"]["match"] = match_why
+    except Exception as e:
+        log.warning(f"AE plan topology enrichment skipped for fusion: {e}")
+    topo_dir = out_path.parent.parent / "outputs_topology"
+    topo_dir.mkdir(parents=True, exist_ok=True)
+    topology_path = topo_dir / f"fused-{digest}.topology.json"
+    _write_json(topology_path, topology)
+    try:
+        from plugins.mcp.app.utilities.cti_knowledge_graph import (
+            persist_bundle_topology,
+        )
+        kg = persist_bundle_topology(fused, topology)
+    except Exception as e:
+        log.warning(f"knowledge graph persistence skipped for fusion: {e}")
+        kg = None
+    return topology_path, {
+        "topology_id": topology.get("id"),
+        "host_count": len(topology.get("hosts") or []),
+        "primary_platform": topology.get("primary_platform"),
+        "services": sorted({
+            svc
+            for h in topology.get("hosts") or []
+            for svc in (h.get("services") or [])
+        }),
+        "knowledge_graph": kg,
     }
 
 
@@ -797,19 +834,19 @@ async def synthesize_deploy_spec_tool(
     ae_ir: Optional[dict] = None
     if ae_plan_slug:
         try:
-            from plugins.mcp.app.utilities.cti_ae_library_loader import (
-                discover_ae_plans,
-                find_plan_by_adversary,
-                parse_ae_plan,
+            from plugins.mcp.app.utilities.cti_ae_library_loader import find_plan_by_adversary
+            from plugins.mcp.app.utilities.cti_ae_plan_index import (
+                cached_ae_plans,
+                cached_parse_ae_plan,
             )
-            plans = discover_ae_plans()
+            plans = cached_ae_plans()
             plan = find_plan_by_adversary(plans, ae_plan_slug)
             if plan:
-                ae_ir = parse_ae_plan(plan, taxonomy=None)
+                ae_ir = cached_parse_ae_plan(plan, taxonomy=None)
         except Exception as e:
             log.warning(f"AE plan IR not loaded for slug {ae_plan_slug!r}: {e}")
 
-    images_catalog = await _load_images_catalog()
+    images_catalog, images_catalog_age_s = await _load_images_catalog()
 
     try:
         spec = synthesize_deploy_spec(
@@ -844,6 +881,7 @@ async def synthesize_deploy_spec_tool(
         "required_platforms_missing": spec.get("required_platforms_missing") or [],
         "operator_review": spec.get("operator_review") or {},
         "ae_plan_slug": ae_plan_slug,
+        "images_catalog_age_s": images_catalog_age_s,
         "saved_to": str(out_path),
     }
 
@@ -907,14 +945,15 @@ async def range_capabilities(provider: Optional[str] = None) -> dict:
     Provider names come from Range's live provider endpoint, which reads
     SUPPORTED_PROVIDERS, instead of from a static MCP-side list.
     """
-    providers_payload = await _range_get_json("/plugin/range/onprem/providers")
+    providers_payload, providers_age = await _cached_range_json("/plugin/range/onprem/providers")
     providers = providers_payload.get("providers") or []
     selected = (provider or "").strip()
     if not selected and providers:
         selected = str(providers[0].get("name") or providers[0].get("provider") or "")
 
-    images = await _range_api_images_catalog(selected) if selected else []
-    features = await _range_get_json("/plugin/range/onprem/features")
+    images, images_age = await _cached_range_images(selected) if selected else ([], 0.0)
+    features, features_age = await _cached_range_json("/plugin/range/onprem/features")
+    # Substrate status is live state, not catalog data: never cached.
     substrate = {}
     if selected == "microvm":
         substrate = await _range_get_json("/plugin/range/microvm/substrate-status")
@@ -926,16 +965,46 @@ async def range_capabilities(provider: Optional[str] = None) -> dict:
         "image_count": len(images),
         "features": features,
         "microvm_substrate": substrate,
+        "catalog_age_s": round(max(providers_age, images_age, features_age), 3),
     }
 
 
+# Set to False the first time the Range plugin answers the status stream
+# with an HTTP error or a non-SSE response, so later waits go straight to
+# polling. A stream that merely sits idle for poll_interval_s falls back to
+# polling for that wait only.
+_RANGE_STATUS_STREAM = "/plugin/range/onprem/deploy-status/stream"
+_range_stream_supported: Optional[bool] = None
+
+
+def _range_status_stream(body: dict, idle_timeout_s: float):
+    async def events():
+        global _range_stream_supported
+        try:
+            async for event in _HTTP.stream_events("POST", _RANGE_STATUS_STREAM, json=body,
+                                                   idle_timeout_s=idle_timeout_s):
+                _range_stream_supported = True
+                if isinstance(event, dict):
+                    yield event
+        except StreamIdle:
+            raise
+        except StreamUnsupported:
+            _range_stream_supported = False
+            raise
+    return events
+
+
 @mcp.tool(name="cti_pipeline_wait_for_range")
 async def wait_for_range(profile_name: str, provider: str = "microvm",
                          timeout_s: int = 1200,
-                         poll_interval_s: int = 15) -> dict:
-    """Poll Range deployment status until the range is ready or failed."""
-    import time as _time
-
+                         poll_interval_s: int = 15,
+                         ctx: Context = None) -> dict:
+    """
+    Wait until the range is ready or failed. Follows the Range status stream
+    when available, otherwise polls adaptively (1 s first, backing off to
+    ``poll_interval_s``, back to 1 s after each status change).
+    Status changes are sent to the client as progress notifications.
+    """
     if not profile_name:
         return {"error": "profile_name is required"}
     if timeout_s < 1:
@@ -943,57 +1012,27 @@ async def wait_for_range(profile_name: str, provider: str = "microvm",
     if poll_interval_s < 1:
         poll_interval_s = 1
 
-    terminal_ok = {"running", "ready", "complete", "completed", "success"}
-    terminal_bad = {"error", "failed", "failure"}
-    deadline = _time.time() + timeout_s
-    polls = 0
-    last: dict = {}
-
-    while _time.time() <= deadline:
-        polls += 1
-        last = await _range_post_json(
-            "/plugin/range/onprem/deploy-status",
-            {"profile": profile_name, "provider": provider or "microvm"},
-            timeout_s=15,
-        )
-        status = str(last.get("status") or "unknown").lower()
-        elapsed = int(timeout_s - max(0, deadline - _time.time()))
-        if status in terminal_ok:
-            return {
-                "profile": profile_name,
-                "provider": provider,
-                "status": status,
-                "ready": True,
-                "timed_out": False,
-                "elapsed_s": elapsed,
-                "polls": polls,
-                "last_status": last,
-            }
-        if status in terminal_bad:
-            return {
-                "profile": profile_name,
-                "provider": provider,
-                "status": status,
-                "ready": False,
-                "timed_out": False,
-                "elapsed_s": elapsed,
-                "polls": polls,
-                "last_status": last,
-                "error": last.get("error"),
-            }
-        await asyncio.sleep(poll_interval_s)
-
-    return {
-        "profile": profile_name,
-        "provider": provider,
-        "status": str(last.get("status") or "unknown").lower(),
-        "ready": False,
-        "timed_out": True,
-        "elapsed_s": timeout_s,
-        "polls": polls,
-        "last_status": last,
-        "error": f"range did not become ready within {timeout_s}s",
-    }
+    body = {"profile": profile_name, "provider": provider or "microvm"}
+
+    async def poll() -> dict:
+        return await _range_post_json("/plugin/range/onprem/deploy-status", body,
+                                      policy="range-status")
+
+    async def on_progress(elapsed_s: float, total_s: float, status: str) -> None:
+        if ctx is None:
+            return
+        await ctx.report_progress(elapsed_s, total_s)
+        await ctx.info(f"range {profile_name}: {status} after {int(elapsed_s)}s")
+
+    result = await wait_for_status(
+        poll,
+        timeout_s=timeout_s,
+        max_interval_s=poll_interval_s,
+        stream=(None if _range_stream_supported is False
+                else _range_status_stream(body, idle_timeout_s=poll_interval_s)),
+        on_progress=on_progress,
+    )
+    return {"profile": profile_name, "provider": provider, **result}
 
 
 @mcp.tool(name="cti_pipeline_import_ansible_feature")
@@ -1029,7 +1068,7 @@ async def import_ansible_feature(feature_name: str, main_yml: str,
 
     import aiohttp
 
-    url = _caldera_root().rstrip("/") + "/plugin/range/onprem/import-ansible-feature"
+    url = _HTTP.root() + "/plugin/range/onprem/import-ansible-feature"
     headers = {
         "KEY": _caldera_api_key(),
         "Accept": "application/json",
@@ -1058,26 +1097,20 @@ async def import_ansible_feature(feature_name: str, main_yml: str,
         )
 
     try:
-        async with aiohttp.ClientSession(headers=headers) as session:
-            async with session.post(
-                url,
-                data=form,
-                timeout=aiohttp.ClientTimeout(total=120),
-            ) as resp:
-                text = await resp.text()
-                try:
-                    payload = json.loads(text) if text else {}
-                except json.JSONDecodeError:
-                    payload = {"raw": text}
-                if resp.status >= 400:
-                    return {
-                        "error": f"feature import returned {resp.status}",
-                        "url": url,
-                        "response": payload,
-                    }
-                return payload
+        res = await _HTTP.request(
+            "POST", url, data=form, headers=headers,
+            policy=HTTP_POLICIES["range-import"],
+        )
     except Exception as e:
         return {"error": f"feature import request failed: {e}", "url": url}
+    if not res.ok:
+        return {
+            "error": f"feature import returned {res.status}",
+            "url": url,
+            "response": res.payload,
+        }
+    _CATALOG_CACHE.invalidate()
+    return res.payload
 
 
 @mcp.tool(name="cti_pipeline_deploy_range")
@@ -1113,16 +1146,12 @@ async def deploy_range(profile_name: str, deploy_spec: dict) -> dict:
     if not images:
         return {"error": "deploy_spec.images is empty - nothing to deploy"}
 
-    # Use aiohttp - we are inside an asyncio loop and the parent process
-    # already requires it.
-    import aiohttp
-
     # Auto-register the synthesised profile before deploying. The range
     # plugin's save-profile endpoint is idempotent (dedups by profile
     # name) so calling it on every deploy is safe and avoids the
     # "Profile 'X' not found" silent fail-loop. For microvm, we inject
     # the canonical timestone endpoint + db url so the provider boots.
-    save_url = _caldera_root().rstrip("/") + "/plugin/range/onprem/save-profile"
+    save_url = _HTTP.root() + "/plugin/range/onprem/save-profile"
     profile_yaml = (
         f"- profile: {profile_name}\n"
         f"  range: onprem\n"
@@ -1138,24 +1167,20 @@ async def deploy_range(profile_name: str, deploy_spec: dict) -> dict:
     else:
         profile_yaml += "  vars: {}\n"
     try:
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            async with session.post(
-                save_url,
-                json={"yaml": profile_yaml},
-                timeout=aiohttp.ClientTimeout(total=30),
-            ) as resp:
-                save_text = await resp.text()
-                if resp.status >= 400:
-                    # Profile registration failed — surface the error
-                    # immediately instead of letting deploy hit the
-                    # same "profile not found" trap.
-                    return {
-                        "error": f"profile register returned {resp.status}",
-                        "url": save_url,
-                        "response": save_text[:500],
-                    }
+        saved = await _HTTP.request(
+            "POST", save_url, json={"yaml": profile_yaml},
+            policy=HTTP_POLICIES["range-profile"],
+        )
     except Exception as e:
         return {"error": f"profile register request failed: {e}", "url": save_url}
+    if not saved.ok:
+        # Profile registration failed — surface the error immediately
+        # instead of letting deploy hit the same "profile not found" trap.
+        return {
+            "error": f"profile register returned {saved.status}",
+            "url": save_url,
+            "response": json.dumps(saved.payload)[:500],
+        }
 
     body = {
         "profile": profile_name,
@@ -1163,23 +1188,23 @@ async def deploy_range(profile_name: str, deploy_spec: dict) -> dict:
         "images": images,
     }
 
-    url = _caldera_root().rstrip("/") + "/plugin/range/onprem/manage/deploy"
+    url = _HTTP.root() + "/plugin/range/onprem/manage/deploy"
     try:
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            async with session.post(url, json=body, timeout=aiohttp.ClientTimeout(total=60)) as resp:
-                text = await resp.text()
-                try:
-                    payload = json.loads(text) if text else {}
-                except json.JSONDecodeError:
-                    payload = {"raw": text}
-                if resp.status >= 400:
-                    return {
-                        "error": f"range deploy returned {resp.status}",
-                        "url": url,
-                        "response": payload,
-                    }
+        res = await _HTTP.request("POST", url, json=body, policy=HTTP_POLICIES["range-deploy"])
     except Exception as e:
         return {"error": f"range deploy request failed: {e}", "url": url}
+    finally:
+        # Deploying may bootstrap images and features; drop cached catalogs
+        # whatever the outcome, once the POST has been handled, so a read
+        # racing the deploy cannot repopulate them with the old state.
+        _CATALOG_CACHE.invalidate()
+    payload = res.payload
+    if not res.ok:
+        return {
+            "error": f"range deploy returned {res.status}",
+            "url": url,
+            "response": payload,
+        }
 
     # Best-effort stack_id reconstruction mirrors sanitize_stack_id in
     # plugins/range/app/cdktf/cdktf_utilities.py - a slug-and-lowercase
@@ -1251,24 +1276,18 @@ async def run_operation(
         # already apply.
         body["_target_paws"] = list(agent_paws)
 
-    import aiohttp
     url = _caldera_base_url() + "operations"
     try:
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            async with session.post(url, json=body, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                text = await resp.text()
-                try:
-                    payload = json.loads(text) if text else {}
-                except json.JSONDecodeError:
-                    payload = {"raw": text}
-                if resp.status >= 400:
-                    return {
-                        "error": f"operation create returned {resp.status}",
-                        "url": url,
-                        "response": payload,
-                    }
+        res = await _HTTP.request("POST", url, json=body, policy=HTTP_POLICIES["caldera-operation"])
     except Exception as e:
         return {"error": f"operation create request failed: {e}", "url": url}
+    payload = res.payload
+    if not res.ok:
+        return {
+            "error": f"operation create returned {res.status}",
+            "url": url,
+            "response": payload,
+        }
 
     return {
         "operation_id": (payload or {}).get("id"),
@@ -1296,25 +1315,19 @@ async def validate_detections(operation_id: str) -> dict:
     if not operation_id:
         return {"error": "operation_id is required"}
 
-    import aiohttp
-    url = _caldera_root().rstrip("/") + "/plugin/detections/validate"
+    url = _HTTP.root() + "/plugin/detections/validate"
     body = {"operation_id": operation_id}
     try:
-        async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-            async with session.post(url, json=body, timeout=aiohttp.ClientTimeout(total=120)) as resp:
-                text = await resp.text()
-                try:
-                    payload = json.loads(text) if text else {}
-                except json.JSONDecodeError:
-                    payload = {"raw": text}
-                if resp.status >= 400:
-                    return {
-                        "error": f"validate returned {resp.status}",
-                        "url": url,
-                        "response": payload,
-                    }
+        res = await _HTTP.request("POST", url, json=body, policy=HTTP_POLICIES["detections-validate"])
     except Exception as e:
         return {"error": f"detections validate request failed: {e}", "url": url}
+    payload = res.payload
+    if not res.ok:
+        return {
+            "error": f"validate returned {res.status}",
+            "url": url,
+            "response": payload,
+        }
 
     # The detection_gui endpoint returns {results: [...], summary: {...}}.
     summary = (payload or {}).get("summary") or {}
@@ -1342,6 +1355,19 @@ async def validate_detections(operation_id: str) -> dict:
     }
 
 
+async def _fetch_agents() -> Optional[list]:
+    """Lean agent list for ``AgentWatcher`` (None when Caldera errored)."""
+    res = await _HTTP.request(
+        "GET", _caldera_base_url().rstrip("/") + "/agents",
+        params=[("include", f) for f in AGENT_FIELDS],
+        policy=HTTP_POLICIES["caldera-agents"],
+    )
+    if res.status != 200 or not isinstance(res.payload, list):
+        log.warning("wait_for_agents poll returned HTTP %s", res.status)
+        return None
+    return res.payload
+
+
 @mcp.tool(name="cti_pipeline_wait_for_agents")
 async def wait_for_agents(
     min_count: int = 1,
@@ -1351,15 +1377,18 @@ async def wait_for_agents(
 ) -> dict:
     """Block until at least ``min_count`` agents check into Caldera.
 
-    Wraps GET /api/v2/agents in a poll loop so the planner doesn't
-    have to choose between guessing-a-sleep and giving-up-on-empty-list.
-    Returns as soon as the threshold is met OR the deadline lapses.
+    Waits on a shared ``AgentWatcher`` over GET /api/v2/agents so the
+    planner doesn't have to choose between guessing-a-sleep and
+    giving-up-on-empty-list; concurrent calls for the same platforms
+    share one poll loop. Returns as soon as the threshold is met OR the
+    deadline lapses.
 
     Args:
         min_count: how many distinct agents (by paw) need to be present
             before the wait succeeds. Default 1.
         timeout_s: hard ceiling on total wait time. Default 600s.
-        poll_interval_s: seconds between polls. Default 30s.
+        poll_interval_s: longest gap between polls; polling starts at ~1s
+            and backs off to this. Default 30s.
         platforms: optional list of platform strings (e.g. ["windows",
             "linux"]) — only agents matching one of these count toward
             min_count. ``None`` (default) accepts any platform.
@@ -1367,57 +1396,20 @@ async def wait_for_agents(
     Returns:
         {agent_count, paws, hostnames, platforms, elapsed_s, timed_out}
     """
-    import aiohttp
-    import time as _time
     if min_count < 1:
         min_count = 1
     if timeout_s < 1:
         timeout_s = 1
     if poll_interval_s < 1:
         poll_interval_s = 1
-    wanted = set(p.lower() for p in (platforms or []) if isinstance(p, str))
-
-    url = _caldera_base_url().rstrip("/") + "/agents"
-    deadline = _time.time() + timeout_s
-    last_count = 0
-    last_paws: list = []
-    last_hosts: list = []
-    last_plats: list = []
-    while _time.time() < deadline:
-        try:
-            async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                    if resp.status == 200:
-                        agents = json.loads(await resp.text()) or []
-                        if wanted:
-                            agents = [a for a in agents
-                                      if (a.get("platform") or "").lower() in wanted]
-                        last_paws = [a.get("paw") for a in agents if a.get("paw")]
-                        last_hosts = [a.get("host") for a in agents if a.get("host")]
-                        last_plats = sorted({(a.get("platform") or "").lower()
-                                              for a in agents if a.get("platform")})
-                        last_count = len(last_paws)
-                        if last_count >= min_count:
-                            return {
-                                "agent_count": last_count,
-                                "paws": last_paws,
-                                "hostnames": last_hosts,
-                                "platforms": last_plats,
-                                "elapsed_s": int(timeout_s - max(0, deadline - _time.time())),
-                                "timed_out": False,
-                            }
-        except Exception as e:
-            log.warning("wait_for_agents poll error: %r", e)
-        await asyncio.sleep(poll_interval_s)
-    return {
-        "agent_count": last_count,
-        "paws": last_paws,
-        "hostnames": last_hosts,
-        "platforms": last_plats,
-        "elapsed_s": timeout_s,
-        "timed_out": True,
-        "error": f"only {last_count} agents checked in within {timeout_s}s (wanted {min_count})",
-    }
+    wanted = frozenset(p.lower() for p in (platforms or []) if isinstance(p, str))
+
+    watcher = watcher_for(wanted, _fetch_agents, platforms=wanted)
+    out = await watcher.wait(min_count, timeout_s, max_interval_s=poll_interval_s)
+    if out["timed_out"]:
+        out["error"] = (f"only {out['agent_count']} agents checked in within "
+                        f"{timeout_s}s (wanted {min_count})")
+    return out
 
 
 @mcp.tool(name="cti_pipeline_apply_features")
@@ -1454,7 +1446,6 @@ async def apply_features(
         {results: [{vm_name, features, ok, response, error?}, ...],
          total_vms, succeeded, failed}
     """
-    import aiohttp
     if not profile_name:
         return {"error": "profile_name is required"}
     vm_features = dict(vm_features or {})
@@ -1501,44 +1492,36 @@ async def apply_features(
             "note": "no features to apply (no windows VMs and no explicit vm_features)",
         }
 
-    url = _caldera_root().rstrip("/") + "/plugin/range/onprem/add-features-to-vm"
+    url = _HTTP.root() + "/plugin/range/onprem/add-features-to-vm"
     results = []
     succeeded = 0
     failed = 0
-    async with aiohttp.ClientSession(headers=_caldera_headers()) as session:
-        for vm_name, features in vm_features.items():
-            if not features:
-                continue
-            body = {
-                "profile": profile_name,
-                "provider": provider,
-                "vm_name": vm_name,
-                "new_features": list(features),
-            }
-            entry = {"vm_name": vm_name, "features": list(features)}
-            try:
-                async with session.post(
-                    url, json=body,
-                    timeout=aiohttp.ClientTimeout(total=900),
-                ) as resp:
-                    text = await resp.text()
-                    try:
-                        payload = json.loads(text) if text else {}
-                    except json.JSONDecodeError:
-                        payload = {"raw": text}
-                    if resp.status >= 400:
-                        entry["ok"] = False
-                        entry["error"] = (payload or {}).get("error") or f"HTTP {resp.status}"
-                        failed += 1
-                    else:
-                        entry["ok"] = True
-                        entry["response"] = payload
-                        succeeded += 1
-            except Exception as e:
+    for vm_name, features in vm_features.items():
+        if not features:
+            continue
+        body = {
+            "profile": profile_name,
+            "provider": provider,
+            "vm_name": vm_name,
+            "new_features": list(features),
+        }
+        entry = {"vm_name": vm_name, "features": list(features)}
+        try:
+            res = await _HTTP.request("POST", url, json=body, policy=HTTP_POLICIES["range-features"])
+            payload = res.payload
+            if not res.ok:
                 entry["ok"] = False
-                entry["error"] = str(e)
+                entry["error"] = (payload or {}).get("error") or f"HTTP {res.status}"
                 failed += 1
-            results.append(entry)
+            else:
+                entry["ok"] = True
+                entry["response"] = payload
+                succeeded += 1
+        except Exception as e:
+            entry["ok"] = False
+            entry["error"] = str(e)
+            failed += 1
+        results.append(entry)
 
     return {
         "results": results,
@@ -1548,6 +1531,135 @@ async def apply_features(
     }
 
 
+# ---------------------------------------------------------------------------
+# Knowledge-graph tools
+# ---------------------------------------------------------------------------
+# Cross-report questions answered from the persisted SQLite graph
+# (cti_knowledge_graph) with indexed SQL / recursive CTEs, instead of
+# re-reading and re-fusing bundles. Node arguments accept a canonical key,
+# ATT&CK technique ID, STIX id or node name. List results are paged:
+# pass the returned next_offset back as offset to continue.
+
+def _kg():
+    from plugins.mcp.app.utilities import cti_knowledge_graph
+    return cti_knowledge_graph
+
+
+@mcp.tool(name="cti_pipeline_graph_query")
+async def graph_query(query: str = "", node_type: str = "",
+                      limit: int = 50, offset: int = 0) -> dict:
+    """Search knowledge-graph nodes accumulated across every ingested report.
+
+    Args:
+        query: case-insensitive substring of the node name (empty = any).
+        node_type: STIX / topology type filter, e.g. "threat-actor",
+            "attack-pattern", "x-cti-range-host", "service".
+        limit, offset: page size and start; follow next_offset.
+
+    Returns:
+        {items: [{key, type, name, stix_id, first_seen, last_seen}],
+        offset, count, next_offset}
+    """
+    kg = _kg()
+    return await asyncio.to_thread(
+        kg.paginate,
+        lambda lim, off: kg.find_nodes(query or None, node_type or None, limit=lim, offset=off),
+        offset, limit,
+    )
+
+
+@mcp.tool(name="cti_pipeline_graph_neighbors")
+async def graph_neighbors(node: str, direction: str = "both",
+                          relationship_type: str = "",
+                          limit: int = 50, offset: int = 0) -> dict:
+    """List nodes one edge away from ``node`` across all reports.
+
+    Args:
+        node: canonical key, technique ID, STIX id or name.
+        direction: "out", "in" or "both".
+        relationship_type: optional filter, e.g. "uses", "targets".
+        limit, offset: page size and start; follow next_offset.
+
+    Returns:
+        {node, items: [{key, type, name, relationship_type, direction,
+        count}], offset, count, next_offset}
+    """
+    kg = _kg()
+    key = await asyncio.to_thread(kg.resolve_key, node)
+    if key is None:
+        return {"error": f"node not found in knowledge graph: {node}"}
+    try:
+        page = await asyncio.to_thread(
+            kg.paginate,
+            lambda lim, off: kg.neighbors(
+                key, direction=direction,
+                relationship_type=relationship_type or None,
+                limit=lim, offset=off,
+            ),
+            offset, limit,
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"node": key, **page}
+
+
+@mcp.tool(name="cti_pipeline_graph_path")
+async def graph_path(source: str, target: str, max_hops: int = 4,
+                     relationship_types: Optional[list[str]] = None) -> dict:
+    """Shortest connection between two nodes across all reports.
+
+    Answers questions such as "how does this actor reach that host".
+
+    Args:
+        source, target: canonical key, technique ID, STIX id or name.
+        max_hops: search depth (capped at 6).
+        relationship_types: optional list restricting which edges count.
+
+    Returns:
+        {found, hops, nodes: [...], edges: [{source, target,
+        relationship_type, count}]}
+    """
+    kg = _kg()
+    src = await asyncio.to_thread(kg.resolve_key, source)
+    dst = await asyncio.to_thread(kg.resolve_key, target)
+    missing = [ref for ref, key in ((source, src), (target, dst)) if key is None]
+    if missing:
+        return {"error": f"node not found in knowledge graph: {', '.join(missing)}"}
+    path = await asyncio.to_thread(
+        kg.shortest_path, src, dst,
+        max_hops=max(0, min(int(max_hops or 4), 6)),
+        relationship_types=relationship_types or None,
+    )
+    if path is None:
+        return {"found": False, "source": src, "target": dst}
+    return {"found": True, **path}
+
+
+@mcp.tool(name="cti_pipeline_graph_techniques")
+async def graph_techniques(technique_ids: Optional[list[str]] = None,
+                           limit: int = 25, offset: int = 0) -> dict:
+    """Aggregate the knowledge graph by ATT&CK technique.
+
+    For each technique: how often it was observed, which kinds of
+    objects use it, and which range hosts it reaches (within 3 hops).
+    Ordered most-observed first.
+
+    Args:
+        technique_ids: optional list such as ["T1021.002", "T1059"].
+        limit, offset: page size and start; follow next_offset.
+
+    Returns:
+        {items: [{technique_id, name, observations, degree,
+        neighbors_by_type, hosts}], offset, count, next_offset}
+    """
+    kg = _kg()
+    return await asyncio.to_thread(
+        kg.paginate,
+        lambda lim, off: kg.technique_aggregates(technique_ids or None, limit=lim, offset=off),
+        offset, limit,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
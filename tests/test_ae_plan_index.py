@@ -0,0 +1,125 @@
+"""Tests for utilities/cti_ae_plan_index.py — persisted AE plan index."""
+
+import json
+import os
+
+
+def _library(root):
+    plan = root / "adversary_emulation_library" / "fin7" / "Emulation_Plan"
+    plan.mkdir(parents=True)
+    (plan / "Scenario.md").write_text(
+        "# Scenario\n\nHost `hrmgr` (10.0.1.5) runs mimikatz.exe for T1003.001.\n",
+        encoding="utf-8",
+    )
+    return root
+
+
+class TestAEPlanIndex:
+    def test_plans_and_ir_persist_and_match_uncached(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_ae_library_loader import discover_ae_plans, parse_ae_plan
+        from plugins.mcp.app.utilities.cti_ae_plan_index import AEPlanIndex, INDEX_FILE
+
+        root = _library(tmp_path)
+        index = AEPlanIndex(root)
+        plans = index.plans()
+        assert plans == discover_ae_plans(root)
+        ir = index.parse(plans[0])
+        assert json.dumps(ir, sort_keys=True) == json.dumps(parse_ae_plan(plans[0]), sort_keys=True)
+        index.flush()
+        assert (root / INDEX_FILE).is_file()
+
+        reloaded = AEPlanIndex(root)
+        assert reloaded._plans_fresh()
+        assert reloaded.plans() == plans
+        assert reloaded.parse(plans[0]) == ir
+
+    def test_library_changes_invalidate(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_ae_plan_index import AEPlanIndex
+
+        root = _library(tmp_path)
+        index = AEPlanIndex(root)
+        plan = index.plans()[0]
+        assert "T1003.001" in [a["id"] for a in index.parse(plan)["attack_patterns"]]
+
+        scenario = plan["scenario_md_path"]
+        text = scenario.read_text(encoding="utf-8")
+        st = scenario.stat()
+        scenario.write_text(text, encoding="utf-8")
+        os.utime(scenario, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert AEPlanIndex(root).parse(plan) == index.parse(plan)
+
+        scenario.write_text(text + "Then T1059.001.\n", encoding="utf-8")
+        assert "T1059.001" in [a["id"] for a in AEPlanIndex(root).parse(plan)["attack_patterns"]]
+
+        (root / "adversary_emulation_library" / "apt29" / "Emulation_Plan").mkdir(parents=True)
+        assert {p["adversary"] for p in AEPlanIndex(root).plans()} == {"fin7", "apt29"}
+
+    def test_saves_are_batched_and_merge_other_writers(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_ae_plan_index import AEPlanIndex, INDEX_FILE
+
+        root = _library(tmp_path)
+        other = root / "adversary_emulation_library" / "apt29" / "Emulation_Plan"
+        other.mkdir(parents=True)
+        (other / "Scenario.md").write_text("# Scenario\n\nT1059.001 on `dc01`.\n", encoding="utf-8")
+
+        plans = {p["adversary"]: p for p in AEPlanIndex(root).plans()}
+        # Two workers, each with the index loaded before the other wrote.
+        a, b = AEPlanIndex(root), AEPlanIndex(root)
+        a.parse(plans["fin7"])
+        b.parse(plans["apt29"])
+
+        def parsed_on_disk():
+            return json.loads((root / INDEX_FILE).read_text(encoding="utf-8"))["parsed"]
+
+        assert parsed_on_disk() == {}
+        a.flush()
+        b.flush()
+        assert {k.split("|")[0] for k in parsed_on_disk()} == {"ctid/fin7", "ctid/apt29"}
+        assert AEPlanIndex(root)._plans_fresh()
+
+
+def _plans():
+    from pathlib import Path
+
+    return [
+        {"adversary": slug, "library": "ctid", "plan_dir": Path("/lib") / slug}
+        for slug in ("alphv_blackcat", "apt29", "fin7", "wizard_spider")
+    ]
+
+
+class TestAEPlanMatcher:
+    def test_matches_like_find_plan_by_adversary(self):
+        from plugins.mcp.app.utilities.cti_ae_library_loader import AEPlanMatcher, find_plan_by_adversary
+
+        plans = _plans()
+        matcher = AEPlanMatcher(plans)
+        for cand in ("APT29", "blackcat", "Wizard Spider", "fin7-2023-campaign", "lazarus", ""):
+            assert matcher.match(cand)[0] is find_plan_by_adversary(plans, cand)
+        plan, why = matcher.match("blackcat")
+        assert why["method"] == "substring" and why["key"] == "alphv_blackcat"
+        assert why["plan"] == "ctid/alphv_blackcat"
+
+    def test_attack_aliases_and_trigram_fallback(self):
+        from plugins.mcp.app.utilities.cti_ae_library_loader import AEPlanMatcher
+
+        taxonomy = {"groups": {"intrusion-set--1": {
+            "name": "APT29", "aliases": ["APT29", "Cozy Bear", "NOBELIUM"]}}}
+        matcher = AEPlanMatcher(_plans(), taxonomy)
+        plan, why = matcher.match_first(["Unknown Actor", "Cozy Bear"])
+        assert plan["adversary"] == "apt29"
+        assert why["candidate"] == "Cozy Bear" and why["method"] == "exact"
+        assert why["key_kind"] == "attack-alias"
+
+        plan, why = matcher.match("Wizzard Spider")
+        assert plan["adversary"] == "wizard_spider"
+        assert why["method"] == "trigram" and why["score"] > matcher.fuzzy_threshold
+        assert matcher.match("Sandworm")[0] is None
+        assert matcher.match("Wizard Spyder") == (None, None)  # 0.538: too weak
+
+    def test_numbered_names_never_fuzzy_match_a_sibling(self):
+        from plugins.mcp.app.utilities.cti_ae_library_loader import AEPlanMatcher
+
+        matcher = AEPlanMatcher(_plans(), fuzzy_threshold=0.1)
+        assert matcher.match("APT28") == (None, None)
+        assert matcher.match("FIN6") == (None, None)
+        assert matcher.match("APT-29")[0]["adversary"] == "apt29"
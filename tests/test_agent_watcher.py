@@ -0,0 +1,76 @@
+"""Tests for utilities/agent_watcher.py — shared adaptive agent check-in watcher."""
+
+import asyncio
+
+import pytest
+
+
+def _agent(paw, platform="linux", host=None):
+    return {"paw": paw, "platform": platform, "host": host or f"h-{paw}"}
+
+
+class _Fetcher:
+    """Returns the next agent list on each call; repeats the last one."""
+
+    def __init__(self, *lists):
+        self.lists = list(lists)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.lists[min(self.calls, len(self.lists)) - 1]
+
+
+class TestAgentWatcher:
+    @pytest.mark.asyncio
+    async def test_returns_when_threshold_met_with_backoff_and_platform_filter(self):
+        from plugins.mcp.app.utilities.agent_watcher import AgentWatcher
+
+        sleeps = []
+
+        async def sleep(delay):
+            sleeps.append(delay)
+            await asyncio.sleep(0)
+
+        fetch = _Fetcher([], [], [_agent("a"), _agent("w", "windows")], [_agent("a")],
+                         [_agent("a"), _agent("b")])
+        watcher = AgentWatcher(fetch, platforms=["Linux"], sleep=sleep)
+        out = await watcher.wait(min_count=2, timeout_s=5, max_interval_s=3)
+        assert out["timed_out"] is False
+        assert sorted(out["paws"]) == ["a", "b"] and out["platforms"] == ["linux"]
+        # 1, 2 while empty; reset on "a" appearing; 2 with no change; reset again.
+        assert sleeps[:4] == [1, 2, 1, 2]
+        await asyncio.sleep(0)
+        assert watcher._task is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_waiters_share_one_poll_loop_and_push_wakes_them(self):
+        from plugins.mcp.app.utilities.agent_watcher import AgentWatcher
+
+        fetch = _Fetcher([_agent("a")])
+        watcher = AgentWatcher(fetch, initial_interval_s=60)
+        one = asyncio.ensure_future(watcher.wait(1, timeout_s=5))
+        two = asyncio.ensure_future(watcher.wait(2, timeout_s=5))
+        first = await one
+        assert first["agent_count"] == 1 and not two.done()
+
+        assert await watcher.push([_agent("b"), {"platform": "linux"}]) is True
+        second = await two
+        assert second["agent_count"] == 2 and second["timed_out"] is False
+        assert fetch.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_reports_last_set(self):
+        from plugins.mcp.app.utilities.agent_watcher import AgentWatcher
+
+        watcher = AgentWatcher(_Fetcher([_agent("a")]), initial_interval_s=0.01)
+        out = await watcher.wait(3, timeout_s=0.05, max_interval_s=0.01)
+        assert out["timed_out"] is True and out["elapsed_s"] == 0.05
+        assert out["paws"] == ["a"]
+
+    def test_watcher_for_reuses_instance_per_key(self):
+        from plugins.mcp.app.utilities.agent_watcher import watcher_for
+
+        fetch = _Fetcher([])
+        key = ("test", frozenset({"linux"}))
+        assert watcher_for(key, fetch, ["linux"]) is watcher_for(key, fetch, ["linux"])
@@ -0,0 +1,153 @@
+"""Tests for utilities/caldera_http.py — pooled Caldera/Range client."""
+
+import asyncio
+
+import pytest
+
+
+async def _server():
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    hits = {"flaky": 0}
+
+    async def ok(request):
+        return web.json_response({"key": request.headers.get("KEY"),
+                                  "provider": request.query.get("provider")})
+
+    async def flaky(request):
+        hits["flaky"] += 1
+        if hits["flaky"] == 1:
+            return web.Response(status=503)
+        return web.json_response({"attempt": hits["flaky"]})
+
+    async def missing(request):
+        return web.Response(status=404, text="nope")
+
+    async def login_page(request):
+        return web.Response(status=200, text="<html>sign in</html>", content_type="text/html")
+
+    async def events(request):
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        await resp.write(b'data: {"status": "deploying"}\n\ndata: {"status":\ndata: "ready"}\n\n')
+        if request.query.get("stall"):
+            await asyncio.sleep(30)
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/ok", ok)
+    app.router.add_post("/events", events)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_post("/missing", missing)
+    app.router.add_get("/proxy/ok", login_page)
+    server = TestServer(app)
+    await server.start_server()
+    return server, hits
+
+
+class TestCalderaHTTP:
+    @pytest.mark.asyncio
+    async def test_falls_back_to_live_root_and_remembers_it(self):
+        from plugins.mcp.app.utilities.caldera_http import CalderaHTTP, Policy
+
+        server, _ = await _server()
+        live = str(server.make_url("")).rstrip("/")
+        http = CalderaHTTP(roots=lambda: ["http://127.0.0.1:9", live + "/"],
+                           headers=lambda: {"KEY": "k"})
+        try:
+            res = await http.request_root("GET", "/ok", params={"provider": "microvm"},
+                                          policy=Policy(timeout_s=2))
+            assert res.status == 200 and res.payload == {"key": "k", "provider": "microvm"}
+            assert http.good_root == live and http.root() == live
+            session = await http.session()
+            await http.request_root("GET", "/ok")
+            assert await http.session() is session
+
+            res = await http.request_root("POST", "/missing")
+            assert res.status == 404 and res.payload == {"raw": "nope"} and not res.ok
+            assert await http.request_root("POST", "/missing", require_ok=True) is None
+        finally:
+            await http.close()
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_require_json_skips_non_json_roots_without_pinning_them(self):
+        from plugins.mcp.app.utilities.caldera_http import CalderaHTTP
+
+        server, _ = await _server()
+        live = str(server.make_url("")).rstrip("/")
+        http = CalderaHTTP(roots=lambda: [live + "/proxy", live], headers=dict)
+        try:
+            res = await http.request_root("GET", "/ok", require_ok=True)
+            assert res.payload == {"raw": "<html>sign in</html>"} and not res.is_json
+            assert http.good_root == live + "/proxy"
+
+            http.good_root = None
+            res = await http.request_root("GET", "/ok", require_ok=True, require_json=True)
+            assert res.is_json and res.payload == {"key": None, "provider": None}
+            assert http.good_root == live
+        finally:
+            await http.close()
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_5xx_only_when_policy_allows(self):
+        from plugins.mcp.app.utilities.caldera_http import CalderaHTTP, Policy
+
+        server, hits = await _server()
+        http = CalderaHTTP(roots=lambda: [str(server.make_url(""))], headers=dict)
+        try:
+            url = str(server.make_url("/flaky"))
+            assert (await http.request("GET", url, policy=Policy(retries=0))).status == 503
+            hits["flaky"] = 0
+            res = await http.request("GET", url, policy=Policy(retries=1, backoff_s=0))
+            assert res.status == 200 and res.payload == {"attempt": 2}
+        finally:
+            await http.close()
+            await server.close()
+
+
+class TestStreamEvents:
+    @pytest.mark.asyncio
+    async def test_parses_events_and_rejects_non_sse_or_idle_streams(self):
+        from plugins.mcp.app.utilities.caldera_http import CalderaHTTP, StreamIdle, StreamUnsupported
+
+        server, _ = await _server()
+        http = CalderaHTTP(roots=lambda: [str(server.make_url(""))], headers=dict)
+        try:
+            events = [e async for e in http.stream_events("POST", "/events")]
+            assert events == [{"status": "deploying"}, {"status": "ready"}]
+
+            with pytest.raises(StreamUnsupported) as unsupported:
+                [e async for e in http.stream_events("POST", "/missing")]
+            assert not isinstance(unsupported.value, StreamIdle)
+
+            seen = []
+            with pytest.raises(StreamIdle, match="no data"):
+                async for e in http.stream_events("POST", "/events?stall=1", idle_timeout_s=0.2):
+                    seen.append(e)
+            assert len(seen) == 2
+        finally:
+            await http.close()
+            await server.close()
+
+
+class TestRequestStats:
+    def test_counts_and_histograms_stay_keyed_by_resource(self):
+        from plugins.mcp.app.utilities.caldera_http import LATENCY_BUCKETS_S, RequestStats
+
+        stats = RequestStats()
+        for i in range(50):
+            stats.record("GET", f"abilities/{i}", 200, 0.07)
+        stats.record("GET", "/abilities", 404, 0.01)
+        stats.record("POST", "operations/x/links", None, 99.0)
+
+        assert len(stats.counts) == 3 and len(stats.latency) == 2
+        assert stats.counts[("GET", "abilities", 200)] == 50
+        assert stats.counts[("POST", "operations", "error")] == 1
+        hist = stats.latency[("GET", "abilities")]
+        assert len(hist) == len(LATENCY_BUCKETS_S) + 1
+        assert hist[0] == 1 and hist[1] == 50
+        assert stats.latency[("POST", "operations")][-1] == 1
+        assert stats.snapshot()["latency"]["GET abilities"] == hist
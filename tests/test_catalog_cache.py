@@ -0,0 +1,127 @@
+"""Tests for utilities/catalog_cache.py — TTL + stale-while-revalidate cache."""
+
+import asyncio
+
+import pytest
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    @pytest.mark.asyncio
+    async def test_fresh_stale_and_expired(self):
+        from plugins.mcp.app.utilities.catalog_cache import TTLCache
+
+        clock = _Clock()
+        cache = TTLCache(ttl_s=10, stale_s=100, clock=clock)
+        calls = []
+
+        async def load():
+            calls.append(clock.now)
+            return len(calls)
+
+        assert await cache.get("k", load) == (1, 0.0)
+        clock.now += 5
+        assert await cache.get("k", load) == (1, 5.0)
+
+        # Stale: old value served at once, one refresh in the background.
+        clock.now += 10
+        assert await cache.get("k", load) == (1, 15.0)
+        assert await cache.get("k", load) == (1, 15.0)
+        await asyncio.sleep(0)
+        assert len(calls) == 2
+        assert await cache.get("k", load) == (2, 0.0)
+
+        clock.now += 500
+        assert await cache.get("k", load) == (3, 0.0)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load_and_invalidate_drops_inflight(self):
+        from plugins.mcp.app.utilities.catalog_cache import TTLCache
+
+        cache = TTLCache(ttl_s=10, stale_s=10)
+        gate = asyncio.Event()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await gate.wait()
+            return "v"
+
+        first = asyncio.ensure_future(cache.get("k", load))
+        second = asyncio.ensure_future(cache.get("k", load))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        gate.set()
+        assert [v for v, _ in await asyncio.gather(first, second)] == ["v", "v"]
+        assert len(calls) == 1
+        assert cache.age("k") is None
+
+    @pytest.mark.asyncio
+    async def test_get_after_invalidate_does_not_join_the_old_load(self):
+        from plugins.mcp.app.utilities.catalog_cache import TTLCache
+
+        cache = TTLCache(ttl_s=10, stale_s=10)
+        old_gate = asyncio.Event()
+
+        async def old_load():
+            await old_gate.wait()
+            return "old"
+
+        async def new_load():
+            return "new"
+
+        first = asyncio.ensure_future(cache.get("k", old_load))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        assert await asyncio.wait_for(cache.get("k", new_load), 1) == ("new", 0.0)
+        old_gate.set()
+        assert (await first)[0] == "old"
+        # The superseded load neither overwrote the entry nor cleared the new one.
+        assert await cache.get("k", old_load) == ("new", pytest.approx(0.0, abs=1))
+
+    @pytest.mark.asyncio
+    async def test_failed_loads_are_not_cached(self):
+        from plugins.mcp.app.utilities.catalog_cache import CatalogUnavailable, TTLCache
+
+        clock = _Clock()
+        cache = TTLCache(ttl_s=10, stale_s=100, clock=clock)
+        up = [False]
+
+        async def load():
+            if not up[0]:
+                raise CatalogUnavailable("range down")
+            return ["img"]
+
+        with pytest.raises(CatalogUnavailable):
+            await cache.get("k", load)
+        assert cache.age("k") is None
+        up[0] = True
+        assert await cache.get("k", load) == (["img"], 0.0)
+
+        # A failed background refresh keeps serving the stale value.
+        up[0] = False
+        clock.now += 20
+        assert await cache.get("k", load) == (["img"], 20.0)
+        await asyncio.sleep(0)
+        assert await cache.get("k", load) == (["img"], 20.0)
+
+    def test_sync_get_and_invalidate(self):
+        from plugins.mcp.app.utilities.catalog_cache import TTLCache
+
+        clock = _Clock()
+        cache = TTLCache(ttl_s=10, stale_s=0, clock=clock)
+        values = iter(["a", "b", "c"])
+        assert cache.get_sync("k", lambda: next(values)) == ("a", 0.0)
+        clock.now += 3
+        assert cache.get_sync("k", lambda: next(values)) == ("a", 3.0)
+        cache.invalidate("k")
+        assert cache.get_sync("k", lambda: next(values)) == ("b", 0.0)
+        clock.now += 11
+        assert cache.get_sync("k", lambda: next(values)) == ("c", 0.0)
@@ -296,3 +296,238 @@ def test_knowledge_graph_persists_to_sqlite(tmp_path):
     result = persist_bundle_topology(bundle, topology, db_path=tmp_path / "kg.sqlite")
     assert result["nodes_seen"] >= 2
     assert (tmp_path / "kg.sqlite").is_file()
+
+
+def test_knowledge_graph_read_api(tmp_path):
+    from plugins.mcp.app.utilities import cti_knowledge_graph as kg
+
+    actor = {"type": "threat-actor", "id": "threat-actor--1", "name": "ALPHV"}
+    tool = {"type": "tool", "id": "tool--1", "name": "PsExec"}
+    tech = {
+        "type": "attack-pattern", "id": "attack-pattern--1", "name": "SMB/Windows Admin Shares",
+        "external_references": [{"source_name": "mitre-attack", "external_id": "T1021.002"}],
+    }
+    infra = {"type": "infrastructure", "id": "infrastructure--1", "name": "File server"}
+    rels = [
+        {"type": "relationship", "id": "relationship--1", "relationship_type": "uses",
+         "source_ref": actor["id"], "target_ref": tool["id"]},
+        {"type": "relationship", "id": "relationship--2", "relationship_type": "uses",
+         "source_ref": tool["id"], "target_ref": tech["id"]},
+        {"type": "relationship", "id": "relationship--3", "relationship_type": "targets",
+         "source_ref": tool["id"], "target_ref": infra["id"]},
+    ]
+    bundle = {"type": "bundle", "objects": [actor, tool, tech, infra, *rels]}
+    topology = {
+        "hosts": [{"name": "fs01", "ip": "10.0.0.5", "stix_id": infra["id"]}],
+        "network_edges": [{"service": "smb", "protocol": "tcp", "port": 445,
+                           "host_refs": [infra["id"], infra["id"]]}],
+    }
+    db = tmp_path / "kg.sqlite"
+    result = kg.persist_bundle_topology(bundle, topology, db_path=db)
+    assert result["edges_seen"] == 6
+
+    tool_key = kg.canonical_key(tool)
+    out = {(n["name"], n["direction"]) for n in kg.neighbors(tool_key, db_path=db)}
+    assert ("ALPHV", "in") in out and ("SMB/Windows Admin Shares", "out") in out
+    assert [n["name"] for n in kg.neighbors(tool_key, db_path=db, direction="out",
+                                            relationship_type="targets")] == ["File server"]
+
+    sub = kg.k_hop(kg.canonical_key(actor), k=1, db_path=db)
+    assert {n["name"] for n in sub["nodes"]} == {"ALPHV", "PsExec"}
+    assert sub["edges"][0]["relationship_type"] == "uses"
+
+    hosts = kg.hosts_for_technique("t1021.002", db_path=db)
+    assert [h["name"] for h in hosts] == ["fs01"] and hosts[0]["depth"] == 3
+    assert [n["name"] for n in kg.nodes_by_type("service", db_path=db)] == ["smb:tcp:445"]
+
+    # Re-ingesting bumps edge counts instead of duplicating rows
+    kg.persist_bundle_topology(bundle, topology, db_path=db)
+    counts = {n["relationship_type"]: n["count"] for n in kg.neighbors(tool_key, db_path=db)}
+    assert counts["uses"] == 2
+    assert kg.neighbors("missing", db_path=tmp_path / "none.sqlite") == []
+    assert not (tmp_path / "none.sqlite").exists()
+
+
+def test_knowledge_graph_read_connection_is_query_only(tmp_path):
+    import sqlite3
+
+    from plugins.mcp.app.utilities import cti_knowledge_graph as kg
+
+    db = tmp_path / "kg.sqlite"
+    kg.persist_bundle_topology({"type": "bundle", "objects": []}, {}, db_path=db)
+    conn = kg._read(db)
+    try:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE IF NOT EXISTS scratch (x)")
+    finally:
+        conn.close()
+
+
+def test_knowledge_graph_cross_report_queries(tmp_path):
+    from plugins.mcp.app.utilities import cti_knowledge_graph as kg
+
+    tech = {
+        "type": "attack-pattern", "id": "attack-pattern--1", "name": "PowerShell",
+        "external_references": [{"source_name": "mitre-attack", "external_id": "T1059.001"}],
+    }
+    db = tmp_path / "kg.sqlite"
+    # Two reports: each ties a different actor to the same technique
+    for i, actor_name in enumerate(["ALPHV", "FIN7"]):
+        actor = {"type": "threat-actor", "id": f"threat-actor--{i}", "name": actor_name}
+        infra = {"type": "infrastructure", "id": f"infrastructure--{i}", "name": f"Server {i}"}
+        bundle = {"type": "bundle", "objects": [
+            actor, tech, infra,
+            {"type": "relationship", "id": f"relationship--a{i}", "relationship_type": "uses",
+             "source_ref": actor["id"], "target_ref": tech["id"]},
+            {"type": "relationship", "id": f"relationship--b{i}", "relationship_type": "targets",
+             "source_ref": actor["id"], "target_ref": infra["id"]},
+        ]}
+        topology = {"hosts": [{"name": f"host{i}", "stix_id": infra["id"]}]}
+        kg.persist_bundle_topology(bundle, topology, db_path=db)
+
+    assert kg.resolve_key("T1059.001", db_path=db) == "attack:T1059.001"
+    assert kg.resolve_key("fin7", db_path=db) == "threat-actor:fin7"
+
+    path = kg.shortest_path("threat-actor:alphv", kg.resolve_key("host1", db_path=db), db_path=db)
+    assert [n["name"] for n in path["nodes"]] == ["ALPHV", "PowerShell", "FIN7", "Server 1", "host1"]
+    assert kg.shortest_path("threat-actor:alphv", "threat-actor:fin7", db_path=db, max_hops=1) is None
+
+    [agg] = kg.technique_aggregates(["t1059.001"], db_path=db)
+    assert agg["observations"] == 2 and agg["neighbors_by_type"] == {"threat-actor": 2}
+    assert sorted(agg["hosts"]) == ["host0", "host1"]
+
+    first = kg.paginate(lambda lim, off: kg.find_nodes(db_path=db, limit=lim, offset=off), limit=3)
+    assert first["count"] == 3 and first["next_offset"] == 3
+    rest = kg.paginate(lambda lim, off: kg.find_nodes(db_path=db, limit=lim, offset=off),
+                       offset=first["next_offset"], limit=50)
+    assert rest["next_offset"] is None
+    capped = kg.paginate(lambda lim, off: kg.find_nodes(db_path=db, limit=lim, offset=off),
+                         limit=50, max_bytes=300)
+    assert capped["count"] < 7 and capped["next_offset"] == capped["count"]
+
+
+def test_fusion_engine_dedups_lists_and_spill_matches_in_memory(tmp_path):
+    from plugins.mcp.app.utilities.cti_fusion import fuse_bundles
+
+    def ap(n, refs, labels):
+        return {
+            "type": "attack-pattern",
+            "id": f"attack-pattern--{n}",
+            "name": f"Technique {n}",
+            "labels": labels,
+            "external_references": [{"source_name": "mitre-attack", "external_id": "T1059"}] + refs,
+        }
+
+    bundles = []
+    for i in range(6):
+        tool = {"type": "tool", "id": f"tool--{i}", "name": f"Tool {i % 3}", "labels": [1, True, "1"]}
+        rel = {"type": "relationship", "id": f"relationship--{i}", "relationship_type": "uses",
+               "source_ref": tool["id"], "target_ref": f"attack-pattern--{i}"}
+        refs = [{"source_name": "report", "url": f"https://example.test/{i % 2}"}]
+        bundles.append({"type": "bundle", "objects": [ap(i, refs, ["a", "b"] if i % 2 else ["b"]), tool, rel]})
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(bundles[-1]), encoding="utf-8")
+
+    in_memory = fuse_bundles(bundles[:-1] + [path])
+    spilled = fuse_bundles(bundles, spill=tmp_path / "spill.sqlite", max_resident=1)
+    assert in_memory["objects"] == spilled["objects"]
+    assert in_memory["x_cti_fusion"]["source_bundle_count"] == 6
+
+    techniques = [o for o in in_memory["objects"] if o["type"] == "attack-pattern"]
+    assert len(techniques) == 1
+    technique = techniques[0]
+    assert technique["id"] == "attack-pattern--0"
+    assert technique["labels"] == ["b", "a"]
+    assert len(technique["external_references"]) == 3
+    assert technique["x_cti_fused_from"] == [f"attack-pattern--{i}" for i in range(6)]
+
+    tools = [o for o in in_memory["objects"] if o["type"] == "tool"]
+    assert [t["id"] for t in tools] == ["tool--0", "tool--1", "tool--2"]
+    assert tools[0]["labels"] == [1, True, "1"]
+    rels = [o for o in in_memory["objects"] if o["type"] == "relationship"]
+    assert {(r["source_ref"], r["target_ref"]) for r in rels} == {
+        ("tool--0", "attack-pattern--0"), ("tool--1", "attack-pattern--0"), ("tool--2", "attack-pattern--0"),
+    }
+    assert bundles[0]["objects"][0]["labels"] == ["b"]
+
+
+def test_load_bundles_parallel_keeps_order_and_names_bad_file(tmp_path):
+    from plugins.mcp.app.utilities.cti_fusion import load_bundles
+
+    paths = []
+    for i in range(12):
+        p = tmp_path / f"b{i}.json"
+        p.write_text(json.dumps({"type": "bundle", "id": f"bundle--{i}", "objects": []}), encoding="utf-8")
+        paths.append(p)
+    assert [b["id"] for b in load_bundles(paths, workers=4)] == [f"bundle--{i}" for i in range(12)]
+
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ValueError, match="bad.json"):
+        load_bundles(paths[:3] + [bad], workers=4)
+
+
+def test_fuse_bundle_files_streams_in_input_order_with_or_without_spill(tmp_path):
+    from plugins.mcp.app.utilities.cti_fusion import fuse_bundle_files, fuse_bundles
+
+    paths = []
+    for i in range(5):
+        objects = [{"type": "tool", "id": f"tool--{i}", "name": "PsExec", "labels": [str(i)]},
+                   {"type": "malware", "id": f"malware--{i}", "name": f"Family {i}"},
+                   {"type": "relationship", "id": f"relationship--{i}", "relationship_type": "uses",
+                    "source_ref": f"malware--{i}", "target_ref": f"tool--{i}"}]
+        p = tmp_path / f"b{i}.json"
+        p.write_text(json.dumps({"type": "bundle", "objects": objects}), encoding="utf-8")
+        paths.append(p)
+
+    expected = fuse_bundles(paths)["objects"]
+    parallel = fuse_bundle_files(paths, workers=3)
+    spilled = fuse_bundle_files(paths, spill=True, max_resident=1)
+    assert parallel["objects"] == expected == spilled["objects"]
+    assert parallel["x_cti_fusion"]["source_bundle_count"] == 5
+    assert [o["id"] for o in expected if o["type"] == "tool"] == ["tool--0"]
+
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    for spill in (False, True):
+        with pytest.raises(ValueError, match="bad.json"):
+            fuse_bundle_files(paths[:2] + [bad], spill=spill)
+
+
+def test_bundle_index_adjacency_matches_linear_helpers():
+    from plugins.mcp.app.utilities.cti_topology_inference import (
+        BundleIndex,
+        _direct_refs_by_type,
+        _domain_from_located_at,
+    )
+
+    objects = [
+        {"type": "infrastructure", "id": "infrastructure--1", "name": "web"},
+        {"type": "software", "id": "software--1", "name": "nginx"},
+        {"type": "software", "id": "software--2", "name": "openssl"},
+        {"type": "identity", "id": "identity--1", "name": "corp"},
+        {"type": "relationship", "relationship_type": "uses",
+         "source_ref": "infrastructure--1", "target_ref": "software--1"},
+        {"type": "relationship", "relationship_type": "located-at",
+         "source_ref": "infrastructure--1", "target_ref": "identity--1"},
+        {"type": "relationship", "relationship_type": "related-to",
+         "source_ref": "infrastructure--1", "target_ref": "infrastructure--1"},
+        {"type": "observed-data", "id": "observed-data--1",
+         "object_refs": ["infrastructure--1", "software--2"]},
+    ]
+    index = BundleIndex(objects)
+
+    assert [e["relationship_type"] for e in index.edges_touching("infrastructure--1")] == [
+        "uses", "located-at", "related-to",
+    ]
+    assert index.ids_by_type["software"] == ["software--1", "software--2"]
+    assert _direct_refs_by_type("infrastructure--1", objects, "software", index) == {
+        "software--1", "software--2",
+    }
+    assert _direct_refs_by_type("infrastructure--1", objects, "software") == {
+        "software--1", "software--2",
+    }
+    identities = {"identity--1": objects[3]}
+    assert _domain_from_located_at("infrastructure--1", objects, identities, index) is objects[3]
+    assert _domain_from_located_at("software--1", objects, identities, index) is None
@@ -112,3 +112,87 @@ class TestStage2D3FENDPath:
         assert root.is_dir()
         assert (root / "D3fend_CAD_Graph_Schema.json").is_file()
         assert (root / "ontology").is_dir()
+
+
+_TINY_TTL = """@prefix d3f: <http://d3fend.mitre.org/ontologies/d3fend.owl#> .
+d3f:D3-PA d3f:mitigates <https://attack.mitre.org/techniques/T1003.001> .
+d3f:D3-PA d3f:derived-from d3f:D3-PM .
+"""
+
+
+class TestDefendEnricherIndex:
+    def _root(self, tmp_path):
+        (tmp_path / "ontology").mkdir()
+        (tmp_path / "ontology" / "tiny.ttl").write_text(_TINY_TTL, encoding="utf-8")
+        (tmp_path / "D3fend_CAD_Graph_Schema.json").write_text("{}", encoding="utf-8")
+        return tmp_path
+
+    def _bundle(self):
+        return {"objects": [{
+            "type": "attack-pattern", "id": "attack-pattern--1", "name": "LSASS Memory",
+            "external_references": [{"external_id": "T1003.001"}],
+        }]}
+
+    def test_index_is_cached_and_used(self, tmp_path, monkeypatch):
+        from plugins.mcp.app.utilities import cti_defend_enricher as enricher
+
+        root = self._root(tmp_path)
+        monkeypatch.setattr(enricher, "_INDEX_CACHE", {})
+        _, info = enricher.enrich_stix_bundle_with_defend(self._bundle(), root)
+        edges = {e["relationship"]: e for e in info["cad_graph"]["edges"]}
+        assert edges["mitigates"]["target"] == "attack-pattern--1"
+        assert "derived-from" in edges
+        assert (root / enricher.INDEX_FILE).exists()
+
+        # A fresh process reads the on-disk index instead of parsing TTL
+        monkeypatch.setattr(enricher, "_INDEX_CACHE", {})
+        monkeypatch.setattr(enricher, "load_d3fend_graph", lambda files: pytest.fail("reparsed"))
+        index = enricher.load_d3fend_index(root)
+        assert index["mitigates_by_attack"]["T1003.001"][0].endswith("D3-PA")
+
+    def test_changed_ttl_rebuilds_index(self, tmp_path, monkeypatch):
+        import os
+        from plugins.mcp.app.utilities import cti_defend_enricher as enricher
+
+        root = self._root(tmp_path)
+        monkeypatch.setattr(enricher, "_INDEX_CACHE", {})
+        assert len(enricher.load_d3fend_index(root)["mitigations"]) == 1
+
+        ttl = root / "ontology" / "tiny.ttl"
+        ttl.write_text(_TINY_TTL + "d3f:D3-X d3f:mitigates <https://attack.mitre.org/techniques/T1059> .\n")
+        st = ttl.stat()
+        os.utime(ttl, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert len(enricher.load_d3fend_index(root)["mitigations"]) == 2
+
+    def test_scoped_graph_keeps_only_relevant_countermeasures(self, tmp_path, monkeypatch):
+        from plugins.mcp.app.utilities import cti_defend_enricher as enricher
+
+        root = self._root(tmp_path)
+        (root / "ontology" / "tiny.ttl").write_text(
+            _TINY_TTL + "d3f:D3-X d3f:mitigates <https://attack.mitre.org/techniques/T1059> .\n",
+            encoding="utf-8",
+        )
+        monkeypatch.setattr(enricher, "_INDEX_CACHE", {})
+
+        _, info = enricher.enrich_stix_bundle_with_defend(self._bundle(), root)
+        ids = {n["id"].split("#")[-1] for n in info["cad_graph"]["nodes"] if n["nodeType"] == "Countermeasure"}
+        assert ids == {"D3-PA", "D3-PM"}
+
+        _, full = enricher.enrich_stix_bundle_with_defend(self._bundle(), root, scope="full")
+        analytics = [n for n in full["cad_graph"]["nodes"] if n["nodeType"] == "Analytic"]
+        assert len(analytics) == 2
+
+    def test_catalog_scope_references_shared_catalog(self, tmp_path, monkeypatch):
+        import json
+        from plugins.mcp.app.utilities import cti_defend_enricher as enricher
+
+        root = self._root(tmp_path)
+        monkeypatch.setattr(enricher, "_INDEX_CACHE", {})
+        out = enricher.write_d3fend_catalog(root, tmp_path / "cad")
+        catalog = json.loads(out.read_text(encoding="utf-8"))
+
+        _, info = enricher.enrich_stix_bundle_with_defend(self._bundle(), root, scope="catalog")
+        graph = info["cad_graph"]
+        assert graph["metadata"]["d3fend_catalog"]["id"] == catalog["id"]
+        assert not [n for n in graph["nodes"] if n["nodeType"] in ("Countermeasure", "Analytic")]
+        assert [e for e in graph["edges"] if e["relationship"] == "mitigates"]
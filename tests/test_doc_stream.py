@@ -0,0 +1,61 @@
+"""Tests for nlp/cti_doc_stream.py — sentence-bounded streaming windows."""
+import io
+
+import pytest
+
+
+REPORT = (
+    "The actor gained access via phishing. PsExec was used for lateral movement. "
+    "Shadow copies were deleted!\n\nA ransomware payload encrypted the file server. "
+) * 50
+
+
+class TestIterSentenceWindows:
+    def test_windows_tile_source(self):
+        from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_sentence_windows
+        windows = list(iter_sentence_windows(REPORT, max_chars=300))
+        assert len(windows) > 1
+        assert "".join(w.text for w in windows) == REPORT
+        for w in windows:
+            assert REPORT[w.start:w.end] == w.text
+            assert len(w.text) <= 300
+
+    def test_windows_end_on_sentence_boundary(self):
+        from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_sentence_windows
+        for w in list(iter_sentence_windows(REPORT, max_chars=300))[:-1]:
+            assert w.text.rstrip()[-1] in ".!?"
+
+    def test_file_source_matches_string_source(self):
+        from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_sentence_windows
+        from_str = list(iter_sentence_windows(REPORT, max_chars=300))
+        from_file = list(iter_sentence_windows(io.StringIO(REPORT), max_chars=300))
+        assert [(w.start, w.end) for w in from_file] == [(w.start, w.end) for w in from_str]
+
+    def test_unbroken_blob_is_hard_split(self):
+        from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_sentence_windows
+        blob = "A" * 1000
+        windows = list(iter_sentence_windows(blob, max_chars=256))
+        assert "".join(w.text for w in windows) == blob
+        assert max(len(w.text) for w in windows) == 256
+
+    def test_invalid_size(self):
+        from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_sentence_windows
+        with pytest.raises(ValueError):
+            list(iter_sentence_windows("text", max_chars=0))
+
+
+class TestIterWindowDocs:
+    def test_offsets_map_to_source(self):
+        spacy = pytest.importorskip("spacy")
+        from plugins.mcp.app.utilities.nlp.cti_doc_stream import iter_window_docs
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+
+        sentences = 0
+        for window, doc in iter_window_docs(nlp, REPORT, max_chars=400):
+            for sent in doc.sents:
+                start, end = window.offset(sent.start_char, sent.end_char)
+                assert REPORT[start:end] == sent.text
+                sentences += 1
+        assert sentences >= 200
@@ -0,0 +1,100 @@
+"""Tests for utilities/cti_infra_aggregation.py and the Stage 3 aggregate loop."""
+import json
+
+
+def _infra_bundle(*hypotheses):
+    return {
+        "type": "bundle",
+        "objects": [{
+            "type": "x-cti-infrastructure-reasoning",
+            "x_infrastructure_hypotheses": list(hypotheses),
+        }],
+    }
+
+
+def _hyp(component, confidence, rationale="r", evidence=("e",)):
+    return {"component": component, "category": "service", "confidence": confidence,
+            "rationale": rationale, "evidence": list(evidence)}
+
+
+class TestInfraAggregator:
+    def test_incremental_matches_full_scan(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_infra_aggregation import (
+            InfraAggregator,
+            aggregate_infrastructure_hypotheses,
+        )
+
+        bundles = {
+            "a.infra.stix.json": _infra_bundle(_hyp("smb", 0.6, "r1"), _hyp("rdp", 0.5)),
+            "b.infra.stix.json": _infra_bundle(_hyp("smb", 0.8, "r2", ("e2",))),
+        }
+        agg = InfraAggregator()
+        for name, bundle in bundles.items():
+            (tmp_path / name).write_text(json.dumps(bundle), encoding="utf-8")
+            agg.add_bundle(name, bundle)
+
+        result = agg.aggregate()
+        assert result == aggregate_infrastructure_hypotheses(tmp_path)
+        smb = next(r for r in result if r["component"] == "smb")
+        assert smb["reports"] == 2 and smb["confidence"] == 0.75
+        assert smb["rationales"] == ["r1", "r2"] and smb["evidence"] == ["e", "e2"]
+
+        # Replacing a report drops its previous contribution
+        agg.add_bundle("b.infra.stix.json", _infra_bundle(_hyp("dns", 0.4)))
+        assert {r["component"]: r["reports"] for r in agg.aggregate()} == {
+            "smb": 1, "rdp": 1, "dns": 1,
+        }
+
+    def test_single_bundle_update_uses_state_not_directory(self, tmp_path, monkeypatch):
+        from plugins.mcp.app.utilities import cti_infra_aggregation as mod
+
+        agg = mod.InfraAggregator()
+        agg.add_bundle("a.infra.stix.json", _infra_bundle(_hyp("smb", 0.6)))
+        agg.write(tmp_path)
+
+        def no_scan(*args, **kwargs):
+            raise AssertionError("directory rescanned")
+
+        monkeypatch.setattr(mod.InfraAggregator, "from_dir", classmethod(no_scan))
+        result = mod.update_infrastructure_aggregate(
+            tmp_path, tmp_path / "b.infra.stix.json", _infra_bundle(_hyp("smb", 0.8)),
+        )
+        assert result[0]["reports"] == 2
+        on_disk = json.loads((tmp_path / mod.AGGREGATE_FILE).read_text(encoding="utf-8"))
+        assert on_disk == result
+
+
+class TestStage3Aggregation:
+    def test_aggregate_written_once_per_run(self, tmp_path, monkeypatch):
+        from plugins.mcp.app import cti_pipeline_stage3 as stage3
+        from plugins.mcp.app.utilities import cti_infra_aggregation as mod
+
+        (tmp_path / "outputs_stix").mkdir()
+        (tmp_path / "clean").mkdir()
+        for stem in ("r1", "r2", "r3"):
+            (tmp_path / "outputs_stix" / f"{stem}.stix.json").write_text(
+                json.dumps({"type": "bundle", "objects": []}), encoding="utf-8",
+            )
+            (tmp_path / "clean" / f"{stem}.txt").write_text("text", encoding="utf-8")
+
+        def fake_infer(*, bundle, clean_text, source_stix_file, use_llm):
+            return {"type": "x-cti-infrastructure-reasoning",
+                    "x_infrastructure_hypotheses": [_hyp("smb", 0.5)]}
+
+        writes = []
+        real_write = mod.InfraAggregator.write
+
+        def counting_write(self, infra_dir):
+            writes.append(infra_dir)
+            return real_write(self, infra_dir)
+
+        monkeypatch.setattr(stage3, "infer_infrastructure_reasoning", fake_infer)
+        monkeypatch.setattr(mod.InfraAggregator, "write", counting_write)
+        stage3.run_phase3_infrastructure(tmp_path, use_llm=False)
+
+        assert len(writes) == 1
+        out = json.loads(
+            (tmp_path / "outputs_stix" / "infra" / mod.AGGREGATE_FILE).read_text(encoding="utf-8")
+        )
+        assert out == [{"component": "smb", "category": "service", "reports": 3,
+                        "confidence": 0.6, "rationales": ["r"], "evidence": ["e"]}]
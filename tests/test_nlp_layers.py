@@ -82,6 +82,18 @@ class TestDedupeBehaviorsByVector:
         from plugins.mcp.app.utilities.nlp.cti_nlp_enhancements import dedupe_behaviors_by_vector
         assert dedupe_behaviors_by_vector([]) == []
 
+    def test_blocked_greedy_matches_sequential(self):
+        import numpy as np
+        from plugins.mcp.app.utilities.nlp.cti_nlp_enhancements import _greedy_dedupe_indices
+        rng = np.random.default_rng(7)
+        base = rng.normal(size=(12, 16)).astype(np.float32)
+        vecs = base[rng.integers(0, 12, size=200)] + rng.normal(scale=0.1, size=(200, 16)).astype(np.float32)
+        vecs[5] = 0.0
+        expected = _greedy_dedupe_indices(vecs, 0.92, block=1)
+        assert _greedy_dedupe_indices(vecs, 0.92, block=32) == expected
+        assert 5 in expected
+        assert expected == sorted(expected)
+
 
 class TestCleanIrNlpLayer1:
     def test_expands_behaviors(self):
@@ -0,0 +1,129 @@
+"""Tests for utilities/cti_nvd_index.py — on-disk NVD CVE->CPE index."""
+import gzip
+import json
+import os
+
+
+def _feed_11(items):
+    return {
+        "CVE_data_type": "CVE",
+        "CVE_Items": [
+            {
+                "cve": {"CVE_data_meta": {"ID": cve}},
+                "configurations": {"nodes": [{"cpe_match": [
+                    {"vulnerable": True, "cpe23Uri": c} for c in cpes
+                ] + [{"vulnerable": False, "cpe23Uri": "cpe:2.3:o:microsoft:windows:-:*:*:*:*:*:*:*"}]}]},
+            }
+            for cve, cpes in items
+        ],
+    }
+
+
+def _feed_20(items):
+    return {
+        "resultsPerPage": len(items),
+        "vulnerabilities": [
+            {"cve": {"id": cve, "configurations": [{"nodes": [{"cpeMatch": [
+                {"vulnerable": True, "criteria": c} for c in cpes
+            ]}]}]}}
+            for cve, cpes in items
+        ],
+    }
+
+
+APACHE = "cpe:2.3:a:apache:log4j:2.14.1:*:*:*:*:*:*:*"
+APACHE_OLD = "cpe:2.3:a:apache:log4j:2.0:*:*:*:*:*:*:*"
+EXCHANGE = "cpe:2.3:a:microsoft:exchange_server:2019:*:*:*:*:*:*:*"
+
+
+class TestNvdCpeIndex:
+    def test_ingest_dedupes_and_keeps_first_seen_order(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_nvd_index import NvdCpeIndex
+
+        feeds = tmp_path / "nvd"
+        feeds.mkdir()
+        with gzip.open(feeds / "a-2021.json.gz", "wt", encoding="utf-8") as fh:
+            json.dump(_feed_11([("CVE-2021-44228", [APACHE, APACHE_OLD, APACHE])]), fh)
+        (feeds / "b-2021.json").write_text(json.dumps(_feed_20([
+            ("cve-2021-44228", [APACHE_OLD, EXCHANGE]),
+            ("CVE-2021-26855", [EXCHANGE]),
+        ])), encoding="utf-8")
+
+        index = NvdCpeIndex(tmp_path / "index.sqlite")
+        assert index.sync(sorted(feeds.iterdir()))["added"] == 2
+        assert index.get("CVE-2021-44228") == [APACHE, APACHE_OLD, EXCHANGE]
+        assert index.get("CVE-1999-0001", []) == []
+        assert len(index) == 2 and "cve-2021-26855" in index
+        assert index.cves_for_product("microsoft", "exchange_server") == [
+            "CVE-2021-26855", "CVE-2021-44228",
+        ]
+        assert index.cves_for_product(None, "log4j") == ["CVE-2021-44228"]
+
+    def test_sync_is_incremental(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_nvd_index import NvdCpeIndex
+
+        feed = tmp_path / "feed.json"
+        feed.write_text(json.dumps(_feed_20([("CVE-2021-44228", [APACHE])])), encoding="utf-8")
+        index = NvdCpeIndex(tmp_path / "index.sqlite")
+        index.sync([feed])
+        assert index.sync([feed]) == {"added": 0, "updated": 0, "removed": 0, "unchanged": 1}
+
+        feed.write_text(json.dumps(_feed_20([("CVE-2021-44228", [APACHE_OLD])])), encoding="utf-8")
+        os.utime(feed, ns=(1, 1))
+        assert index.sync([feed])["updated"] == 1
+        assert index.get("CVE-2021-44228") == [APACHE_OLD]
+
+        feed.unlink()
+        assert index.sync([])["removed"] == 1
+        assert len(index) == 0
+
+    def test_topology_lookup_reads_the_index(self, tmp_path, monkeypatch):
+        from plugins.mcp.app.utilities import cti_topology_inference as topo
+
+        feeds = tmp_path / "nvd"
+        feeds.mkdir()
+        (feeds / "feed.json").write_text(
+            json.dumps(_feed_20([("CVE-2021-26855", [EXCHANGE])])), encoding="utf-8",
+        )
+        monkeypatch.setenv("CTI_NVD_CACHE", str(feeds))
+        monkeypatch.setenv("CTI_NVD_INDEX", str(tmp_path / "index.sqlite"))
+        topo._local_nvd_cpe_index.cache_clear()
+        try:
+            vulns = topo._vulnerabilities_by_infrastructure([
+                {"type": "infrastructure", "id": "infrastructure--1", "name": "mail"},
+                {"type": "vulnerability", "id": "vulnerability--1", "name": "CVE-2021-26855"},
+            ])
+        finally:
+            topo._local_nvd_cpe_index.cache_clear()
+        rec = vulns["infrastructure--1"][0]
+        assert rec["cpe_matches"] == [EXCHANGE]
+        assert rec["software_hints"][0]["name"] == "exchange server"
+        assert (tmp_path / "index.sqlite").exists()
+
+    def test_presynced_workers_read_without_ingesting(self, tmp_path, monkeypatch):
+        from plugins.mcp.app.utilities import cti_topology_inference as topo
+        from plugins.mcp.app.utilities.cti_nvd_index import open_nvd_index
+
+        feeds = tmp_path / "nvd"
+        feeds.mkdir()
+        (feeds / "feed.json").write_text(
+            json.dumps(_feed_20([("CVE-2021-26855", [EXCHANGE])])), encoding="utf-8",
+        )
+        monkeypatch.setenv("CTI_NVD_CACHE", str(feeds))
+        monkeypatch.setenv("CTI_NVD_INDEX", str(tmp_path / "index.sqlite"))
+        monkeypatch.setattr(topo, "_NVD_SYNC", True)
+        topo.use_presynced_nvd_index()
+        try:
+            # Nothing synced yet: a worker sees no index rather than building one.
+            assert topo._local_nvd_cpe_index() == {}
+            assert not (tmp_path / "index.sqlite").exists()
+
+            open_nvd_index().close()  # the parent's one-time sync
+            topo._local_nvd_cpe_index.cache_clear()
+            assert topo._local_nvd_cpe_index().get("CVE-2021-26855") == [EXCHANGE]
+        finally:
+            topo._local_nvd_cpe_index.cache_clear()
+
+        # The parent restores syncing once its pool is done.
+        topo.use_presynced_nvd_index(False)
+        assert topo._NVD_SYNC is True
@@ -0,0 +1,78 @@
+"""Tests for capabilities/rag_chunker.py — structure-aware STIX chunking."""
+
+
+def _bundle(description="Credential dumper used to obtain plaintext passwords."):
+    return {
+        "type": "bundle",
+        "objects": [
+            {"type": "threat-actor", "id": "threat-actor--1", "name": "ALPHV"},
+            {
+                "type": "tool", "id": "tool--1", "name": "Mimikatz",
+                "description": description,
+                "x_mitre_platforms": ["Windows"],
+                "x_mitre_aliases": ["Mimikatz", "mimikatz.exe"],
+                "external_references": [{"source_name": "mitre-attack", "external_id": "S0002"}],
+            },
+            {
+                "type": "attack-pattern", "id": "attack-pattern--1", "name": "LSASS Memory",
+                "description": "Dump LSASS.",
+                "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": "credential-access"}],
+            },
+            {"type": "relationship", "relationship_type": "uses",
+             "source_ref": "threat-actor--1", "target_ref": "tool--1"},
+            {"type": "relationship", "relationship_type": "uses",
+             "source_ref": "tool--1", "target_ref": "attack-pattern--1"},
+        ],
+    }
+
+
+class TestChunkBundle:
+    def test_chunk_carries_metadata_and_neighbors(self):
+        from plugins.mcp.app.capabilities.rag_chunker import chunk_bundle
+
+        chunks = {c.id: c for c in chunk_bundle(_bundle())}
+        tool = chunks["tool--1"]
+        assert tool.text.split(" | ")[0] == "Mimikatz"
+        assert "ids: S0002" in tool.text and "platforms: Windows" in tool.text
+        assert "aliases: mimikatz.exe" in tool.text
+        assert "uses: LSASS Memory (attack-pattern)" in tool.text
+        assert "used-by: ALPHV (threat-actor)" in tool.text
+        assert tool.keys == {"S0002", "Mimikatz", "mimikatz.exe"}
+        assert "phases: credential-access" in chunks["attack-pattern--1"].text
+
+    def test_text_is_stable_and_budgeted(self):
+        from plugins.mcp.app.capabilities.rag_chunker import chunk_bundle, estimate_tokens
+
+        long = "word " * 2000
+        first = chunk_bundle(_bundle(long), max_tokens=100)
+        second = chunk_bundle(_bundle(long), max_tokens=100)
+        assert [c.text for c in first] == [c.text for c in second]
+        tool = next(c for c in first if c.id == "tool--1")
+        assert estimate_tokens(tool.text) <= 100
+        assert tool.description == long
+        assert "uses: LSASS Memory" in tool.text
+
+    def test_merge_dedupes_across_bundles(self):
+        from plugins.mcp.app.capabilities.rag_chunker import chunk_bundle, merge_chunks
+
+        richer = chunk_bundle(_bundle())
+        bare = chunk_bundle({"objects": [
+            {"type": "tool", "id": "tool--1", "name": "Mimikatz", "description": "Dumper.",
+             "aliases": ["mz"]},
+        ]})
+        merged = merge_chunks([bare, richer, richer])
+        assert [c.id for c in merged] == ["tool--1", "threat-actor--1", "attack-pattern--1"]
+        tool = merged[0]
+        assert "used-by: ALPHV" in tool.text
+        assert "mz" in tool.keys and "S0002" in tool.keys
+
+
+class TestRAGServiceChunks:
+    def test_text_chunks_and_adv_step(self):
+        from plugins.mcp.app.capabilities.rag import RAGService
+
+        corpus, adv_step = RAGService.extract_text_chunks(_bundle())
+        assert len(corpus) == 3
+        assert adv_step["Mimikatz"] == "Credential dumper used to obtain plaintext passwords."
+        keys = RAGService.extract_chunk_keys(_bundle())
+        assert any("S0002" in v for v in keys.values())
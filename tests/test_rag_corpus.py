@@ -0,0 +1,69 @@
+"""Tests for capabilities/rag_corpus.py — shared RAG corpus manager."""
+import json
+
+import numpy as np
+import pytest
+
+
+class _FakeEmbedder:
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, texts):
+        _FakeEmbedder.calls.append(list(texts))
+        return np.array([[len(t), t.count("a") + 1.0, 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    from plugins.mcp.app.capabilities import rag
+    from plugins.mcp.app.capabilities.rag_corpus import RAGCorpusManager
+    from plugins.mcp.app.capabilities.rag_store import EmbeddingStore
+
+    stores = {}
+    monkeypatch.setattr(rag, "create_embedder", lambda *a, **kw: _FakeEmbedder())
+    monkeypatch.setattr(
+        rag, "get_embedding_store",
+        lambda model, **kw: stores.setdefault(model, EmbeddingStore(model, root=tmp_path / "index")),
+    )
+    _FakeEmbedder.calls = []
+    return RAGCorpusManager(max_corpora=2)
+
+
+def _write_bundle(path, names):
+    objects = [{"type": "malware", "name": n, "description": f"{n} payload"} for n in names]
+    path.write_text(json.dumps({"type": "bundle", "objects": objects}), encoding="utf-8")
+    return path
+
+
+class TestRAGCorpusManager:
+    def test_reuses_built_service(self, corpus, tmp_path):
+        bundle = _write_bundle(tmp_path / "a.json", ["Alpha", "Beta"])
+        first = corpus.service_for([bundle])
+        second = corpus.service_for([bundle])
+        assert first is second
+        assert len(_FakeEmbedder.calls) == 1
+
+    def test_changed_file_is_reloaded(self, corpus, tmp_path):
+        bundle = _write_bundle(tmp_path / "a.json", ["Alpha"])
+        first = corpus.service_for([bundle])
+        _write_bundle(bundle, ["Alpha", "Gamma Longer Name"])
+        second = corpus.service_for([bundle])
+        assert second is not first
+        assert any("Gamma" in c for c in second.corpus)
+        # Only the new chunk is embedded
+        assert _FakeEmbedder.calls[-1] == ["Gamma Longer Name | Gamma Longer Name payload\ntype: malware"]
+
+    def test_invalidate_and_lru(self, corpus, tmp_path):
+        a = _write_bundle(tmp_path / "a.json", ["Alpha"])
+        b = _write_bundle(tmp_path / "b.json", ["Beta"])
+        c = _write_bundle(tmp_path / "c.json", ["Gamma"])
+        first = corpus.service_for([a])
+        corpus.invalidate([a])
+        assert corpus.service_for([a]) is not first
+
+        corpus.service_for([b])
+        corpus.service_for([c])
+        assert corpus.stats()["corpora"] == 2
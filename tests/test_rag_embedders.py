@@ -0,0 +1,93 @@
+"""Tests for capabilities/rag_embedders.py — local RAG embedding backends."""
+import sys
+
+import numpy as np
+import pytest
+
+
+def _vector_nlp():
+    import spacy
+
+    nlp = spacy.blank("en")
+    for word, vec in {
+        "powershell": [1.0, 0.0, 0.0],
+        "script": [0.9, 0.1, 0.0],
+        "ransomware": [0.0, 1.0, 0.0],
+        "encrypt": [0.0, 0.9, 0.1],
+    }.items():
+        nlp.vocab.set_vector(word, np.asarray(vec, dtype=np.float32))
+    return nlp
+
+
+class TestSpacyVectorEmbedder:
+    def test_batched_matches_single(self):
+        from plugins.mcp.app.capabilities.rag_embedders import SpacyVectorEmbedder
+
+        texts = ["powershell script", "ransomware encrypt", "unknown words", ""] * 5
+        batched = SpacyVectorEmbedder(nlp=_vector_nlp(), batch_size=3, workers=3)
+        single = SpacyVectorEmbedder(nlp=_vector_nlp(), batch_size=100, workers=1)
+
+        out = batched(texts)
+        assert out.shape == (20, 3) and out.dtype == np.float32
+        assert np.allclose(out, single(texts))
+        assert not out[2].any()
+
+    def test_related_text_ranks_first(self):
+        from plugins.mcp.app.capabilities.rag_embedders import SpacyVectorEmbedder
+        from plugins.mcp.app.capabilities.rag_store import top_k
+
+        embed = SpacyVectorEmbedder(nlp=_vector_nlp())
+        matrix = embed(["ransomware encrypt", "powershell script"])
+        matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        assert top_k(matrix, embed(["powershell"]), 1)[0][0] == 1
+
+    def test_model_without_vectors_is_rejected(self):
+        import spacy
+        from plugins.mcp.app.capabilities.rag_embedders import SpacyVectorEmbedder
+
+        with pytest.raises(ValueError):
+            SpacyVectorEmbedder(nlp=spacy.blank("en"))
+
+
+class TestCreateEmbedder:
+    def test_local_models_are_cached(self, monkeypatch):
+        from plugins.mcp.app.capabilities import rag_embedders
+
+        loads = []
+
+        def fake_load(embed_model, **kwargs):
+            loads.append(embed_model)
+            return rag_embedders.SpacyVectorEmbedder(nlp=_vector_nlp())
+
+        monkeypatch.setattr(rag_embedders, "_LOCAL_EMBEDDERS", {})
+        monkeypatch.setattr(rag_embedders, "load_local_embedder", fake_load)
+        first = rag_embedders.create_embedder("local/spacy", api_key="ignored")
+        assert rag_embedders.create_embedder("local/spacy") is first
+        assert loads == ["local/spacy"]
+
+    def test_default_spacy_reuses_taxonomy_pipeline(self, monkeypatch):
+        import types
+        import spacy
+        from plugins.mcp.app import utilities
+        from plugins.mcp.app.capabilities import rag_embedders
+
+        shared = types.ModuleType("cti_taxonomy_loader")
+        shared.nlp = _vector_nlp()
+        monkeypatch.setitem(sys.modules, "plugins.mcp.app.utilities.cti_taxonomy_loader", shared)
+        monkeypatch.setattr(utilities, "cti_taxonomy_loader", shared, raising=False)
+
+        def no_load(*args, **kwargs):
+            raise AssertionError("en_core_web_lg must not be loaded twice")
+
+        monkeypatch.setattr(spacy, "load", no_load)
+        assert rag_embedders.load_local_embedder("local/spacy").nlp is shared.nlp
+        with pytest.raises(AssertionError):
+            rag_embedders.load_local_embedder("local/spacy:en_core_web_md")
+
+    def test_unknown_local_backend(self):
+        from plugins.mcp.app.capabilities.rag_embedders import load_local_embedder
+
+        with pytest.raises(ValueError):
+            load_local_embedder("local/word2vec")
+        with pytest.raises(ValueError):
+            load_local_embedder("local/onnx")
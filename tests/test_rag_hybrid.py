@@ -0,0 +1,77 @@
+"""Tests for capabilities/rag_hybrid.py and hybrid RAGService.search."""
+import numpy as np
+
+
+CORPUS = [
+    "PowerShell | Adversaries may abuse PowerShell commands and scripts for execution.",
+    "Mimikatz | Credential dumper used to obtain plaintext passwords from LSASS.",
+    "Log4Shell exploitation | Exploitation of CVE-2021-44228 in Apache Log4j.",
+    "Cobalt Strike | Commercial adversary simulation framework used for C2.",
+]
+
+
+class TestBM25Index:
+    def test_ranks_matching_document_first(self):
+        from plugins.mcp.app.capabilities.rag_hybrid import BM25Index
+        index = BM25Index(CORPUS)
+        assert index.search("dump lsass passwords", 2)[0] == 1
+        assert index.search("cve-2021-44228", 1) == [2]
+        assert index.search("nothing relevant here", 3) == []
+
+
+class TestHybridIndex:
+    def test_exact_name_and_external_id(self):
+        from plugins.mcp.app.capabilities.rag_hybrid import HybridIndex
+        index = HybridIndex(CORPUS, {CORPUS[0]: {"T1059.001"}})
+        assert index.exact_hits("How is T1059.001 used?") == [0]
+        assert index.exact_hits("operators ran cobalt strike beacons") == [3]
+
+    def test_short_names_are_not_exact_keys(self):
+        from plugins.mcp.app.capabilities.rag_hybrid import HybridIndex
+        corpus = ["net | Windows net utility.", "Ryuk | Ransomware."]
+        index = HybridIndex(corpus)
+        assert index.exact_hits("use net to list shares") == []
+        assert index.exact_hits("ryuk encrypted the hosts") == [1]
+
+    def test_rrf_prefers_consensus(self):
+        from plugins.mcp.app.capabilities.rag_hybrid import reciprocal_rank_fusion
+        assert reciprocal_rank_fusion([[1, 2, 3], [2, 1, 4]])[:2] == [1, 2]
+        assert reciprocal_rank_fusion([[5], [7, 5]])[0] == 5
+
+
+class TestRAGServiceHybridSearch:
+    def _service(self):
+        from plugins.mcp.app.capabilities.rag import RAGService
+
+        calls = []
+
+        def embed(texts):
+            calls.append(list(texts))
+            return np.ones((len(texts), 3), dtype=np.float32)
+
+        rag = RAGService(api_key="x")
+        rag.corpus = list(CORPUS)
+        rag.adv_step = {c.split(" | ")[0]: c.split(" | ")[1] for c in CORPUS}
+        from plugins.mcp.app.capabilities.rag_hybrid import HybridIndex
+        rag.hybrid = HybridIndex(rag.corpus, {CORPUS[0]: {"T1059.001"}})
+        rag.matrix = np.ones((len(CORPUS), 3), dtype=np.float32) / np.sqrt(3)
+        rag.embedder = embed
+        return rag, calls
+
+    def test_exact_hits_skip_embedding(self):
+        rag, calls = self._service()
+        assert rag.search("T1059.001", k=1) == [CORPUS[0]]
+        assert calls == []
+
+    def test_fused_search_pins_exact_hits(self):
+        rag, calls = self._service()
+        results = rag.search("Mimikatz and lsass credential theft", k=3)
+        assert results[0] == CORPUS[1]
+        assert len(calls) == 1
+
+    def test_title_lookup_and_context_do_not_embed(self):
+        rag, calls = self._service()
+        assert rag.search_cti_data_by_title("Cobalt Strike").startswith("Commercial")
+        context = rag.get_context_for_task("T1059.001", k=1)
+        assert context["detailed_context"][0]["name"] == "PowerShell"
+        assert calls == []
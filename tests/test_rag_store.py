@@ -0,0 +1,100 @@
+"""Tests for capabilities/rag_store.py — persistent RAG embedding store."""
+import numpy as np
+
+
+def _fake_embedder(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), t.count("a") + 1.0, 1.0] for t in texts], dtype=np.float32)
+    return embed
+
+
+class TestEmbeddingStore:
+    def test_only_new_chunks_are_embedded(self, tmp_path):
+        from plugins.mcp.app.capabilities.rag_store import EmbeddingStore
+
+        calls = []
+        store = EmbeddingStore("openai/text-embedding-3-small", root=tmp_path)
+        rows = store.ensure(["alpha | one", "beta | two", "alpha | one"], _fake_embedder(calls))
+        assert rows[0] == rows[2]
+        assert calls == [["alpha | one", "beta | two"]]
+
+        store.ensure(["beta | two", "gamma | three"], _fake_embedder(calls))
+        assert calls[-1] == ["gamma | three"]
+        assert len(store) == 3
+
+    def test_reload_from_disk(self, tmp_path):
+        from plugins.mcp.app.capabilities.rag_store import EmbeddingStore
+
+        calls = []
+        first = EmbeddingStore("local/model", root=tmp_path)
+        rows = first.ensure(["alpha", "beta"], _fake_embedder(calls))
+
+        second = EmbeddingStore("local/model", root=tmp_path)
+        assert second.ensure(["alpha", "beta"], _fake_embedder(calls)) == rows
+        assert len(calls) == 1
+        norms = np.linalg.norm(second.matrix(), axis=1)
+        assert np.allclose(norms, 1.0)
+
+    def test_uncommitted_rows_are_trimmed(self, tmp_path):
+        from plugins.mcp.app.capabilities.rag_store import EmbeddingStore
+
+        store = EmbeddingStore("local/model", root=tmp_path)
+        store.ensure(["alpha"], _fake_embedder([]))
+        with open(store.dir / "vectors.f32", "ab") as f:
+            f.write(b"\0" * 12)
+
+        reloaded = EmbeddingStore("local/model", root=tmp_path)
+        assert reloaded.matrix().shape == (1, 3)
+
+    def test_truncated_vectors_are_rebuilt_not_appended_to(self, tmp_path):
+        from plugins.mcp.app.capabilities.rag_store import EmbeddingStore, normalize_rows
+
+        embed = _fake_embedder([])
+        store = EmbeddingStore("local/model", root=tmp_path)
+        store.ensure(["a", "b"], embed)
+        with open(store.dir / "vectors.f32", "r+b") as f:
+            f.truncate(12)
+
+        reloaded = EmbeddingStore("local/model", root=tmp_path)
+        assert len(reloaded) == 0
+        rows = reloaded.ensure(["b"], embed)
+        assert np.allclose(reloaded.vectors(rows), normalize_rows(embed(["b"])))
+        assert (store.dir / "vectors.f32").stat().st_size == 12
+
+    def test_vectors_without_keys_are_discarded(self, tmp_path):
+        from plugins.mcp.app.capabilities.rag_store import EmbeddingStore, normalize_rows
+
+        embed = _fake_embedder([])
+        store = EmbeddingStore("local/model", root=tmp_path)
+        store.ensure(["a"], embed)
+        (store.dir / "keys.json").unlink()
+
+        reloaded = EmbeddingStore("local/model", root=tmp_path)
+        assert not (store.dir / "vectors.f32").exists()
+        rows = reloaded.ensure(["b"], embed)
+        assert rows == [0]
+        assert np.allclose(reloaded.vectors(rows), normalize_rows(embed(["b"])))
+
+    def test_same_model_on_different_endpoints_gets_separate_stores(self, tmp_path):
+        from plugins.mcp.app.capabilities.rag_store import get_embedding_store
+
+        a = get_embedding_store("openai/embed", root=tmp_path, api_base="http://gpu-a:8000/v1")
+        b = get_embedding_store("openai/embed", root=tmp_path, api_base="http://gpu-b:8000/v1/")
+        default = get_embedding_store("openai/embed", root=tmp_path)
+        assert len({a.dir, b.dir, default.dir}) == 3
+        assert get_embedding_store("openai/embed", root=tmp_path, api_base="HTTP://GPU-A:8000/v1/") is a
+
+        a.add(["h"], np.ones((1, 3)))
+        b.add(["h"], np.ones((1, 5)))  # a different dim no longer collides
+        assert (a.dim, b.dim, default.dim) == (3, 5, None)
+
+
+class TestTopK:
+    def test_orders_by_cosine(self):
+        from plugins.mcp.app.capabilities.rag_store import normalize_rows, top_k
+
+        matrix = normalize_rows([[1, 0], [0, 1], [1, 1]])
+        hits = top_k(matrix, [1, 0.1], 2)
+        assert [i for i, _ in hits] == [0, 2]
+        assert top_k(matrix[:0], [1, 0], 3) == []
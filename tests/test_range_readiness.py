@@ -0,0 +1,139 @@
+"""Tests for utilities/range_readiness.py — adaptive / streamed range readiness."""
+
+import pytest
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+def _poller(clock, statuses):
+    it = iter(statuses)
+
+    async def poll():
+        clock.now += 0.1
+        return {"status": next(it)}
+    return poll
+
+
+class TestAdaptiveInterval:
+    def test_backs_off_to_cap_and_resets(self):
+        from plugins.mcp.app.utilities.range_readiness import AdaptiveInterval
+
+        iv = AdaptiveInterval(initial_s=1, max_s=5)
+        assert [iv.next() for _ in range(5)] == [1, 2, 4, 5, 5]
+        iv.reset()
+        assert iv.next() == 1
+
+
+class TestWaitForStatus:
+    @pytest.mark.asyncio
+    async def test_polls_fast_then_backs_off_and_rechecks_on_transition(self):
+        from plugins.mcp.app.utilities.range_readiness import wait_for_status
+
+        clock = _Clock()
+        seen = []
+
+        async def on_progress(elapsed, total, status):
+            seen.append(status)
+
+        poll = _poller(clock, ["pending", "pending", "pending", "deploying", "deploying", "running"])
+        out = await wait_for_status(poll, timeout_s=600, max_interval_s=15,
+                                    on_progress=on_progress, clock=clock, sleep=clock.sleep)
+        assert out["ready"] is True and out["timed_out"] is False
+        assert out["polls"] == 6 and out["mode"] == "poll"
+        # 1, 2, 4 while pending; the transition resets the backoff to 1.
+        assert clock.sleeps == [1, 2, 4, 1, 2]
+        assert seen == ["pending", "deploying", "running"]
+        assert [t["status"] for t in out["transitions"]] == seen
+
+    @pytest.mark.asyncio
+    async def test_flapping_status_never_polls_faster_than_initial_interval(self):
+        from plugins.mcp.app.utilities.range_readiness import wait_for_status
+
+        clock = _Clock()
+        out = await wait_for_status(
+            _poller(clock, ["deploying", None, "deploying", None, "deploying", "running"]),
+            timeout_s=600, clock=clock, sleep=clock.sleep,
+        )
+        assert out["ready"] is True
+        # Dropping to "unknown" and back is not a transition: backoff continues.
+        assert clock.sleeps == [1, 2, 4, 8, 15]
+
+        clock = _Clock()
+        out = await wait_for_status(
+            _poller(clock, ["pending", "deploying"] * 5 + ["running"]),
+            timeout_s=600, clock=clock, sleep=clock.sleep,
+        )
+        assert out["polls"] == 11 and clock.sleeps == [1] * 10
+
+    @pytest.mark.asyncio
+    async def test_failure_and_timeout(self):
+        from plugins.mcp.app.utilities.range_readiness import wait_for_status
+
+        clock = _Clock()
+        out = await wait_for_status(_poller(clock, ["deploying", "failed"]),
+                                    timeout_s=60, clock=clock, sleep=clock.sleep)
+        assert out["ready"] is False and out["status"] == "failed"
+
+        clock = _Clock()
+        out = await wait_for_status(_poller(clock, ["pending"] * 100), timeout_s=10,
+                                    max_interval_s=4, clock=clock, sleep=clock.sleep)
+        assert out["timed_out"] is True and out["elapsed_s"] == 10
+        assert max(clock.sleeps) <= 4 and clock.now <= 10.5
+
+    @pytest.mark.asyncio
+    async def test_stream_preferred_and_falls_back_to_polling(self):
+        from plugins.mcp.app.utilities.range_readiness import wait_for_status
+
+        clock = _Clock()
+
+        def stream():
+            async def events():
+                yield {"status": "deploying"}
+                yield {"status": "ready"}
+            return events()
+
+        async def poll():
+            raise AssertionError("should not poll when the stream answers")
+
+        out = await wait_for_status(poll, timeout_s=60, stream=stream,
+                                    clock=clock, sleep=clock.sleep)
+        assert out["ready"] is True and out["mode"] == "stream" and out["polls"] == 0
+
+        def broken():
+            async def events():
+                raise RuntimeError("HTTP 404")
+                yield  # pragma: no cover
+            return events()
+
+        out = await wait_for_status(_poller(clock, ["running"]), timeout_s=60,
+                                    stream=broken, clock=clock, sleep=clock.sleep)
+        assert out["ready"] is True and out["mode"] == "poll" and out["polls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_stream_timeout_falls_back_instead_of_timing_out(self):
+        from plugins.mcp.app.utilities.range_readiness import wait_for_status
+
+        clock = _Clock()
+
+        def idle():
+            async def events():
+                yield {"status": "deploying"}
+                raise TimeoutError("read idle")
+            return events()
+
+        out = await wait_for_status(_poller(clock, ["running"]), timeout_s=60,
+                                    stream=idle, clock=clock, sleep=clock.sleep)
+        assert out["ready"] is True and out["timed_out"] is False and out["polls"] == 1
+        assert out["mode"] == "poll"
+
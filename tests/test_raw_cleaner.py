@@ -60,3 +60,50 @@ class TestProcessRawFile:
 
         assert "[TEXT]" in result
         assert (clean / "blackcat-report.md").read_text(encoding="utf-8").startswith("# ALPHV")
+
+
+class TestIsLinguisticallyDominant:
+    def test_prose(self):
+        from plugins.mcp.app.utilities.cti_raw_cleaner import _is_linguistically_dominant
+        prose = (
+            "The threat actor deployed ransomware across the network. "
+            "Operators used PsExec to move laterally and disabled Windows Defender. "
+            "Shadow copies were deleted with vssadmin before encryption began."
+        )
+        assert _is_linguistically_dominant(prose) is True
+
+    def test_code(self):
+        from plugins.mcp.app.utilities.cti_raw_cleaner import _is_linguistically_dominant
+        code = "var a=b.c(d);if(x){y[0]=z;}else{w($q,r);} " * 20
+        assert _is_linguistically_dominant(code) is False
+
+
+@pytest.mark.asyncio
+class TestCleanRawDirectoryManifest:
+    async def test_unchanged_files_are_skipped(self, tmp_path, capsys):
+        from plugins.mcp.app.utilities.cti_raw_cleaner import (
+            MANIFEST_NAME,
+            clean_raw_directory_async,
+        )
+
+        raw = tmp_path / "raw"
+        clean = tmp_path / "clean"
+        images = tmp_path / "images"
+        for d in (raw, clean, images):
+            d.mkdir()
+        (raw / "report.md").write_text(
+            "# Report\n\nThe actor used ransomware against a file server.",
+            encoding="utf-8",
+        )
+
+        await clean_raw_directory_async(raw, clean, images)
+        assert (clean / "report.md").exists()
+        assert "report.md" in (clean / MANIFEST_NAME).read_text(encoding="utf-8")
+        capsys.readouterr()
+
+        await clean_raw_directory_async(raw, clean, images)
+        assert "[SKIP] Unchanged: report.md" in capsys.readouterr().out
+
+        (clean / "report.md").unlink()
+        await clean_raw_directory_async(raw, clean, images)
+        assert (clean / "report.md").exists()
@@ -0,0 +1,70 @@
+"""Tests for utilities/cti_stage_pool.py — per-bundle process pool."""
+
+import os
+
+
+def _size_or_fail(path, state):
+    if path.name.startswith("bad"):
+        raise ValueError(f"cannot parse {path.name}")
+    return (path.stat().st_size, state.get("tag"), os.getpid())
+
+
+def _die(path, state):
+    if path.name.startswith("bad"):
+        os._exit(1)
+    return path.name
+
+
+def _setup():
+    return {"tag": "shared"}
+
+
+def _files(tmp_path, names_sizes):
+    paths = []
+    for name, size in names_sizes:
+        p = tmp_path / name
+        p.write_bytes(b"x" * size)
+        paths.append(p)
+    return paths
+
+
+class TestMapBundles:
+    def test_largest_first_and_workers_env(self, tmp_path, monkeypatch):
+        from plugins.mcp.app.utilities.cti_stage_pool import largest_first, resolve_workers, WORKERS_ENV
+
+        small, big, mid = _files(tmp_path, [("a", 1), ("b", 30), ("c", 10)])
+        assert largest_first([small, big, mid]) == [big, mid, small]
+        monkeypatch.delenv(WORKERS_ENV, raising=False)
+        assert resolve_workers() == 1
+        monkeypatch.setenv(WORKERS_ENV, "3")
+        assert resolve_workers() == 3
+        assert resolve_workers(0) >= 1
+
+    def test_sequential_isolates_failures(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_stage_pool import map_bundles
+
+        paths = _files(tmp_path, [("a", 1), ("bad", 2), ("c", 3)])
+        results = map_bundles(_size_or_fail, paths, workers=1, setup=_setup)
+        assert [r.path for r in results] == paths
+        assert results[0].result[:2] == (1, "shared") and results[0].result[2] == os.getpid()
+        assert results[1].result is None and results[1].error.startswith("ValueError")
+        assert results[2].error is None
+
+    def test_pool_keeps_input_order_and_shares_state(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_stage_pool import map_bundles
+
+        paths = _files(tmp_path, [("a", 1), ("bad", 50), ("c", 20), ("d", 5)])
+        results = map_bundles(_size_or_fail, paths, workers=2, setup=_setup)
+        assert [r.path for r in results] == paths
+        assert [r.result[0] for r in results if not r.error] == [1, 20, 5]
+        assert all(r.result[1] == "shared" for r in results if not r.error)
+        assert all(r.result[2] != os.getpid() for r in results if not r.error)
+        assert "cannot parse bad" in results[1].error
+
+    def test_crashed_worker_only_fails_its_bundle(self, tmp_path):
+        from plugins.mcp.app.utilities.cti_stage_pool import map_bundles
+
+        paths = _files(tmp_path, [("a", 1), ("bad", 9), ("c", 3)])
+        results = map_bundles(_die, paths, workers=2)
+        assert [r.result for r in results] == ["a", None, "c"]
+        assert "worker process died" in results[1].error